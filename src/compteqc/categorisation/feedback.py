@@ -17,6 +17,7 @@ from pathlib import Path
 import yaml
 
 from compteqc.categorisation.regles import ConditionRegle, Regle
+from compteqc.ingestion.beneficiaires import beneficiaire_canonique, cle_beneficiaire
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +26,12 @@ SEUIL_AUTO_REGLE = 2
 
 
 def _normaliser_vendeur(vendeur: str) -> str:
-    """Normalise le nom du vendeur pour le suivi des corrections."""
-    return vendeur.upper().strip()
+    """Normalise le nom du vendeur pour le suivi des corrections.
+
+    Passe par le beneficiaire canonique pour que les variantes d'un meme
+    marchand (numero de magasin, prefixe de processeur) partagent l'historique.
+    """
+    return cle_beneficiaire(beneficiaire_canonique(vendeur))
 
 
 def _slugifier(nom: str) -> str:
@@ -39,9 +44,24 @@ def _slugifier(nom: str) -> str:
     return slug[:20]
 
 
+def _fusionner_entree(cible: dict, source: dict) -> None:
+    """Ajoute les compteurs et les notes de `source` a l'entree `cible`."""
+    for compte, nombre in source.get("comptes", {}).items():
+        cible["comptes"][compte] = cible["comptes"].get(compte, 0) + nombre
+    cible["notes"].extend(source.get("notes", []))
+    cible["notes"].sort(key=lambda n: n.get("timestamp", ""))
+    horodatages = [e["dernier_timestamp"] for e in (cible, source) if "dernier_timestamp" in e]
+    if horodatages:
+        cible["dernier_timestamp"] = max(horodatages)
+
+
 def charger_historique(chemin: Path) -> dict:
     """Charge l'historique des corrections depuis le fichier JSON.
 
+    Les cles des anciens historiques (vendeur brut en majuscules) sont
+    regroupees sous leur cle canonique: les compteurs vers SEUIL_AUTO_REGLE
+    sont conserves.
+
     Args:
         chemin: Chemin vers le fichier JSON.
 
@@ -55,7 +75,12 @@ def charger_historique(chemin: Path) -> dict:
     if not contenu.strip():
         return {}
 
-    return json.loads(contenu)
+    historique: dict = {}
+    for cle, entree in json.loads(contenu).items():
+        canonique = _normaliser_vendeur(cle)
+        cible = historique.setdefault(canonique, {"comptes": {}, "notes": []})
+        _fusionner_entree(cible, entree)
+    return historique
 
 
 def _sauvegarder_historique(chemin: Path, historique: dict) -> None:
@@ -15,6 +15,8 @@ from sklearn.feature_extraction.text import CountVectorizer
 from sklearn.pipeline import Pipeline, make_pipeline
 from sklearn.svm import SVC
 
+from compteqc.ingestion.beneficiaires import beneficiaire_canonique, beneficiaires_canoniques
+
 logger = logging.getLogger(__name__)
 
 
@@ -74,7 +76,11 @@ class PredicteurML:
 
         # Construire les textes d'entree avec poids
         # narration poids 1.0, payee poids 0.8 (repete pour simuler le poids)
-        textes = [f"{narration} {payee}" for payee, narration, _ in data]
+        # Le payee canonique regroupe les variantes d'un meme marchand
+        payees = beneficiaires_canoniques(payee for payee, _, _ in data)
+        textes = [
+            f"{narration} {payee}" for payee, (_, narration, _) in zip(payees, data)
+        ]
 
         self._pipeline = make_pipeline(
             CountVectorizer(analyzer="word", ngram_range=(1, 2)),
@@ -104,7 +110,7 @@ class PredicteurML:
         if not self._est_entraine or self._pipeline is None:
             return None
 
-        texte = f"{narration} {payee}"
+        texte = f"{narration} {beneficiaire_canonique(payee)}"
         probas = self._pipeline.predict_proba([texte])[0]
         idx_max = int(np.argmax(probas))
         compte = str(self._classes[idx_max])
@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import copy
 import logging
+from collections.abc import Callable
 from pathlib import Path
 
 from beancount.core import data
@@ -16,11 +17,14 @@ from beancount.parser import parser as beancount_parser
 from beancount.parser import printer
 
 from compteqc.categorisation.pipeline import ResultatPipeline
+from compteqc.ledger.cloture import annees_cloturees
 from compteqc.ledger.fichiers import (
     ajouter_include,
     chemin_fichier_mensuel,
     ecrire_transactions,
 )
+from compteqc.ledger.journal import JournalEcritures
+from compteqc.ledger.verrou import VerrouEcriture
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +42,7 @@ def ecrire_pending(
     chemin_pending: Path,
     transactions: list[data.Transaction],
     resultats: list[ResultatPipeline],
+    journal: JournalEcritures | None = None,
 ) -> int:
     """Ecrit des transactions dans pending.beancount avec le tag #pending.
 
@@ -45,6 +50,7 @@ def ecrire_pending(
         chemin_pending: Chemin vers pending.beancount.
         transactions: Liste de transactions Beancount.
         resultats: Resultats pipeline correspondants (meme ordre).
+        journal: Operation journalisee (l'ecriture sera annulable).
 
     Returns:
         Nombre de transactions ecrites.
@@ -60,9 +66,12 @@ def ecrire_pending(
     texte = "\n".join(printer.format_entry(t) for t in txns_pending)
 
     if not chemin_pending.exists():
-        chemin_pending.write_text(_ENTETE_PENDING, encoding="utf-8")
+        if journal is not None:
+            journal.ajouter(chemin_pending, _ENTETE_PENDING)
+        else:
+            chemin_pending.write_text(_ENTETE_PENDING, encoding="utf-8")
 
-    ecrire_transactions(chemin_pending, texte)
+    ecrire_transactions(chemin_pending, texte, journal=journal)
 
     return len(txns_pending)
 
@@ -159,6 +168,8 @@ def approuver_transactions(
     chemin_pending: Path,
     chemin_main: Path,
     indices: list[int],
+    version_attendue: int | None = None,
+    etape: Callable[[str], None] | None = None,
 ) -> int:
     """Approuve des transactions pending et les deplace vers les fichiers mensuels.
 
@@ -166,89 +177,93 @@ def approuver_transactions(
         chemin_pending: Chemin vers pending.beancount.
         chemin_main: Chemin vers main.beancount.
         indices: Indices (0-based) des transactions a approuver.
+        version_attendue: Version du ledger sur laquelle les indices ont ete
+            calcules (aucune verification si None).
+        etape: Appelee au debut de chaque etape ("ecriture", "validation",
+            "confirmation"). Une exception levee par le rappel avant la
+            confirmation annule toutes les ecritures.
 
     Returns:
-        Nombre de transactions approuvees.
-    """
-    pending = lire_pending(chemin_pending)
-    if not pending:
-        return 0
-
-    indices_set = set(indices)
-    a_approuver = []
-    restantes = []
-
-    for i, txn in enumerate(pending):
-        if i in indices_set:
-            a_approuver.append(txn)
-        else:
-            restantes.append(txn)
+        Nombre de transactions approuvees. Les transactions d'un exercice
+        cloture ne sont pas approuvees et restent en attente.
 
-    if not a_approuver:
-        return 0
-
-    # Sauvegarder pour rollback
-    contenu_pending_avant = chemin_pending.read_text(encoding="utf-8")
+    Raises:
+        ConflitVersion: Si le ledger a ete modifie depuis `version_attendue`.
+    """
     ledger_dir = chemin_main.parent
 
-    fichiers_modifies: dict[Path, str | None] = {}
+    # Les indices ne sont valides que si pending.beancount n'a pas change:
+    # lecture et ecritures se font sous le verrou d'ecriture.
+    with VerrouEcriture(ledger_dir, version_attendue):
+        pending = lire_pending(chemin_pending)
+        if not pending:
+            return 0
 
-    try:
-        # Ecrire chaque transaction approuvee dans son fichier mensuel
-        for txn in a_approuver:
-            txn_approuvee = _finaliser_approbation(txn)
-            fichier_mensuel = chemin_fichier_mensuel(
-                txn.date.year, txn.date.month, ledger_dir
-            )
+        indices_set = set(indices)
+        cloturees = set(annees_cloturees(chemin_main))
+        a_approuver = []
+        restantes = []
+
+        for i, txn in enumerate(pending):
+            if i in indices_set and txn.date.year in cloturees:
+                # Reste en attente: a saisir en ajustement de l'exercice courant
+                logger.warning(
+                    "Transaction du %s non approuvee: l'exercice %d est cloture.",
+                    txn.date, txn.date.year,
+                )
+                restantes.append(txn)
+            elif i in indices_set:
+                a_approuver.append(txn)
+            else:
+                restantes.append(txn)
+
+        if not a_approuver:
+            return 0
 
-            # Sauvegarder pour rollback
-            if fichier_mensuel not in fichiers_modifies:
-                if fichier_mensuel.exists():
-                    fichiers_modifies[fichier_mensuel] = fichier_mensuel.read_text(
-                        encoding="utf-8"
+        # Les ecritures sont journalisees: une erreur ou un ledger invalide
+        # annule les ajouts et la reecriture de pending.beancount.
+        if etape is not None:
+            etape("ecriture")
+        try:
+            with JournalEcritures(ledger_dir, "approbation") as journal:
+                # Ecrire chaque transaction approuvee dans son fichier mensuel
+                for txn in a_approuver:
+                    txn_approuvee = _finaliser_approbation(txn)
+                    fichier_mensuel = chemin_fichier_mensuel(
+                        txn.date.year, txn.date.month, ledger_dir, journal=journal
                     )
-                else:
-                    fichiers_modifies[fichier_mensuel] = None
 
-            texte = printer.format_entry(txn_approuvee)
-            ecrire_transactions(fichier_mensuel, texte)
+                    texte = printer.format_entry(txn_approuvee)
+                    ecrire_transactions(fichier_mensuel, texte, journal=journal)
 
-            chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
-            ajouter_include(chemin_main, chemin_relatif)
+                    chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
+                    ajouter_include(chemin_main, chemin_relatif, journal=journal)
 
-        # Reecrire pending.beancount avec les transactions restantes
-        _reecrire_pending(chemin_pending, restantes)
+                # Reecrire pending.beancount avec les transactions restantes
+                _reecrire_pending(chemin_pending, restantes, journal=journal)
 
-        # Valider le ledger
-        from compteqc.ledger.validation import valider_ledger
+                # Valider le ledger
+                from compteqc.ledger.validation import valider_ledger
 
-        valide, erreurs = valider_ledger(chemin_main)
+                if etape is not None:
+                    etape("validation")
+                valide, erreurs = valider_ledger(chemin_main)
 
-        if not valide:
-            logger.error(
-                "Validation echouee apres approbation. Rollback."
-            )
-            for err in erreurs:
-                logger.error("  %s", err)
-
-            # Rollback
-            chemin_pending.write_text(contenu_pending_avant, encoding="utf-8")
-            for fichier, contenu in fichiers_modifies.items():
-                if contenu is not None:
-                    fichier.write_text(contenu, encoding="utf-8")
-                elif fichier.exists():
-                    fichier.unlink()
-            return 0
+                if not valide:
+                    logger.error(
+                        "Validation echouee apres approbation. Rollback."
+                    )
+                    for err in erreurs:
+                        logger.error("  %s", err)
+                    journal.annuler()
+                    return 0
 
-    except Exception:
-        logger.error("Erreur lors de l'approbation. Rollback.", exc_info=True)
-        chemin_pending.write_text(contenu_pending_avant, encoding="utf-8")
-        for fichier, contenu in fichiers_modifies.items():
-            if contenu is not None:
-                fichier.write_text(contenu, encoding="utf-8")
-            elif fichier.exists():
-                fichier.unlink()
-        return 0
+                if etape is not None:
+                    etape("confirmation")
+
+        except Exception:
+            logger.error("Erreur lors de l'approbation. Rollback.", exc_info=True)
+            return 0
 
     return len(a_approuver)
 
@@ -276,42 +291,59 @@ def _finaliser_approbation(txn: data.Transaction) -> data.Transaction:
 def rejeter_transactions(
     chemin_pending: Path,
     indices: list[int],
+    version_attendue: int | None = None,
 ) -> int:
     """Rejette des transactions pending (les supprime).
 
     Args:
         chemin_pending: Chemin vers pending.beancount.
         indices: Indices (0-based) des transactions a rejeter.
+        version_attendue: Version du ledger sur laquelle les indices ont ete
+            calcules (aucune verification si None).
 
     Returns:
         Nombre de transactions rejetees.
+
+    Raises:
+        ConflitVersion: Si le ledger a ete modifie depuis `version_attendue`.
     """
-    pending = lire_pending(chemin_pending)
-    if not pending:
-        return 0
+    with VerrouEcriture(chemin_pending.parent, version_attendue) as verrou:
+        pending = lire_pending(chemin_pending)
+        if not pending:
+            return 0
 
-    indices_set = set(indices)
-    restantes = [txn for i, txn in enumerate(pending) if i not in indices_set]
-    nb_rejetees = len(pending) - len(restantes)
+        indices_set = set(indices)
+        restantes = [txn for i, txn in enumerate(pending) if i not in indices_set]
+        nb_rejetees = len(pending) - len(restantes)
 
-    if nb_rejetees > 0:
-        _reecrire_pending(chemin_pending, restantes)
+        if nb_rejetees > 0:
+            _reecrire_pending(chemin_pending, restantes)
+            verrou.modifie()
 
     return nb_rejetees
 
 
-def _reecrire_pending(chemin_pending: Path, transactions: list[data.Transaction]) -> None:
+def _reecrire_pending(
+    chemin_pending: Path,
+    transactions: list[data.Transaction],
+    journal: JournalEcritures | None = None,
+) -> None:
     """Reecrit pending.beancount avec les transactions fournies."""
     contenu = _ENTETE_PENDING
 
     if transactions:
         contenu += "\n" + "\n".join(printer.format_entry(t) for t in transactions)
 
-    chemin_pending.write_text(contenu, encoding="utf-8")
+    if journal is not None:
+        journal.reecrire(chemin_pending, contenu)
+    else:
+        chemin_pending.write_text(contenu, encoding="utf-8")
 
 
-def assurer_include_pending(chemin_main: Path, chemin_pending: Path) -> None:
+def assurer_include_pending(
+    chemin_main: Path, chemin_pending: Path, journal: JournalEcritures | None = None
+) -> None:
     """Ajoute l'include pour pending.beancount dans main.beancount si necessaire."""
     ledger_dir = chemin_main.parent
     chemin_relatif = str(chemin_pending.relative_to(ledger_dir))
-    ajouter_include(chemin_main, chemin_relatif)
+    ajouter_include(chemin_main, chemin_relatif, journal=journal)
@@ -69,6 +69,12 @@ def main(
     if regles:
         _regles_path = Path(regles)
 
+    # Terminer les ecritures interrompues (arret en plein import/approbation)
+    from compteqc.ledger.journal import recuperer_journaux
+
+    if _ledger_path.parent.is_dir() and recuperer_journaux(_ledger_path.parent):
+        console.print("[yellow]Ecritures interrompues recuperees (journal).[/yellow]")
+
 
 # Import et enregistrement des sous-commandes
 from compteqc.cli.importer import importer_app  # noqa: E402
@@ -306,3 +312,46 @@ def retrain() -> None:
             f"[yellow]Donnees insuffisantes pour l'entrainement: "
             f"{len(donnees)} transactions (minimum {PredicteurML.MIN_TRAINING_SIZE})[/yellow]"
         )
+
+
+@app.command(name="cloture")
+def cloture(
+    annee: int = typer.Option(..., "--annee", "-a", help="Annee fiscale a cloturer"),
+    compte_benefices: str = typer.Option(
+        "Capital:Benefices-Non-Repartis",
+        "--benefices",
+        help="Compte de capital qui recoit le resultat cumule",
+    ),
+) -> None:
+    """Cloturer un exercice: archiver l'annee et creer les soldes d'ouverture.
+
+    Les commandes courantes ne chargent ensuite que les annees ouvertes.
+    L'historique complet reste disponible avec --archives (cpa, rapport).
+    """
+    from compteqc.ledger.cloture import cloturer_exercice
+    from compteqc.ledger.git import auto_commit
+
+    chemin_main = get_ledger_path()
+    if not chemin_main.exists():
+        console.print(f"[red]Ledger introuvable: {chemin_main}[/red]")
+        raise typer.Exit(1)
+
+    try:
+        resultat = cloturer_exercice(chemin_main, annee, compte_benefices)
+    except ValueError as e:
+        console.print(f"[red]Cloture impossible:[/red] {e}")
+        raise typer.Exit(1) from e
+
+    console.print(
+        f"[green]Exercice {annee} cloture:[/green] {resultat.nb_fichiers} fichier(s) archive(s) "
+        f"dans {resultat.archive}"
+    )
+    console.print(
+        f"Soldes d'ouverture {annee + 1}: {resultat.nb_comptes} compte(s) "
+        f"dans {resultat.ouverture}"
+    )
+
+    try:
+        auto_commit(chemin_main.parent.parent, f"cloture({annee}): exercice archive")
+    except ValueError as e:
+        console.print(f"[red]Erreur lors du commit :[/red] {e}")
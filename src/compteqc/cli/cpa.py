@@ -25,6 +25,19 @@ def cpa_export(
     ledger: Optional[str] = typer.Option(
         None, "--ledger", "-l", help="Chemin vers le fichier main.beancount"
     ),
+    archives: bool = typer.Option(
+        False, "--archives", help="Inclure les exercices clotures (historique complet)"
+    ),
+    jobs: Optional[int] = typer.Option(
+        None,
+        "--jobs",
+        "-j",
+        min=1,
+        help="Processus de rendu PDF (defaut: un par rapport, au plus un par coeur)",
+    ),
+    sans_cache: bool = typer.Option(
+        False, "--sans-cache", help="Rendre tous les rapports sans reutiliser le cache"
+    ),
 ) -> None:
     """Generer le package CPA complet (ZIP avec tous les rapports)."""
     from pathlib import Path
@@ -32,6 +45,7 @@ def cpa_export(
     from beancount import loader
 
     from compteqc.cli.app import get_ledger_path
+    from compteqc.ledger.cloture import annees_cloturees, chemin_historique
     from compteqc.rapports.cpa_package import CpaPackageError, generer_package_cpa
 
     chemin_ledger = Path(ledger) if ledger else get_ledger_path()
@@ -40,10 +54,20 @@ def cpa_export(
         raise typer.Exit(1)
 
     output_dir = Path(sortie) if sortie else Path("ledger/exports")
+    cache = (
+        None if sans_cache
+        else chemin_ledger.resolve().parent.parent / "data" / "cache" / "rapports"
+    )
     output_dir.mkdir(parents=True, exist_ok=True)
 
     console.print(f"[bold]Generation du package CPA {annee}...[/bold]")
 
+    if not archives and annee in annees_cloturees(chemin_ledger):
+        # Les transactions d'un exercice cloture ne sont que dans les archives
+        console.print(f"[dim]Exercice {annee} cloture: chargement de l'historique.[/dim]")
+        archives = True
+    if archives:
+        chemin_ledger = chemin_historique(chemin_ledger)
     entries, _, _ = loader.load_file(str(chemin_ledger))
 
     try:
@@ -52,6 +76,8 @@ def cpa_export(
             annee=annee,
             output_dir=output_dir,
             console_out=console,
+            jobs=jobs,
+            cache=cache,
         )
         console.print(f"\n[green]Package CPA genere:[/green] {zip_path}")
     except CpaPackageError as e:
@@ -65,6 +91,9 @@ def cpa_verifier(
     ledger: Optional[str] = typer.Option(
         None, "--ledger", "-l", help="Chemin vers le fichier main.beancount"
     ),
+    archives: bool = typer.Option(
+        False, "--archives", help="Inclure les exercices clotures (historique complet)"
+    ),
 ) -> None:
     """Executer le checklist de fin d'exercice (sans generer de rapports)."""
     from pathlib import Path
@@ -72,6 +101,7 @@ def cpa_verifier(
     from beancount import loader
 
     from compteqc.cli.app import get_ledger_path
+    from compteqc.ledger.cloture import annees_cloturees, chemin_historique
     from compteqc.rapports.cpa_package import afficher_checklist
     from compteqc.echeances.verification import verifier_fin_exercice
 
@@ -80,6 +110,12 @@ def cpa_verifier(
         console.print(f"[red]Ledger introuvable: {chemin_ledger}[/red]")
         raise typer.Exit(1)
 
+    if not archives and annee in annees_cloturees(chemin_ledger):
+        # Les transactions d'un exercice cloture ne sont que dans les archives
+        console.print(f"[dim]Exercice {annee} cloture: chargement de l'historique.[/dim]")
+        archives = True
+    if archives:
+        chemin_ledger = chemin_historique(chemin_ledger)
     entries, _, _ = loader.load_file(str(chemin_ledger))
 
     console.print(f"[bold]Verification fin d'exercice {annee}...[/bold]")
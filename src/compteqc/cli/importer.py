@@ -8,6 +8,7 @@ from decimal import Decimal
 from pathlib import Path
 
 import typer
+import yaml
 from beancount import loader
 from beancount.core import data
 from beancount.parser import printer
@@ -22,17 +23,21 @@ from compteqc.categorisation.pending import assurer_include_pending, ecrire_pend
 from compteqc.categorisation.pipeline import PipelineCategorisation, ResultatPipeline
 from compteqc.categorisation.regles import charger_regles
 from compteqc.ingestion import (
+    NormaliseurBeneficiaires,
     RBCCarteImporter,
     RBCChequesImporter,
-    RBCOfxImporter,
     archiver_fichier,
 )
+from compteqc.ingestion.beneficiaires import definir_normaliseur_defaut
+from compteqc.ingestion.registre import registre_defaut
+from compteqc.ledger.cloture import annees_cloturees
 from compteqc.ledger.fichiers import (
     ajouter_include,
     chemin_fichier_mensuel,
     ecrire_transactions,
 )
 from compteqc.ledger.git import auto_commit
+from compteqc.ledger.journal import JournalEcritures
 from compteqc.ledger.validation import charger_comptes_existants, valider_ledger
 
 logger = logging.getLogger(__name__)
@@ -69,42 +74,13 @@ def _detecter_importateurs(chemin: str, compte: str) -> list:
         )
         raise typer.Exit(1)
 
-    # AUTO: detecter tous les importateurs qui reconnaissent le fichier
-    path = Path(chemin)
-
-    # OFX/QFX: essayer le parser OFX
-    if path.suffix.lower() in (".ofx", ".qfx"):
-        try:
-            from ofxtools.Parser import OFXTree
-
-            tree = OFXTree()
-            tree.parse(chemin)
-            ofx = tree.convert()
-            for stmt in ofx.statements:
-                acctid = stmt.account.acctid
-                acct_type = getattr(stmt.account, "accttype", "CHECKING")
-                if acct_type in ("CHECKING", "SAVINGS"):
-                    return [RBCOfxImporter(
-                        account="Actifs:Banque:RBC:Cheques",
-                        account_id=acctid,
-                    )]
-                else:
-                    return [RBCOfxImporter(
-                        account="Passifs:CartesCredit:RBC",
-                        account_id=acctid,
-                    )]
-        except Exception:
-            pass
-
-    # CSV: essayer les deux importateurs (fichier combine possible)
-    resultats = []
-    imp_cheques = RBCChequesImporter()
-    imp_carte = RBCCarteImporter()
-
-    if imp_cheques.identify(chemin):
-        resultats.append(imp_cheques)
-    if imp_carte.identify(chemin):
-        resultats.append(imp_carte)
+    # AUTO: le registre lit la tete du fichier une fois et choisit le format
+    registre = registre_defaut()
+    try:
+        resultats = registre.detecter(Path(chemin))
+    except ValueError as e:
+        console.print(f"[red]Erreur:[/red] {e}", style="bold")
+        raise typer.Exit(1)
 
     if resultats:
         return resultats
@@ -114,18 +90,36 @@ def _detecter_importateurs(chemin: str, compte: str) -> list:
         style="bold",
     )
     console.print("Formats supportes :")
-    console.print("  - CSV RBC (cheques et/ou carte de credit)")
-    console.print("  - OFX/QFX RBC")
+    for fmt in registre.formats:
+        console.print(f"  - {fmt.description}")
     raise typer.Exit(1)
 
 
+def _charger_alias(chemin_regles: Path) -> None:
+    """Charge la table d'alias des beneficiaires situee a cote des regles.
+
+    Le normaliseur charge devient le normaliseur partage utilise par les
+    importateurs et le modele ML.
+    """
+    chemin_alias = chemin_regles.parent / "beneficiaires.yaml"
+    try:
+        definir_normaliseur_defaut(NormaliseurBeneficiaires.charger(chemin_alias))
+    except (ValueError, yaml.YAMLError) as e:
+        console.print(f"  [yellow]Table d'alias ignoree ({chemin_alias}): {e}[/yellow]")
+
+
 def _creer_pipeline(
     chemin_main: Path,
     chemin_regles: Path,
     comptes_valides: set[str],
     entries_existantes: list,
+    predicteur_ml: PredicteurML | None = None,
 ) -> PipelineCategorisation:
-    """Cree le pipeline de categorisation a trois niveaux."""
+    """Cree le pipeline de categorisation a trois niveaux.
+
+    Si `predicteur_ml` est fourni (deja entraine), il est reutilise tel quel
+    au lieu d'etre re-entraine depuis le ledger.
+    """
     # Tier 1: Regles
     try:
         config_regles = charger_regles(chemin_regles)
@@ -136,21 +130,8 @@ def _creer_pipeline(
     moteur = MoteurRegles(config_regles, comptes_valides)
 
     # Tier 2: ML (essayer d'entrainer depuis le ledger existant)
-    predicteur_ml = PredicteurML()
-    donnees_ml = _extraire_donnees_entrainement(entries_existantes)
-    if donnees_ml:
-        predicteur_ml.entrainer(donnees_ml)
-        if predicteur_ml.est_entraine:
-            console.print(
-                f"  [dim]ML: entraine avec {len(donnees_ml)} transactions[/dim]"
-            )
-        else:
-            console.print(
-                "  [dim]ML: donnees insuffisantes pour entrainement"
-                f" ({len(donnees_ml)} transactions)[/dim]"
-            )
-    else:
-        console.print("  [dim]ML: aucune donnee d'entrainement (demarrage a froid)[/dim]")
+    if predicteur_ml is None:
+        predicteur_ml = _entrainer_predicteur(entries_existantes)
 
     # Tier 3: LLM
     classificateur_llm = None
@@ -169,6 +150,26 @@ def _creer_pipeline(
     return PipelineCategorisation(moteur, predicteur_ml, classificateur_llm, detecteur_capex)
 
 
+def _entrainer_predicteur(entries_existantes: list) -> PredicteurML:
+    """Entraine le predicteur ML depuis les transactions approuvees du ledger."""
+    predicteur_ml = PredicteurML()
+    donnees_ml = _extraire_donnees_entrainement(entries_existantes)
+    if donnees_ml:
+        predicteur_ml.entrainer(donnees_ml)
+        if predicteur_ml.est_entraine:
+            console.print(
+                f"  [dim]ML: entraine avec {len(donnees_ml)} transactions[/dim]"
+            )
+        else:
+            console.print(
+                "  [dim]ML: donnees insuffisantes pour entrainement"
+                f" ({len(donnees_ml)} transactions)[/dim]"
+            )
+    else:
+        console.print("  [dim]ML: aucune donnee d'entrainement (demarrage a froid)[/dim]")
+    return predicteur_ml
+
+
 def _extraire_donnees_entrainement(
     entries: list,
 ) -> list[tuple[str, str, str]]:
@@ -267,9 +268,17 @@ def _importer_avec(
     chemin_main: Path,
     chemin_regles: Path,
     entries_existantes,
+    pipeline: PipelineCategorisation | None = None,
+    transactions_ecrites: list[data.Transaction] | None = None,
 ) -> tuple[int, int, int, int]:
     """Execute l'import pour un importateur donne.
 
+    Args:
+        pipeline: Pipeline deja construit (mode surveillance). Si absent,
+            un pipeline est cree a partir du ledger.
+        transactions_ecrites: Si fourni, recoit les transactions ecrites
+            (directes et pending) pour mettre a jour un ledger en memoire.
+
     Retourne (nb_importees, nb_regles, nb_ia_auto, nb_pending).
     """
     # Extraire les transactions
@@ -282,11 +291,27 @@ def _importer_avec(
         )
         return (0, 0, 0, 0)
 
+    # Un exercice cloture est reporte dans l'ouverture de l'annee suivante:
+    # ses transactions doivent passer par un ajustement de l'exercice courant.
+    cloturees = set(annees_cloturees(chemin_main))
+    hors_exercice = [t for t in nouvelles if t.date.year in cloturees]
+    if hors_exercice:
+        annees = ", ".join(str(a) for a in sorted({t.date.year for t in hors_exercice}))
+        console.print(
+            f"  [yellow]{len(hors_exercice)} transaction(s) datee(s) d'un exercice "
+            f"cloture ({annees}) ignoree(s): saisir un ajustement dans "
+            "l'exercice courant.[/yellow]"
+        )
+        nouvelles = [t for t in nouvelles if t.date.year not in cloturees]
+        if not nouvelles:
+            return (0, 0, 0, 0)
+
     # Creer le pipeline
-    comptes_valides = charger_comptes_existants(chemin_main)
-    pipeline = _creer_pipeline(
-        chemin_main, chemin_regles, comptes_valides, entries_existantes
-    )
+    if pipeline is None:
+        comptes_valides = charger_comptes_existants(chemin_main)
+        pipeline = _creer_pipeline(
+            chemin_main, chemin_regles, comptes_valides, entries_existantes
+        )
 
     # Router chaque transaction
     txns_direct: list[data.Transaction] = []
@@ -307,47 +332,53 @@ def _importer_avec(
             # "pending" ou "revue" -> staging
             txns_pending.append((txn_mod, resultat))
 
-    # Ecrire les transactions directes dans les fichiers mensuels
-    if txns_direct:
-        ledger_dir = chemin_main.parent
-        # Grouper par mois
-        par_mois: dict[tuple[int, int], list[data.Transaction]] = {}
-        for txn in txns_direct:
-            key = (txn.date.year, txn.date.month)
-            par_mois.setdefault(key, []).append(txn)
+    # Ecritures journalisees: un ledger invalide ou une erreur les annule
+    ledger_dir = chemin_main.parent
+    nb_pending = 0
+    with JournalEcritures(ledger_dir, f"import {path.name}") as journal:
+        # Ecrire les transactions directes dans les fichiers mensuels
+        if txns_direct:
+            # Grouper par mois
+            par_mois: dict[tuple[int, int], list[data.Transaction]] = {}
+            for txn in txns_direct:
+                key = (txn.date.year, txn.date.month)
+                par_mois.setdefault(key, []).append(txn)
 
-        for (annee, mois), txns in par_mois.items():
-            fichier_mensuel = chemin_fichier_mensuel(annee, mois, ledger_dir)
+            for (annee, mois), txns in par_mois.items():
+                fichier_mensuel = chemin_fichier_mensuel(annee, mois, ledger_dir, journal=journal)
 
-            texte = "\n".join(printer.format_entry(t) for t in txns)
-            ecrire_transactions(fichier_mensuel, texte)
+                texte = "\n".join(printer.format_entry(t) for t in txns)
+                ecrire_transactions(fichier_mensuel, texte, journal=journal)
 
-            chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
-            ajouter_include(chemin_main, chemin_relatif)
+                chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
+                ajouter_include(chemin_main, chemin_relatif, journal=journal)
 
-    # Ecrire les transactions pending
-    nb_pending = 0
-    if txns_pending:
-        ledger_dir = chemin_main.parent
-        chemin_pending = ledger_dir / "pending.beancount"
+        # Ecrire les transactions pending
+        if txns_pending:
+            chemin_pending = ledger_dir / "pending.beancount"
 
-        txns_list = [t for t, _ in txns_pending]
-        resultats_list = [r for _, r in txns_pending]
+            txns_list = [t for t, _ in txns_pending]
+            resultats_list = [r for _, r in txns_pending]
 
-        nb_pending = ecrire_pending(chemin_pending, txns_list, resultats_list)
+            nb_pending = ecrire_pending(chemin_pending, txns_list, resultats_list, journal=journal)
 
-        if nb_pending > 0:
-            assurer_include_pending(chemin_main, chemin_pending)
+            if nb_pending > 0:
+                assurer_include_pending(chemin_main, chemin_pending, journal=journal)
 
-    # Valider le ledger
-    valide, erreurs = valider_ledger(chemin_main)
+        # Valider le ledger
+        valide, erreurs = valider_ledger(chemin_main)
 
-    if not valide:
-        console.print("[red]Erreur de validation du ledger ![/red]")
-        console.print("Les ecritures ont ete annulees (rollback).")
-        for err in erreurs:
-            console.print(f"  [red]{err}[/red]")
-        raise typer.Exit(1)
+        if not valide:
+            journal.annuler()
+            console.print("[red]Erreur de validation du ledger ![/red]")
+            console.print("Les ecritures ont ete annulees (rollback).")
+            for err in erreurs:
+                console.print(f"  [red]{err}[/red]")
+            raise typer.Exit(1)
+
+    if transactions_ecrites is not None:
+        transactions_ecrites.extend(txns_direct)
+        transactions_ecrites.extend(t for t, _ in txns_pending)
 
     return (len(nouvelles), nb_regles, nb_ia_auto, nb_pending)
 
@@ -374,6 +405,7 @@ def fichier(
 
     chemin_main = get_ledger_path()
     chemin_regles = get_regles_path()
+    _charger_alias(chemin_regles)
 
     path = Path(chemin_fichier)
     if not path.exists():
@@ -478,3 +510,217 @@ def fichier(
             "\n[yellow]Aucun commit git cree[/yellow]"
             " (pas de changements ou erreur)."
         )
+
+
+# ---------------------------------------------------------------------------
+# Mode surveillance (daemon)
+# ---------------------------------------------------------------------------
+
+
+class _ContexteSurveillance:
+    """Etat garde en memoire par `cqc importer surveiller` entre deux fichiers.
+
+    Le ledger parse, le moteur de regles et le modele ML restent chauds.
+    Le ledger n'est re-parse que s'il a ete modifie hors du daemon (CLI,
+    Fava, MCP); le pipeline n'est reconstruit que si le ledger ou le
+    fichier de regles a change.
+    """
+
+    def __init__(self, chemin_main: Path, chemin_regles: Path) -> None:
+        self.chemin_main = chemin_main
+        self.chemin_regles = chemin_regles
+        self.entries: list = []
+        self.pipeline: PipelineCategorisation | None = None
+        self._predicteur_ml: PredicteurML | None = None
+        self._empreinte_ledger: dict[Path, int] = {}
+        self._mtime_regles: int | None = None
+        self._mtime_alias: int | None = -1
+
+    def _empreinte(self) -> dict[Path, int]:
+        """Dates de modification de tous les fichiers .beancount du ledger."""
+        empreinte = {}
+        for fichier in self.chemin_main.parent.rglob("*.beancount"):
+            try:
+                empreinte[fichier] = fichier.stat().st_mtime_ns
+            except FileNotFoundError:
+                continue
+        return empreinte
+
+    def _mtime_fichier_regles(self) -> int | None:
+        try:
+            return self.chemin_regles.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _mtime_fichier_alias(self) -> int | None:
+        try:
+            return (self.chemin_regles.parent / "beneficiaires.yaml").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def preparer(self) -> None:
+        """Rafraichit l'etat chaud si le ledger ou les regles ont change."""
+        empreinte = self._empreinte()
+        ledger_modifie = empreinte != self._empreinte_ledger
+        mtime_regles = self._mtime_fichier_regles()
+        mtime_alias = self._mtime_fichier_alias()
+
+        if mtime_alias != self._mtime_alias:
+            _charger_alias(self.chemin_regles)
+            self._mtime_alias = mtime_alias
+            ledger_modifie = True  # les payees canoniques du modele ML changent
+
+        if ledger_modifie:
+            console.print("  [dim]Chargement du ledger...[/dim]")
+            self.entries, _errors, _options = loader.load_file(str(self.chemin_main))
+            self._predicteur_ml = _entrainer_predicteur(self.entries)
+
+        if ledger_modifie or mtime_regles != self._mtime_regles or self.pipeline is None:
+            comptes_valides = {
+                entry.account for entry in self.entries if hasattr(entry, "account")
+            }
+            self.pipeline = _creer_pipeline(
+                self.chemin_main,
+                self.chemin_regles,
+                comptes_valides,
+                self.entries,
+                predicteur_ml=self._predicteur_ml,
+            )
+
+        self._empreinte_ledger = empreinte
+        self._mtime_regles = mtime_regles
+
+    def enregistrer(self, transactions: list[data.Transaction]) -> None:
+        """Ajoute au ledger en memoire les transactions ecrites par le daemon."""
+        self.entries.extend(transactions)
+        self._empreinte_ledger = self._empreinte()
+
+    def invalider(self) -> None:
+        """Force un rechargement complet au prochain fichier."""
+        self._empreinte_ledger = {}
+
+
+def _traiter_fichier_surveille(
+    path: Path,
+    contexte: _ContexteSurveillance,
+    repertoire_processed: Path,
+) -> int:
+    """Importe un fichier depose dans le repertoire surveille.
+
+    Utilise le meme routage que `cqc importer fichier` (direct ou pending),
+    puis archive le fichier, le retire du repertoire surveille et cree le
+    commit git.
+
+    Returns:
+        Nombre de transactions importees (0 si rien de nouveau ou erreur).
+    """
+    console.print(f"\nNouveau fichier [cyan]{path.name}[/cyan]")
+    contexte.preparer()
+
+    try:
+        importateurs = _detecter_importateurs(str(path), "AUTO")
+    except typer.Exit:
+        return 0
+
+    total_importees = 0
+    for imp in importateurs:
+        console.print(f"Import [cyan]{imp.account('')}[/cyan]...")
+        ecrites: list[data.Transaction] = []
+        try:
+            nb_imp, _nb_reg, _nb_ia, nb_pend = _importer_avec(
+                imp,
+                path,
+                contexte.chemin_main,
+                contexte.chemin_regles,
+                contexte.entries,
+                pipeline=contexte.pipeline,
+                transactions_ecrites=ecrites,
+            )
+        except typer.Exit:
+            contexte.invalider()
+            return total_importees
+        except Exception as e:
+            logger.warning("Erreur d'import pour %s: %s", path, e, exc_info=True)
+            console.print(f"  [red]Erreur:[/red] {e}")
+            contexte.invalider()
+            return total_importees
+
+        contexte.enregistrer(ecrites)
+        total_importees += nb_imp
+        if nb_imp:
+            console.print(
+                f"  [green]{nb_imp} transaction(s) importee(s)[/green]"
+                f" dont {nb_pend} en attente de revision"
+            )
+
+    if total_importees == 0:
+        console.print("  [yellow]Aucune nouvelle transaction (deja importe ?).[/yellow]")
+        return 0
+
+    archiver_fichier(path, repertoire_processed, total_importees)
+    path.unlink()
+
+    repertoire_projet = contexte.chemin_main.parent.parent
+    message_commit = f"import({path.name}): {total_importees} transactions"
+    try:
+        if auto_commit(repertoire_projet, message_commit):
+            console.print(f"  [green]Commit git cree :[/green] {message_commit}")
+    except ValueError as e:
+        console.print(f"  [red]Erreur lors du commit :[/red] {e}")
+
+    return total_importees
+
+
+@importer_app.command(name="surveiller")
+def surveiller(
+    repertoire: str = typer.Option(
+        "data/imports",
+        "--repertoire",
+        "-d",
+        help="Repertoire surveille pour les nouveaux fichiers bancaires",
+    ),
+    delai: float = typer.Option(
+        2.0,
+        "--delai",
+        help="Secondes de stabilite avant d'importer un fichier (ecritures partielles)",
+    ),
+    polling: bool = typer.Option(
+        False,
+        "--polling",
+        help="Forcer le mode polling au lieu d'inotify",
+    ),
+) -> None:
+    """Surveiller un repertoire et importer les fichiers bancaires des leur arrivee.
+
+    Garde le ledger, les regles et le modele ML en memoire entre les fichiers:
+    chaque fichier depose est importe en quelques secondes, sans le demarrage
+    a froid de `cqc importer fichier`. Ctrl+C pour arreter.
+    """
+    from compteqc.cli.app import get_ledger_path, get_regles_path
+    from compteqc.ingestion import SurveillantRepertoire
+
+    chemin_main = get_ledger_path()
+    if not chemin_main.exists():
+        console.print(
+            f"[red]Erreur:[/red] Ledger introuvable : {chemin_main}\n"
+            "Verifiez le chemin avec l'option --ledger."
+        )
+        raise typer.Exit(1)
+
+    contexte = _ContexteSurveillance(chemin_main, get_regles_path())
+    contexte.preparer()
+
+    repertoire_processed = Path("data/processed")
+    with SurveillantRepertoire(
+        Path(repertoire), delai_stabilite=delai, forcer_polling=polling
+    ) as surveillant:
+        console.print(
+            f"Surveillance de [cyan]{repertoire}[/cyan] (mode {surveillant.mode})."
+            " Ctrl+C pour arreter."
+        )
+        try:
+            while True:
+                for chemin in surveillant.attendre():
+                    _traiter_fichier_surveille(chemin, contexte, repertoire_processed)
+        except KeyboardInterrupt:
+            console.print("\nArret de la surveillance.")
@@ -118,6 +118,7 @@ def lancer(
     # Generate and write transaction
     import datetime
 
+    from compteqc.ledger.cloture import ExerciceCloture, verifier_exercice_ouvert
     from compteqc.ledger.fichiers import (
         ajouter_include,
         chemin_fichier_mensuel,
@@ -125,6 +126,11 @@ def lancer(
     )
 
     date_paie = datetime.date.today()
+    try:
+        verifier_exercice_ouvert(Path(ledger), date_paie.year)
+    except ExerciceCloture as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
     txn = generer_transaction_paie(
         date_paie, resultat, salary_offset=offset_decimal,
     )
@@ -11,9 +11,27 @@ from beancount.core import data
 from rich.console import Console
 from rich.table import Table
 
+from compteqc.ledger.arbre import arbre_soldes
+from compteqc.ledger.cloture import chemin_historique
+from compteqc.ledger.colonnes import table_postings
+
 rapport_app = typer.Typer(no_args_is_help=True)
 console = Console()
 
+# Charger aussi les exercices clotures (option --archives du groupe rapport)
+_archives = False
+
+
+@rapport_app.callback()
+def rapport_callback(
+    archives: bool = typer.Option(
+        False, "--archives", help="Inclure les exercices clotures (historique complet)"
+    ),
+) -> None:
+    """Rapports financiers (balance, resultats, bilan)."""
+    global _archives
+    _archives = archives
+
 
 def _charger_ledger(chemin_main):
     """Charge le ledger et retourne (entries, errors, options)."""
@@ -23,6 +41,8 @@ def _charger_ledger(chemin_main):
     if not path.exists():
         console.print(f"[red]Erreur:[/red] Ledger introuvable : {chemin_main}")
         raise typer.Exit(1)
+    if _archives:
+        path = chemin_historique(path)
     return loader.load_file(str(path))
 
 
@@ -32,14 +52,7 @@ def _calculer_soldes(entries) -> dict[str, Decimal]:
     Returns:
         Dictionnaire {nom_compte: solde_CAD}.
     """
-    soldes_dict: dict[str, Decimal] = {}
-    for entry in entries:
-        if isinstance(entry, data.Transaction):
-            for posting in entry.postings:
-                if posting.units:
-                    acct = posting.account
-                    soldes_dict[acct] = soldes_dict.get(acct, Decimal("0")) + posting.units.number
-    return soldes_dict
+    return table_postings(entries).soldes()
 
 
 def _formater_montant(montant: Decimal) -> str:
@@ -170,26 +183,9 @@ def resultats(
     date_debut = datetime.date.fromisoformat(debut) if debut else None
     date_fin = datetime.date.fromisoformat(fin) if fin else None
 
-    revenus: dict[str, Decimal] = {}
-    depenses: dict[str, Decimal] = {}
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if date_debut and entry.date < date_debut:
-            continue
-        if date_fin and entry.date > date_fin:
-            continue
-
-        for posting in entry.postings:
-            if posting.units is None:
-                continue
-            acct = posting.account
-            montant = posting.units.number
-            if acct.startswith("Revenus"):
-                revenus[acct] = revenus.get(acct, Decimal("0")) + montant
-            elif acct.startswith("Depenses"):
-                depenses[acct] = depenses.get(acct, Decimal("0")) + montant
+    table = table_postings(entries)
+    revenus = table.soldes(debut=date_debut, fin=date_fin, prefixe="Revenus")
+    depenses = table.soldes(debut=date_debut, fin=date_fin, prefixe="Depenses")
 
     if not revenus and not depenses:
         console.print("[yellow]Aucune transaction de revenus ou depenses.[/yellow]")
@@ -247,29 +243,15 @@ def bilan() -> None:
     from compteqc.cli.app import get_ledger_path
 
     entries, errors, options = _charger_ledger(get_ledger_path())
-    soldes_dict = _calculer_soldes(entries)
+    arbre = arbre_soldes(entries)
 
-    actifs: dict[str, Decimal] = {}
-    passifs: dict[str, Decimal] = {}
-    capitaux: dict[str, Decimal] = {}
-
-    for acct, montant in soldes_dict.items():
-        if montant == Decimal("0"):
-            continue
-        if acct.startswith("Actifs"):
-            actifs[acct] = montant
-        elif acct.startswith("Passifs"):
-            passifs[acct] = montant
-        elif acct.startswith("Capital"):
-            capitaux[acct] = montant
+    actifs = arbre.soldes("Actifs", non_nuls=True)
+    passifs = arbre.soldes("Passifs", non_nuls=True)
+    capitaux = arbre.soldes("Capital", non_nuls=True)
 
     # Inclure le resultat net (Revenus - Depenses) dans les capitaux propres
-    resultat_net = Decimal("0")
-    for acct, montant in soldes_dict.items():
-        if acct.startswith("Revenus"):
-            resultat_net -= montant  # Revenus sont negatifs en beancount
-        elif acct.startswith("Depenses"):
-            resultat_net -= montant  # Depenses sont positives, on les soustrait
+    # (Revenus negatifs en beancount, Depenses positives)
+    resultat_net = -(arbre.sous_total("Revenus") + arbre.sous_total("Depenses"))
 
     if not actifs and not passifs and not capitaux and resultat_net == 0:
         console.print("[yellow]Aucune donnee pour generer le bilan.[/yellow]")
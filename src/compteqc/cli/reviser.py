@@ -25,12 +25,15 @@ from compteqc.categorisation.pending import (
     lire_pending,
     rejeter_transactions,
 )
+from compteqc.ledger.cloture import ExerciceCloture, annees_cloturees
 from compteqc.ledger.fichiers import (
     ajouter_include,
     chemin_fichier_mensuel,
     ecrire_transactions,
 )
 from compteqc.ledger.git import auto_commit
+from compteqc.ledger.journal import JournalEcritures
+from compteqc.ledger.verrou import ConflitVersion, version_ledger
 
 logger = logging.getLogger(__name__)
 
@@ -236,6 +239,7 @@ def approuver(
     """Approuver des transactions en attente."""
     chemin_main, chemin_pending, _, _ = _get_paths()
 
+    version = version_ledger(chemin_main.parent)
     pending = lire_pending(chemin_pending)
     if not pending:
         console.print("Aucune transaction en attente.")
@@ -254,7 +258,23 @@ def approuver(
         console.print("Aucune transaction selectionnee.")
         return
 
-    nb = approuver_transactions(chemin_pending, chemin_main, idx_list)
+    try:
+        nb = approuver_transactions(
+            chemin_pending, chemin_main, idx_list, version_attendue=version
+        )
+    except ConflitVersion as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    cloturees = set(annees_cloturees(chemin_main))
+    nb_cloturees = sum(
+        1 for i in set(idx_list) if 0 <= i < len(pending) and pending[i].date.year in cloturees
+    )
+    if nb_cloturees:
+        console.print(
+            f"[yellow]{nb_cloturees} transaction(s) d'un exercice cloture laissee(s) "
+            "en attente: saisir un ajustement dans l'exercice courant.[/yellow]"
+        )
 
     if nb > 0:
         # Git auto-commit
@@ -283,6 +303,7 @@ def rejeter(
     """Rejeter des transactions en attente (les supprimer)."""
     chemin_main, chemin_pending, _, _ = _get_paths()
 
+    version = version_ledger(chemin_main.parent)
     pending = lire_pending(chemin_pending)
     if not pending:
         console.print("Aucune transaction en attente.")
@@ -293,7 +314,11 @@ def rejeter(
         console.print("Aucune transaction selectionnee.")
         return
 
-    nb = rejeter_transactions(chemin_pending, idx_list)
+    try:
+        nb = rejeter_transactions(chemin_pending, idx_list, version_attendue=version)
+    except ConflitVersion as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
 
     if nb > 0:
         repertoire_projet = chemin_main.parent.parent
@@ -318,6 +343,7 @@ def recategoriser(
     """Recategoriser une transaction en attente."""
     chemin_main, chemin_pending, chemin_regles, chemin_historique = _get_paths()
 
+    version = version_ledger(chemin_main.parent)
     pending = lire_pending(chemin_pending)
     if not pending:
         console.print("Aucune transaction en attente.")
@@ -409,22 +435,29 @@ def recategoriser(
         postings=nouveaux_postings,
     )
 
-    # Ecrire dans le fichier mensuel
-    ledger_dir = chemin_main.parent
-    fichier_mensuel = chemin_fichier_mensuel(
-        txn.date.year, txn.date.month, ledger_dir
-    )
+    from compteqc.categorisation.pending import _reecrire_pending
 
-    texte = printer.format_entry(txn_corrigee)
-    ecrire_transactions(fichier_mensuel, texte)
-    chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
-    ajouter_include(chemin_main, chemin_relatif)
+    # Ecrire dans le fichier mensuel et retirer du pending, sauf si le
+    # ledger a ete modifie depuis la lecture (l'indice serait perime)
+    ledger_dir = chemin_main.parent
+    try:
+        with JournalEcritures(
+            ledger_dir, "recategorisation", version_attendue=version
+        ) as journal:
+            fichier_mensuel = chemin_fichier_mensuel(
+                txn.date.year, txn.date.month, ledger_dir, journal=journal
+            )
 
-    # Retirer du pending
-    restantes = [t for i, t in enumerate(pending) if i != idx]
-    from compteqc.categorisation.pending import _reecrire_pending
+            texte = printer.format_entry(txn_corrigee)
+            ecrire_transactions(fichier_mensuel, texte, journal=journal)
+            chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
+            ajouter_include(chemin_main, chemin_relatif, journal=journal)
 
-    _reecrire_pending(chemin_pending, restantes)
+            restantes = [t for i, t in enumerate(pending) if i != idx]
+            _reecrire_pending(chemin_pending, restantes, journal=journal)
+    except (ConflitVersion, ExerciceCloture) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
 
     # Valider le ledger
     from compteqc.ledger.validation import valider_ledger
@@ -503,3 +536,41 @@ def journal() -> None:
 
     console.print(tableau)
     console.print(f"\n{len(auto_approuvees)} transactions auto-approuvees.")
+
+
+@reviser_app.command(name="alias")
+def alias(
+    brut: str = typer.Argument(help="Libelle brut du releve (ex: 'PMNT FACT ELECTR HYDRO-QUEBEC')"),
+    canonique: str = typer.Argument(help="Beneficiaire canonique (ex: 'Hydro-Quebec')"),
+) -> None:
+    """Associer un libelle brut a un beneficiaire canonique (alias appris)."""
+    from compteqc.ingestion.beneficiaires import (
+        NormaliseurBeneficiaires,
+        cle_beneficiaire,
+        definir_normaliseur_defaut,
+    )
+
+    chemin_main, _, chemin_regles, _ = _get_paths()
+    chemin_alias = chemin_regles.parent / "beneficiaires.yaml"
+
+    try:
+        normaliseur = NormaliseurBeneficiaires.charger(chemin_alias)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+
+    avant = normaliseur.canonique(brut)
+    normaliseur.apprendre(brut, canonique)
+    normaliseur.sauvegarder()
+    definir_normaliseur_defaut(normaliseur)
+
+    console.print(
+        f"[green]Alias appris: {cle_beneficiaire(brut)} -> {canonique}[/green]"
+        + (f" (etait: {avant})" if avant != canonique else "")
+    )
+
+    repertoire_projet = chemin_main.parent.parent
+    try:
+        auto_commit(repertoire_projet, f"reviser: alias {canonique}")
+    except (ValueError, Exception) as e:
+        logger.warning("Auto-commit echoue: %s", e)
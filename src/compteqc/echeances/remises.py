@@ -11,13 +11,13 @@ from decimal import Decimal
 
 from pydantic import BaseModel
 
-from beancount.core import data
-
 from compteqc.echeances.calendrier import (
     Echeance,
     TypeEcheance,
     _ajuster_jour_ouvrable,
 )
+from compteqc.ledger.cloture import TAG_OUVERTURE
+from compteqc.ledger.colonnes import table_postings
 
 
 # ---------------------------------------------------------------------------
@@ -70,51 +70,35 @@ def suivi_remises(entries: list, annee: int) -> list[RemisePaie]:
     Returns:
         Liste de 12 RemisePaie (janvier a decembre).
     """
-    # Accumulateurs par mois (1-12)
-    retenues_dues: dict[int, Decimal] = {m: Decimal("0.00") for m in range(1, 13)}
-    cotisations_dues: dict[int, Decimal] = {m: Decimal("0.00") for m in range(1, 13)}
-    retenues_remises: dict[int, Decimal] = {m: Decimal("0.00") for m in range(1, 13)}
-    cotisations_remises: dict[int, Decimal] = {m: Decimal("0.00") for m in range(1, 13)}
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.date.year != annee:
-            continue
-
-        mois = entry.date.month
-
-        # Identifier si c'est une remise (paiement au fisc):
-        # une remise debite Passifs:Retenues (positif) et credite Actifs:Banque
-        comptes_debites = set()
-        comptes_credites = set()
-        for posting in entry.postings:
-            if posting.units.number > 0:
-                comptes_debites.add(posting.account)
-            elif posting.units.number < 0:
-                comptes_credites.add(posting.account)
-
-        est_remise = any(
-            c.startswith(PREFIXES_BANQUE) for c in comptes_credites
-        ) and any(
-            c.startswith(PREFIXES_RETENUES) or c.startswith(PREFIXES_COTISATIONS)
-            for c in comptes_debites
+    table = table_postings(entries)
+    # Les soldes d'ouverture (cloture d'exercice) ne sont ni des retenues ni des remises
+    annee_courante = table.masque(
+        debut=datetime.date(annee, 1, 1), fin=datetime.date(annee, 12, 31),
+        sans_tag=TAG_OUVERTURE,
+    )
+    mois = table.mois()
+    debits = table.montants > 0
+    credits = table.montants < 0
+    retenues = table.masque(prefixe=PREFIXES_RETENUES)
+    cotisations = table.masque(prefixe=PREFIXES_COTISATIONS)
+
+    # Identifier les remises (paiements au fisc):
+    # une remise debite Passifs:Retenues (positif) et credite Actifs:Banque
+    est_remise = table.par_transaction(
+        annee_courante & credits & table.masque(prefixe=PREFIXES_BANQUE)
+    ) & table.par_transaction(annee_courante & debits & (retenues | cotisations))
+
+    def _par_mois(masque, valeur_absolue: bool = False) -> dict[int, Decimal]:
+        sommes = table.sommes_groupees(
+            mois, 13, annee_courante & masque, valeur_absolue=valeur_absolue
         )
+        return {m: Decimal("0.00") + table.en_decimal(sommes[m]) for m in range(1, 13)}
 
-        for posting in entry.postings:
-            montant = posting.units.number
-
-            if posting.account.startswith(PREFIXES_RETENUES):
-                if est_remise and montant > 0:
-                    retenues_remises[mois] += montant
-                elif montant < 0:
-                    retenues_dues[mois] += abs(montant)
-
-            elif posting.account.startswith(PREFIXES_COTISATIONS):
-                if est_remise and montant > 0:
-                    cotisations_remises[mois] += montant
-                elif montant < 0:
-                    cotisations_dues[mois] += abs(montant)
+    # Accumulateurs par mois (1-12)
+    retenues_dues = _par_mois(retenues & credits, valeur_absolue=True)
+    cotisations_dues = _par_mois(cotisations & credits, valeur_absolue=True)
+    retenues_remises = _par_mois(retenues & debits & est_remise)
+    cotisations_remises = _par_mois(cotisations & debits & est_remise)
 
     # Construire les resultats
     resultats: list[RemisePaie] = []
@@ -4,6 +4,10 @@ Valide la coherence des donnees avant la generation du package CPA.
 Chaque verification retourne un VerificationResult avec severite
 appropriee. Les erreurs fatales (equation desequilibree) bloquent
 le package; les avertissements permettent la generation.
+
+Les verifications lisent les memes `Agregats` que les rapports du package
+CPA: soldes, codes GIFI, pret actionnaire et compteurs de transactions
+sont obtenus en un seul parcours du ledger.
 """
 
 from __future__ import annotations
@@ -11,11 +15,13 @@ from __future__ import annotations
 from decimal import Decimal
 from enum import Enum
 
-from beancount.core import data
 from pydantic import BaseModel
 
-from compteqc.mcp.services import calculer_soldes
-from compteqc.rapports.gifi_export import extract_gifi_map, validate_gifi
+from compteqc.rapports.agregats import Agregats
+from compteqc.rapports.gifi_export import validate_gifi
+
+# Agregats lus par le checklist (declares avec ceux des rapports du package)
+BESOINS_VERIFICATION = ("soldes", "gifi", "pret", "non_classees", "en_attente")
 
 
 class Severite(str, Enum):
@@ -33,11 +39,9 @@ class VerificationResult(BaseModel):
     severite: Severite
 
 
-def _verifier_equation(entries: list) -> VerificationResult:
+def _verifier_equation(agregats: Agregats) -> VerificationResult:
     """Verifie l'equation comptable (GIFI validation)."""
-    soldes = calculer_soldes(entries)
-    gifi_map = extract_gifi_map(entries)
-    result = validate_gifi(soldes, gifi_map)
+    result = validate_gifi(agregats.soldes(), agregats.gifi())
 
     if result.balanced:
         return VerificationResult(
@@ -54,14 +58,9 @@ def _verifier_equation(entries: list) -> VerificationResult:
     )
 
 
-def _verifier_pret_actionnaire(entries: list, annee: int) -> VerificationResult:
+def _verifier_pret_actionnaire(agregats: Agregats) -> VerificationResult:
     """Verifie le solde du pret actionnaire en fin d'exercice."""
-    import datetime
-
-    from compteqc.quebec.pret_actionnaire.suivi import obtenir_etat_pret
-
-    fin = datetime.date(annee, 12, 31)
-    etat = obtenir_etat_pret(entries, fin)
+    etat = agregats.etat_pret()
 
     if etat.solde == Decimal("0"):
         return VerificationResult(
@@ -78,23 +77,9 @@ def _verifier_pret_actionnaire(entries: list, annee: int) -> VerificationResult:
     )
 
 
-def _verifier_non_classe(entries: list, annee: int) -> VerificationResult:
+def _verifier_non_classe(agregats: Agregats) -> VerificationResult:
     """Verifie les transactions non classees (Depenses:Non-Classe)."""
-    import datetime
-
-    debut = datetime.date(annee, 1, 1)
-    fin = datetime.date(annee, 12, 31)
-    count = 0
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.date < debut or entry.date > fin:
-            continue
-        for posting in entry.postings:
-            if posting.account == "Depenses:Non-Classe":
-                count += 1
-                break
+    count = agregats.nb_non_classees()
 
     if count == 0:
         return VerificationResult(
@@ -111,14 +96,9 @@ def _verifier_non_classe(entries: list, annee: int) -> VerificationResult:
     )
 
 
-def _verifier_pending(entries: list) -> VerificationResult:
+def _verifier_pending(agregats: Agregats) -> VerificationResult:
     """Verifie les transactions en attente d'approbation."""
-    count = 0
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.flag == "!":
-            count += 1
+    count = agregats.nb_en_attente()
 
     if count == 0:
         return VerificationResult(
@@ -135,10 +115,10 @@ def _verifier_pending(entries: list) -> VerificationResult:
     )
 
 
-def _verifier_cca(entries: list, annee: int) -> VerificationResult:
+def _verifier_cca(agregats: Agregats) -> VerificationResult:
     """Verifie la coherence des immobilisations (placeholder)."""
     # Simplified: check that Actifs:Immobilisations balance is non-negative
-    soldes = calculer_soldes(entries)
+    soldes = agregats.soldes()
     total_immo = Decimal("0")
     for compte, montant in soldes.items():
         if compte.startswith("Actifs:Immobilisations"):
@@ -159,9 +139,9 @@ def _verifier_cca(entries: list, annee: int) -> VerificationResult:
     )
 
 
-def _verifier_taxes(entries: list, annee: int) -> VerificationResult:
+def _verifier_taxes(agregats: Agregats) -> VerificationResult:
     """Verifie la concordance TPS/TVQ."""
-    soldes = calculer_soldes(entries)
+    soldes = agregats.soldes()
     tps_nette = soldes.get("Passifs:TPS-Nette", Decimal("0"))
     tvq_nette = soldes.get("Passifs:TVQ-Nette", Decimal("0"))
 
@@ -192,6 +172,7 @@ def verifier_fin_exercice(
     entries: list,
     annee: int,
     fin_exercice: object = None,  # Accepted but currently uses annee
+    agregats: Agregats | None = None,
 ) -> list[VerificationResult]:
     """Execute toutes les verifications de fin d'exercice.
 
@@ -199,15 +180,19 @@ def verifier_fin_exercice(
         entries: Liste d'entrees Beancount.
         annee: Annee fiscale.
         fin_exercice: Date de fin d'exercice (optionnel, defaut 31 dec).
+        agregats: Agregats partages avec les rapports (crees si absents).
 
     Returns:
         Liste de VerificationResult avec les resultats de chaque verification.
     """
+    if agregats is None:
+        agregats = Agregats(entries, annee)
+    agregats.declarer(BESOINS_VERIFICATION)
     return [
-        _verifier_equation(entries),
-        _verifier_pret_actionnaire(entries, annee),
-        _verifier_cca(entries, annee),
-        _verifier_taxes(entries, annee),
-        _verifier_non_classe(entries, annee),
-        _verifier_pending(entries),
+        _verifier_equation(agregats),
+        _verifier_pret_actionnaire(agregats),
+        _verifier_cca(agregats),
+        _verifier_taxes(agregats),
+        _verifier_non_classe(agregats),
+        _verifier_pending(agregats),
     ]
@@ -1,21 +1,25 @@
 """Extension Fava: File d'approbation des transactions.
 
-Affiche les transactions #pending avec badges de confiance et
-permet l'approbation/rejet par lots via formulaire HTML.
+Affiche les transactions #pending avec badges de confiance, paginees et
+filtrees cote serveur, et permet l'approbation/rejet par lots via
+formulaire HTML (selection cochee ou toutes les transactions du filtre).
 """
 
 from __future__ import annotations
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
+from urllib.parse import urlencode
 
 from flask import request
 from werkzeug.utils import redirect
 
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase, extension_endpoint
+from fava.ext import extension_endpoint
 
-from compteqc.mcp.services import lister_pending
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
+from compteqc.ledger.verrou import ConflitVersion, version_ledger
+from compteqc.mcp.pagination import LIMITE_DEFAUT, valider_limite
 
 
 # ---------------------------------------------------------------------------
@@ -47,65 +51,230 @@ def est_gros_montant(montant: Decimal) -> bool:
     return montant > Decimal("2000")
 
 
+NIVEAUX = ("elevee", "moderee", "revision")
+FILTRES = ("niveau", "source", "compte", "montant_min", "montant_max")
+
+
+def enrichir(txn: dict, indice: int) -> dict:
+    """Ajoute a une transaction pending son indice, son niveau et le flag gros montant.
+
+    Args:
+        txn: Transaction retournee par lister_pending().
+        indice: Position dans la file complete (designe la transaction pour
+            approuver/rejeter).
+    """
+    return {
+        **txn,
+        "indice": indice,
+        "niveau": niveau_confiance(txn["confiance"]),
+        "gros_montant": est_gros_montant(txn["montant"]),
+    }
+
+
+def lire_filtres(args) -> dict[str, str]:
+    """Extrait les filtres de la file depuis les parametres d'une requete.
+
+    Args:
+        args: request.args (page) ou request.form (action sur le filtre).
+
+    Returns:
+        Filtres non vides parmi niveau, source, compte, montant_min, montant_max.
+    """
+    filtres = {}
+    for nom in FILTRES:
+        valeur = (args.get(nom) or "").strip()
+        if valeur:
+            filtres[nom] = valeur
+    if filtres.get("niveau") not in (None, *NIVEAUX):
+        del filtres["niveau"]
+    return filtres
+
+
+def _montant(filtres: dict[str, str], nom: str) -> Decimal | None:
+    if nom not in filtres:
+        return None
+    try:
+        return Decimal(filtres[nom])
+    except InvalidOperation:
+        raise ValueError(f"Montant invalide: {filtres[nom]}") from None
+
+
+def filtrer_pending(pending: list[dict], filtres: dict[str, str]) -> list[int]:
+    """Retourne les indices des transactions retenues par les filtres.
+
+    Args:
+        pending: File complete (lister_pending()).
+        filtres: Filtres de lire_filtres(): niveau de confiance, source
+            exacte, compte propose (sous-chaine, sans casse), bornes de montant.
+
+    Raises:
+        ValueError: Si une borne de montant est invalide.
+    """
+    minimum = _montant(filtres, "montant_min")
+    maximum = _montant(filtres, "montant_max")
+    niveau = filtres.get("niveau")
+    source = filtres.get("source")
+    compte = filtres.get("compte", "").upper()
+
+    indices = []
+    for i, txn in enumerate(pending):
+        if niveau and niveau_confiance(txn["confiance"]) != niveau:
+            continue
+        if source and txn["source"] != source:
+            continue
+        if compte and compte not in (txn.get("compte_propose") or "").upper():
+            continue
+        if minimum is not None and txn["montant"] < minimum:
+            continue
+        if maximum is not None and txn["montant"] > maximum:
+            continue
+        indices.append(i)
+    return indices
+
+
+def _entier(valeur: str | None, defaut: int) -> int:
+    try:
+        return int(valeur) if valeur else defaut
+    except ValueError:
+        return defaut
+
+
+def _message(titre: str, texte: str) -> str:
+    """Page HTML minimale avec un lien de retour."""
+    return (
+        '<html><body>'
+        f'<h2>{titre}</h2>'
+        f'<p>{texte}</p>'
+        '<a href="javascript:history.back()">Retour</a>'
+        '</body></html>'
+    )
+
+
+MESSAGE_GROS_MONTANTS = (
+    "Des transactions de plus de 2 000 $ sont selectionnees. "
+    "Veuillez cocher la case de confirmation."
+)
+
+
 # ---------------------------------------------------------------------------
 # Extension
 # ---------------------------------------------------------------------------
 
-class ApprobationExtension(FavaExtensionBase):
-    """File d'approbation pour les transactions classees par IA."""
+class ApprobationExtension(ExtensionDonnees):
+    """File d'approbation pour les transactions classees par IA.
+
+    La page n'affiche qu'une page de la file, filtree cote serveur
+    (confiance, source, compte, montant). L'action "Approuver tout le
+    filtre" approuve toutes les transactions retenues en une seule ecriture.
+    """
 
     report_title = "File d'approbation"
 
     def __init__(self, ledger: FavaLedger, config: str | None = None) -> None:
         super().__init__(ledger, config)
         self._pending: list[dict] = []
+        self._index: dict[tuple, list[int]] = {}
+        self._version = 0
+
+    def _ledger_dir(self) -> Path:
+        return Path(self.ledger.beancount_file_path).parent
 
     def after_load_file(self) -> None:
-        """Recharge la liste des transactions pending apres chargement du ledger."""
+        """Note la version du ledger; la liste pending sera rechargee a l'affichage."""
+        self._version = version_ledger(self._ledger_dir())
+        super().after_load_file()
+
+    def _calculer(self) -> None:
         self._charger_pending()
 
-    def _charger_pending(self) -> None:
-        """Charge les transactions #pending depuis les entrees du ledger."""
-        self._pending = lister_pending(self.ledger.all_entries)
-        # Enrichir avec le niveau de confiance et le flag gros montant
-        for txn in self._pending:
-            txn["niveau"] = niveau_confiance(txn["confiance"])
-            txn["gros_montant"] = est_gros_montant(txn["montant"])
+    def _conflit(self, erreur: ConflitVersion) -> str:
+        """Recharge le ledger et affiche le conflit (indices perimes)."""
+        self.ledger.load_file()
+        return _message("Ledger modifie", f"{erreur}. Aucune modification n'a ete appliquee.")
 
+    def _charger_pending(self) -> None:
+        """Charge les transactions #pending depuis le service partage.
+
+        La liste du service est partagee: elle n'est pas modifiee, seules les
+        lignes affichees sont enrichies (`enrichir`).
+        """
+        self._pending = donnees_ledger(self.ledger).pending()
+        self._index = {}
+
+    def _indices(self, filtres: dict[str, str]) -> list[int]:
+        """Indices retenus par les filtres, calcules une fois par chargement."""
+        cle = tuple(sorted(filtres.items()))
+        indices = self._index.get(cle)
+        if indices is None:
+            indices = self._index[cle] = filtrer_pending(self._pending, filtres)
+        return indices
+
+    @a_jour
     def pending_transactions(self) -> list[dict]:
-        """Retourne la liste des transactions en attente."""
-        return self._pending
-
-    @extension_endpoint("approuver", ["POST"])
-    def approuver(self) -> str:
-        """Endpoint POST pour approuver des transactions par lots."""
+        """Retourne la liste complete des transactions en attente (enrichies)."""
+        return [enrichir(txn, i) for i, txn in enumerate(self._pending)]
+
+    @a_jour
+    def page_pending(self) -> dict:
+        """Retourne la page de la file demandee (filtres, page et taille dans l'URL).
+
+        Structure:
+        - transactions: Transactions de la page, enrichies (indice, niveau, gros_montant)
+        - total: Nombre de transactions retenues par les filtres
+        - total_file: Taille de la file complete
+        - nb_gros: Transactions de plus de 2 000 $ parmi celles retenues
+        - page, nb_pages, taille: Position dans la file filtree
+        - filtres: Filtres appliques
+        - sources: Sources presentes dans la file (choix du filtre)
+        - url_precedente, url_suivante: Liens de pagination (None aux extremites)
+        - erreur: Message si un filtre est invalide
+        """
+        filtres = lire_filtres(request.args)
+        taille = valider_limite(_entier(request.args.get("taille"), LIMITE_DEFAUT))
+        erreur = None
+        try:
+            indices = self._indices(filtres)
+        except ValueError as e:
+            indices, erreur = [], str(e)
+
+        nb_pages = max(1, -(-len(indices) // taille))
+        page = min(max(1, _entier(request.args.get("page"), 1)), nb_pages)
+        debut = (page - 1) * taille
+
+        def url(numero: int) -> str:
+            return "?" + urlencode({**filtres, "taille": taille, "page": numero})
+
+        return {
+            "transactions": [
+                enrichir(self._pending[i], i) for i in indices[debut:debut + taille]
+            ],
+            "total": len(indices),
+            "total_file": len(self._pending),
+            "nb_gros": sum(1 for i in indices if est_gros_montant(self._pending[i]["montant"])),
+            "page": page,
+            "nb_pages": nb_pages,
+            "taille": taille,
+            "filtres": filtres,
+            "sources": sorted({str(txn["source"]) for txn in self._pending}),
+            "url_precedente": url(page - 1) if page > 1 else None,
+            "url_suivante": url(page + 1) if page < nb_pages else None,
+            "erreur": erreur,
+        }
+
+    def _approuver(self, indices: list[int]) -> str:
+        """Approuve les indices en une ecriture, puis recharge le ledger."""
         from compteqc.categorisation.pending import approuver_transactions
 
-        ids = request.form.getlist("ids")
-        confirmer_gros = request.form.get("confirmer_gros_montants") == "on"
-
-        indices = [int(i) for i in ids if i.isdigit()]
-
-        # Guardrail: verifier les gros montants
-        if not confirmer_gros:
-            for idx in indices:
-                if idx < len(self._pending) and self._pending[idx].get("gros_montant"):
-                    # Retourner une page d'erreur simple
-                    return (
-                        '<html><body>'
-                        '<h2>Confirmation requise</h2>'
-                        '<p>Des transactions de plus de 2 000 $ sont selectionnees. '
-                        'Veuillez cocher la case de confirmation.</p>'
-                        '<a href="javascript:history.back()">Retour</a>'
-                        '</body></html>'
-                    )
-
-        # Determiner les chemins
         ledger_path = Path(self.ledger.beancount_file_path)
-        chemin_main = ledger_path
         chemin_pending = ledger_path.parent / "pending.beancount"
 
-        approuver_transactions(chemin_pending, chemin_main, indices)
+        # Les indices designent la liste affichee: refus si le ledger a change depuis
+        try:
+            approuver_transactions(
+                chemin_pending, ledger_path, indices, version_attendue=self._version
+            )
+        except ConflitVersion as e:
+            return self._conflit(e)
 
         # Recharger le ledger pour rafraichir
         self.ledger.load_file()
@@ -113,6 +282,54 @@ class ApprobationExtension(FavaExtensionBase):
         # Redirect vers la page de l'extension
         return redirect(request.referrer or request.url)
 
+    @extension_endpoint("approuver", ["POST"])
+    def approuver(self) -> str:
+        """Endpoint POST pour approuver les transactions cochees."""
+        self.assurer_a_jour()
+        ids = request.form.getlist("ids")
+        confirmer_gros = request.form.get("confirmer_gros_montants") == "on"
+
+        indices = [int(i) for i in ids if i.isdigit()]
+
+        # Guardrail: verifier les gros montants
+        if not confirmer_gros and any(
+            idx < len(self._pending) and est_gros_montant(self._pending[idx]["montant"])
+            for idx in indices
+        ):
+            return _message("Confirmation requise", MESSAGE_GROS_MONTANTS)
+
+        return self._approuver(indices)
+
+    @extension_endpoint("approuver_filtre", ["POST"])
+    def approuver_filtre(self) -> str:
+        """Endpoint POST pour approuver toutes les transactions retenues par un filtre.
+
+        Le formulaire renvoie les filtres de la page et le nombre de
+        transactions annonce (`nb_attendu`): si la selection a change depuis
+        l'affichage, rien n'est approuve.
+        """
+        self.assurer_a_jour()
+        filtres = lire_filtres(request.form)
+        confirmer_gros = request.form.get("confirmer_gros_montants") == "on"
+        try:
+            indices = self._indices(filtres)
+        except ValueError as e:
+            return _message("Filtre invalide", str(e))
+
+        if _entier(request.form.get("nb_attendu"), -1) != len(indices):
+            return _message(
+                "Selection modifiee",
+                "La file a change depuis l'affichage. Aucune transaction n'a ete approuvee.",
+            )
+        if not indices:
+            return redirect(request.referrer or request.url)
+        if not confirmer_gros and any(
+            est_gros_montant(self._pending[i]["montant"]) for i in indices
+        ):
+            return _message("Confirmation requise", MESSAGE_GROS_MONTANTS)
+
+        return self._approuver(indices)
+
     @extension_endpoint("rejeter", ["POST"])
     def rejeter(self) -> str:
         """Endpoint POST pour rejeter une transaction."""
@@ -126,7 +343,10 @@ class ApprobationExtension(FavaExtensionBase):
         ledger_path = Path(self.ledger.beancount_file_path)
         chemin_pending = ledger_path.parent / "pending.beancount"
 
-        rejeter_transactions(chemin_pending, [idx])
+        try:
+            rejeter_transactions(chemin_pending, [idx], version_attendue=self._version)
+        except ConflitVersion as e:
+            return self._conflit(e)
 
         # Recharger le ledger pour rafraichir
         self.ledger.load_file()
@@ -0,0 +1,367 @@
+"""Donnees derivees partagees par les extensions Fava, calculees a la demande.
+
+Fava appelle `after_load_file` de chaque extension a chaque rechargement.
+Chaque extension parcourait `ledger.all_entries` de son cote (file
+d'approbation, cumuls de paie, TPS/TVQ, pret actionnaire...) et la DPA
+relisait le registre d'actifs YAML: une dizaine de passes par
+rechargement, pour des tableaux de bord que personne n'ouvre forcement.
+
+`donnees_ledger(ledger)` retourne le service unique d'un `FavaLedger`.
+Rien n'est calcule au chargement; chaque part est calculee a la premiere
+demande puis gardee tant que le ledger n'a pas change:
+
+- un seul parcours des transactions (`all_entries_by_type`, deja groupe
+  par Fava) collecte les transactions #pending et les mouvements du pret
+  actionnaire de l'annee;
+- la table de postings en colonnes, construite une fois, sert les cumuls
+  de paie et les sommaires TPS/TVQ;
+- les parts qui dependent de la configuration d'une extension (frequence
+  TPS/TVQ, registre d'actifs) sont memorisees par parametre; le registre
+  d'actifs n'est relu que si son fichier a change.
+
+Les parts sont memorisees par empreinte (mtime, taille) des fichiers du
+ledger et par jour: un rechargement qui ne change aucun fichier ne refait
+aucun calcul.
+
+Les extensions derivent de `ExtensionDonnees`: `after_load_file` marque
+leur vue perimee, et la vue est recalculee (`_calculer`) au premier appel
+d'une methode `@a_jour`, c'est-a-dire au premier affichage de la page.
+Avec COMPTEQC_FAVA_PRECHAUFFAGE=true, un thread de fond recalcule les vues
+apres chaque rechargement pour que la premiere page s'affiche sans attente.
+
+Usage:
+    class PaieQCExtension(ExtensionDonnees):
+        def _calculer(self) -> None:
+            self._payroll_data = donnees_ledger(self.ledger).cumuls_paie()
+
+        @a_jour
+        def totaux(self) -> dict: ...
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import logging
+import os
+import threading
+from collections.abc import Callable
+from decimal import Decimal
+from pathlib import Path
+
+from beancount.core import data
+from fava.core import FavaLedger
+from fava.ext import FavaExtensionBase
+
+from compteqc.mcp.services import est_pending, resume_pending
+from compteqc.quebec.dpa.calcul import PoolDPA, construire_pools
+from compteqc.quebec.dpa.registre import RegistreActifs
+from compteqc.quebec.paie.ytd import calculer_cumuls_depuis_transactions
+from compteqc.quebec.pret_actionnaire.suivi import (
+    EtatPret,
+    MouvementPret,
+    calculer_etat_pret,
+    mouvement_depuis_posting,
+)
+from compteqc.quebec.taxes.sommaire import SommairePeriode, generer_sommaires_annuels
+
+logger = logging.getLogger(__name__)
+
+
+def _empreinte(chemin: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(chemin)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def prechauffage_active() -> bool:
+    """True si COMPTEQC_FAVA_PRECHAUFFAGE demande le calcul en arriere-plan."""
+    return os.environ.get("COMPTEQC_FAVA_PRECHAUFFAGE", "false").lower() == "true"
+
+
+class DonneesDerivees:
+    """Aggregats derives d'un FavaLedger, calcules a la demande et memorises."""
+
+    def __init__(self, ledger) -> None:
+        self.ledger = ledger
+        self.actualisations = 0
+        self.parcours = 0
+        self._verrou = threading.RLock()
+        self._entries: list | None = None
+        self._cle: tuple | None = None
+        self.annee = datetime.date.today().year
+        self._transactions_vues: tuple[list[dict], list[MouvementPret]] | None = None
+        self._parts: dict[tuple, object] = {}
+        self._registres: dict[str, tuple[tuple[int, int] | None, RegistreActifs]] = {}
+        self._a_prechauffer: list[Callable[[], None]] = []
+        self._prechauffage: threading.Thread | None = None
+
+    @property
+    def fin_exercice(self) -> datetime.date:
+        """Fin de l'exercice courant."""
+        return datetime.date(self.annee, 12, 31)
+
+    def _fichiers(self) -> list[str]:
+        options = getattr(self.ledger, "options", None) or {}
+        return list(options.get("include") or [self.ledger.beancount_file_path])
+
+    def _cle_chargement(self) -> tuple:
+        """Empreinte des fichiers du ledger et jour courant."""
+        fichiers = tuple((f, _empreinte(Path(f))) for f in self._fichiers())
+        return fichiers, datetime.date.today()
+
+    def actualiser(self) -> None:
+        """Oublie les parts calculees si le ledger (ou le jour) a change.
+
+        Un rechargement qui ne modifie aucun fichier garde les parts: seule
+        la liste d'entrees de reference est remplacee.
+        """
+        with self._verrou:
+            entries = self.ledger.all_entries
+            if entries is self._entries and self._cle is not None and (
+                self._cle[1] == datetime.date.today()
+            ):
+                return
+            cle = self._cle_chargement()
+            self._entries = entries
+            if cle == self._cle:
+                return
+            self._cle = cle
+            self.annee = cle[1].year
+            self._transactions_vues = None
+            self._parts = {}
+            self.actualisations += 1
+
+    def _parcourir(self) -> tuple[list[dict], list[MouvementPret]]:
+        """Parcours unique des transactions: pending et mouvements du pret."""
+        if self._transactions_vues is not None:
+            return self._transactions_vues
+        debut, fin = datetime.date(self.annee, 1, 1), self.fin_exercice
+        pending: list[dict] = []
+        mouvements: list[MouvementPret] = []
+        for entry in self._transactions():
+            if est_pending(entry):
+                pending.append(resume_pending(entry))
+            if not debut <= entry.date <= fin:
+                continue
+            for posting in entry.postings:
+                mouvement = mouvement_depuis_posting(entry, posting)
+                if mouvement is not None:
+                    mouvements.append(mouvement)
+        self.parcours += 1
+        self._transactions_vues = (pending, mouvements)
+        return self._transactions_vues
+
+    def _transactions(self) -> list:
+        par_type = getattr(self.ledger, "all_entries_by_type", None)
+        transactions = getattr(par_type, "Transaction", None)
+        if transactions is not None:
+            return transactions
+        return [e for e in self._entries if isinstance(e, data.Transaction)]
+
+    def _part(self, cle: tuple, calculer):
+        with self._verrou:
+            self.actualiser()
+            if cle not in self._parts:
+                self._parts[cle] = calculer()
+            return self._parts[cle]
+
+    # ------------------------------------------------------------------
+    # Parts par extension
+    # ------------------------------------------------------------------
+
+    def pending(self) -> list[dict]:
+        """Transactions #pending (file d'approbation)."""
+        with self._verrou:
+            self.actualiser()
+            return self._parcourir()[0]
+
+    def cumuls_paie(self) -> dict[str, Decimal]:
+        """Cumuls annuels de paie de l'annee courante."""
+        return self._part(
+            ("paie",), lambda: calculer_cumuls_depuis_transactions(self._entries, self.annee)
+        )
+
+    def sommaires_taxes(self, frequence: str = "annuel") -> list[SommairePeriode]:
+        """Sommaires TPS/TVQ de l'annee courante par periode de declaration."""
+        return self._part(
+            ("taxes", frequence),
+            lambda: generer_sommaires_annuels(self._entries, self.annee, frequence),
+        )
+
+    def etat_pret(self) -> EtatPret:
+        """Etat du pret actionnaire sur l'exercice courant."""
+        return self._part(("pret",), lambda: calculer_etat_pret(self._parcourir()[1]))
+
+    def registre_actifs(self, chemin: str | None = None) -> RegistreActifs:
+        """Registre d'actifs, relu seulement si son fichier a change.
+
+        Args:
+            chemin: Fichier du registre (defaut: actifs.yaml a cote du ledger).
+        """
+        if chemin is None:
+            chemin = str(Path(self.ledger.beancount_file_path).parent / "actifs.yaml")
+        empreinte = _empreinte(Path(chemin))
+        with self._verrou:
+            trouve = self._registres.get(chemin)
+            if trouve is not None and trouve[0] == empreinte:
+                return trouve[1]
+            try:
+                registre = RegistreActifs(chemin)
+                registre.charger()
+            except Exception:
+                registre = RegistreActifs()
+                registre._actifs = []
+            self._registres[chemin] = (empreinte, registre)
+            return registre
+
+    def pools_dpa(self, chemin: str | None = None) -> dict[int, PoolDPA]:
+        """Pools DPA de l'annee courante depuis le registre d'actifs."""
+        registre = self.registre_actifs(chemin)
+        with self._verrou:
+            self.actualiser()
+            cle = ("dpa", chemin)
+            trouve = self._parts.get(cle)
+            if trouve is None or trouve[0] is not registre:
+                # Premiere annee: FNACC d'ouverture a zero. Dans une version
+                # future, l'UCC precedent proviendra du ledger.
+                pools = construire_pools(registre.actifs, {}, self.annee)
+                trouve = self._parts[cle] = (registre, pools)
+            return trouve[1]
+
+    def alertes_echeances(self) -> list:
+        """Alertes des echeances de production, avec celles du pret actionnaire.
+
+        Raises:
+            ImportError: Si le module d'echeances n'est pas disponible.
+        """
+        from compteqc.echeances.calendrier import (
+            calculer_echeances,
+            integrer_echeances_pret,
+            obtenir_alertes,
+        )
+
+        def calculer():
+            echeances = integrer_echeances_pret(
+                calculer_echeances(self.fin_exercice), self.etat_pret()
+            )
+            return obtenir_alertes(echeances)
+
+        return self._part(("echeances",), calculer)
+
+    # ------------------------------------------------------------------
+    # Prechauffage
+    # ------------------------------------------------------------------
+
+    def prechauffer(self, calculer: Callable[[], None]) -> None:
+        """Planifie un calcul dans le thread de prechauffage du ledger.
+
+        Les calculs planifies pendant un meme rechargement s'executent a la
+        suite, dans un seul thread de fond.
+        """
+        with self._verrou:
+            self._a_prechauffer.append(calculer)
+            if self._prechauffage is not None and self._prechauffage.is_alive():
+                return
+            self._prechauffage = threading.Thread(
+                target=self._prechauffer, name="compteqc-fava-prechauffage", daemon=True
+            )
+            self._prechauffage.start()
+
+    def _prechauffer(self) -> None:
+        while True:
+            with self._verrou:
+                if not self._a_prechauffer:
+                    self._prechauffage = None
+                    return
+                calculer = self._a_prechauffer.pop(0)
+            try:
+                calculer()
+            except Exception:
+                logger.warning("Prechauffage d'une extension Fava en echec", exc_info=True)
+
+    def attendre_prechauffage(self, delai: float | None = None) -> None:
+        """Attend la fin du prechauffage en cours (tests, arret)."""
+        fil = self._prechauffage
+        if fil is not None:
+            fil.join(delai)
+
+
+_services: dict[int, tuple[object, DonneesDerivees]] = {}
+_services_verrou = threading.Lock()
+
+
+def donnees_ledger(ledger) -> DonneesDerivees:
+    """Retourne le service de donnees derivees d'un FavaLedger (cree au premier appel).
+
+    Le ledger est retenu avec son service: FavaLedger n'accepte pas de
+    reference faible, et un ledger Fava vit autant que l'application.
+    """
+    with _services_verrou:
+        trouve = _services.get(id(ledger))
+        if trouve is None or trouve[0] is not ledger:
+            trouve = _services[id(ledger)] = (ledger, DonneesDerivees(ledger))
+        return trouve[1]
+
+
+def oublier_services() -> None:
+    """Oublie les services enregistres (tests)."""
+    with _services_verrou:
+        _services.clear()
+
+
+# ---------------------------------------------------------------------------
+# Extensions a calcul differe
+# ---------------------------------------------------------------------------
+
+class ExtensionDonnees(FavaExtensionBase):
+    """Extension Fava dont la vue est calculee au premier affichage.
+
+    Les sous-classes implementent `_calculer` (l'ancien corps de
+    `after_load_file`) et decorent de `@a_jour` les methodes appelees par
+    leur template et leurs endpoints.
+    """
+
+    def __init__(self, ledger: FavaLedger, config: str | None = None) -> None:
+        super().__init__(ledger, config)
+        self._verrou_vue = threading.Lock()
+        self._perimee = True
+
+    def after_load_file(self) -> None:
+        """Marque la vue perimee; elle sera recalculee a la premiere consultation."""
+        self._perimee = True
+        if prechauffage_active():
+            donnees_ledger(self.ledger).prechauffer(self.assurer_a_jour)
+
+    def _calculer(self) -> None:
+        """Calcule la vue de l'extension depuis le service partage."""
+
+    def assurer_a_jour(self) -> None:
+        """Recalcule la vue si un rechargement l'a rendue perimee."""
+        # Instances creees sans __init__ (tests): vue deja remplie a la main
+        verrou = getattr(self, "_verrou_vue", None)
+        if verrou is None or not self._perimee:
+            return
+        with verrou:
+            if not self._perimee:
+                return
+            # Un rechargement pendant le calcul la rendra de nouveau perimee
+            self._perimee = False
+            try:
+                self._calculer()
+            except BaseException:
+                self._perimee = True
+                raise
+
+
+def a_jour(methode: Callable) -> Callable:
+    """Recalcule la vue de l'extension (si perimee) avant d'executer `methode`."""
+
+    @functools.wraps(methode)
+    def enveloppe(self, *args, **kwargs):
+        self.assurer_a_jour()
+        return methode(self, *args, **kwargs)
+
+    return enveloppe
@@ -10,18 +10,17 @@ import datetime
 from decimal import Decimal
 
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase
 
-from compteqc.quebec.dpa.calcul import PoolDPA, construire_pools
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
+from compteqc.quebec.dpa.calcul import PoolDPA
 from compteqc.quebec.dpa.classes import CLASSES_DPA
-from compteqc.quebec.dpa.registre import RegistreActifs
 
 
 # Classes DPA a afficher (toujours dans l'ordre)
 CLASSES_AFFICHEES = [8, 10, 12, 50, 54]
 
 
-class DpaQCExtension(FavaExtensionBase):
+class DpaQCExtension(ExtensionDonnees):
     """Cedule DPA/CCA par classe d'actif."""
 
     report_title = "DPA/CCA"
@@ -32,37 +31,22 @@ class DpaQCExtension(FavaExtensionBase):
         self._annee: int = datetime.date.today().year
         self._registre_path: str | None = config
 
-    def after_load_file(self) -> None:
-        """Recalcule les pools DPA apres chargement du ledger."""
-        self._annee = datetime.date.today().year
-        self._pools = {}
+    def _calculer(self) -> None:
+        """Lit les pools DPA du service partage.
 
-        # Tenter de charger le registre d'actifs
-        try:
-            if self._registre_path:
-                registre = RegistreActifs(self._registre_path)
-                registre.charger()
-            else:
-                # Chemin par defaut relatif au ledger
-                from pathlib import Path
-
-                ledger_dir = Path(self.ledger.beancount_file_path).parent
-                registre_path = ledger_dir / "actifs.yaml"
-                registre = RegistreActifs(str(registre_path))
-                registre.charger()
-        except Exception:
-            registre = RegistreActifs()
-            registre._actifs = []
-
-        # Construire les pools avec UCC d'ouverture a zero (premiere annee)
-        # Dans une version future, l'UCC precedent proviendra du ledger
-        ucc_precedent: dict[int, Decimal] = {}
-        self._pools = construire_pools(registre.actifs, ucc_precedent, self._annee)
+        Le registre d'actifs (config ou actifs.yaml a cote du ledger) n'est
+        relu que si son fichier a change.
+        """
+        donnees = donnees_ledger(self.ledger)
+        self._pools = donnees.pools_dpa(self._registre_path)
+        self._annee = donnees.annee
 
+    @a_jour
     def annee(self) -> int:
         """Retourne l'annee courante."""
         return self._annee
 
+    @a_jour
     def cca_schedule(self) -> list[dict]:
         """Retourne la cedule DPA pour le template.
 
@@ -101,6 +85,7 @@ class DpaQCExtension(FavaExtensionBase):
                 })
         return result
 
+    @a_jour
     def totaux(self) -> dict:
         """Retourne les totaux de la cedule DPA."""
         schedule = self.cca_schedule()
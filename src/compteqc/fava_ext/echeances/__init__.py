@@ -7,10 +7,9 @@ compteqc.echeances.calendrier quand il est disponible.
 
 from __future__ import annotations
 
-from datetime import date
-
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase
+
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
 
 
 # ---------------------------------------------------------------------------
@@ -39,7 +38,7 @@ def couleur_urgence(urgence: str) -> str:
 # Extension
 # ---------------------------------------------------------------------------
 
-class EcheancesExtension(FavaExtensionBase):
+class EcheancesExtension(ExtensionDonnees):
     """Echeances fiscales et alertes de production."""
 
     report_title = "Echeances"
@@ -49,32 +48,34 @@ class EcheancesExtension(FavaExtensionBase):
         self._alertes: list[dict] = []
         self._echeances_disponible: bool = False
 
-    def after_load_file(self) -> None:
-        """Charge les echeances depuis le module Phase 5 si disponible."""
+    def _calculer(self) -> None:
+        """Charge les echeances (et celles du pret actionnaire) si le module est disponible."""
         try:
-            from compteqc.echeances.calendrier import (  # type: ignore[import-not-found]
-                calculer_echeances,
-                obtenir_alertes,
-            )
-
-            # Determiner la fin d'exercice
-            fin_exercice = date(date.today().year, 12, 31)
-
-            echeances = calculer_echeances(fin_exercice)
-            alertes_brutes = obtenir_alertes(echeances)
-            # Pre-compute CSS class for each alert (Jinja2 can't call Python functions)
-            for alerte in alertes_brutes:
-                alerte["classe_css"] = couleur_urgence(alerte.get("urgence", "info"))
-            self._alertes = alertes_brutes
-            self._echeances_disponible = True
+            alertes = donnees_ledger(self.ledger).alertes_echeances()
         except ImportError:
             self._alertes = []
             self._echeances_disponible = False
-
+            return
+
+        # Pre-compute CSS class for each alert (Jinja2 can't call Python functions)
+        self._alertes = [
+            {
+                "description": alerte.echeance.description,
+                "date_limite": alerte.echeance.date_limite,
+                "jours_restants": alerte.jours_restants,
+                "urgence": alerte.urgence,
+                "classe_css": couleur_urgence(alerte.urgence),
+            }
+            for alerte in alertes
+        ]
+        self._echeances_disponible = True
+
+    @a_jour
     def alertes(self) -> list[dict]:
         """Retourne la liste des alertes actives."""
         return self._alertes
 
+    @a_jour
     def echeances_disponible(self) -> bool:
         """Retourne True si le module d'echeances Phase 5 est disponible."""
         return self._echeances_disponible
@@ -10,13 +10,9 @@ import datetime
 from decimal import Decimal
 
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase
 
-from compteqc.quebec.paie.ytd import (
-    MAPPAGE_COMPTES_EMPLOYEUR,
-    MAPPAGE_COMPTES_RETENUES,
-    calculer_cumuls_depuis_transactions,
-)
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
+from compteqc.quebec.paie.ytd import MAPPAGE_COMPTES_EMPLOYEUR, MAPPAGE_COMPTES_RETENUES
 from compteqc.quebec.rates import TAUX, obtenir_taux
 
 
@@ -75,7 +71,7 @@ COTISATIONS = [
 ]
 
 
-class PaieQCExtension(FavaExtensionBase):
+class PaieQCExtension(ExtensionDonnees):
     """Tableau de bord paie Quebec avec cumulatif annuel."""
 
     report_title = "Paie Quebec"
@@ -85,16 +81,18 @@ class PaieQCExtension(FavaExtensionBase):
         self._payroll_data: dict | None = None
         self._annee: int = datetime.date.today().year
 
-    def after_load_file(self) -> None:
-        """Recalcule les donnees de paie apres chargement du ledger."""
-        self._annee = datetime.date.today().year
-        entries = self.ledger.all_entries
-        self._payroll_data = calculer_cumuls_depuis_transactions(entries, self._annee)
+    def _calculer(self) -> None:
+        """Lit les cumuls de paie du service partage."""
+        donnees = donnees_ledger(self.ledger)
+        self._payroll_data = donnees.cumuls_paie()
+        self._annee = donnees.annee
 
+    @a_jour
     def annee(self) -> int:
         """Retourne l'annee courante."""
         return self._annee
 
+    @a_jour
     def payroll_summary(self) -> list[dict]:
         """Retourne le sommaire des cotisations pour le template.
 
@@ -138,6 +136,7 @@ class PaieQCExtension(FavaExtensionBase):
 
         return result
 
+    @a_jour
     def retenues_impot(self) -> list[dict]:
         """Retourne les retenues d'impot YTD.
 
@@ -159,6 +158,7 @@ class PaieQCExtension(FavaExtensionBase):
             },
         ]
 
+    @a_jour
     def totaux(self) -> dict:
         """Retourne les totaux pour le sommaire.
 
@@ -10,10 +10,10 @@ import datetime
 from decimal import Decimal
 
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase
 
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
 from compteqc.quebec.pret_actionnaire.alertes import calculer_dates_alerte, obtenir_alertes_actives
-from compteqc.quebec.pret_actionnaire.suivi import EtatPret, obtenir_etat_pret
+from compteqc.quebec.pret_actionnaire.suivi import EtatPret
 
 
 def niveau_alerte_s152(jours_restants: int) -> str:
@@ -35,7 +35,7 @@ def niveau_alerte_s152(jours_restants: int) -> str:
     return "critique"
 
 
-class PretActionnaireExtension(FavaExtensionBase):
+class PretActionnaireExtension(ExtensionDonnees):
     """Suivi du pret actionnaire avec alerte s.15(2)."""
 
     report_title = "Pret actionnaire"
@@ -46,13 +46,14 @@ class PretActionnaireExtension(FavaExtensionBase):
         self._annee: int = datetime.date.today().year
         self._fin_exercice = datetime.date(self._annee, 12, 31)
 
-    def after_load_file(self) -> None:
-        """Recalcule l'etat du pret apres chargement du ledger."""
-        self._annee = datetime.date.today().year
-        self._fin_exercice = datetime.date(self._annee, 12, 31)
-        entries = self.ledger.all_entries
-        self._etat = obtenir_etat_pret(entries, self._fin_exercice)
+    def _calculer(self) -> None:
+        """Lit l'etat du pret du service partage."""
+        donnees = donnees_ledger(self.ledger)
+        self._etat = donnees.etat_pret()
+        self._annee = donnees.annee
+        self._fin_exercice = donnees.fin_exercice
 
+    @a_jour
     def loan_status(self) -> dict:
         """Retourne l'etat du pret actionnaire pour le template.
 
@@ -95,6 +96,7 @@ class PretActionnaireExtension(FavaExtensionBase):
             "mouvements": mouvements,
         }
 
+    @a_jour
     def s152_status(self) -> dict | None:
         """Retourne le statut s.15(2) pour le template.
 
@@ -11,14 +11,16 @@ from pathlib import Path
 
 from flask import request
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase, extension_endpoint
+from fava.ext import extension_endpoint
+
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour
 
 
 # ---------------------------------------------------------------------------
 # Extension
 # ---------------------------------------------------------------------------
 
-class RecusExtension(FavaExtensionBase):
+class RecusExtension(ExtensionDonnees):
     """Televersement de recus et factures avec extraction IA."""
 
     report_title = "Recus"
@@ -28,7 +30,7 @@ class RecusExtension(FavaExtensionBase):
         self._upload_disponible: bool = False
         self._recent_uploads: list[dict] = []
 
-    def after_load_file(self) -> None:
+    def _calculer(self) -> None:
         """Verifie la disponibilite du module Phase 5 et charge les recus recents."""
         try:
             from compteqc.documents.upload import telecharger_recu  # noqa: F401
@@ -69,10 +71,12 @@ class RecusExtension(FavaExtensionBase):
             pass
         return recents
 
+    @a_jour
     def upload_disponible(self) -> bool:
         """Retourne True si le module d'upload Phase 5 est disponible."""
         return self._upload_disponible
 
+    @a_jour
     def recent_uploads(self) -> list[dict]:
         """Retourne la liste des recus recents."""
         return self._recent_uploads
@@ -80,6 +84,7 @@ class RecusExtension(FavaExtensionBase):
     @extension_endpoint("upload", ["POST"])
     def upload(self) -> str:
         """Endpoint POST pour telecharger un fichier."""
+        self.assurer_a_jour()
         fichier = request.files.get("fichier")
 
         if not fichier or not fichier.filename:
@@ -10,12 +10,12 @@ import datetime
 from decimal import Decimal
 
 from fava.core import FavaLedger
-from fava.ext import FavaExtensionBase
 
-from compteqc.quebec.taxes.sommaire import SommairePeriode, generer_sommaires_annuels
+from compteqc.fava_ext.donnees import ExtensionDonnees, a_jour, donnees_ledger
+from compteqc.quebec.taxes.sommaire import SommairePeriode
 
 
-class TaxesQCExtension(FavaExtensionBase):
+class TaxesQCExtension(ExtensionDonnees):
     """Suivi TPS/TVQ par periode de production."""
 
     report_title = "TPS/TVQ"
@@ -29,12 +29,13 @@ class TaxesQCExtension(FavaExtensionBase):
         if config and config.strip() in ("annuel", "trimestriel"):
             self._frequence = config.strip()
 
-    def after_load_file(self) -> None:
-        """Recalcule les sommaires TPS/TVQ apres chargement du ledger."""
-        self._annee = datetime.date.today().year
-        entries = self.ledger.all_entries
-        self._sommaires = generer_sommaires_annuels(entries, self._annee, self._frequence)
+    def _calculer(self) -> None:
+        """Lit les sommaires TPS/TVQ du service partage."""
+        donnees = donnees_ledger(self.ledger)
+        self._sommaires = donnees.sommaires_taxes(self._frequence)
+        self._annee = donnees.annee
 
+    @a_jour
     def annee(self) -> int:
         """Retourne l'annee courante."""
         return self._annee
@@ -43,6 +44,7 @@ class TaxesQCExtension(FavaExtensionBase):
         """Retourne la frequence de declaration."""
         return self._frequence
 
+    @a_jour
     def tax_summary(self) -> list[dict]:
         """Retourne les sommaires par periode pour le template.
 
@@ -70,6 +72,7 @@ class TaxesQCExtension(FavaExtensionBase):
             })
         return result
 
+    @a_jour
     def totaux_annuels(self) -> dict:
         """Retourne les totaux annuels agrege de toutes les periodes."""
         total = {
@@ -1,13 +1,30 @@
 """Module d'ingestion de donnees bancaires pour CompteQC."""
 
+from compteqc.ingestion.beneficiaires import (
+    NormaliseurBeneficiaires,
+    beneficiaire_canonique,
+    beneficiaires_canoniques,
+)
 from compteqc.ingestion.normalisation import archiver_fichier
-from compteqc.ingestion.rbc_carte import RBCCarteImporter
+from compteqc.ingestion.rbc_carte import RBCCarteImporter, importateurs_depuis_csv
 from compteqc.ingestion.rbc_cheques import RBCChequesImporter
-from compteqc.ingestion.rbc_ofx import RBCOfxImporter
+from compteqc.ingestion.rbc_ofx import RBCOfxImporter, charger_ofx, importateurs_depuis_ofx
+from compteqc.ingestion.registre import FormatImport, RegistreImportateurs, registre_defaut
+from compteqc.ingestion.surveillance import SurveillantRepertoire
 
 __all__ = [
+    "FormatImport",
+    "NormaliseurBeneficiaires",
     "RBCChequesImporter",
     "RBCCarteImporter",
     "RBCOfxImporter",
+    "RegistreImportateurs",
+    "SurveillantRepertoire",
     "archiver_fichier",
+    "beneficiaire_canonique",
+    "beneficiaires_canoniques",
+    "charger_ofx",
+    "importateurs_depuis_csv",
+    "importateurs_depuis_ofx",
+    "registre_defaut",
 ]
@@ -0,0 +1,237 @@
+"""Beneficiaires canoniques: table d'alias, motifs compiles et memoisation.
+
+Un meme marchand apparait sous plusieurs libelles dans les releves
+("TIM HORTONS #1234", "TIM HORTONS 5678 MONTREAL", "SQ *TIM HORTONS").
+Le normaliseur ramene ces variantes a un seul beneficiaire canonique
+("Tim Hortons") pour que les regles, le modele ML, l'historique des
+corrections et la deduplication voient le meme vendeur.
+
+Resolution, dans l'ordre:
+1. Alias appris (correspondance exacte sur la cle normalisee).
+2. Alias YAML (motifs regex, premier qui correspond gagne).
+3. Libelle nettoye (motifs de bruit retires, Title Case).
+
+Format du fichier YAML (rules/beneficiaires.yaml):
+
+    alias:
+      Hydro-Quebec:
+        - "HYDRO[- ]?QUEBEC"
+      Amazon:
+        - "^AMAZON"
+        - "AMZN"
+    appris:
+      "PMNT FACT ELECTR HYDRO-QUEBEC": Hydro-Quebec
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+import unicodedata
+from collections.abc import Iterable
+from functools import lru_cache
+from pathlib import Path
+
+import yaml
+
+from compteqc.ingestion.normalisation import nettoyer_beneficiaire
+
+logger = logging.getLogger(__name__)
+
+CHEMIN_ALIAS_DEFAUT = Path("rules/beneficiaires.yaml")
+
+TAILLE_MEMO = 4096
+
+# Prefixes des processeurs de paiement (Square, Toast, PayPal, etc.)
+_RE_PREFIXE_PROCESSEUR = re.compile(r"^(?:SQ|TST|SP|PAYPAL|PP|IZ|ZTL)\s*\*\s*")
+# Jeton apres asterisque (ex: "AMAZON.CA*AB12CD34")
+_RE_JETON_ASTERISQUE = re.compile(r"\*\s*[A-Z0-9]+$")
+# Numero de magasin/succursale (ex: "#1234", "STORE 12", "SUCC 045")
+_RE_NUMERO_MAGASIN = re.compile(r"\s*(?:#|\bNO\.?\s*|\b(?:STORE|MAGASIN|SUCC|SUCCURSALE)\s+)\d+\b")
+# Nombres de 3 chiffres et plus isoles (numeros de magasin sans marqueur)
+_RE_NOMBRE_ISOLE = re.compile(r"(?<=\s)\d{3,}\b")
+# Numero colle au nom (ex: "SAQ23132", "SQDC77075")
+_RE_NUMERO_COLLE = re.compile(r"(?<=[A-Z])\d{4,}\b")
+# Code de province en fin de libelle (ex: "MONTREAL QC")
+_RE_PROVINCE = re.compile(r"\s+(?:QC|ON|BC|AB|MB|SK|NS|NB|NL|PE|YT|NT|NU)$")
+_RE_ESPACES = re.compile(r"\s+")
+
+_MOTIFS_BRUIT = (
+    _RE_PREFIXE_PROCESSEUR,
+    _RE_JETON_ASTERISQUE,
+    _RE_NUMERO_MAGASIN,
+    _RE_NOMBRE_ISOLE,
+    _RE_NUMERO_COLLE,
+    _RE_PROVINCE,
+)
+
+
+def cle_beneficiaire(brut: str) -> str:
+    """Retourne la cle normalisee d'un libelle (majuscules, bruit retire).
+
+    La cle sert a indexer les alias appris: deux libelles qui ne different
+    que par la casse, les accents, les espaces, un numero de magasin ou le
+    code de province ont la meme cle.
+
+    Args:
+        brut: Libelle brut du releve.
+
+    Returns:
+        Cle en majuscules, sans bruit. Chaine vide si le libelle est vide.
+    """
+    texte = unicodedata.normalize("NFKD", brut).encode("ASCII", "ignore").decode("ASCII")
+    texte = _RE_ESPACES.sub(" ", texte.strip()).upper()
+    for motif in _MOTIFS_BRUIT:
+        texte = motif.sub("", texte)
+    return _RE_ESPACES.sub(" ", texte).strip(" -*")
+
+
+class NormaliseurBeneficiaires:
+    """Ramene les libelles bruts a un beneficiaire canonique.
+
+    Les resultats sont memoises (LRU); la memoire est videe quand un alias
+    est appris.
+    """
+
+    def __init__(
+        self,
+        alias: dict[str, list[str]] | None = None,
+        appris: dict[str, str] | None = None,
+        chemin: Path | None = None,
+        taille_memo: int = TAILLE_MEMO,
+    ) -> None:
+        """Initialise le normaliseur.
+
+        Args:
+            alias: {canonique: [motifs regex]} evalues sur la cle normalisee.
+            appris: {cle normalisee: canonique} appris des corrections.
+            chemin: Fichier YAML de sauvegarde (pour `sauvegarder`).
+            taille_memo: Nombre de libelles memoises.
+        """
+        self.chemin = chemin
+        self._alias_brut: dict[str, list[str]] = {k: list(v) for k, v in (alias or {}).items()}
+        self._alias: list[tuple[re.Pattern[str], str]] = []
+        for canonique, motifs in self._alias_brut.items():
+            for motif in motifs:
+                try:
+                    self._alias.append((re.compile(motif, re.IGNORECASE), canonique))
+                except re.error as e:
+                    logger.warning("Regex d'alias invalide pour '%s': %s", canonique, e)
+        self._appris: dict[str, str] = {
+            cle_beneficiaire(k): v for k, v in (appris or {}).items()
+        }
+        self._memo = lru_cache(maxsize=taille_memo)(self._resoudre)
+
+    @classmethod
+    def charger(cls, chemin: Path) -> NormaliseurBeneficiaires:
+        """Charge la table d'alias depuis un fichier YAML.
+
+        Un fichier absent donne un normaliseur sans alias (nettoyage seul).
+
+        Raises:
+            ValueError: Si le YAML n'a pas la structure attendue.
+        """
+        if not chemin.exists():
+            return cls(chemin=chemin)
+
+        donnees = yaml.safe_load(chemin.read_text(encoding="utf-8")) or {}
+        alias = donnees.get("alias") or {}
+        appris = donnees.get("appris") or {}
+        if not isinstance(alias, dict) or not isinstance(appris, dict):
+            raise ValueError(f"Table d'alias invalide ({chemin}): 'alias' et 'appris' "
+                             "doivent etre des dictionnaires")
+        alias = {
+            str(k): [v] if isinstance(v, str) else [str(m) for m in v]
+            for k, v in alias.items()
+        }
+        return cls(alias=alias, appris={str(k): str(v) for k, v in appris.items()}, chemin=chemin)
+
+    def _resoudre(self, brut: str) -> str:
+        cle = cle_beneficiaire(brut)
+        if not cle:
+            return nettoyer_beneficiaire(brut)
+
+        canonique = self._appris.get(cle)
+        if canonique is not None:
+            return canonique
+
+        for motif, canonique in self._alias:
+            if motif.search(cle):
+                return canonique
+
+        return nettoyer_beneficiaire(cle)
+
+    def canonique(self, brut: str) -> str:
+        """Retourne le beneficiaire canonique d'un libelle brut."""
+        return self._memo(brut)
+
+    def canonique_lot(self, bruts: Iterable[str]) -> list[str]:
+        """Normalise une colonne entiere de libelles.
+
+        Chaque libelle distinct n'est resolu qu'une fois, quel que soit
+        son nombre d'occurrences.
+
+        Args:
+            bruts: Libelles bruts (ex: tous les payees d'un releve).
+
+        Returns:
+            Beneficiaires canoniques, dans le meme ordre.
+        """
+        bruts = list(bruts)
+        distincts = {brut: self._memo(brut) for brut in dict.fromkeys(bruts)}
+        return [distincts[brut] for brut in bruts]
+
+    def apprendre(self, brut: str, canonique: str) -> None:
+        """Enregistre un alias appris (libelle brut -> beneficiaire canonique)."""
+        self._appris[cle_beneficiaire(brut)] = canonique
+        self._memo.cache_clear()
+
+    def sauvegarder(self, chemin: Path | None = None) -> None:
+        """Ecrit la table d'alias (YAML + appris) dans le fichier YAML."""
+        chemin = chemin or self.chemin
+        if chemin is None:
+            raise ValueError("Aucun chemin de sauvegarde pour la table d'alias")
+        donnees = {"alias": self._alias_brut, "appris": dict(sorted(self._appris.items()))}
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        tmp = chemin.with_suffix(".tmp")
+        tmp.write_text(
+            yaml.dump(donnees, default_flow_style=False, allow_unicode=True, sort_keys=False),
+            encoding="utf-8",
+        )
+        tmp.rename(chemin)
+
+    def stats_memo(self) -> dict[str, int]:
+        """Retourne les statistiques de la memoire LRU (hits, misses, taille)."""
+        info = self._memo.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "taille": info.currsize}
+
+
+_normaliseur_defaut: NormaliseurBeneficiaires | None = None
+
+
+def normaliseur_defaut() -> NormaliseurBeneficiaires:
+    """Retourne le normaliseur partage, charge depuis rules/beneficiaires.yaml."""
+    global _normaliseur_defaut
+    if _normaliseur_defaut is None:
+        try:
+            _normaliseur_defaut = NormaliseurBeneficiaires.charger(CHEMIN_ALIAS_DEFAUT)
+        except (ValueError, yaml.YAMLError) as e:
+            logger.warning("Table d'alias ignoree (%s): %s", CHEMIN_ALIAS_DEFAUT, e)
+            _normaliseur_defaut = NormaliseurBeneficiaires(chemin=CHEMIN_ALIAS_DEFAUT)
+    return _normaliseur_defaut
+
+
+def definir_normaliseur_defaut(normaliseur: NormaliseurBeneficiaires | None) -> None:
+    """Remplace le normaliseur partage (None = recharger au prochain appel)."""
+    global _normaliseur_defaut
+    _normaliseur_defaut = normaliseur
+
+
+def beneficiaire_canonique(brut: str) -> str:
+    """Raccourci: beneficiaire canonique via le normaliseur partage."""
+    return normaliseur_defaut().canonique(brut)
+
+
+def beneficiaires_canoniques(bruts: Iterable[str]) -> list[str]:
+    """Raccourci: normalisation en lot via le normaliseur partage."""
+    return normaliseur_defaut().canonique_lot(bruts)
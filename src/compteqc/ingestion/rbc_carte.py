@@ -12,9 +12,12 @@ import beangulp
 from beancount.core import data
 from beancount.core.data import EMPTY_SET
 
-from compteqc.ingestion.normalisation import detecter_encodage, nettoyer_beneficiaire
+from compteqc.ingestion.beneficiaires import beneficiaire_canonique
+from compteqc.ingestion.normalisation import detecter_encodage
 from compteqc.ingestion.rbc_cheques import (
+    _construire_signatures_existantes,
     _est_header_rbc,
+    _signature,
     _trouver_colonne,
 )
 
@@ -124,10 +127,11 @@ class RBCCarteImporter(beangulp.Importer):
                     if idx_desc2 is not None and len(row) > idx_desc2:
                         desc2 = row[idx_desc2].strip().strip('"')
                     narration = f"{desc1} {desc2}".strip() if desc2 else desc1
-                    payee = nettoyer_beneficiaire(desc1)
+                    payee = beneficiaire_canonique(desc1)
 
-                    sig = _signature(txn_date, montant, narration)
-                    if sig in existing_sigs:
+                    sig = _signature(txn_date, montant, beneficiaire_canonique(narration))
+                    if existing_sigs[sig] > 0:
+                        existing_sigs[sig] -= 1
                         logger.info(
                             "Doublon detecte ligne %d: %s %s %s",
                             lineno, txn_date, montant, narration[:40],
@@ -164,7 +168,6 @@ class RBCCarteImporter(beangulp.Importer):
                     )
 
                     transactions.append(txn)
-                    existing_sigs.add(sig)
 
                 except (KeyError, ValueError, IndexError) as e:
                     logger.warning("Erreur ligne %d du CSV carte: %s", lineno, e)
@@ -173,17 +176,54 @@ class RBCCarteImporter(beangulp.Importer):
         return transactions
 
 
-def _signature(txn_date, montant: Decimal, narration: str) -> str:
-    return f"{txn_date}|{montant}|{narration[:20]}"
+def importateurs_depuis_csv(filepath: str | Path) -> list[beangulp.Importer]:
+    """Retourne les importateurs RBC pour un CSV, en une seule lecture.
 
+    Un export RBC peut combiner des lignes Chèques et Visa: la colonne
+    "Type de compte" est parcourue une fois pour decider quels importateurs
+    instancier, au lieu d'appeler `identify` sur chacun. L'encodage est
+    deduit de la tete du fichier et les lignes sont lues en flux: la
+    lecture s'arrete des que les deux types de compte ont ete vus.
 
-def _construire_signatures_existantes(existing: data.Entries) -> set[str]:
-    sigs: set[str] = set()
-    for entry in existing:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.postings:
-            montant = entry.postings[0].units.number
-            narration = entry.narration or ""
-            sigs.add(_signature(entry.date, montant, narration))
-    return sigs
+    Args:
+        filepath: Chemin du fichier CSV.
+
+    Returns:
+        [RBCChequesImporter] et/ou [RBCCarteImporter], ou liste vide.
+    """
+    from compteqc.ingestion.rbc_cheques import _TYPE_CHEQUES_PREFIX, RBCChequesImporter
+    from compteqc.ingestion.registre import TAILLE_TETE
+
+    with open(filepath, "rb") as f:
+        tete = f.read(TAILLE_TETE)
+    try:
+        tete.decode("utf-8-sig")
+        encodage = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # Un caractere multi-octets coupe en fin de tete reste de l'UTF-8
+        encodage = "utf-8-sig" if e.start >= len(tete) - 3 else "latin-1"
+
+    cheques = visa = False
+    with open(filepath, encoding=encodage, errors="replace", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None or not _est_header_rbc(header):
+            return []
+        col_type = _trouver_colonne(header, "Type")
+        idx_type = [h.strip().strip('"') for h in header].index(col_type)
+
+        for row in reader:
+            if len(row) <= idx_type:
+                continue
+            type_compte = row[idx_type].strip().strip('"')
+            cheques = cheques or type_compte.startswith(_TYPE_CHEQUES_PREFIX)
+            visa = visa or type_compte == _TYPE_VISA
+            if cheques and visa:
+                break
+
+    importateurs: list[beangulp.Importer] = []
+    if cheques:
+        importateurs.append(RBCChequesImporter())
+    if visa:
+        importateurs.append(RBCCarteImporter())
+    return importateurs
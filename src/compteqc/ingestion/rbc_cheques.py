@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import csv
 import logging
+from collections import Counter
 from datetime import datetime
 from decimal import Decimal
 from pathlib import Path
@@ -12,7 +13,8 @@ import beangulp
 from beancount.core import data
 from beancount.core.data import EMPTY_SET
 
-from compteqc.ingestion.normalisation import detecter_encodage, nettoyer_beneficiaire
+from compteqc.ingestion.beneficiaires import beneficiaire_canonique, beneficiaires_canoniques
+from compteqc.ingestion.normalisation import detecter_encodage
 
 logger = logging.getLogger(__name__)
 
@@ -141,11 +143,12 @@ class RBCChequesImporter(beangulp.Importer):
                     if idx_desc2 is not None and len(row) > idx_desc2:
                         desc2 = row[idx_desc2].strip().strip('"')
                     narration = f"{desc1} {desc2}".strip() if desc2 else desc1
-                    payee = nettoyer_beneficiaire(narration)
+                    payee = beneficiaire_canonique(narration)
 
-                    # Déduplication
-                    sig = _signature(txn_date, montant, narration)
-                    if sig in existing_sigs:
+                    # Déduplication (chaque occurrence du ledger absorbe une ligne)
+                    sig = _signature(txn_date, montant, payee)
+                    if existing_sigs[sig] > 0:
+                        existing_sigs[sig] -= 1
                         logger.info(
                             "Doublon detecte ligne %d: %s %s %s",
                             lineno, txn_date, montant, narration[:40],
@@ -181,7 +184,6 @@ class RBCChequesImporter(beangulp.Importer):
                     )
 
                     transactions.append(txn)
-                    existing_sigs.add(sig)
 
                 except (KeyError, ValueError, IndexError) as e:
                     logger.warning("Erreur ligne %d du CSV cheques: %s", lineno, e)
@@ -190,19 +192,24 @@ class RBCChequesImporter(beangulp.Importer):
         return transactions
 
 
-def _signature(txn_date, montant: Decimal, narration: str) -> str:
-    """Crée une signature pour déduplication CSV."""
-    return f"{txn_date}|{montant}|{narration[:20]}"
+def _signature(txn_date, montant: Decimal, beneficiaire: str) -> str:
+    """Crée une signature pour déduplication CSV (beneficiaire canonique)."""
+    return f"{txn_date}|{montant}|{beneficiaire}"
 
 
-def _construire_signatures_existantes(existing: data.Entries) -> set[str]:
-    """Construit les signatures de déduplication à partir des transactions existantes."""
-    sigs: set[str] = set()
-    for entry in existing:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.postings:
-            montant = entry.postings[0].units.number
-            narration = entry.narration or ""
-            sigs.add(_signature(entry.date, montant, narration))
-    return sigs
+def _construire_signatures_existantes(existing: data.Entries) -> Counter[str]:
+    """Construit les signatures de déduplication à partir des transactions existantes.
+
+    Les signatures sont comptees (multi-ensemble): deux achats identiques le
+    meme jour au meme marchand ne sont pas confondus avec un doublon.
+    """
+    cles = [
+        (entry.date, entry.postings[0].units.number, entry.narration or "")
+        for entry in existing
+        if isinstance(entry, data.Transaction) and entry.postings
+    ]
+    beneficiaires = beneficiaires_canoniques(narration for _, _, narration in cles)
+    return Counter(
+        _signature(date, montant, beneficiaire)
+        for (date, montant, _), beneficiaire in zip(cles, beneficiaires)
+    )
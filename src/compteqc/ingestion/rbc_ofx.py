@@ -1,19 +1,127 @@
-"""Importateur OFX/QFX pour RBC."""
+"""Importateur OFX/QFX pour RBC.
+
+Le fichier OFX n'est parse qu'une fois: `charger_ofx` garde l'arbre converti
+en cache (cle: chemin, taille, date de modification) et
+`importateurs_depuis_ofx` transmet cet arbre aux importateurs crees pour
+chaque releve du fichier (cheques et carte de credit dans un meme fichier).
+"""
 
 from __future__ import annotations
 
 import logging
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any
 
 import beangulp
 from beancount.core import data
 from beancount.core.data import EMPTY_SET
+from ofxtools.models import CCACCTFROM
 from ofxtools.Parser import OFXTree
 
-from compteqc.ingestion.normalisation import nettoyer_beneficiaire
+from compteqc.ingestion.beneficiaires import beneficiaire_canonique
 
 logger = logging.getLogger(__name__)
 
+COMPTE_CHEQUES = "Actifs:Banque:RBC:Cheques"
+COMPTE_CARTE = "Passifs:CartesCredit:RBC"
+
+_TAILLE_CACHE_OFX = 8
+
+# (chemin resolu, taille, mtime_ns) -> arbre OFX converti
+_cache_ofx: OrderedDict[tuple[str, int, int], Any] = OrderedDict()
+
+
+def charger_ofx(filepath: str | Path) -> Any:
+    """Parse un fichier OFX/QFX, avec cache par identite de fichier.
+
+    Un second appel sur le meme fichier non modifie retourne l'arbre deja
+    converti sans re-parser. Le cache est borne aux derniers fichiers lus.
+
+    Args:
+        filepath: Chemin du fichier OFX/QFX.
+
+    Returns:
+        L'objet OFX converti par ofxtools (avec `.statements`).
+
+    Raises:
+        ValueError: Si le fichier est illisible ou n'est pas un OFX valide.
+    """
+    path = Path(filepath)
+    try:
+        stat = path.stat()
+    except OSError as e:
+        raise ValueError(f"Fichier OFX illisible: {path} - {e}") from e
+
+    cle = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    ofx = _cache_ofx.get(cle)
+    if ofx is not None:
+        _cache_ofx.move_to_end(cle)
+        return ofx
+
+    try:
+        tree = OFXTree()
+        tree.parse(str(path))
+        ofx = tree.convert()
+    except Exception as e:
+        raise ValueError(f"Fichier OFX invalide: {path} - {e}") from e
+
+    _cache_ofx[cle] = ofx
+    while len(_cache_ofx) > _TAILLE_CACHE_OFX:
+        _cache_ofx.popitem(last=False)
+    return ofx
+
+
+def vider_cache_ofx() -> None:
+    """Vide le cache des fichiers OFX parses."""
+    _cache_ofx.clear()
+
+
+def _compte_pour_releve(stmt) -> str:
+    """Determine le compte Beancount d'un releve OFX.
+
+    Les releves de carte de credit (CCSTMTRS / CCACCTFROM) n'ont pas de
+    ACCTTYPE; les releves bancaires CHECKING/SAVINGS vont au compte-cheques.
+    """
+    if isinstance(stmt.account, CCACCTFROM):
+        return COMPTE_CARTE
+    if getattr(stmt.account, "accttype", None) in (None, "CHECKING", "SAVINGS"):
+        return COMPTE_CHEQUES
+    return COMPTE_CARTE
+
+
+def importateurs_depuis_ofx(filepath: str | Path) -> list[RBCOfxImporter]:
+    """Cree un importateur par releve contenu dans le fichier OFX/QFX.
+
+    Le fichier est parse une seule fois; chaque importateur recoit l'arbre
+    deja converti et ne re-parse pas lors de `extract`.
+
+    Args:
+        filepath: Chemin du fichier OFX/QFX.
+
+    Returns:
+        Liste d'importateurs (un par ACCTID distinct, dans l'ordre du fichier).
+
+    Raises:
+        ValueError: Si le fichier n'est pas un OFX valide.
+    """
+    ofx = charger_ofx(filepath)
+    importateurs: list[RBCOfxImporter] = []
+    vus: set[str] = set()
+    for stmt in ofx.statements:
+        acctid = stmt.account.acctid
+        if acctid in vus:
+            continue
+        vus.add(acctid)
+        importateurs.append(
+            RBCOfxImporter(
+                account=_compte_pour_releve(stmt),
+                account_id=acctid,
+                ofx=ofx,
+            )
+        )
+    return importateurs
+
 
 class RBCOfxImporter(beangulp.Importer):
     """Importateur pour les fichiers OFX/QFX de comptes RBC.
@@ -22,15 +130,22 @@ class RBCOfxImporter(beangulp.Importer):
     La deduplication se fait par FITID (identifiant unique de transaction).
     """
 
-    def __init__(self, account: str, account_id: str):
+    def __init__(self, account: str, account_id: str, ofx: Any | None = None):
         """Initialise l'importateur OFX RBC.
 
         Args:
             account: Nom du compte Beancount (ex: "Actifs:Banque:RBC:Cheques").
             account_id: Le ACCTID RBC pour identifier le bon compte.
+            ofx: Arbre OFX deja parse (optionnel, evite un second parsing).
         """
         self._account = account
         self._account_id = account_id
+        self._ofx = ofx
+
+    def _arbre(self, filepath: str) -> Any:
+        if self._ofx is not None:
+            return self._ofx
+        return charger_ofx(filepath)
 
     def identify(self, filepath: str) -> bool:
         """Retourne True si le fichier est un OFX/QFX pour le bon compte RBC."""
@@ -38,15 +153,11 @@ class RBCOfxImporter(beangulp.Importer):
         if path.suffix.lower() not in (".ofx", ".qfx"):
             return False
         try:
-            tree = OFXTree()
-            tree.parse(str(path))
-            ofx = tree.convert()
-            for stmt in ofx.statements:
-                if stmt.account.acctid == self._account_id:
-                    return True
-            return False
-        except Exception:
+            ofx = self._arbre(filepath)
+        except ValueError as e:
+            logger.debug("identify OFX: %s", e)
             return False
+        return any(stmt.account.acctid == self._account_id for stmt in ofx.statements)
 
     def account(self, filepath: str) -> str:
         """Retourne le compte Beancount associe."""
@@ -70,13 +181,7 @@ class RBCOfxImporter(beangulp.Importer):
                 le bon compte.
         """
         path = Path(filepath)
-
-        try:
-            tree = OFXTree()
-            tree.parse(str(path))
-            ofx = tree.convert()
-        except Exception as e:
-            raise ValueError(f"Fichier OFX invalide: {path} - {e}") from e
+        ofx = self._arbre(filepath)
 
         # Collecter les FITID existants pour deduplication
         existing_fitids = _collecter_fitids(existing)
@@ -101,7 +206,7 @@ class RBCOfxImporter(beangulp.Importer):
                 name = str(tx.name or "").strip()
                 memo = str(tx.memo or "").strip()
                 narration = f"{name} {memo}".strip() if memo else name
-                payee = nettoyer_beneficiaire(narration)
+                payee = beneficiaire_canonique(narration)
 
                 # Le montant est deja un Decimal via ofxtools
                 montant = tx.trnamt
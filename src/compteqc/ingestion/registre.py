@@ -0,0 +1,264 @@
+"""Registre des formats d'import avec detection par empreinte d'en-tete.
+
+Chaque format declare comment le reconnaitre a partir des premiers Ko du
+fichier, sans instancier d'importateur:
+- `entete`: colonnes CSV requises (ensemble de noms normalises), avec
+  `prefixes_entete` pour les colonnes dont le nom varie d'un export a
+  l'autre (ex: "CAD" ou "CAD$");
+- `magique`: marqueurs d'octets (ex: b"OFXHEADER" pour OFX).
+
+La detection lit la tete du fichier une seule fois, calcule l'empreinte de
+l'en-tete et la cherche dans un index (dictionnaire); a defaut, retient les
+formats dont les colonnes requises sont toutes presentes. Seul le format retenu
+est importe: la fabrique est une reference "module:fonction" resolue a la
+demande, ce qui evite le cout d'import des formats inutilises.
+
+Les formats tiers (Desjardins, autre emetteur de carte, etc.) s'ajoutent
+via le groupe d'entry points `compteqc.importateurs`. L'entry point pointe
+vers un `FormatImport` (ou une liste de formats) declare dans un module
+leger:
+
+    [project.entry-points."compteqc.importateurs"]
+    desjardins = "compteqc_desjardins.formats:FORMAT"
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib
+import logging
+import re
+import unicodedata
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+GROUPE_ENTRY_POINTS = "compteqc.importateurs"
+
+TAILLE_TETE = 8192
+
+# Colonne stable: ASCII simple, sans caractere de remplacement ("Num?ro")
+_RE_COLONNE_STABLE = re.compile(r"^[a-z0-9 _'./$()-]+$")
+_RE_ESPACES = re.compile(r"\s+")
+
+
+def empreinte_entete(colonnes: Iterable[str]) -> frozenset[str]:
+    """Calcule l'empreinte d'un en-tete CSV.
+
+    Les noms de colonnes sont mis en minuscules et debarrasses des
+    guillemets et espaces superflus. Les colonnes accentuees sont ignorees:
+    leur graphie varie selon l'encodage de l'export ("Numéro", "Num?ro",
+    "NumÃ©ro"), ce qui rendrait l'empreinte instable.
+
+    Args:
+        colonnes: Noms de colonnes bruts de la premiere ligne.
+
+    Returns:
+        Ensemble des colonnes stables normalisees.
+    """
+    empreinte = set()
+    for colonne in colonnes:
+        nom = _RE_ESPACES.sub(" ", colonne.strip().strip('"').strip()).lower()
+        if nom and _RE_COLONNE_STABLE.match(nom):
+            empreinte.add(nom)
+    return frozenset(empreinte)
+
+
+def _decoder_tete(tete: bytes) -> str:
+    """Decode la tete d'un fichier (UTF-8, repli Latin-1)."""
+    try:
+        return tete.decode("utf-8-sig")
+    except UnicodeDecodeError as e:
+        if e.start >= len(tete) - 3:
+            # Caractere multi-octets coupe en fin de tete
+            return tete[: e.start].decode("utf-8-sig")
+        return tete.decode("latin-1")
+
+
+def _premiere_ligne_csv(tete: bytes) -> list[str]:
+    texte = unicodedata.normalize("NFC", _decoder_tete(tete))
+    lignes = texte.splitlines()
+    if not lignes:
+        return []
+    return next(csv.reader([lignes[0]]), [])
+
+
+@dataclass(frozen=True)
+class FormatImport:
+    """Declaration d'un format de fichier bancaire.
+
+    Attributes:
+        nom: Identifiant unique (ex: "rbc-csv").
+        description: Libelle affiche a l'utilisateur.
+        extensions: Extensions acceptees (minuscules, avec le point).
+        fabrique: Reference "module:fonction". La fonction recoit le chemin
+            du fichier et retourne la liste des importateurs beangulp a
+            utiliser (vide si le contenu ne correspond finalement pas).
+        entete: Colonnes CSV requises, normalisees (voir `empreinte_entete`).
+            Les colonnes supplementaires de l'export sont acceptees.
+        prefixes_entete: Prefixes de colonnes requises dont le nom exact
+            varie: chaque prefixe doit debuter au moins une colonne.
+        magique: Marqueurs d'octets recherches dans la tete du fichier.
+    """
+
+    nom: str
+    description: str
+    extensions: tuple[str, ...]
+    fabrique: str
+    entete: frozenset[str] | None = None
+    prefixes_entete: tuple[str, ...] = field(default=())
+    magique: tuple[bytes, ...] = field(default=())
+
+    def accepte_entete(self, empreinte: frozenset[str]) -> bool:
+        """Vrai si l'en-tete contient les colonnes requises du format."""
+        if self.entete is None or not self.entete <= empreinte:
+            return False
+        return all(
+            any(colonne.startswith(prefixe) for colonne in empreinte)
+            for prefixe in self.prefixes_entete
+        )
+
+    def charger_fabrique(self) -> Callable[[Path], list]:
+        """Importe le module de la fabrique (a la demande)."""
+        module, _, attribut = self.fabrique.partition(":")
+        return getattr(importlib.import_module(module), attribut)
+
+
+FORMATS_INTEGRES = (
+    FormatImport(
+        nom="rbc-ofx",
+        description="OFX/QFX RBC (cheques et carte de credit)",
+        extensions=(".ofx", ".qfx"),
+        fabrique="compteqc.ingestion.rbc_ofx:importateurs_depuis_ofx",
+        magique=(b"OFXHEADER", b"<OFX>"),
+    ),
+    FormatImport(
+        nom="rbc-csv",
+        description="CSV RBC (cheques et/ou carte de credit)",
+        extensions=(".csv",),
+        fabrique="compteqc.ingestion.rbc_carte:importateurs_depuis_csv",
+        # "CAD" ou "CAD$" selon l'export; USD et Description 2 sont facultatives
+        entete=frozenset({"type de compte", "description 1"}),
+        prefixes_entete=("cad",),
+    ),
+)
+
+
+class RegistreImportateurs:
+    """Index des formats d'import connus et detection des fichiers."""
+
+    def __init__(self, formats: Iterable[FormatImport] = ()) -> None:
+        self._formats: dict[str, FormatImport] = {}
+        self._par_entete: dict[frozenset[str], list[FormatImport]] = {}
+        self._magiques: list[tuple[bytes, FormatImport]] = []
+        self._plugins_charges = False
+        for fmt in formats:
+            self.enregistrer(fmt)
+
+    def enregistrer(self, fmt: FormatImport) -> None:
+        """Ajoute un format au registre.
+
+        Raises:
+            ValueError: Si un format du meme nom existe deja, ou si le format
+                ne declare ni empreinte d'en-tete ni marqueur d'octets.
+        """
+        if fmt.nom in self._formats:
+            raise ValueError(f"Format d'import deja enregistre: {fmt.nom}")
+        if fmt.entete is None and not fmt.magique:
+            raise ValueError(f"Le format {fmt.nom} doit declarer 'entete' ou 'magique'")
+        self._formats[fmt.nom] = fmt
+        if fmt.entete is not None:
+            self._par_entete.setdefault(fmt.entete, []).append(fmt)
+        for marqueur in fmt.magique:
+            self._magiques.append((marqueur.lower(), fmt))
+
+    def charger_plugins(self) -> None:
+        """Enregistre les formats declares par entry points (une seule fois).
+
+        Seuls les modules de declaration sont importes ici; les modules des
+        importateurs restent charges a la demande via `fabrique`.
+        """
+        if self._plugins_charges:
+            return
+        self._plugins_charges = True
+        for ep in entry_points(group=GROUPE_ENTRY_POINTS):
+            try:
+                objet = ep.load()
+                formats = [objet] if isinstance(objet, FormatImport) else list(objet)
+                for fmt in formats:
+                    self.enregistrer(fmt)
+            except Exception as e:
+                logger.warning("Plugin d'import '%s' ignore: %s", ep.name, e)
+
+    @property
+    def formats(self) -> list[FormatImport]:
+        """Formats enregistres, dans l'ordre d'enregistrement."""
+        self.charger_plugins()
+        return list(self._formats.values())
+
+    def identifier(self, chemin: Path) -> list[FormatImport]:
+        """Retourne les formats correspondant a la tete du fichier.
+
+        La tete (TAILLE_TETE octets) est lue une seule fois. Les marqueurs
+        d'octets sont verifies en premier, puis l'empreinte de l'en-tete
+        CSV est cherchee dans l'index.
+        """
+        self.charger_plugins()
+        extension = chemin.suffix.lower()
+        with open(chemin, "rb") as f:
+            tete = f.read(TAILLE_TETE)
+        if not tete:
+            return []
+
+        tete_min = tete.lower()
+        trouves = [
+            fmt for marqueur, fmt in self._magiques
+            if extension in fmt.extensions and marqueur in tete_min
+        ]
+        if trouves:
+            return list(dict.fromkeys(trouves))
+
+        if self._par_entete:
+            empreinte = empreinte_entete(_premiere_ligne_csv(tete))
+            candidats = [
+                fmt for fmt in self._par_entete.get(empreinte, ()) if fmt.accepte_entete(empreinte)
+            ]
+            if not candidats:
+                # Repli: colonnes supplementaires ou facultatives de l'export
+                candidats = [
+                    fmt for fmts in self._par_entete.values()
+                    for fmt in fmts if fmt.accepte_entete(empreinte)
+                ]
+            return [fmt for fmt in candidats if extension in fmt.extensions]
+
+        return []
+
+    def detecter(self, chemin: Path) -> list:
+        """Retourne les importateurs a utiliser pour un fichier.
+
+        Returns:
+            Importateurs beangulp (liste vide si le format est inconnu).
+
+        Raises:
+            ValueError: Si le format est reconnu mais le fichier illisible
+                (ex: OFX corrompu).
+        """
+        for fmt in self.identifier(chemin):
+            importateurs = fmt.charger_fabrique()(chemin)
+            if importateurs:
+                return importateurs
+        return []
+
+
+_registre_defaut: RegistreImportateurs | None = None
+
+
+def registre_defaut() -> RegistreImportateurs:
+    """Retourne le registre partage (formats integres + plugins)."""
+    global _registre_defaut
+    if _registre_defaut is None:
+        _registre_defaut = RegistreImportateurs(FORMATS_INTEGRES)
+    return _registre_defaut
@@ -0,0 +1,239 @@
+"""Surveillance d'un repertoire d'import (inotify avec repli par polling).
+
+Signale les fichiers bancaires deposes dans un repertoire (ex: data/imports/)
+une fois leur ecriture terminee. Un fichier est considere complet lorsque sa
+taille et sa date de modification sont stables pendant `delai_stabilite`
+secondes, ce qui absorbe les ecritures partielles des navigateurs.
+
+Sous Linux, inotify (via ctypes, sans dependance externe) reveille la boucle
+des qu'un fichier change. Ailleurs, ou si inotify est indisponible, un
+balayage periodique du repertoire prend le relais.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS_DEFAUT = (".csv", ".ofx", ".qfx")
+
+# Suffixes des telechargements en cours (Chrome, Firefox, Safari, generiques)
+_SUFFIXES_TEMPORAIRES = (".part", ".crdownload", ".download", ".tmp", ".partial")
+
+# Masques inotify (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+
+class Inotify:
+    """Enveloppe minimale autour de l'API inotify de la libc."""
+
+    def __init__(self, repertoire: Path) -> None:
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 a echoue")
+        self.fd = fd
+        try:
+            self.ajouter(repertoire)
+        except OSError:
+            os.close(fd)
+            raise
+
+    def ajouter(self, repertoire: Path) -> None:
+        """Surveille un repertoire supplementaire avec le meme descripteur."""
+        masque = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_MODIFY
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(repertoire), masque)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch a echoue pour {repertoire}")
+
+    def attendre(self, timeout: float | None) -> bool:
+        """Bloque jusqu'a un evenement ou l'expiration. Retourne True si evenement."""
+        prets, _, _ = select.select([self.fd], [], [], timeout)
+        if not prets:
+            return False
+        # Vider la file: seul le reveil compte, le repertoire est re-balaye ensuite
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def fermer(self) -> None:
+        os.close(self.fd)
+
+
+class SurveillantRepertoire:
+    """Surveille un repertoire et retourne les fichiers dont l'ecriture est terminee.
+
+    Chaque fichier n'est signale qu'une fois par version: s'il est reecrit
+    (taille ou date de modification differente), il sera signale de nouveau.
+
+    Usage:
+        with SurveillantRepertoire(Path("data/imports")) as surveillant:
+            while True:
+                for chemin in surveillant.attendre():
+                    importer(chemin)
+    """
+
+    def __init__(
+        self,
+        repertoire: Path,
+        extensions: tuple[str, ...] = EXTENSIONS_DEFAUT,
+        delai_stabilite: float = 2.0,
+        intervalle_polling: float = 1.0,
+        forcer_polling: bool = False,
+    ) -> None:
+        """Initialise le surveillant.
+
+        Args:
+            repertoire: Repertoire a surveiller (cree s'il n'existe pas).
+            extensions: Extensions de fichiers acceptees (minuscules).
+            delai_stabilite: Secondes sans changement avant de signaler un fichier.
+            intervalle_polling: Periode de balayage en mode polling.
+            forcer_polling: Ignorer inotify meme s'il est disponible.
+        """
+        self.repertoire = repertoire
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.delai_stabilite = delai_stabilite
+        self.intervalle_polling = intervalle_polling
+
+        # chemin -> (taille, mtime_ns, instant du dernier changement observe)
+        self._candidats: dict[Path, tuple[int, int, float]] = {}
+        # chemin -> (taille, mtime_ns) deja signales
+        self._signales: dict[Path, tuple[int, int]] = {}
+
+        self.repertoire.mkdir(parents=True, exist_ok=True)
+
+        self._inotify: Inotify | None = None
+        if not forcer_polling and sys.platform.startswith("linux"):
+            try:
+                self._inotify = Inotify(self.repertoire)
+            except (OSError, AttributeError) as e:
+                logger.info("inotify indisponible (%s), repli sur le polling", e)
+
+    @property
+    def mode(self) -> str:
+        """Retourne "inotify" ou "polling"."""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _est_candidat(self, chemin: Path) -> bool:
+        nom = chemin.name
+        if nom.startswith(".") or nom.lower().endswith(_SUFFIXES_TEMPORAIRES):
+            return False
+        return chemin.suffix.lower() in self.extensions
+
+    def balayer(self, maintenant: float | None = None) -> list[Path]:
+        """Balaye le repertoire et retourne les fichiers devenus stables.
+
+        Args:
+            maintenant: Horodatage monotone (injectable pour les tests).
+
+        Returns:
+            Fichiers prets a importer, tries par nom.
+        """
+        if maintenant is None:
+            maintenant = time.monotonic()
+
+        presents: set[Path] = set()
+        prets: list[Path] = []
+
+        try:
+            elements = list(os.scandir(self.repertoire))
+        except FileNotFoundError:
+            elements = []
+
+        for element in elements:
+            chemin = Path(element.path)
+            if not self._est_candidat(chemin):
+                continue
+            try:
+                if not element.is_file():
+                    continue
+                stat = element.stat()
+            except FileNotFoundError:
+                continue
+
+            presents.add(chemin)
+            if stat.st_size == 0:
+                # Fichier cree mais pas encore ecrit
+                continue
+            version = (stat.st_size, stat.st_mtime_ns)
+            if self._signales.get(chemin) == version:
+                continue
+
+            precedent = self._candidats.get(chemin)
+            if precedent is None or precedent[:2] != version:
+                self._candidats[chemin] = (*version, maintenant)
+                continue
+
+            if maintenant - precedent[2] >= self.delai_stabilite:
+                del self._candidats[chemin]
+                self._signales[chemin] = version
+                prets.append(chemin)
+
+        # Oublier les fichiers disparus (deplaces, archives, supprimes)
+        for chemin in list(self._candidats):
+            if chemin not in presents:
+                del self._candidats[chemin]
+        for chemin in list(self._signales):
+            if chemin not in presents:
+                del self._signales[chemin]
+
+        return sorted(prets)
+
+    def attendre(self, timeout: float | None = None) -> list[Path]:
+        """Bloque jusqu'a ce qu'au moins un fichier soit pret, ou jusqu'au timeout.
+
+        Args:
+            timeout: Duree maximale d'attente en secondes (None = indefini).
+
+        Returns:
+            Fichiers prets (liste vide si le timeout expire).
+        """
+        echeance = None if timeout is None else time.monotonic() + timeout
+        while True:
+            prets = self.balayer()
+            if prets:
+                return prets
+
+            restant = None if echeance is None else echeance - time.monotonic()
+            if restant is not None and restant <= 0:
+                return []
+
+            if self._inotify is not None:
+                # Fichiers en cours d'ecriture: re-verifier la stabilite sous peu
+                attente = self.delai_stabilite / 2 if self._candidats else None
+                if attente is None or (restant is not None and restant < attente):
+                    attente = restant
+                self._inotify.attendre(attente)
+            else:
+                attente = self.intervalle_polling
+                if restant is not None:
+                    attente = min(attente, restant)
+                time.sleep(attente)
+
+    def fermer(self) -> None:
+        """Libere le descripteur inotify le cas echeant."""
+        if self._inotify is not None:
+            self._inotify.fermer()
+            self._inotify = None
+
+    def __enter__(self) -> SurveillantRepertoire:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fermer()
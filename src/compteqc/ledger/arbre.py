@@ -0,0 +1,172 @@
+"""Arbre des comptes avec sous-totaux par noeud.
+
+Les rapports (bilan CLI, outil MCP, rapport PDF) filtraient le dictionnaire
+plat des soldes avec `startswith("Actifs")` et re-sommaient chaque
+sous-arbre. L'arbre range chaque compte sous ses parents
+("Depenses:Bureau:Logiciels" -> "Depenses" -> "Depenses:Bureau") et
+maintient pour chaque noeud:
+
+- `solde`: solde propre du compte (postings sur ce compte exactement);
+- `sous_total`: solde propre + soldes de tous les descendants.
+
+Ajouter un montant a un compte met a jour les sous-totaux des ancetres
+seulement (O(profondeur)). Un sous-total ou les soldes d'un sous-arbre
+se lisent sans parcourir les autres comptes.
+"""
+
+from __future__ import annotations
+
+import datetime
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+SEPARATEUR = ":"
+
+
+@dataclass(eq=False)
+class NoeudCompte:
+    """Noeud de l'arbre des comptes.
+
+    Attributes:
+        nom: Nom complet du compte (ex: "Depenses:Bureau").
+        solde: Solde propre du compte.
+        sous_total: Solde du compte et de tous ses descendants.
+        enfants: Sous-comptes indexes par segment (ex: "Bureau").
+        ouvert: Vrai si le compte a recu au moins un montant (un noeud
+            intermediaire comme "Depenses" peut n'exister que comme parent).
+    """
+
+    nom: str
+    solde: Decimal = Decimal(0)
+    sous_total: Decimal = Decimal(0)
+    enfants: dict[str, NoeudCompte] = field(default_factory=dict)
+    ouvert: bool = False
+
+    def parcourir(self) -> Iterator[NoeudCompte]:
+        """Parcourt le sous-arbre en profondeur (ordre alphabetique)."""
+        yield self
+        for segment in sorted(self.enfants):
+            yield from self.enfants[segment].parcourir()
+
+
+class ArbreComptes:
+    """Soldes du ledger organises en arbre de comptes.
+
+    Usage:
+        arbre = arbre_soldes(entries)
+        arbre.sous_total("Depenses")
+        arbre.soldes("Actifs", non_nuls=True)
+    """
+
+    def __init__(self) -> None:
+        self.racine = NoeudCompte(nom="")
+        self._noeuds: dict[str, NoeudCompte] = {"": self.racine}
+
+    @classmethod
+    def depuis_soldes(cls, soldes: dict[str, Decimal]) -> ArbreComptes:
+        """Construit l'arbre a partir d'un dictionnaire {compte: solde}."""
+        arbre = cls()
+        for compte, montant in soldes.items():
+            arbre.ajouter(compte, montant)
+        return arbre
+
+    def _creer(self, compte: str) -> list[NoeudCompte]:
+        """Retourne le chemin racine -> compte, en creant les noeuds manquants."""
+        chemin = [self.racine]
+        noeud = self.racine
+        for segment in compte.split(SEPARATEUR):
+            enfant = noeud.enfants.get(segment)
+            if enfant is None:
+                nom = f"{noeud.nom}{SEPARATEUR}{segment}" if noeud.nom else segment
+                enfant = NoeudCompte(nom=nom)
+                noeud.enfants[segment] = enfant
+                self._noeuds[nom] = enfant
+            chemin.append(enfant)
+            noeud = enfant
+        return chemin
+
+    def ajouter(self, compte: str, montant: Decimal) -> None:
+        """Ajoute un montant au compte et aux sous-totaux de ses ancetres."""
+        chemin = self._creer(compte)
+        feuille = chemin[-1]
+        feuille.solde += montant
+        feuille.ouvert = True
+        for noeud in chemin:
+            noeud.sous_total += montant
+
+    def noeud(self, compte: str) -> NoeudCompte | None:
+        """Retourne le noeud d'un compte (ou d'un parent), None si absent."""
+        return self._noeuds.get(compte)
+
+    def sous_total(self, compte: str = "") -> Decimal:
+        """Solde du compte et de ses descendants (tout l'arbre si vide)."""
+        noeud = self._noeuds.get(compte)
+        return noeud.sous_total if noeud is not None else Decimal(0)
+
+    def soldes(self, compte: str = "", non_nuls: bool = False) -> dict[str, Decimal]:
+        """Soldes propres des comptes du sous-arbre (parcours en profondeur).
+
+        Args:
+            compte: Racine du sous-arbre (ex: "Actifs"). Tout l'arbre si vide.
+            non_nuls: Exclure les comptes a solde nul.
+        """
+        noeud = self._noeuds.get(compte)
+        if noeud is None:
+            return {}
+        return {
+            n.nom: n.solde
+            for n in noeud.parcourir()
+            if n.ouvert and (not non_nuls or n.solde != 0)
+        }
+
+    def sous_totaux(self, compte: str = "", profondeur: int | None = None) -> dict[str, Decimal]:
+        """Sous-totaux de chaque noeud du sous-arbre (parents inclus).
+
+        Args:
+            compte: Racine du sous-arbre. Tout l'arbre si vide.
+            profondeur: Nombre maximal de segments du nom (ex: 2 pour
+                "Depenses:Bureau"). Sans limite si None.
+        """
+        noeud = self._noeuds.get(compte)
+        if noeud is None:
+            return {}
+        return {
+            n.nom: n.sous_total
+            for n in noeud.parcourir()
+            if n.nom and (profondeur is None or n.nom.count(SEPARATEUR) < profondeur)
+        }
+
+    def totaux_gifi(self, gifi_map: dict[str, str], compte: str = "") -> dict[str, Decimal]:
+        """Agrege les soldes propres des comptes du sous-arbre par code GIFI.
+
+        Meme resultat que `aggregate_by_gifi` sur les soldes du sous-arbre.
+        """
+        noeud = self._noeuds.get(compte)
+        if noeud is None:
+            return {}
+        totaux: dict[str, Decimal] = {}
+        for n in noeud.parcourir():
+            gifi = gifi_map.get(n.nom) if n.ouvert else None
+            if gifi:
+                totaux[gifi] = totaux.get(gifi, Decimal(0)) + n.solde
+        return totaux
+
+
+def arbre_soldes(entries: list, date: datetime.date | None = None) -> ArbreComptes:
+    """Retourne l'arbre des soldes d'une liste d'entrees.
+
+    Sans date, l'arbre est conserve avec la table de postings en cache et
+    mis a jour pour les seuls comptes touches quand la liste grandit.
+
+    Args:
+        entries: Liste d'entrees Beancount.
+        date: Soldes en fin de journee a cette date (tout l'historique si None).
+    """
+    from compteqc.ledger.colonnes import table_postings
+
+    table = table_postings(entries)
+    if date is not None:
+        return ArbreComptes.depuis_soldes(table.index_soldes().soldes_au(date))
+    return table.arbre_comptes()
+
@@ -0,0 +1,273 @@
+"""Chargement incremental du ledger, fichier par fichier.
+
+`loader.load_file` re-parse tous les fichiers inclus a chaque appel. Le
+`ChargeurLedger` garde le resultat du parsing de chaque fichier avec son
+empreinte (mtime et taille): un rechargement ne re-parse que les fichiers
+modifies, puis refait les etapes globales de Beancount (tri, booking,
+plugins, validation) sur l'ensemble des entrees. Le resultat est le meme
+que `loader.load_file`.
+
+`SurveillantLedger` surveille les fichiers inclus dans un thread (inotify
+sur leurs repertoires, avec repli par polling) et appelle un rappel des
+qu'un fichier change, y compris quand la modification vient d'un autre
+processus (CLI, Fava, editeur).
+"""
+
+from __future__ import annotations
+
+import copy
+import glob
+import logging
+import os
+import sys
+import threading
+from collections.abc import Callable
+from pathlib import Path
+
+from beancount import loader
+from beancount.core import data
+from beancount.ops import validation
+from beancount.parser import booking, options, parser
+
+from compteqc.ingestion.surveillance import Inotify
+
+logger = logging.getLogger(__name__)
+
+Ledger = tuple[list, list, dict]
+
+
+def _empreinte(chemin: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class ChargeurLedger:
+    """Charge un ledger en ne re-parsant que les fichiers modifies.
+
+    Usage:
+        chargeur = ChargeurLedger(Path("ledger/main.beancount"))
+        entries, errors, options_map = chargeur.charger()
+        ...
+        if chargeur.modifie():
+            entries, errors, options_map = chargeur.charger()
+    """
+
+    def __init__(self, chemin_main: Path | str) -> None:
+        self.chemin_main = os.path.abspath(chemin_main)
+        # chemin absolu -> (empreinte, entries, erreurs, options du fichier)
+        self._cache: dict[str, tuple[tuple[int, int], list, list, dict]] = {}
+        self._fichiers: list[str] = []
+        self._verrou = threading.Lock()
+        self.nb_parses = 0
+
+    @property
+    def fichiers(self) -> list[str]:
+        """Fichiers lus lors du dernier chargement (main et includes)."""
+        return list(self._fichiers)
+
+    def modifie(self) -> bool:
+        """Vrai si un fichier du dernier chargement a change (ou jamais charge)."""
+        if not self._fichiers:
+            return True
+        for chemin in self._fichiers:
+            trouve = self._cache.get(chemin)
+            if trouve is None or _empreinte(chemin) != trouve[0]:
+                return True
+        return False
+
+    def _parser(self, chemin: str) -> tuple[list, list, dict]:
+        empreinte = _empreinte(chemin)
+        trouve = self._cache.get(chemin)
+        if trouve is not None and trouve[0] == empreinte:
+            return trouve[1], trouve[2], trouve[3]
+        entries, erreurs, options_fichier = parser.parse_file(chemin)
+        self.nb_parses += 1
+        if empreinte is not None:
+            self._cache[chemin] = (empreinte, entries, erreurs, options_fichier)
+        return entries, erreurs, options_fichier
+
+    def _parser_recursif(self) -> Ledger:
+        """Equivalent de `loader._parse_recursive`, avec le cache par fichier."""
+        entries: list = []
+        erreurs: list = []
+        options_main = None
+        autres_options = []
+        vus: list[str] = []
+        pile = [self.chemin_main]
+
+        while pile:
+            chemin = os.path.normpath(pile.pop(0))
+            if chemin in vus:
+                erreurs.append(loader.LoadError(
+                    data.new_metadata("<load>", 0), f'Duplicate filename parsed: "{chemin}"'
+                ))
+                continue
+            if not os.path.exists(chemin):
+                erreurs.append(loader.LoadError(
+                    data.new_metadata("<load>", 0), f'File "{chemin}" does not exist'
+                ))
+                continue
+            vus.append(chemin)
+
+            src_entries, src_erreurs, src_options = self._parser(chemin)
+            entries.extend(src_entries)
+            erreurs.extend(src_erreurs)
+            if options_main is None:
+                options_main = src_options
+            else:
+                autres_options.append(src_options)
+
+            repertoire = os.path.dirname(chemin)
+            for include in src_options["include"]:
+                motif = include if os.path.isabs(include) else os.path.join(repertoire, include)
+                trouves = glob.glob(motif, recursive=True)
+                if not trouves:
+                    erreurs.append(loader.LoadError(
+                        data.new_metadata("<load>", 0),
+                        f'File glob "{include}" does not match any files',
+                    ))
+                pile.extend(trouves)
+
+        if options_main is None:
+            options_main = options.OPTIONS_DEFAULTS.copy()
+        # Copie: le cache garde les options du fichier telles que parsees
+        # (aggregate_options_map met a jour dcontext en place)
+        options_main = dict(options_main)
+        options_main["dcontext"] = copy.deepcopy(options_main["dcontext"])
+        options_main["include"] = sorted(vus)
+        self._fichiers = vus
+        return entries, erreurs, loader.aggregate_options_map(options_main, autres_options)
+
+    def charger(self) -> Ledger:
+        """Charge le ledger (fichiers modifies re-parses, les autres repris du cache).
+
+        Returns:
+            (entries, errors, options_map), comme `loader.load_file`.
+        """
+        with self._verrou:
+            entries, erreurs, options_map = self._parser_recursif()
+            entries.sort(key=data.entry_sortkey)
+
+            entries, erreurs_booking = booking.book(entries, options_map)
+            erreurs.extend(erreurs_booking)
+
+            pythonpath = list(sys.path)
+            try:
+                if "pythonpath" in options_map:
+                    sys.path[0:0] = options_map["pythonpath"]
+                entries, erreurs = loader.run_transformations(entries, erreurs, options_map, None)
+            finally:
+                sys.path[:] = pythonpath
+
+            erreurs.extend(validation.validate(entries, options_map, None, None))
+            options_map["input_hash"] = loader.compute_input_hash(options_map["include"])
+
+            # Oublier les fichiers qui ne sont plus inclus
+            for chemin in set(self._cache) - set(self._fichiers):
+                del self._cache[chemin]
+            return entries, erreurs, options_map
+
+
+class SurveillantLedger:
+    """Thread qui declenche un rechargement quand un fichier inclus change.
+
+    `rappel` est appele depuis le thread de surveillance (typiquement une
+    methode qui recharge via `chargeur.charger()` et publie le resultat).
+
+    Usage:
+        surveillant = SurveillantLedger(chargeur, rappel=app.reload)
+        surveillant.demarrer()
+        ...
+        surveillant.arreter()
+    """
+
+    def __init__(
+        self,
+        chargeur: ChargeurLedger,
+        rappel: Callable[[], None],
+        intervalle: float = 1.0,
+        forcer_polling: bool = False,
+    ) -> None:
+        """Initialise le surveillant.
+
+        Args:
+            chargeur: Chargeur dont les fichiers sont surveilles.
+            rappel: Fonction appelee quand un fichier a change.
+            intervalle: Periode de verification (polling, et filet de
+                securite en mode inotify).
+            forcer_polling: Ignorer inotify meme s'il est disponible.
+        """
+        self.chargeur = chargeur
+        self.rappel = rappel
+        self.intervalle = intervalle
+        self.forcer_polling = forcer_polling
+        self._inotify: Inotify | None = None
+        self._repertoires: set[str] = set()
+        self._arret = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def mode(self) -> str:
+        """Retourne "inotify" ou "polling"."""
+        return "inotify" if self._inotify is not None else "polling"
+
+    def _surveiller_repertoires(self) -> None:
+        """Ajoute une surveillance inotify pour chaque repertoire de fichier inclus."""
+        if self.forcer_polling or not sys.platform.startswith("linux"):
+            return
+        for repertoire in {os.path.dirname(f) for f in self.chargeur.fichiers}:
+            if repertoire in self._repertoires:
+                continue
+            try:
+                if self._inotify is None:
+                    self._inotify = Inotify(Path(repertoire))
+                else:
+                    self._inotify.ajouter(Path(repertoire))
+                self._repertoires.add(repertoire)
+            except (OSError, AttributeError) as e:
+                logger.info("inotify indisponible (%s), repli sur le polling", e)
+                return
+
+    def verifier(self) -> bool:
+        """Recharge le ledger si un fichier a change. Retourne True si recharge."""
+        if not self.chargeur.modifie():
+            return False
+        try:
+            self.rappel()
+        except Exception:
+            logger.exception("Rechargement du ledger impossible")
+            return False
+        self._surveiller_repertoires()
+        return True
+
+    def _boucle(self) -> None:
+        while not self._arret.is_set():
+            if self._inotify is not None:
+                if self._inotify.attendre(self.intervalle):
+                    # Laisser l'ecrivain terminer une rafale d'ecritures
+                    self._arret.wait(0.05)
+            else:
+                self._arret.wait(self.intervalle)
+            if not self._arret.is_set():
+                self.verifier()
+
+    def demarrer(self) -> None:
+        """Demarre le thread de surveillance (daemon)."""
+        self._surveiller_repertoires()
+        self._thread = threading.Thread(
+            target=self._boucle, name="surveillant-ledger", daemon=True
+        )
+        self._thread.start()
+
+    def arreter(self) -> None:
+        """Arrete le thread et libere inotify."""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.intervalle + 1)
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.fermer()
+            self._inotify = None
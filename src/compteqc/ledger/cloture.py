@@ -0,0 +1,265 @@
+"""Cloture d'exercice: archivage des annees fermees et soldes d'ouverture.
+
+Sans cloture, chaque commande analyse toutes les annees depuis la creation
+de la societe. La cloture d'une annee fiscale:
+
+1. cree `clotures/<annee>.beancount`, l'archive qui inclut les fichiers
+   mensuels de l'annee;
+2. cree `clotures/ouverture-<annee+1>.beancount`, une transaction unique
+   (tag #ouverture) qui reporte les soldes des comptes de bilan au 1er
+   janvier; le resultat cumule va aux benefices non repartis;
+3. remplace, dans main.beancount, les includes de l'annee (et l'ouverture
+   precedente) par l'include de la nouvelle ouverture.
+
+Les commandes courantes ne chargent plus que les annees ouvertes et les
+soldes d'ouverture. L'historique complet (rapports CPA, comparatifs)
+reste accessible via `chemin_historique`, qui remplace les soldes
+d'ouverture par les archives.
+"""
+
+from __future__ import annotations
+
+import datetime
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+from beancount import loader
+
+from compteqc.ledger.colonnes import table_postings
+from compteqc.ledger.journal import JournalEcritures
+from compteqc.ledger.validation import valider_ledger
+
+REPERTOIRE_CLOTURES = "clotures"
+TAG_OUVERTURE = "ouverture"
+COMPTE_BENEFICES_DEFAUT = "Capital:Benefices-Non-Repartis"
+NOM_HISTORIQUE = ".historique.beancount"
+
+PREFIXES_BILAN = ("Actifs", "Passifs", "Capital")
+
+_RE_INCLUDE_MENSUEL = re.compile(
+    r'^include "((\d{4})/\d{2}\.beancount)"[ \t]*\n?', re.MULTILINE
+)
+_RE_INCLUDE_OUVERTURE = re.compile(
+    rf'^include "{REPERTOIRE_CLOTURES}/ouverture-\d{{4}}\.beancount"[ \t]*\n?', re.MULTILINE
+)
+
+_ENTETE = """\
+option "name_assets" "Actifs"
+option "name_liabilities" "Passifs"
+option "name_equity" "Capital"
+option "name_income" "Revenus"
+option "name_expenses" "Depenses"
+"""
+
+
+@dataclass
+class ResultatCloture:
+    """Resultat d'une cloture d'exercice."""
+
+    annee: int
+    archive: Path
+    ouverture: Path
+    nb_fichiers: int
+    nb_comptes: int
+    resultat_cumule: Decimal
+
+
+def annees_ouvertes(chemin_main: Path) -> list[int]:
+    """Annees dont des fichiers mensuels sont inclus dans main.beancount."""
+    contenu = chemin_main.read_text(encoding="utf-8")
+    return sorted({int(m.group(2)) for m in _RE_INCLUDE_MENSUEL.finditer(contenu)})
+
+
+def annees_cloturees(chemin_main: Path) -> list[int]:
+    """Annees archivees dans ledger/clotures/."""
+    repertoire = chemin_main.parent / REPERTOIRE_CLOTURES
+    if not repertoire.is_dir():
+        return []
+    return sorted(
+        int(p.stem) for p in repertoire.glob("*.beancount") if re.fullmatch(r"\d{4}", p.stem)
+    )
+
+
+class ExerciceCloture(ValueError):
+    """Ecriture datee d'un exercice deja cloture."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(
+            f"L'exercice {annee} est cloture: ses soldes sont reportes dans "
+            f"l'ouverture {annee + 1}. Saisir un ajustement dans l'exercice courant."
+        )
+        self.annee = annee
+
+
+def verifier_exercice_ouvert(chemin_main: Path, annee: int) -> None:
+    """Refuse une ecriture dans un exercice cloture.
+
+    Un fichier mensuel d'une annee cloturee serait de nouveau inclus a cote
+    de l'ouverture de l'annee suivante: l'exercice serait compte deux fois.
+
+    Raises:
+        ExerciceCloture: Si `annee` est archivee dans ledger/clotures/.
+    """
+    if annee in annees_cloturees(chemin_main):
+        raise ExerciceCloture(annee)
+
+
+def _formater_ouverture(
+    annee: int, soldes: dict[str, Decimal], compte_benefices: str
+) -> tuple[str, int, Decimal]:
+    """Formate la transaction de soldes d'ouverture de l'annee `annee`.
+
+    Returns:
+        (texte du fichier, nombre de comptes reportes, resultat cumule).
+    """
+    bilan = {
+        compte: solde for compte, solde in sorted(soldes.items())
+        if compte.startswith(PREFIXES_BILAN) and solde != 0
+    }
+    # Comptes de resultat soldes aux benefices non repartis
+    resultat = sum(
+        (s for c, s in soldes.items() if not c.startswith(PREFIXES_BILAN)), Decimal(0)
+    )
+    if resultat != 0:
+        bilan[compte_benefices] = bilan.get(compte_benefices, Decimal(0)) + resultat
+
+    texte = f"; Soldes d'ouverture {annee} (cloture de l'exercice {annee - 1})\n" + _ENTETE
+    postings = [(c, s) for c, s in bilan.items() if s != 0]
+    if postings:
+        largeur = max(len(c) for c, _ in postings)
+        texte += (
+            f'\n{annee}-01-01 * "Soldes d\'ouverture {annee}" #{TAG_OUVERTURE}\n'
+            f'  cloture: "{annee - 1}"\n'
+        )
+        for compte, solde in postings:
+            texte += f"  {compte:<{largeur}}  {solde} CAD\n"
+    return texte, len(postings), resultat
+
+
+def cloturer_exercice(
+    chemin_main: Path,
+    annee: int,
+    compte_benefices: str = COMPTE_BENEFICES_DEFAUT,
+) -> ResultatCloture:
+    """Cloture une annee fiscale du ledger.
+
+    Les ecritures sont journalisees: si le ledger resultant est invalide,
+    tout est annule.
+
+    Args:
+        chemin_main: Chemin vers main.beancount.
+        annee: Annee a cloturer (la plus ancienne annee ouverte).
+        compte_benefices: Compte de capital qui recoit le resultat cumule.
+
+    Returns:
+        ResultatCloture avec les fichiers crees.
+
+    Raises:
+        ValueError: Si l'annee n'est pas ouverte, si une annee anterieure
+            est encore ouverte, si des transactions en attente datent de
+            l'annee, ou si le ledger est invalide avant ou apres cloture.
+    """
+    ledger_dir = chemin_main.parent
+    ouvertes = annees_ouvertes(chemin_main)
+    if annee not in ouvertes:
+        raise ValueError(f"Aucun fichier mensuel de {annee} dans {chemin_main.name}")
+    anterieures = [a for a in ouvertes if a < annee]
+    if anterieures:
+        raise ValueError(
+            f"Cloturer d'abord les annees anterieures: {', '.join(map(str, anterieures))}"
+        )
+
+    valide, erreurs = valider_ledger(chemin_main)
+    if not valide:
+        raise ValueError("Ledger invalide, cloture annulee:\n" + "\n".join(erreurs))
+
+    from compteqc.categorisation.pending import lire_pending
+
+    fin = datetime.date(annee, 12, 31)
+    en_attente = [t for t in lire_pending(ledger_dir / "pending.beancount") if t.date <= fin]
+    if en_attente:
+        raise ValueError(
+            f"{len(en_attente)} transaction(s) en attente datee(s) de {annee} ou avant: "
+            "les approuver ou rejeter avant la cloture"
+        )
+
+    entries, _, _ = loader.load_file(str(chemin_main))
+    soldes = table_postings(entries).index_soldes().soldes_au(fin)
+    texte_ouverture, nb_comptes, resultat = _formater_ouverture(annee + 1, soldes, compte_benefices)
+
+    contenu_main = chemin_main.read_text(encoding="utf-8")
+    fichiers = [
+        m.group(1) for m in _RE_INCLUDE_MENSUEL.finditer(contenu_main) if int(m.group(2)) == annee
+    ]
+    texte_archive = f"; Exercice {annee} (cloture)\n" + _ENTETE + "\n" + "".join(
+        f'include "../{f}"\n' for f in sorted(fichiers)
+    )
+
+    nom_ouverture = f"{REPERTOIRE_CLOTURES}/ouverture-{annee + 1}.beancount"
+    nouveau_main = _RE_INCLUDE_MENSUEL.sub(
+        lambda m: "" if int(m.group(2)) == annee else m.group(0), contenu_main
+    )
+    nouveau_main = _RE_INCLUDE_OUVERTURE.sub("", nouveau_main)
+    if not nouveau_main.endswith("\n"):
+        nouveau_main += "\n"
+    nouveau_main += f'include "{nom_ouverture}"\n'
+
+    archive = ledger_dir / REPERTOIRE_CLOTURES / f"{annee}.beancount"
+    ouverture = ledger_dir / nom_ouverture
+    if archive.exists() or ouverture.exists():
+        raise ValueError(f"Exercice {annee} deja cloture ({archive.parent})")
+    archive.parent.mkdir(parents=True, exist_ok=True)
+
+    with JournalEcritures(ledger_dir, f"cloture {annee}") as journal:
+        journal.ajouter(archive, texte_archive)
+        journal.ajouter(ouverture, texte_ouverture)
+        journal.reecrire(chemin_main, nouveau_main)
+
+        valide, erreurs = valider_ledger(chemin_main)
+        if not valide:
+            journal.annuler()
+            raise ValueError("Ledger invalide apres cloture, annulee:\n" + "\n".join(erreurs))
+
+    return ResultatCloture(
+        annee=annee,
+        archive=archive,
+        ouverture=ouverture,
+        nb_fichiers=len(fichiers),
+        nb_comptes=nb_comptes,
+        resultat_cumule=resultat,
+    )
+
+
+def chemin_historique(chemin_main: Path) -> Path:
+    """Retourne un fichier racine qui charge l'historique complet.
+
+    Les includes de soldes d'ouverture de main.beancount sont remplaces par
+    les archives des exercices clotures. Le fichier est genere a cote de
+    main.beancount (les includes relatifs restent valides). Sans exercice
+    cloture, main.beancount est retourne tel quel.
+    """
+    clotures = annees_cloturees(chemin_main)
+    if not clotures:
+        return chemin_main
+
+    contenu = chemin_main.read_text(encoding="utf-8")
+    archives = "".join(
+        f'include "{REPERTOIRE_CLOTURES}/{annee}.beancount"\n' for annee in clotures
+    )
+    contenu = _RE_INCLUDE_OUVERTURE.sub("", contenu)
+    if not contenu.endswith("\n"):
+        contenu += "\n"
+    contenu += archives
+
+    chemin = chemin_main.parent / NOM_HISTORIQUE
+    if not chemin.exists() or chemin.read_text(encoding="utf-8") != contenu:
+        chemin.write_text(contenu, encoding="utf-8")
+    return chemin
+
+
+def charger_ledger(chemin_main: Path, archives: bool = False) -> tuple[list, list, dict]:
+    """Charge le ledger courant, ou l'historique complet si `archives`."""
+    chemin = chemin_historique(chemin_main) if archives else chemin_main
+    return loader.load_file(str(chemin))
@@ -0,0 +1,513 @@
+"""Table de postings en colonnes (NumPy) materialisee depuis le ledger.
+
+Les calculs analytiques (soldes, cumuls de paie, sommaires de taxes,
+remises) parcouraient la liste des `data.Transaction` et additionnaient des
+Decimal posting par posting. La table range chaque posting sur une ligne de
+tableaux NumPy paralleles:
+
+- `dates`: date ordinale (int32);
+- `id_compte`: indice dans `comptes` (int32);
+- `montants`: montant entier mis a l'echelle (int64, 10**echelle unites);
+- `tags`: ensemble de tags de la transaction en bits (uint64);
+- `id_txn`: indice de la transaction dans `transactions` (int32).
+
+Les regroupements par compte et les sommes sur une plage de dates sont des
+operations vectorisees sur des entiers, donc exactes. Les resultats sont
+reconvertis en Decimal a la sortie.
+
+Comme les calculs qu'elle remplace, la table additionne les nombres sans
+tenir compte de la devise (le ledger est en CAD).
+
+Pour les soldes a date, `IndexSoldes` conserve par compte les dates triees
+et les sommes cumulees: un solde a une date, ou la variation sur une
+periode, se lit par recherche dichotomique au lieu de re-sommer
+l'historique.
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from decimal import Decimal
+
+import numpy as np
+from beancount.core import data
+
+from compteqc.ledger.arbre import ArbreComptes
+
+ECHELLE_MIN = 2
+ECHELLE_MAX = 9
+
+# Au-dela de 64 tags distincts, les tags supplementaires sont verifies sur
+# les transactions plutot que dans le masque de bits.
+_NB_BITS_TAGS = 64
+
+_LIMITE_INT64 = 2**63
+
+# Ordinal du 1970-01-01 (origine de numpy.datetime64)
+_ORDINAL_EPOCH = datetime.date(1970, 1, 1).toordinal()
+
+
+class TablePostings:
+    """Postings du ledger en colonnes NumPy.
+
+    Usage:
+        table = table_postings(entries)
+        soldes = table.soldes(fin=datetime.date(2026, 12, 31))
+    """
+
+    def __init__(self) -> None:
+        self.comptes: list[str] = []
+        self.transactions: list[data.Transaction] = []
+        self.echelle = ECHELLE_MIN
+        self.dates = np.empty(0, dtype=np.int32)
+        self.id_compte = np.empty(0, dtype=np.int32)
+        self.montants = np.empty(0, dtype=np.int64)
+        self.tags = np.empty(0, dtype=np.uint64)
+        self.id_txn = np.empty(0, dtype=np.int32)
+        self._index_comptes: dict[str, int] = {}
+        self._index_tags: dict[str, int] = {}
+        self._total_absolu = 0
+        self._index_soldes: IndexSoldes | None = None
+        self._arbre: ArbreComptes | None = None
+        self._nb_postings_arbre = 0
+
+    @classmethod
+    def depuis_entries(cls, entries: Iterable) -> TablePostings:
+        """Construit la table a partir d'une liste d'entrees Beancount."""
+        table = cls()
+        table.ajouter(entries)
+        return table
+
+    def __len__(self) -> int:
+        return len(self.montants)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def _id_compte(self, compte: str) -> int:
+        idx = self._index_comptes.get(compte)
+        if idx is None:
+            idx = len(self.comptes)
+            self._index_comptes[compte] = idx
+            self.comptes.append(compte)
+        return idx
+
+    def _bits_tags(self, tags: Iterable[str]) -> int:
+        bits = 0
+        for tag in tags:
+            idx = self._index_tags.get(tag)
+            if idx is None:
+                if len(self._index_tags) >= _NB_BITS_TAGS:
+                    continue
+                idx = len(self._index_tags)
+                self._index_tags[tag] = idx
+            bits |= 1 << idx
+        return bits
+
+    def ajouter(self, entries: Iterable) -> None:
+        """Ajoute les postings de nouvelles transactions a la table.
+
+        Raises:
+            ValueError: Si un montant a plus de ECHELLE_MAX decimales, ou si
+                les montants cumules depassent la capacite d'un int64.
+        """
+        nombres: list[Decimal] = []
+        dates: list[int] = []
+        comptes: list[int] = []
+        tags: list[int] = []
+        txns: list[int] = []
+        nouvelles: list[data.Transaction] = []
+        echelle = self.echelle
+
+        for entry in entries:
+            if not isinstance(entry, data.Transaction):
+                continue
+            id_txn = len(self.transactions) + len(nouvelles)
+            nouvelles.append(entry)
+            ordinal = entry.date.toordinal()
+            bits = self._bits_tags(entry.tags) if entry.tags else 0
+            for posting in entry.postings:
+                if not posting.units or posting.units.number is None:
+                    continue
+                nombre = posting.units.number
+                exposant = nombre.as_tuple().exponent
+                if isinstance(exposant, int) and -exposant > echelle:
+                    echelle = -exposant
+                nombres.append(nombre)
+                dates.append(ordinal)
+                comptes.append(self._id_compte(posting.account))
+                tags.append(bits)
+                txns.append(id_txn)
+
+        if not nombres:
+            self.transactions.extend(nouvelles)
+            return
+        if echelle > ECHELLE_MAX:
+            raise ValueError(
+                f"Montant avec {echelle} decimales: non representable dans la table "
+                f"(maximum {ECHELLE_MAX})"
+            )
+
+        if echelle != self.echelle:
+            facteur = 10 ** (echelle - self.echelle)
+            if self._total_absolu * facteur >= _LIMITE_INT64:
+                raise ValueError("Montants cumules hors de la capacite int64")
+            self._total_absolu *= facteur
+            self.montants = self.montants * facteur
+            self.echelle = echelle
+
+        entiers = [int(n.scaleb(echelle)) for n in nombres]
+        total_absolu = self._total_absolu + sum(abs(e) for e in entiers)
+        if total_absolu >= _LIMITE_INT64:
+            raise ValueError("Montants cumules hors de la capacite int64")
+        self._total_absolu = total_absolu
+
+        self.transactions.extend(nouvelles)
+        self.dates = np.concatenate([self.dates, np.array(dates, dtype=np.int32)])
+        self.id_compte = np.concatenate([self.id_compte, np.array(comptes, dtype=np.int32)])
+        self.montants = np.concatenate([self.montants, np.array(entiers, dtype=np.int64)])
+        self.tags = np.concatenate([self.tags, np.array(tags, dtype=np.uint64)])
+        self.id_txn = np.concatenate([self.id_txn, np.array(txns, dtype=np.int32)])
+
+    # ------------------------------------------------------------------
+    # Conversions
+    # ------------------------------------------------------------------
+
+    def en_decimal(self, valeur: int | np.integer) -> Decimal:
+        """Convertit un entier mis a l'echelle en Decimal exact."""
+        return Decimal(int(valeur)).scaleb(-self.echelle)
+
+    # ------------------------------------------------------------------
+    # Selection
+    # ------------------------------------------------------------------
+
+    def masque(
+        self,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+        tag: str | None = None,
+        prefixe: str | tuple[str, ...] | None = None,
+        comptes: Iterable[str] | None = None,
+        sans_tag: str | None = None,
+    ) -> np.ndarray:
+        """Retourne le masque booleen des postings correspondant aux filtres.
+
+        Args:
+            debut: Date minimale (inclusive).
+            fin: Date maximale (inclusive).
+            tag: Tag que la transaction doit porter.
+            prefixe: Prefixe(s) de nom de compte (ex: "Depenses").
+            comptes: Noms de comptes exacts.
+            sans_tag: Tag que la transaction ne doit pas porter.
+        """
+        masque = np.ones(len(self), dtype=bool)
+        if debut is not None:
+            masque &= self.dates >= debut.toordinal()
+        if fin is not None:
+            masque &= self.dates <= fin.toordinal()
+        if tag is not None:
+            masque &= self._masque_tag(tag)
+        if sans_tag is not None:
+            masque &= ~self._masque_tag(sans_tag)
+        if prefixe is not None:
+            masque &= self._masque_comptes(
+                i for i, c in enumerate(self.comptes) if c.startswith(prefixe)
+            )
+        if comptes is not None:
+            masque &= self._masque_comptes(
+                self._index_comptes[c] for c in comptes if c in self._index_comptes
+            )
+        return masque
+
+    def _masque_comptes(self, ids: Iterable[int]) -> np.ndarray:
+        selection = np.zeros(len(self.comptes), dtype=bool)
+        selection[list(ids)] = True
+        return selection[self.id_compte]
+
+    def _masque_tag(self, tag: str) -> np.ndarray:
+        idx = self._index_tags.get(tag)
+        if idx is not None:
+            return (self.tags & np.uint64(1 << idx)) != 0
+        # Tag hors du masque de bits (ou absent): verification par transaction
+        par_txn = np.fromiter(
+            (bool(t.tags) and tag in t.tags for t in self.transactions),
+            dtype=bool,
+            count=len(self.transactions),
+        )
+        return par_txn[self.id_txn] if len(par_txn) else np.zeros(len(self), dtype=bool)
+
+    # ------------------------------------------------------------------
+    # Agregations
+    # ------------------------------------------------------------------
+
+    def mois(self) -> np.ndarray:
+        """Mois (1-12) de chaque posting."""
+        jours = (self.dates - _ORDINAL_EPOCH).astype("datetime64[D]")
+        return jours.astype("datetime64[M]").astype(np.int64) % 12 + 1
+
+    def sommes_groupees(
+        self,
+        groupes: np.ndarray,
+        taille: int,
+        masque: np.ndarray | None = None,
+        valeur_absolue: bool = False,
+    ) -> np.ndarray:
+        """Somme des montants (entiers) par groupe.
+
+        Args:
+            groupes: Indice de groupe de chaque posting (0 <= g < taille).
+            taille: Nombre de groupes.
+            masque: Postings a inclure (tous par defaut).
+            valeur_absolue: Additionner la valeur absolue de chaque posting.
+        """
+        montants = self.montants if masque is None else self.montants[masque]
+        if masque is not None:
+            groupes = groupes[masque]
+        if valeur_absolue:
+            montants = np.abs(montants)
+        sommes = np.zeros(taille, dtype=np.int64)
+        np.add.at(sommes, groupes, montants)
+        return sommes
+
+    def sommes_par_compte(
+        self, masque: np.ndarray | None = None, valeur_absolue: bool = False
+    ) -> np.ndarray:
+        """Somme des montants (entiers) par indice de compte."""
+        return self.sommes_groupees(
+            self.id_compte, len(self.comptes), masque, valeur_absolue=valeur_absolue
+        )
+
+    def par_transaction(self, masque: np.ndarray) -> np.ndarray:
+        """Vrai pour chaque posting dont la transaction a un posting dans `masque`."""
+        selection = np.zeros(len(self.transactions), dtype=bool)
+        selection[self.id_txn[masque]] = True
+        return selection[self.id_txn]
+
+    def soldes(
+        self,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+        tag: str | None = None,
+        prefixe: str | tuple[str, ...] | None = None,
+        valeur_absolue: bool = False,
+    ) -> dict[str, Decimal]:
+        """Soldes par compte (Decimal) pour les postings filtres.
+
+        Seuls les comptes ayant au moins un posting selectionne sont
+        retournes (un solde peut etre nul).
+
+        Args:
+            valeur_absolue: Additionner la valeur absolue de chaque posting.
+        """
+        masque = self.masque(debut=debut, fin=fin, tag=tag, prefixe=prefixe)
+        sommes = self.sommes_par_compte(masque, valeur_absolue=valeur_absolue)
+        presents = np.zeros(len(self.comptes), dtype=bool)
+        presents[self.id_compte[masque]] = True
+        return {
+            self.comptes[i]: self.en_decimal(sommes[i]) for i in np.flatnonzero(presents)
+        }
+
+    def total(self, masque: np.ndarray, valeur_absolue: bool = False) -> Decimal:
+        """Somme exacte des montants selectionnes."""
+        montants = self.montants[masque]
+        if valeur_absolue:
+            montants = np.abs(montants)
+        return self.en_decimal(montants.sum(dtype=np.int64))
+
+    def index_soldes(self) -> IndexSoldes:
+        """Retourne l'index des soldes cumules, mis a jour si la table a grandi."""
+        if self._index_soldes is None:
+            self._index_soldes = IndexSoldes(self)
+        else:
+            self._index_soldes.rafraichir()
+        return self._index_soldes
+
+    def arbre_comptes(self) -> ArbreComptes:
+        """Retourne l'arbre des soldes, mis a jour si la table a grandi.
+
+        Seuls les comptes touches par les nouveaux postings sont mis a jour
+        (un ajout par compte, en O(profondeur)).
+        """
+        if self._arbre is None:
+            self._arbre = ArbreComptes()
+        debut = self._nb_postings_arbre
+        if debut < len(self):
+            masque = np.zeros(len(self), dtype=bool)
+            masque[debut:] = True
+            sommes = self.sommes_par_compte(masque)
+            for idx in np.unique(self.id_compte[debut:]):
+                self._arbre.ajouter(self.comptes[idx], self.en_decimal(sommes[idx]))
+            self._nb_postings_arbre = len(self)
+        return self._arbre
+
+
+class IndexSoldes:
+    """Soldes cumules par compte, interrogeables a n'importe quelle date.
+
+    Pour chaque compte, l'index garde les dates distinctes de ses postings
+    (triees) et le solde cumule a la fin de chacune. Le solde a une date
+    est le cumul de la derniere date <= a celle-ci (recherche dichotomique);
+    la variation sur une periode est la difference de deux soldes.
+
+    Quand la table grandit, seuls les comptes touches par les nouveaux
+    postings sont reconstruits.
+
+    Usage:
+        index = table_postings(entries).index_soldes()
+        index.soldes_au(datetime.date(2025, 12, 31), prefixe="Actifs")
+    """
+
+    def __init__(self, table: TablePostings) -> None:
+        self.table = table
+        self._dates: dict[int, np.ndarray] = {}
+        self._cumuls: dict[int, np.ndarray] = {}
+        self._nb_postings = 0
+        self._echelle = table.echelle
+        self.rafraichir()
+
+    def rafraichir(self) -> None:
+        """Reconstruit les comptes touches depuis la derniere mise a jour."""
+        table = self.table
+        if table.echelle != self._echelle:
+            facteur = 10 ** (table.echelle - self._echelle)
+            self._cumuls = {i: c * facteur for i, c in self._cumuls.items()}
+            self._echelle = table.echelle
+        if len(table) == self._nb_postings:
+            return
+
+        touches = np.unique(table.id_compte[self._nb_postings:])
+        selection = np.flatnonzero(np.isin(table.id_compte, touches))
+        ordre = selection[np.lexsort((table.dates[selection], table.id_compte[selection]))]
+        comptes = table.id_compte[ordre]
+        dates = table.dates[ordre]
+        montants = table.montants[ordre]
+
+        bornes = np.flatnonzero(np.diff(comptes)) + 1
+        for debut, fin in zip(
+            np.concatenate(([0], bornes)), np.concatenate((bornes, [len(ordre)])), strict=True
+        ):
+            cumuls = np.cumsum(montants[debut:fin], dtype=np.int64)
+            dates_compte = dates[debut:fin]
+            # Derniere position de chaque date: solde en fin de journee
+            dernieres = np.append(np.flatnonzero(np.diff(dates_compte)), fin - debut - 1)
+            self._dates[int(comptes[debut])] = dates_compte[dernieres]
+            self._cumuls[int(comptes[debut])] = cumuls[dernieres]
+        self._nb_postings = len(table)
+
+    def _cumul(self, id_compte: int, ordinal: int) -> tuple[int, int]:
+        """Retourne (nombre de dates <= ordinal, cumul a cette date)."""
+        dates = self._dates[id_compte]
+        pos = int(np.searchsorted(dates, ordinal, side="right"))
+        return pos, int(self._cumuls[id_compte][pos - 1]) if pos else 0
+
+    def _ids(self, prefixe: str | tuple[str, ...] | None) -> list[int]:
+        comptes = self.table.comptes
+        return [
+            i for i in self._dates
+            if prefixe is None or comptes[i].startswith(prefixe)
+        ]
+
+    def solde(self, compte: str, date: datetime.date | None = None) -> Decimal:
+        """Solde d'un compte en fin de journee `date` (toute l'histoire si None)."""
+        idx = self.table._index_comptes.get(compte)
+        if idx is None or idx not in self._dates:
+            return Decimal(0)
+        if date is None:
+            return self.table.en_decimal(self._cumuls[idx][-1])
+        return self.table.en_decimal(self._cumul(idx, date.toordinal())[1])
+
+    def soldes_au(
+        self,
+        date: datetime.date | None = None,
+        prefixe: str | tuple[str, ...] | None = None,
+    ) -> dict[str, Decimal]:
+        """Soldes par compte en fin de journee `date`.
+
+        Seuls les comptes ayant au moins un posting a cette date ou avant
+        sont retournes (meme convention que `TablePostings.soldes`).
+        """
+        ordinal = date.toordinal() if date is not None else None
+        resultat = {}
+        for idx in self._ids(prefixe):
+            if ordinal is None:
+                resultat[self.table.comptes[idx]] = self.table.en_decimal(self._cumuls[idx][-1])
+                continue
+            pos, cumul = self._cumul(idx, ordinal)
+            if pos:
+                resultat[self.table.comptes[idx]] = self.table.en_decimal(cumul)
+        return resultat
+
+    def variations(
+        self,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+        prefixe: str | tuple[str, ...] | None = None,
+    ) -> dict[str, Decimal]:
+        """Variation de solde par compte entre `debut` et `fin` (inclusifs).
+
+        Seuls les comptes ayant au moins un posting dans la periode sont
+        retournes.
+        """
+        resultat = {}
+        for idx in self._ids(prefixe):
+            pos_fin, cumul_fin = (
+                self._cumul(idx, fin.toordinal()) if fin is not None
+                else (len(self._dates[idx]), int(self._cumuls[idx][-1]))
+            )
+            pos_debut, cumul_debut = (
+                self._cumul(idx, debut.toordinal() - 1) if debut is not None else (0, 0)
+            )
+            if pos_fin > pos_debut:
+                resultat[self.table.comptes[idx]] = self.table.en_decimal(
+                    cumul_fin - cumul_debut
+                )
+        return resultat
+
+
+# Cache des tables par liste d'entrees. La liste est retenue pour que son
+# identifiant ne puisse pas etre reutilise par une autre liste. Le verrou
+# couvre la recherche, l'ajout en fin de table et l'eviction: les outils MCP
+# lisent depuis un pool de threads.
+_TAILLE_CACHE = 4
+_cache: OrderedDict[int, tuple[list, int, object, TablePostings]] = OrderedDict()
+_verrou_cache = threading.Lock()
+
+
+def table_postings(entries: list) -> TablePostings:
+    """Retourne la table de postings d'une liste d'entrees, avec cache.
+
+    Si la meme liste a grandi depuis le dernier appel (transactions
+    ajoutees en fin de liste, ex: import en mode surveillance), seules les
+    nouvelles entrees sont converties. Toute autre modification (liste
+    rechargee, raccourcie ou reordonnee) reconstruit la table.
+    """
+    cle = id(entries)
+    with _verrou_cache:
+        trouve = _cache.get(cle)
+        if trouve is not None:
+            liste, nb_vus, derniere, table = trouve
+            if liste is entries and len(entries) >= nb_vus and (
+                nb_vus == 0 or entries[nb_vus - 1] is derniere
+            ):
+                if len(entries) > nb_vus:
+                    table.ajouter(entries[nb_vus:])
+                    _cache[cle] = (entries, len(entries), entries[-1], table)
+                _cache.move_to_end(cle)
+                return table
+
+        table = TablePostings.depuis_entries(entries)
+        _cache[cle] = (entries, len(entries), entries[-1] if entries else None, table)
+        _cache.move_to_end(cle)
+        while len(_cache) > _TAILLE_CACHE:
+            _cache.popitem(last=False)
+        return table
+
+
+def vider_cache_tables() -> None:
+    """Oublie les tables en cache."""
+    with _verrou_cache:
+        _cache.clear()
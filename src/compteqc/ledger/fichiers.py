@@ -2,20 +2,34 @@
 
 from __future__ import annotations
 
+import re
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+from compteqc.ledger.cloture import verifier_exercice_ouvert
 
-def chemin_fichier_mensuel(annee: int, mois: int, base_dir: Path) -> Path:
+if TYPE_CHECKING:
+    from compteqc.ledger.journal import JournalEcritures
+
+
+def chemin_fichier_mensuel(
+    annee: int, mois: int, base_dir: Path, journal: JournalEcritures | None = None
+) -> Path:
     """Retourne le chemin vers le fichier mensuel et le cree si necessaire.
 
     Args:
         annee: Annee (ex: 2026).
         mois: Mois (1-12).
         base_dir: Repertoire de base du ledger (ex: /projet/ledger/).
+        journal: Operation journalisee (la creation sera annulable).
 
     Returns:
         Chemin vers le fichier mensuel (ex: ledger/2026/03.beancount).
+
+    Raises:
+        ExerciceCloture: Si l'annee est cloturee.
     """
+    verifier_exercice_ouvert(base_dir / "main.beancount", annee)
     repertoire_annee = base_dir / str(annee)
     repertoire_annee.mkdir(parents=True, exist_ok=True)
 
@@ -30,21 +44,34 @@ def chemin_fichier_mensuel(annee: int, mois: int, base_dir: Path) -> Path:
             'option "name_income" "Revenus"\n'
             'option "name_expenses" "Depenses"\n'
         )
-        fichier.write_text(entete, encoding="utf-8")
+        if journal is not None:
+            journal.ajouter(fichier, entete)
+        else:
+            fichier.write_text(entete, encoding="utf-8")
 
     return fichier
 
 
-def ajouter_include(chemin_main: Path, chemin_relatif: str) -> bool:
+def ajouter_include(
+    chemin_main: Path, chemin_relatif: str, journal: JournalEcritures | None = None
+) -> bool:
     """Ajoute une directive include dans main.beancount si pas deja presente.
 
     Args:
         chemin_main: Chemin vers main.beancount.
         chemin_relatif: Chemin relatif a inclure (ex: "2026/03.beancount").
+        journal: Operation journalisee (l'ajout sera annulable).
 
     Returns:
         True si l'include a ete ajoute, False si deja present.
+
+    Raises:
+        ExerciceCloture: Si le fichier inclus est un fichier mensuel d'une
+            annee cloturee.
     """
+    mensuel = re.fullmatch(r"(\d{4})/\d{2}\.beancount", chemin_relatif)
+    if mensuel:
+        verifier_exercice_ouvert(chemin_main, int(mensuel.group(1)))
     contenu = chemin_main.read_text(encoding="utf-8")
     directive = f'include "{chemin_relatif}"'
 
@@ -52,20 +79,34 @@ def ajouter_include(chemin_main: Path, chemin_relatif: str) -> bool:
         return False
 
     # Ajouter a la fin du fichier
-    if not contenu.endswith("\n"):
-        contenu += "\n"
-    contenu += f"{directive}\n"
-    chemin_main.write_text(contenu, encoding="utf-8")
+    ajout = ("" if contenu.endswith("\n") else "\n") + f"{directive}\n"
+    if journal is not None:
+        journal.ajouter(chemin_main, ajout)
+    else:
+        chemin_main.write_text(contenu + ajout, encoding="utf-8")
     return True
 
 
-def ecrire_transactions(chemin: Path, transactions_beancount: str) -> None:
+def ecrire_transactions(
+    chemin: Path, transactions_beancount: str, journal: JournalEcritures | None = None
+) -> None:
     """Ajoute du texte Beancount (transactions formatees) a la fin du fichier.
 
     Args:
         chemin: Chemin vers le fichier .beancount cible.
         transactions_beancount: Texte Beancount a ajouter.
+        journal: Operation journalisee (l'ajout sera annulable).
     """
+    if journal is not None:
+        # Seul le dernier octet est lu pour savoir s'il faut un saut de ligne
+        fin_ligne = False
+        if chemin.exists() and chemin.stat().st_size:
+            with open(chemin, "rb") as f:
+                f.seek(-1, 2)
+                fin_ligne = f.read(1) == b"\n"
+        journal.ajouter(chemin, ("" if fin_ligne else "\n") + "\n" + transactions_beancount)
+        return
+
     contenu_existant = chemin.read_text(encoding="utf-8") if chemin.exists() else ""
     if not contenu_existant.endswith("\n"):
         contenu_existant += "\n"
@@ -1,12 +1,30 @@
-"""Auto-commit git apres modification du ledger."""
+"""Auto-commit git apres modification du ledger.
+
+Deux backends:
+- en processus, via dulwich: l'index est lu une fois, seuls
+  les fichiers dont le stat a change sont hashes, puis l'index et l'objet
+  commit sont ecrits directement, sans lancer de processus git;
+- par sous-processus (`git add`, `git diff --cached`, `git commit`), en
+  repli si le backend dulwich echoue.
+
+La variable d'environnement COMPTEQC_GIT_BACKEND force un backend
+("dulwich" ou "subprocess"); par defaut, dulwich est essaye en premier.
+"""
 
 from __future__ import annotations
 
+import logging
+import os
 import subprocess
 from pathlib import Path
 
 from compteqc.ledger.validation import valider_ledger
 
+logger = logging.getLogger(__name__)
+
+# Repertoires suivis par l'auto-commit, relatifs a la racine du projet
+PATTERNS_SUIVIS = ("ledger/", "rules/", "data/processed/")
+
 
 def auto_commit(repertoire: Path, message: str) -> bool:
     """Cree un commit git automatique apres validation du ledger.
@@ -32,17 +50,30 @@ def auto_commit(repertoire: Path, message: str) -> bool:
             "Ledger invalide, commit annule. Erreurs:\n" + "\n".join(erreurs)
         )
 
+    patterns = [p for p in PATTERNS_SUIVIS if (repertoire / p).exists()]
+
+    backend = os.environ.get("COMPTEQC_GIT_BACKEND", "").lower()
+    if backend != "subprocess":
+        try:
+            return _commit_dulwich(repertoire, patterns, message)
+        except Exception as e:
+            if backend == "dulwich":
+                raise
+            logger.warning("Commit en processus impossible (%s), repli sur git", e)
+
+    return _commit_subprocess(repertoire, patterns, message)
+
+
+def _commit_subprocess(repertoire: Path, patterns: list[str], message: str) -> bool:
+    """Stage et commit via des sous-processus git."""
     # Stage les fichiers beancount, rules, et data/processed
-    patterns = ["ledger/", "rules/", "data/processed/"]
     for pattern in patterns:
-        chemin = repertoire / pattern
-        if chemin.exists():
-            subprocess.run(
-                ["git", "add", pattern],
-                cwd=str(repertoire),
-                capture_output=True,
-                text=True,
-            )
+        subprocess.run(
+            ["git", "add", pattern],
+            cwd=str(repertoire),
+            capture_output=True,
+            text=True,
+        )
 
     # Verifier s'il y a des changements stages
     result = subprocess.run(
@@ -62,3 +93,80 @@ def auto_commit(repertoire: Path, message: str) -> bool:
         text=True,
     )
     return result.returncode == 0
+
+
+def _meme_stat(entree, st: os.stat_result) -> bool:
+    """Vrai si le stat du fichier correspond a l'entree d'index (pas de rehash)."""
+    if entree.size != st.st_size:
+        return False
+    mtime = entree.mtime
+    if isinstance(mtime, tuple):
+        return mtime[0] * 1_000_000_000 + mtime[1] == st.st_mtime_ns
+    return int(mtime) == int(st.st_mtime)
+
+
+def _commit_dulwich(repertoire: Path, patterns: list[str], message: str) -> bool:
+    """Stage et commit en processus via dulwich.
+
+    Equivalent de `git add <patterns>` (ajouts, modifications et
+    suppressions, fichiers ignores exclus) suivi de `git commit`.
+
+    Raises:
+        ImportError: Si dulwich n'est pas installe.
+    """
+    from dulwich.ignore import IgnoreFilterManager
+    from dulwich.index import blob_from_path_and_stat, index_entry_from_stat
+    from dulwich.repo import Repo
+
+    with Repo.discover(str(repertoire)) as repo:
+        racine = Path(repo.path).resolve()
+        index = repo.open_index()
+        ignores = None
+
+        for pattern in patterns:
+            base = (repertoire / pattern).resolve()
+            prefixe = base.relative_to(racine).as_posix().encode() + b"/"
+
+            # Fichiers suivis supprimes du disque
+            for chemin in [c for c in index if c.startswith(prefixe)]:
+                if not (racine / chemin.decode()).is_file():
+                    del index[chemin]
+
+            for dossier, sous_dossiers, fichiers in os.walk(base):
+                sous_dossiers[:] = [d for d in sous_dossiers if d != ".git"]
+                for nom in fichiers:
+                    chemin_fs = Path(dossier) / nom
+                    chemin = chemin_fs.relative_to(racine).as_posix().encode()
+                    st = chemin_fs.lstat()
+                    entree = index[chemin] if chemin in index else None
+                    if entree is None:
+                        if ignores is None:
+                            ignores = IgnoreFilterManager.from_repo(repo)
+                        if ignores.is_ignored(chemin.decode()):
+                            continue
+                    elif _meme_stat(entree, st):
+                        continue
+                    blob = blob_from_path_and_stat(str(chemin_fs).encode(), st)
+                    if entree is not None and entree.sha == blob.id:
+                        # Contenu identique (ex: fichier reecrit): rafraichir le stat
+                        index[chemin] = index_entry_from_stat(st, blob.id, entree.mode)
+                        continue
+                    repo.object_store.add_object(blob)
+                    index[chemin] = index_entry_from_stat(st, blob.id)
+
+        arbre = index.commit(repo.object_store)
+        index.write()
+        try:
+            arbre_head = repo[repo.head()].tree
+        except KeyError:
+            arbre_head = None
+        if arbre == arbre_head:
+            # Pas de changements stages
+            return False
+
+        message_bytes = message.encode("utf-8")
+        if hasattr(repo, "get_worktree"):
+            repo.get_worktree().commit(message=message_bytes, tree=arbre)
+        else:
+            repo.do_commit(message_bytes, tree=arbre)
+    return True
@@ -0,0 +1,325 @@
+"""Journal d'ecriture anticipee (WAL) pour les modifications multi-fichiers.
+
+Une approbation ou un import touche plusieurs fichiers (fichiers mensuels,
+pending.beancount, includes de main.beancount). Le journal rend ces
+modifications atomiques, meme si le processus s'arrete en cours d'ecriture.
+
+Chaque modification est d'abord decrite dans le journal
+(`<ledger>/.journal/<id>.wal`, une ligne JSON par enregistrement), le
+journal est synchronise sur disque (fsync), puis la modification est
+appliquee au fichier cible. Les enregistrements sont des deltas:
+
+- `ajout`: texte ajoute en fin de fichier et taille avant l'ajout
+  (annuler = tronquer a cette taille, ou supprimer un fichier cree);
+- `remplacement`: position, ancien et nouveau segment d'une reecriture
+  (prefixe et suffixe communs omis), avec l'empreinte BLAKE2 du fichier
+  avant et apres. Les empreintes rendent le rejeu et l'annulation
+  idempotents, y compris pour une insertion ou une suppression pure (un
+  segment vide se retrouve a toutes les positions).
+
+Une fois toutes les modifications appliquees, un enregistrement `fin` est
+ecrit et le journal supprime. Au demarrage, `recuperer_journaux` rejoue les
+operations terminees et annule les operations incompletes. Le cout d'une
+annulation est proportionnel au delta, pas a la taille des fichiers.
+
+L'operation se deroule sous le verrou d'ecriture du ledger
+(`compteqc.ledger.verrou`): la recuperation ne peut pas annuler le journal
+d'un autre processus en cours d'ecriture, et une operation confirmee
+incremente la version du ledger.
+
+Usage:
+    with JournalEcritures(ledger_dir, "approbation") as journal:
+        ecrire_transactions(fichier, texte, journal=journal)
+        if not valide:
+            journal.annuler()
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from compteqc.ledger.verrou import VerrouEcriture
+
+logger = logging.getLogger(__name__)
+
+REPERTOIRE_JOURNAL = ".journal"
+EXTENSION = ".wal"
+
+
+def _fsync_fichier(chemin: Path) -> None:
+    fd = os.open(chemin, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _ecrire_atomique(chemin: Path, contenu: bytes) -> None:
+    """Remplace le contenu d'un fichier (tmp + fsync + rename)."""
+    tmp = chemin.with_name(chemin.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(contenu)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, chemin)
+
+
+def _empreinte(contenu: bytes) -> str:
+    return hashlib.blake2b(contenu, digest_size=16).hexdigest()
+
+
+def _remplacer(contenu: bytes, position: int, ancien: bytes, nouveau: bytes) -> bytes:
+    return contenu[:position] + nouveau + contenu[position + len(ancien):]
+
+
+def _appliquer(base: Path, rec: dict) -> None:
+    """Applique un enregistrement (idempotent: sans effet s'il est deja applique)."""
+    chemin = base / rec["fichier"]
+    if rec["op"] == "ajout":
+        texte = rec["texte"].encode("utf-8")
+        taille_avant = rec["taille_avant"]
+        taille = chemin.stat().st_size if chemin.exists() else None
+        if taille != taille_avant:
+            return
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        with open(chemin, "ab") as f:
+            f.write(texte)
+            f.flush()
+            os.fsync(f.fileno())
+    elif rec["op"] == "remplacement":
+        ancien = rec["ancien"].encode("utf-8")
+        nouveau = rec["nouveau"].encode("utf-8")
+        pos = rec["position"]
+        contenu = chemin.read_bytes()
+        if "empreinte_avant" in rec:
+            # Deja applique (ou fichier modifie depuis): l'empreinte differe
+            applicable = _empreinte(contenu) == rec["empreinte_avant"]
+        else:
+            applicable = contenu[pos:pos + len(ancien)] == ancien
+        if applicable:
+            _ecrire_atomique(chemin, _remplacer(contenu, pos, ancien, nouveau))
+
+
+def _defaire(base: Path, rec: dict) -> None:
+    """Annule un enregistrement (idempotent: sans effet s'il n'a pas ete applique)."""
+    chemin = base / rec["fichier"]
+    if rec["op"] == "ajout":
+        taille_avant = rec["taille_avant"]
+        if taille_avant is None:
+            chemin.unlink(missing_ok=True)
+        elif chemin.exists() and chemin.stat().st_size > taille_avant:
+            os.truncate(chemin, taille_avant)
+            _fsync_fichier(chemin)
+    elif rec["op"] == "remplacement":
+        ancien = rec["ancien"].encode("utf-8")
+        nouveau = rec["nouveau"].encode("utf-8")
+        pos = rec["position"]
+        if not chemin.exists():
+            return
+        contenu = chemin.read_bytes()
+        if "empreinte_apres" in rec:
+            # Jamais applique (ou fichier modifie depuis): l'empreinte differe
+            applique = _empreinte(contenu) == rec["empreinte_apres"]
+        else:
+            applique = contenu[pos:pos + len(nouveau)] == nouveau and ancien != nouveau
+        if applique:
+            _ecrire_atomique(chemin, _remplacer(contenu, pos, nouveau, ancien))
+
+
+def _delta(ancien: str, nouveau: str) -> tuple[int, str, str]:
+    """Retourne (position en octets, segment ancien, segment nouveau)."""
+    limite = min(len(ancien), len(nouveau))
+    debut = 0
+    while debut < limite and ancien[debut] == nouveau[debut]:
+        debut += 1
+    fin = 0
+    while fin < limite - debut and ancien[-1 - fin] == nouveau[-1 - fin]:
+        fin += 1
+    position = len(ancien[:debut].encode("utf-8"))
+    return position, ancien[debut:len(ancien) - fin], nouveau[debut:len(nouveau) - fin]
+
+
+class JournalEcritures:
+    """Operation journalisee sur les fichiers d'un repertoire de ledger.
+
+    Utilise comme gestionnaire de contexte: une exception annule les
+    modifications; une sortie normale les confirme (sauf si `annuler` ou
+    `confirmer` a deja ete appele).
+    """
+
+    def __init__(
+        self, base: Path, description: str = "", version_attendue: int | None = None
+    ) -> None:
+        """Initialise l'operation.
+
+        Args:
+            base: Repertoire du ledger (parent de main.beancount).
+            description: Libelle de l'operation (ex: "approbation").
+            version_attendue: Version du ledger sur laquelle l'operation a ete
+                calculee (`ConflitVersion` a l'entree si elle a change).
+        """
+        self.base = base
+        self.description = description
+        self.version_attendue = version_attendue
+        self._verrou: VerrouEcriture | None = None
+        self.chemin: Path | None = None
+        self.termine = False
+        self._enregistrements: list[dict] = []
+        self._fichier = None
+
+    def __enter__(self) -> JournalEcritures:
+        self._verrou = VerrouEcriture(self.base, self.version_attendue)
+        self._verrou.__enter__()
+        try:
+            recuperer_journaux(self.base)
+        except BaseException:
+            self._verrou.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        try:
+            if not self.termine:
+                if exc_type is not None:
+                    self.annuler()
+                else:
+                    self.confirmer()
+        finally:
+            self._verrou.__exit__(exc_type, exc, tb)
+        return False
+
+    def _relatif(self, chemin: Path) -> str:
+        return os.path.relpath(chemin.resolve(), self.base.resolve())
+
+    def _journaliser(self, rec: dict) -> None:
+        if self.termine:
+            raise RuntimeError("Operation journalisee deja terminee")
+        if self._fichier is None:
+            repertoire = self.base / REPERTOIRE_JOURNAL
+            repertoire.mkdir(parents=True, exist_ok=True)
+            self.chemin = repertoire / f"{time.time_ns()}-{os.getpid()}{EXTENSION}"
+            self._fichier = open(self.chemin, "a", encoding="utf-8")
+            self._fichier.write(
+                json.dumps({"op": "debut", "description": self.description}) + "\n"
+            )
+        self._fichier.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self._fichier.flush()
+        os.fsync(self._fichier.fileno())
+
+    def _executer(self, rec: dict) -> None:
+        self._journaliser(rec)
+        self._enregistrements.append(rec)
+        _appliquer(self.base, rec)
+
+    def ajouter(self, chemin: Path, texte: str) -> None:
+        """Ajoute du texte a la fin d'un fichier (cree s'il n'existe pas)."""
+        if not texte:
+            return
+        taille = chemin.stat().st_size if chemin.exists() else None
+        self._executer({
+            "op": "ajout",
+            "fichier": self._relatif(chemin),
+            "taille_avant": taille,
+            "texte": texte,
+        })
+
+    def reecrire(self, chemin: Path, contenu: str) -> None:
+        """Remplace le contenu d'un fichier; seul le segment modifie est journalise."""
+        if not chemin.exists():
+            self.ajouter(chemin, contenu)
+            return
+        octets = chemin.read_bytes()
+        position, ancien, nouveau = _delta(octets.decode("utf-8"), contenu)
+        if ancien == nouveau:
+            return
+        apres = _remplacer(octets, position, ancien.encode("utf-8"), nouveau.encode("utf-8"))
+        self._executer({
+            "op": "remplacement",
+            "fichier": self._relatif(chemin),
+            "position": position,
+            "ancien": ancien,
+            "nouveau": nouveau,
+            "empreinte_avant": _empreinte(octets),
+            "empreinte_apres": _empreinte(apres),
+        })
+
+    def _fermer(self) -> None:
+        if self._fichier is not None:
+            self._fichier.close()
+            self._fichier = None
+        if self.chemin is not None:
+            self.chemin.unlink(missing_ok=True)
+        self.termine = True
+
+    def confirmer(self) -> None:
+        """Marque l'operation comme terminee et supprime le journal."""
+        if self.termine:
+            return
+        if self._fichier is not None:
+            self._fichier.write(json.dumps({"op": "fin"}) + "\n")
+            self._fichier.flush()
+            os.fsync(self._fichier.fileno())
+            if self._verrou is not None:
+                self._verrou.modifie()
+        self._fermer()
+
+    def annuler(self) -> None:
+        """Annule les modifications appliquees, dans l'ordre inverse."""
+        if self.termine:
+            return
+        for rec in reversed(self._enregistrements):
+            _defaire(self.base, rec)
+        self._fermer()
+
+
+def recuperer_journaux(base: Path) -> int:
+    """Termine les operations interrompues d'un repertoire de ledger.
+
+    Les operations dont le journal contient `fin` sont rejouees (au cas ou
+    une ecriture n'aurait pas ete appliquee); les autres sont annulees.
+    Une derniere ligne tronquee (arret pendant l'ecriture du journal)
+    correspond a une modification jamais appliquee et est ignoree.
+
+    Args:
+        base: Repertoire du ledger.
+
+    Returns:
+        Nombre d'operations recuperees.
+    """
+    repertoire = base / REPERTOIRE_JOURNAL
+    if not repertoire.is_dir():
+        return 0
+
+    with VerrouEcriture(base) as verrou:
+        nb = 0
+        for chemin in sorted(repertoire.glob(f"*{EXTENSION}")):
+            enregistrements = []
+            termine = False
+            for ligne in chemin.read_text(encoding="utf-8").splitlines():
+                try:
+                    rec = json.loads(ligne)
+                except json.JSONDecodeError:
+                    break
+                if rec["op"] == "fin":
+                    termine = True
+                elif rec["op"] in ("ajout", "remplacement"):
+                    enregistrements.append(rec)
+
+            if termine:
+                logger.warning("Operation interrompue rejouee: %s", chemin.name)
+                for rec in enregistrements:
+                    _appliquer(base, rec)
+            else:
+                logger.warning("Operation interrompue annulee: %s", chemin.name)
+                for rec in reversed(enregistrements):
+                    _defaire(base, rec)
+            chemin.unlink()
+            nb += 1
+        if nb:
+            verrou.modifie()
+    return nb
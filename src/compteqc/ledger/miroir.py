@@ -0,0 +1,450 @@
+"""Miroir SQLite du ledger, indexe pour les consommateurs a requetes frequentes.
+
+Le miroir contient les transactions, postings, metadonnees, tags et
+documents du ledger, avec des index sur (compte, date), tag et beneficiaire.
+Une recherche ponctuelle (ex: tous les postings de Passifs:Pret-Actionnaire
+en 2026) parcourt l'index au lieu de toute la liste des entrees.
+
+La synchronisation est incrementale par fichier source: chaque fichier
+(ledger/2026/01.beancount, etc.) a une empreinte, un hachage des entrees
+qui en ont ete analysees. Seuls les fichiers dont l'empreinte a change sont
+re-ecrits dans le miroir. L'empreinte decrit donc les entrees recues, pas
+le fichier sur disque: un fichier modifie apres l'analyse ne peut pas
+marquer le miroir a jour avec des entrees perimees.
+
+Les montants sont stockes en texte pour rester des Decimal exacts.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+from decimal import Decimal
+from pathlib import Path
+
+from beancount.core import data
+
+logger = logging.getLogger(__name__)
+
+VERSION_SCHEMA = 1
+
+_SCHEMA = """
+CREATE TABLE fichiers (
+    chemin TEXT PRIMARY KEY,
+    empreinte TEXT NOT NULL
+);
+CREATE TABLE transactions (
+    id INTEGER PRIMARY KEY,
+    fichier TEXT NOT NULL,
+    ligne INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    flag TEXT,
+    payee TEXT,
+    narration TEXT
+);
+CREATE INDEX idx_transactions_fichier ON transactions(fichier);
+CREATE INDEX idx_transactions_payee ON transactions(payee);
+CREATE INDEX idx_transactions_date ON transactions(date);
+CREATE TABLE postings (
+    id INTEGER PRIMARY KEY,
+    txn_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    compte TEXT NOT NULL,
+    date TEXT NOT NULL,
+    montant TEXT NOT NULL,
+    devise TEXT NOT NULL
+);
+CREATE INDEX idx_postings_compte_date ON postings(compte, date);
+CREATE INDEX idx_postings_txn ON postings(txn_id);
+CREATE TABLE tags (
+    txn_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL
+);
+CREATE INDEX idx_tags_tag ON tags(tag);
+CREATE INDEX idx_tags_txn ON tags(txn_id);
+CREATE TABLE meta (
+    txn_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    cle TEXT NOT NULL,
+    valeur TEXT
+);
+CREATE INDEX idx_meta_txn ON meta(txn_id);
+CREATE INDEX idx_meta_cle_valeur ON meta(cle, valeur);
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    fichier TEXT NOT NULL,
+    ligne INTEGER NOT NULL,
+    date TEXT NOT NULL,
+    compte TEXT NOT NULL,
+    chemin TEXT NOT NULL
+);
+CREATE INDEX idx_documents_compte_date ON documents(compte, date);
+CREATE INDEX idx_documents_fichier ON documents(fichier);
+"""
+
+# Cles de metadonnees internes a Beancount, non copiees dans le miroir
+_META_IGNOREES = {"filename", "lineno"}
+
+# Borne superieure pour une recherche par prefixe sur un index texte
+_FIN_PREFIXE = "\U0010ffff"
+
+
+@dataclass(frozen=True)
+class LignePosting:
+    """Un posting du miroir avec le contexte de sa transaction."""
+
+    date: datetime.date
+    compte: str
+    montant: Decimal
+    devise: str
+    payee: str
+    narration: str
+    txn_id: int
+
+
+def _empreinte_groupe(entries: list) -> str:
+    """Empreinte des entrees d'un fichier source (tout ce que le miroir en garde)."""
+    h = hashlib.blake2b(digest_size=16)
+    for entry in entries:
+        meta = sorted((k, str(v)) for k, v in (entry.meta or {}).items() if k != "filename")
+        if isinstance(entry, data.Document):
+            h.update(repr(("document", entry.date, entry.account, entry.filename, meta)).encode())
+            continue
+        h.update(repr((
+            entry.date, entry.flag, entry.payee, entry.narration,
+            sorted(entry.tags or ()), meta,
+        )).encode())
+        for posting in entry.postings:
+            h.update(f"{posting.account}|{posting.units}".encode())
+    return h.hexdigest()
+
+
+class MiroirLedger:
+    """Miroir SQLite synchronise depuis les entrees Beancount.
+
+    Usage:
+        miroir = MiroirLedger(Path("data/cache/miroir.sqlite"))
+        miroir.synchroniser(entries)
+        lignes = miroir.postings(compte="Passifs:Pret-Actionnaire",
+                                 debut=date(2026, 1, 1), fin=date(2026, 12, 31))
+    """
+
+    def __init__(self, chemin_db: Path | str = ":memory:") -> None:
+        """Ouvre (ou cree) la base du miroir.
+
+        Args:
+            chemin_db: Fichier SQLite, ou ":memory:" pour un miroir en memoire.
+        """
+        self.chemin_db = str(chemin_db)
+        if self.chemin_db != ":memory:":
+            Path(self.chemin_db).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.chemin_db, check_same_thread=False)
+        self._verrou = threading.Lock()
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._preparer_schema()
+
+    def _preparer_schema(self) -> None:
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version == VERSION_SCHEMA:
+            return
+        with self._conn:
+            for (table,) in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table'"
+            ).fetchall():
+                self._conn.execute(f'DROP TABLE IF EXISTS "{table}"')
+            self._conn.executescript(_SCHEMA)
+            self._conn.execute(f"PRAGMA user_version = {VERSION_SCHEMA}")
+
+    def fermer(self) -> None:
+        """Ferme la connexion SQLite."""
+        self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Synchronisation
+    # ------------------------------------------------------------------
+
+    def synchroniser(self, entries: Iterable) -> dict[str, int]:
+        """Met le miroir a jour a partir des entrees du ledger.
+
+        Seuls les fichiers sources nouveaux, modifies ou disparus sont
+        re-ecrits.
+
+        Returns:
+            {"modifies": n, "inchanges": n, "supprimes": n}
+        """
+        groupes: dict[str, list] = {}
+        for entry in entries:
+            if not isinstance(entry, (data.Transaction, data.Document)):
+                continue
+            fichier = str((entry.meta or {}).get("filename", "<inconnu>"))
+            groupes.setdefault(fichier, []).append(entry)
+
+        with self._verrou, self._conn:
+            connues = dict(self._conn.execute("SELECT chemin, empreinte FROM fichiers"))
+            stats = {"modifies": 0, "inchanges": 0, "supprimes": 0}
+
+            for fichier in connues.keys() - groupes.keys():
+                self._supprimer_fichier(fichier)
+                stats["supprimes"] += 1
+
+            for fichier, groupe in groupes.items():
+                empreinte = _empreinte_groupe(groupe)
+                if connues.get(fichier) == empreinte:
+                    stats["inchanges"] += 1
+                    continue
+                self._supprimer_fichier(fichier)
+                self._inserer_groupe(fichier, groupe)
+                self._conn.execute(
+                    "INSERT INTO fichiers (chemin, empreinte) VALUES (?, ?)",
+                    (fichier, empreinte),
+                )
+                stats["modifies"] += 1
+
+        logger.debug("Miroir synchronise: %s", stats)
+        return stats
+
+    def _supprimer_fichier(self, fichier: str) -> None:
+        self._conn.execute("DELETE FROM transactions WHERE fichier = ?", (fichier,))
+        self._conn.execute("DELETE FROM documents WHERE fichier = ?", (fichier,))
+        self._conn.execute("DELETE FROM fichiers WHERE chemin = ?", (fichier,))
+
+    def _inserer_groupe(self, fichier: str, entries: list) -> None:
+        cur = self._conn.cursor()
+        for entry in entries:
+            ligne = int((entry.meta or {}).get("lineno", 0) or 0)
+            date = entry.date.isoformat()
+
+            if isinstance(entry, data.Document):
+                cur.execute(
+                    "INSERT INTO documents (fichier, ligne, date, compte, chemin) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (fichier, ligne, date, entry.account, entry.filename),
+                )
+                continue
+
+            cur.execute(
+                "INSERT INTO transactions (fichier, ligne, date, flag, payee, narration) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (fichier, ligne, date, entry.flag, entry.payee or "", entry.narration or ""),
+            )
+            txn_id = cur.lastrowid
+            cur.executemany(
+                "INSERT INTO postings (txn_id, compte, date, montant, devise) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (txn_id, p.account, date, str(p.units.number), p.units.currency)
+                    for p in entry.postings
+                    if p.units and p.units.number is not None
+                ],
+            )
+            if entry.tags:
+                cur.executemany(
+                    "INSERT INTO tags (txn_id, tag) VALUES (?, ?)",
+                    [(txn_id, tag) for tag in entry.tags],
+                )
+            if entry.meta:
+                cur.executemany(
+                    "INSERT INTO meta (txn_id, cle, valeur) VALUES (?, ?, ?)",
+                    [
+                        (txn_id, cle, str(valeur))
+                        for cle, valeur in entry.meta.items()
+                        if cle not in _META_IGNOREES and not cle.startswith("__")
+                    ],
+                )
+
+    # ------------------------------------------------------------------
+    # Requetes
+    # ------------------------------------------------------------------
+
+    def _executer(self, sql: str, params: Iterable = ()) -> list[tuple]:
+        with self._verrou:
+            return self._conn.execute(sql, tuple(params)).fetchall()
+
+    def postings(
+        self,
+        compte: str | None = None,
+        prefixe: str | None = None,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+        tag: str | None = None,
+        sans_tag: str | None = None,
+    ) -> list[LignePosting]:
+        """Postings filtres, tries par date puis par position dans le ledger.
+
+        Args:
+            compte: Nom de compte exact (utilise l'index (compte, date)).
+            prefixe: Prefixe de compte (ex: "Passifs:Retenues").
+            debut: Date minimale (inclusive).
+            fin: Date maximale (inclusive).
+            tag: Tag que la transaction doit porter.
+            sans_tag: Tag que la transaction ne doit pas porter.
+        """
+        conditions, params = self._conditions_postings(compte, prefixe, debut, fin)
+        if tag is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM tags g WHERE g.txn_id = t.id AND g.tag = ?)"
+            )
+            params.append(tag)
+        if sans_tag is not None:
+            conditions.append(
+                "NOT EXISTS (SELECT 1 FROM tags g WHERE g.txn_id = t.id AND g.tag = ?)"
+            )
+            params.append(sans_tag)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        lignes = self._executer(
+            "SELECT p.date, p.compte, p.montant, p.devise, t.payee, t.narration, t.id "
+            "FROM postings p JOIN transactions t ON t.id = p.txn_id "
+            f"{where} ORDER BY p.date, t.fichier, t.ligne, p.id",
+            params,
+        )
+        return [
+            LignePosting(
+                date=datetime.date.fromisoformat(d), compte=c, montant=Decimal(m),
+                devise=devise, payee=payee, narration=narration, txn_id=txn_id,
+            )
+            for d, c, m, devise, payee, narration, txn_id in lignes
+        ]
+
+    @staticmethod
+    def _conditions_postings(compte, prefixe, debut, fin) -> tuple[list[str], list]:
+        conditions: list[str] = []
+        params: list = []
+        if compte is not None:
+            conditions.append("p.compte = ?")
+            params.append(compte)
+        if prefixe is not None:
+            conditions.append("p.compte >= ? AND p.compte < ?")
+            params.extend([prefixe, prefixe + _FIN_PREFIXE])
+        if debut is not None:
+            conditions.append("p.date >= ?")
+            params.append(debut.isoformat())
+        if fin is not None:
+            conditions.append("p.date <= ?")
+            params.append(fin.isoformat())
+        return conditions, params
+
+    def soldes(
+        self,
+        prefixe: str | None = None,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+    ) -> dict[str, Decimal]:
+        """Soldes par compte (Decimal exacts) sur la selection."""
+        conditions, params = self._conditions_postings(None, prefixe, debut, fin)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        soldes: dict[str, Decimal] = {}
+        for compte, montant in self._executer(
+            f"SELECT p.compte, p.montant FROM postings p {where}", params
+        ):
+            soldes[compte] = soldes.get(compte, Decimal("0")) + Decimal(montant)
+        return soldes
+
+    def transactions(
+        self,
+        tag: str | None = None,
+        payee: str | None = None,
+        meta: tuple[str, str] | None = None,
+        debut: datetime.date | None = None,
+        fin: datetime.date | None = None,
+    ) -> list[dict]:
+        """Transactions filtrees par tag, beneficiaire exact ou metadonnee.
+
+        Returns:
+            Dicts {id, date, flag, payee, narration, fichier, ligne}.
+        """
+        conditions: list[str] = []
+        params: list = []
+        if tag is not None:
+            conditions.append("t.id IN (SELECT txn_id FROM tags WHERE tag = ?)")
+            params.append(tag)
+        if payee is not None:
+            conditions.append("t.payee = ?")
+            params.append(payee)
+        if meta is not None:
+            conditions.append("t.id IN (SELECT txn_id FROM meta WHERE cle = ? AND valeur = ?)")
+            params.extend(meta)
+        if debut is not None:
+            conditions.append("t.date >= ?")
+            params.append(debut.isoformat())
+        if fin is not None:
+            conditions.append("t.date <= ?")
+            params.append(fin.isoformat())
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return [
+            {
+                "id": txn_id, "date": datetime.date.fromisoformat(d), "flag": flag,
+                "payee": p, "narration": n, "fichier": f, "ligne": ligne,
+            }
+            for txn_id, d, flag, p, n, f, ligne in self._executer(
+                "SELECT t.id, t.date, t.flag, t.payee, t.narration, t.fichier, t.ligne "
+                f"FROM transactions t {where} ORDER BY t.date, t.fichier, t.ligne",
+                params,
+            )
+        ]
+
+    def documents(self, compte: str | None = None) -> list[dict]:
+        """Directives `document` du ledger, optionnellement pour un compte."""
+        sql = "SELECT date, compte, chemin FROM documents"
+        params: list = []
+        if compte is not None:
+            sql += " WHERE compte = ?"
+            params.append(compte)
+        return [
+            {"date": datetime.date.fromisoformat(d), "compte": c, "chemin": chemin}
+            for d, c, chemin in self._executer(sql + " ORDER BY date, id", params)
+        ]
+
+    def plan_requete(self, sql: str, params: Iterable = ()) -> list[str]:
+        """Retourne le plan SQLite d'une requete (diagnostic des index)."""
+        return [ligne[-1] for ligne in self._executer(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+# Miroirs en memoire par liste d'entrees (LRU), et miroirs persistants par
+# chemin. Le verrou protege les deux caches (outils MCP en pool de threads,
+# rechargement en arriere-plan). Un miroir evince n'est jamais ferme ici: un
+# appelant peut encore l'interroger, sa connexion est fermee par le GC.
+_TAILLE_CACHE = 4
+_cache: OrderedDict[int, tuple[list, int, object, MiroirLedger]] = OrderedDict()
+_persistants: dict[str, MiroirLedger] = {}
+_verrou_cache = threading.Lock()
+
+
+def miroir_ledger(entries: list, chemin_db: Path | str | None = None) -> MiroirLedger:
+    """Retourne le miroir synchronise d'une liste d'entrees, avec cache.
+
+    Args:
+        entries: Entrees Beancount (de loader.load_file).
+        chemin_db: Base persistante a reutiliser d'une session a l'autre. Sans
+            chemin, un miroir en memoire est cree pour cette liste.
+    """
+    cle = id(entries)
+    with _verrou_cache:
+        trouve = _cache.get(cle)
+        if trouve is not None:
+            liste, nb_vus, derniere, miroir = trouve
+            if liste is entries and len(entries) == nb_vus and (
+                nb_vus == 0 or entries[-1] is derniere
+            ):
+                _cache.move_to_end(cle)
+                return miroir
+
+        if trouve is not None:
+            miroir = trouve[3]
+        elif chemin_db is not None:
+            miroir = _persistants.get(str(chemin_db))
+            if miroir is None:
+                miroir = _persistants[str(chemin_db)] = MiroirLedger(chemin_db)
+        else:
+            miroir = MiroirLedger()
+
+        miroir.synchroniser(entries)
+        _cache[cle] = (entries, len(entries), entries[-1] if entries else None, miroir)
+        _cache.move_to_end(cle)
+        while len(_cache) > _TAILLE_CACHE:
+            _cache.popitem(last=False)
+        return miroir
@@ -0,0 +1,207 @@
+"""Requetes BQL (beanquery) ad hoc sur le ledger en memoire.
+
+Les rapports fixes ne couvrent pas toutes les questions ("depenses de
+repas par trimestre", "10 plus gros fournisseurs"...). `MoteurRequetes`
+execute une requete BQL en lecture seule (SELECT, BALANCES, JOURNAL) sur
+une liste d'entrees deja chargee, avec:
+
+- un cache des requetes analysees (le texte BQL ne depend pas du ledger)
+  et des requetes compilees (liees aux tables d'un chargement);
+- une limite de lignes (appliquee par beanquery apres le tri);
+- un delai: le parcours de la table est interrompu au-dela du delai
+  (`DelaiRequeteDepasse`).
+
+Usage:
+    moteur = moteur_requetes(entries, errors, options)
+    resultat = moteur.executer("SELECT account, sum(position) GROUP BY account")
+"""
+
+from __future__ import annotations
+
+import dataclasses
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from decimal import Decimal
+
+import beanquery
+from beancount.core.inventory import Inventory
+from beancount.parser import options as options_beancount
+from beanquery.parser import ast
+
+TAILLE_CACHE = 64
+LIGNES_MAX = 10_000
+DELAI_DEFAUT = 10.0
+_INTERVALLE_VERIFICATION = 1024
+
+_INSTRUCTIONS_PERMISES = (ast.Select, ast.Balances, ast.Journal)
+
+
+class RequeteInvalide(ValueError):
+    """Requete BQL illisible, non compilable ou non permise (ecriture)."""
+
+
+class DelaiRequeteDepasse(TimeoutError):
+    """La requete a depasse son delai d'execution."""
+
+
+@dataclass(frozen=True)
+class ResultatRequete:
+    """Resultat d'une requete: colonnes, lignes et indicateur de troncature."""
+
+    colonnes: list[tuple[str, str]]
+    lignes: list[tuple]
+    tronque: bool
+    duree: float
+
+
+class _TableBornee:
+    """Parcourt une table beanquery en verifiant le delai toutes les N lignes."""
+
+    def __init__(self, table, limite: float) -> None:
+        self._table = table
+        self._limite = limite
+
+    def __getattr__(self, nom):
+        return getattr(self._table, nom)
+
+    def __iter__(self):
+        for n, ligne in enumerate(self._table, 1):
+            if n % _INTERVALLE_VERIFICATION == 0 and time.monotonic() > self._limite:
+                raise DelaiRequeteDepasse("Delai de la requete depasse")
+            yield ligne
+
+
+def _nom_type(dtype) -> str:
+    return getattr(dtype, "__name__", str(dtype))
+
+
+def valeur_json(valeur):
+    """Convertit une valeur de resultat BQL en valeur serialisable JSON."""
+    if valeur is None or isinstance(valeur, (bool, int, float, str)):
+        return valeur
+    if isinstance(valeur, Decimal):
+        return str(valeur)
+    if isinstance(valeur, datetime.date):
+        return valeur.isoformat()
+    if isinstance(valeur, Inventory) or hasattr(valeur, "_fields"):
+        # Amount, Position, Inventory...: representation Beancount
+        return str(valeur)
+    if isinstance(valeur, (set, frozenset)):
+        return sorted(str(v) for v in valeur)
+    if isinstance(valeur, (list, tuple)):
+        return [valeur_json(v) for v in valeur]
+    if isinstance(valeur, dict):
+        return {str(k): valeur_json(v) for k, v in valeur.items()}
+    return str(valeur)
+
+
+class MoteurRequetes:
+    """Executeur BQL lie a un chargement du ledger, avec cache de compilation."""
+
+    def __init__(self, entries: list, errors: list, options: dict) -> None:
+        self.entries = entries
+        options_completes = dict(options_beancount.OPTIONS_DEFAULTS)
+        options_completes.update(options)
+        self._connexion = beanquery.connect(
+            "beancount:", entries=entries, errors=errors, options=options_completes
+        )
+        self._compilees: OrderedDict[str, object] = OrderedDict()
+        self._verrou = threading.Lock()
+        self.compilations = 0
+
+    def compiler(self, requete: str):
+        """Retourne la requete compilee (depuis le cache si deja vue)."""
+        requete = requete.strip()
+        with self._verrou:
+            compilee = self._compilees.get(requete)
+            if compilee is not None:
+                self._compilees.move_to_end(requete)
+                return compilee
+
+        instruction = analyser(requete)
+        try:
+            compilee = self._connexion.compile(instruction)
+        except beanquery.CompilationError as e:
+            raise RequeteInvalide(f"Requete non compilable: {e}") from None
+
+        with self._verrou:
+            self.compilations += 1
+            self._compilees[requete] = compilee
+            while len(self._compilees) > TAILLE_CACHE:
+                self._compilees.popitem(last=False)
+        return compilee
+
+    def executer(
+        self, requete: str, lignes_max: int = LIGNES_MAX, delai: float = DELAI_DEFAUT
+    ) -> ResultatRequete:
+        """Execute une requete BQL en lecture seule.
+
+        Args:
+            requete: Texte BQL (SELECT, BALANCES ou JOURNAL).
+            lignes_max: Nombre maximal de lignes retournees.
+            delai: Duree maximale d'execution, en secondes.
+
+        Raises:
+            RequeteInvalide: Requete illisible, non compilable ou non permise.
+            DelaiRequeteDepasse: Delai depasse.
+        """
+        debut = time.monotonic()
+        compilee = self.compiler(requete)
+        # Copie par execution: la requete compilee reste partagee entre threads
+        limite = lignes_max + 1 if compilee.limit is None else min(compilee.limit, lignes_max + 1)
+        execution = dataclasses.replace(
+            compilee, table=_TableBornee(compilee.table, debut + delai), limit=limite
+        )
+        colonnes, lignes = execution()
+        tronque = len(lignes) > lignes_max
+        return ResultatRequete(
+            colonnes=[(c.name, _nom_type(c.datatype)) for c in colonnes],
+            lignes=[tuple(ligne) for ligne in lignes[:lignes_max]],
+            tronque=tronque,
+            duree=time.monotonic() - debut,
+        )
+
+
+_analyses: OrderedDict[str, object] = OrderedDict()
+_analyses_verrou = threading.Lock()
+
+
+def analyser(requete: str):
+    """Analyse une requete BQL (cache par texte) et refuse les ecritures.
+
+    Raises:
+        RequeteInvalide: Syntaxe invalide ou instruction non permise.
+    """
+    requete = requete.strip()
+    with _analyses_verrou:
+        instruction = _analyses.get(requete)
+        if instruction is not None:
+            _analyses.move_to_end(requete)
+            return instruction
+    try:
+        instruction = beanquery.parser.parse(requete)
+    except beanquery.ParseError as e:
+        raise RequeteInvalide(f"Syntaxe BQL invalide: {e}") from None
+    if not isinstance(instruction, _INSTRUCTIONS_PERMISES):
+        raise RequeteInvalide("Seules les requetes SELECT, BALANCES et JOURNAL sont permises")
+    with _analyses_verrou:
+        _analyses[requete] = instruction
+        while len(_analyses) > TAILLE_CACHE:
+            _analyses.popitem(last=False)
+    return instruction
+
+
+_moteur: MoteurRequetes | None = None
+_moteur_verrou = threading.Lock()
+
+
+def moteur_requetes(entries: list, errors: list, options: dict) -> MoteurRequetes:
+    """Retourne le moteur du chargement `entries` (recree quand le ledger change)."""
+    global _moteur
+    with _moteur_verrou:
+        if _moteur is None or _moteur.entries is not entries:
+            _moteur = MoteurRequetes(entries, errors, options)
+        return _moteur
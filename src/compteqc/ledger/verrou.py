@@ -0,0 +1,236 @@
+"""Verrou d'ecriture inter-processus et compteur de version du ledger.
+
+Fava (endpoint d'approbation), le serveur MCP (`approuver_lot`,
+`lancer_paie`, ...) et la CLI peuvent modifier pending.beancount et les
+fichiers mensuels en meme temps. Deux mecanismes les coordonnent:
+
+- un verrou exclusif `fcntl.flock` sur `<ledger>/.verrou`, pris par tout
+  ecrivain (et par `JournalEcritures`). Le verrou est reentrant dans un
+  meme processus: une fonction qui ecrit peut en appeler une autre sans
+  interblocage, et les threads d'un meme processus s'excluent aussi;
+- un compteur `<ledger>/.version`, incremente a la liberation du verrou
+  quand l'operation a modifie des fichiers.
+
+Un lecteur en memoire (AppContext MCP, extension Fava) retient la version
+de son chargement. `version_ledger` lui permet de savoir a peu de frais si
+le ledger a change, plutot que de tout recharger par precaution. Une
+mutation calculee a partir de cet etat (ex: indices de transactions
+pending) passe `version_attendue`: si un autre ecrivain est passe entre
+temps, `ConflitVersion` est levee avant toute ecriture (compare-and-swap).
+
+Le compteur ne couvre que les ecritures de CompteQC: une modification
+manuelle des fichiers ne l'incremente pas.
+
+Un lecteur qui recharge le ledger prend `VerrouLecture` (verrou partage):
+il attend la fin d'une operation multi-fichiers en cours au lieu d'en
+charger un etat intermediaire.
+
+Usage:
+    with VerrouEcriture(ledger_dir, version_attendue=app.version) as verrou:
+        ...ecritures...
+        verrou.modifie()
+"""
+
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FICHIER_VERROU = ".verrou"
+FICHIER_VERSION = ".version"
+DELAI_DEFAUT = 30.0
+_INTERVALLE = 0.05
+
+
+class ConflitVersion(Exception):
+    """Le ledger a ete modifie depuis la version lue par l'appelant."""
+
+    def __init__(self, attendue: int, actuelle: int) -> None:
+        super().__init__(
+            f"Le ledger a ete modifie (version {actuelle}, attendue {attendue}): "
+            "recharger et recommencer"
+        )
+        self.attendue = attendue
+        self.actuelle = actuelle
+
+
+class VerrouOccupe(TimeoutError):
+    """Le verrou d'ecriture n'a pas pu etre obtenu dans le delai."""
+
+
+@dataclass
+class _Detenteur:
+    """Etat du verrou d'un repertoire dans ce processus."""
+
+    verrou: threading.RLock = field(default_factory=threading.RLock)
+    profondeur: int = 0
+    fd: int | None = None
+    modifie: bool = False
+    proprietaire: int | None = None
+
+
+_detenteurs: dict[Path, _Detenteur] = {}
+_detenteurs_verrou = threading.Lock()
+
+
+def _detenteur(base: Path) -> _Detenteur:
+    cle = base.resolve()
+    with _detenteurs_verrou:
+        detenteur = _detenteurs.get(cle)
+        if detenteur is None:
+            detenteur = _detenteurs[cle] = _Detenteur()
+        return detenteur
+
+
+def version_ledger(base: Path) -> int:
+    """Retourne la version courante du ledger (0 si jamais modifie).
+
+    Args:
+        base: Repertoire du ledger (parent de main.beancount).
+    """
+    try:
+        return int((base / FICHIER_VERSION).read_text(encoding="utf-8").strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _verrouiller_fichier(base: Path, mode: int, delai: float) -> int:
+    """Ouvre `<base>/.verrou` et y pose un flock (exclusif ou partage)."""
+    base.mkdir(parents=True, exist_ok=True)
+    fd = os.open(base / FICHIER_VERROU, os.O_RDWR | os.O_CREAT, 0o644)
+    limite = time.monotonic() + delai
+    while True:
+        try:
+            fcntl.flock(fd, mode | fcntl.LOCK_NB)
+            return fd
+        except BlockingIOError:
+            if time.monotonic() >= limite:
+                os.close(fd)
+                raise VerrouOccupe(f"Ledger verrouille par un autre processus: {base}") from None
+            time.sleep(_INTERVALLE)
+
+
+def _ecrire_version(base: Path, version: int) -> None:
+    chemin = base / FICHIER_VERSION
+    tmp = chemin.with_name(chemin.name + ".tmp")
+    tmp.write_text(f"{version}\n", encoding="utf-8")
+    os.replace(tmp, chemin)
+
+
+class VerrouEcriture:
+    """Verrou exclusif d'ecriture sur un repertoire de ledger.
+
+    Utilise comme gestionnaire de contexte. `modifie` signale que des
+    fichiers ont ete ecrits: la version est incrementee a la liberation du
+    verrou le plus externe (meme si une exception interrompt l'operation,
+    les lecteurs rechargeront alors par prudence).
+    """
+
+    def __init__(
+        self,
+        base: Path,
+        version_attendue: int | None = None,
+        delai: float = DELAI_DEFAUT,
+    ) -> None:
+        """Initialise le verrou.
+
+        Args:
+            base: Repertoire du ledger (parent de main.beancount).
+            version_attendue: Version sur laquelle l'appelant a calcule sa
+                modification; None pour ne pas verifier.
+            delai: Attente maximale du verrou, en secondes.
+        """
+        self.base = base
+        self.version_attendue = version_attendue
+        self.delai = delai
+        self.version: int | None = None
+        self._detenteur = _detenteur(base)
+
+    def __enter__(self) -> VerrouEcriture:
+        detenteur = self._detenteur
+        if not detenteur.verrou.acquire(timeout=self.delai):
+            raise VerrouOccupe(f"Ledger verrouille par un autre ecrivain: {self.base}")
+        try:
+            if detenteur.profondeur == 0:
+                detenteur.fd = _verrouiller_fichier(self.base, fcntl.LOCK_EX, self.delai)
+                detenteur.modifie = False
+                detenteur.proprietaire = threading.get_ident()
+            detenteur.profondeur += 1
+        except BaseException:
+            detenteur.verrou.release()
+            raise
+
+        self.version = version_ledger(self.base)
+        if self.version_attendue is not None and self.version != self.version_attendue:
+            self._liberer()
+            raise ConflitVersion(self.version_attendue, self.version)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self._liberer()
+        return False
+
+    def _liberer(self) -> None:
+        detenteur = self._detenteur
+        try:
+            detenteur.profondeur -= 1
+            if detenteur.profondeur == 0:
+                try:
+                    if detenteur.modifie:
+                        _ecrire_version(self.base, version_ledger(self.base) + 1)
+                finally:
+                    fcntl.flock(detenteur.fd, fcntl.LOCK_UN)
+                    os.close(detenteur.fd)
+                    detenteur.fd = None
+                    detenteur.modifie = False
+                    detenteur.proprietaire = None
+        finally:
+            detenteur.verrou.release()
+
+    def modifie(self) -> None:
+        """Signale que l'operation a modifie des fichiers du ledger."""
+        self._detenteur.modifie = True
+
+
+class VerrouLecture:
+    """Verrou partage: attend qu'aucun ecrivain ne soit en cours.
+
+    Plusieurs lecteurs peuvent le detenir en meme temps; un ecrivain attend
+    qu'ils l'aient libere. Sans effet si le thread courant detient deja le
+    verrou d'ecriture (il lit alors ses propres ecritures).
+
+    Usage:
+        with VerrouLecture(ledger_dir):
+            entries, errors, options = loader.load_file(chemin_main)
+    """
+
+    def __init__(self, base: Path, delai: float = DELAI_DEFAUT) -> None:
+        self.base = base
+        self.delai = delai
+        self._fd: int | None = None
+
+    def __enter__(self) -> VerrouLecture:
+        detenteur = _detenteur(self.base)
+        if detenteur.proprietaire != threading.get_ident():
+            try:
+                self._fd = _verrouiller_fichier(self.base, fcntl.LOCK_SH, self.delai)
+            except VerrouOccupe:
+                raise
+            except OSError as e:
+                # Ledger en lecture seule (ex: montage): aucun ecrivain possible
+                logger.debug("Verrou de lecture ignore (%s)", e)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        return False
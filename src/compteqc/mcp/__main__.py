@@ -1,5 +1,5 @@
 """Permet d'executer le serveur MCP via `python -m compteqc.mcp`."""
 
-from compteqc.mcp.server import mcp
+from compteqc.mcp.server import main
 
-mcp.run(transport="stdio")
+main()
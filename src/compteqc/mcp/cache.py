@@ -0,0 +1,159 @@
+"""Cache des resultats des outils MCP de consultation.
+
+Un client LLM appelle souvent les memes outils (soldes, bilan, TPS/TVQ...)
+plusieurs fois dans une conversation, alors que le ledger n'a pas change.
+Les resultats sont memorises par (outil, arguments, generation du ledger,
+date du jour) avec eviction LRU. La generation est incrementee a chaque
+substitution du ledger dans l'AppContext (`AppContext.remplacer`), qui vide
+aussi le cache: un resultat calcule sur un ledger perime n'est jamais servi.
+
+La date du jour fait partie de la cle car plusieurs outils en dependent
+(annee courante par defaut, compte a rebours s.15(2)).
+
+Les resultats sont des dictionnaires serialises tels quels par FastMCP;
+ils ne doivent pas etre modifies apres coup.
+"""
+
+from __future__ import annotations
+
+import datetime
+import functools
+import inspect
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+TAILLE_DEFAUT = 128
+
+
+@dataclass
+class StatsOutil:
+    """Compteurs d'un outil memorise."""
+
+    succes: int = 0
+    echecs: int = 0
+
+
+@dataclass
+class CacheResultats:
+    """Cache LRU des resultats d'outils, vide a chaque rechargement du ledger."""
+
+    taille_max: int = TAILLE_DEFAUT
+    invalidations: int = 0
+    evictions: int = 0
+    _entrees: OrderedDict = field(default_factory=OrderedDict, repr=False)
+    _stats: dict[str, StatsOutil] = field(default_factory=dict, repr=False)
+    _verrou: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def lire(self, outil: str, cle: tuple) -> tuple[bool, object]:
+        """Retourne (trouve, resultat) et met a jour les compteurs de l'outil."""
+        with self._verrou:
+            stats = self._stats.setdefault(outil, StatsOutil())
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                stats.succes += 1
+                return True, self._entrees[cle]
+            stats.echecs += 1
+            return False, None
+
+    def ecrire(self, cle: tuple, resultat: object) -> None:
+        """Memorise un resultat, en evincant les moins recemment utilises."""
+        with self._verrou:
+            self._entrees[cle] = resultat
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def vider(self) -> None:
+        """Invalide tous les resultats (le ledger a change)."""
+        with self._verrou:
+            self._entrees.clear()
+            self.invalidations += 1
+
+    def statistiques(self) -> dict:
+        """Compteurs globaux et par outil (pour l'outil de diagnostic)."""
+        with self._verrou:
+            succes = sum(s.succes for s in self._stats.values())
+            echecs = sum(s.echecs for s in self._stats.values())
+            total = succes + echecs
+            return {
+                "taille": len(self._entrees),
+                "taille_max": self.taille_max,
+                "succes": succes,
+                "echecs": echecs,
+                "taux_succes": round(succes / total, 3) if total else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "par_outil": {
+                    outil: {"succes": s.succes, "echecs": s.echecs}
+                    for outil, s in sorted(self._stats.items())
+                },
+            }
+
+
+def _empreinte(chemin: Path) -> tuple[int, int] | None:
+    try:
+        st = os.stat(chemin)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def memoiser(
+    fn: Callable | None = None,
+    *,
+    fichiers: Callable[[object], list[Path]] | None = None,
+) -> Callable:
+    """Memorise le resultat d'un outil MCP dans le cache de l'AppContext.
+
+    A placer sous `@mcp.tool()` (la signature est conservee pour le schema
+    de l'outil). Le parametre `ctx` est exclu de la cle.
+
+    Args:
+        fn: Outil a memoriser.
+        fichiers: Fichiers hors ledger dont depend l'outil (ex: registre
+            d'actifs); leur empreinte (mtime, taille) entre dans la cle.
+
+    Usage:
+        @mcp.tool()
+        @memoiser
+        def bilan(date: str | None = None, ctx: Context = None) -> dict: ...
+    """
+    if fn is None:
+        return functools.partial(memoiser, fichiers=fichiers)
+
+    signature = inspect.signature(fn)
+
+    @functools.wraps(fn)
+    def enveloppe(*args, **kwargs):
+        arguments = signature.bind(*args, **kwargs)
+        arguments.apply_defaults()
+        ctx = arguments.arguments.get("ctx")
+        app = ctx.request_context.lifespan_context if ctx is not None else None
+        cache = getattr(app, "cache", None)
+        if not isinstance(cache, CacheResultats):
+            return fn(*args, **kwargs)
+
+        generation = app.generation
+        cle = (
+            fn.__name__,
+            tuple((k, v) for k, v in arguments.arguments.items() if k != "ctx"),
+            generation,
+            datetime.date.today(),
+            tuple(_empreinte(f) for f in fichiers(app)) if fichiers is not None else (),
+        )
+        trouve, resultat = cache.lire(fn.__name__, cle)
+        if trouve:
+            return resultat
+
+        resultat = fn(*args, **kwargs)
+        # Ledger remplace pendant le calcul: le resultat peut melanger deux versions
+        if app.generation == generation:
+            cache.ecrire(cle, resultat)
+        return resultat
+
+    return enveloppe
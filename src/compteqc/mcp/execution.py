@@ -0,0 +1,208 @@
+"""Execution des outils MCP hors de la boucle d'evenements.
+
+Les outils font des parcours complets du ledger, du calcul de paie, des
+appels au pipeline de categorisation ou lancent bean-check en
+sous-processus. Executes directement dans la boucle asyncio de FastMCP,
+une approbation lente bloquait toutes les autres requetes.
+
+`hors_boucle` transforme un outil synchrone en coroutine qui s'execute:
+
+- dans un pool borne de threads pour les lectures (COMPTEQC_TRAVAILLEURS,
+  defaut: min(4, nombre de coeurs));
+- dans une file a ecrivain unique pour les mutations: un seul thread
+  applique les ecritures dans l'ordre d'arrivee, pendant que les outils
+  de lecture continuent de repondre sur le ledger deja charge.
+
+Un pool de threads (plutot que de processus) garde l'acces au ledger en
+memoire de l'AppContext; le travail lourd (bean-check, parsing) libere le
+GIL ou tourne dans un sous-processus.
+
+Un outil long signale ses etapes avec `progression().etape(...)`: chaque
+etape envoie une notification de progression MCP au client (si la requete
+porte un progressToken) et sert de point d'annulation. Quand le client
+annule la requete, l'etape suivante leve `OperationAnnulee`; une etape
+atteinte dans un `JournalEcritures` annule alors les ecritures deja faites.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+_verrou = threading.Lock()
+_lecture: ThreadPoolExecutor | None = None
+_ecriture: ThreadPoolExecutor | None = None
+_ecritures_en_attente = 0
+
+
+class OperationAnnulee(BaseException):
+    """Le client a annule la requete; l'outil s'arrete a l'etape suivante.
+
+    Derive de BaseException, comme asyncio.CancelledError, pour traverser
+    les `except Exception` du code metier (le journal d'ecriture annule
+    quand meme les modifications en cours).
+    """
+
+
+class Progression:
+    """Avancement d'un outil en cours: notifications MCP et jeton d'annulation."""
+
+    def __init__(
+        self,
+        ctx=None,
+        boucle: asyncio.AbstractEventLoop | None = None,
+        total: int | None = None,
+    ) -> None:
+        self.ctx = ctx
+        self.boucle = boucle
+        self.total = total
+        self.avancement = 0
+        self.annulee = threading.Event()
+
+    def annuler(self) -> None:
+        """Demande l'arret de l'outil a sa prochaine etape."""
+        self.annulee.set()
+
+    def verifier(self) -> None:
+        """Leve OperationAnnulee si l'annulation a ete demandee."""
+        if self.annulee.is_set():
+            raise OperationAnnulee("Operation annulee par le client")
+
+    def etape(self, message: str) -> None:
+        """Point de controle entre deux etapes: annulation, puis notification.
+
+        Args:
+            message: Etape qui commence (ex: "ecriture", "validation").
+        """
+        self.verifier()
+        self.avancement += 1
+        if self.ctx is None or self.boucle is None:
+            return
+        try:
+            envoi = self.ctx.report_progress(self.avancement, self.total, message)
+        except Exception:
+            logger.debug("Notification de progression impossible", exc_info=True)
+            return
+        if asyncio.iscoroutine(envoi):
+            asyncio.run_coroutine_threadsafe(envoi, self.boucle)
+
+
+_progression: contextvars.ContextVar[Progression | None] = contextvars.ContextVar(
+    "progression", default=None
+)
+
+
+def progression() -> Progression:
+    """Progression de l'outil en cours (sans effet hors d'un outil `hors_boucle`)."""
+    courante = _progression.get()
+    return courante if courante is not None else Progression()
+
+
+def _nb_travailleurs() -> int:
+    valeur = os.environ.get("COMPTEQC_TRAVAILLEURS")
+    if valeur:
+        return max(1, int(valeur))
+    return min(4, os.cpu_count() or 1)
+
+
+def executeur_lecture() -> ThreadPoolExecutor:
+    """Pool borne partage par les outils de consultation (cree au premier appel)."""
+    global _lecture
+    with _verrou:
+        if _lecture is None:
+            _lecture = ThreadPoolExecutor(
+                max_workers=_nb_travailleurs(), thread_name_prefix="compteqc-lecture"
+            )
+        return _lecture
+
+
+def executeur_ecriture() -> ThreadPoolExecutor:
+    """File a ecrivain unique: les mutations s'executent une a la fois, en ordre."""
+    global _ecriture
+    with _verrou:
+        if _ecriture is None:
+            _ecriture = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compteqc-ecriture")
+        return _ecriture
+
+
+def arreter_executeurs() -> None:
+    """Termine les pools (fin du lifespan); ils seront recrees au besoin."""
+    global _lecture, _ecriture
+    with _verrou:
+        pools, _lecture, _ecriture = (_lecture, _ecriture), None, None
+    for pool in pools:
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+def statistiques() -> dict:
+    """Etat des pools (pour l'outil de diagnostic)."""
+    with _verrou:
+        return {
+            "travailleurs_lecture": _nb_travailleurs(),
+            "ecritures_en_attente": _ecritures_en_attente,
+        }
+
+
+def _suivre_ecriture(delta: int) -> None:
+    global _ecritures_en_attente
+    with _verrou:
+        _ecritures_en_attente += delta
+
+
+def hors_boucle(
+    fn: Callable | None = None, *, ecriture: bool = False, etapes: int | None = None
+) -> Callable:
+    """Execute un outil synchrone dans un pool, sans bloquer la boucle asyncio.
+
+    A placer sous `@mcp.tool()`: la signature est conservee pour le schema
+    de l'outil et l'outil devient une coroutine. Si la requete est annulee,
+    l'outil s'arrete a sa prochaine etape (`progression().etape`), ou ne
+    demarre pas s'il attendait encore dans la file.
+
+    Args:
+        fn: Outil synchrone.
+        ecriture: Passer par la file a ecrivain unique (outil de mutation).
+        etapes: Nombre d'etapes annoncees dans les notifications de progression.
+
+    Usage:
+        @mcp.tool()
+        @hors_boucle(ecriture=True, etapes=3)
+        def approuver_lot(ids: list[str], ctx: Context = None) -> dict: ...
+    """
+    if fn is None:
+        return functools.partial(hors_boucle, ecriture=ecriture, etapes=etapes)
+
+    def executer(suivi: Progression, *args, **kwargs):
+        suivi.verifier()
+        _progression.set(suivi)
+        return fn(*args, **kwargs)
+
+    @functools.wraps(fn)
+    async def enveloppe(*args, **kwargs):
+        boucle = asyncio.get_running_loop()
+        suivi = Progression(kwargs.get("ctx"), boucle, etapes)
+        appel = functools.partial(
+            contextvars.copy_context().run, executer, suivi, *args, **kwargs
+        )
+        if ecriture:
+            _suivre_ecriture(1)
+        try:
+            executeur = executeur_ecriture() if ecriture else executeur_lecture()
+            return await boucle.run_in_executor(executeur, appel)
+        except asyncio.CancelledError:
+            suivi.annuler()
+            raise
+        finally:
+            if ecriture:
+                _suivre_ecriture(-1)
+
+    return enveloppe
@@ -0,0 +1,176 @@
+"""Pagination par curseur des outils MCP qui retournent des listes.
+
+Un client MCP parcourt une longue liste (comptes, transactions pending...)
+page par page: chaque reponse contient `curseur_suivant`, a repasser tel
+quel a l'appel suivant. Le curseur est opaque (base64 d'un petit JSON) et
+porte:
+
+- la generation du ledger (`AppContext.generation`): apres un
+  rechargement, un ancien curseur est refuse (`CurseurInvalide`) plutot
+  que de sauter ou repeter des elements;
+- une empreinte de la requete (outil, filtres, tri): un curseur ne peut
+  pas etre rejoue avec d'autres filtres;
+- la position dans chaque section de la reponse.
+
+La liste filtree et triee (l'index) est construite une fois par
+(outil, filtres, tri, generation) et gardee dans le cache de l'AppContext:
+les pages suivantes ne refont ni le filtrage ni le tri, elles decoupent
+l'index a la position du curseur.
+
+Usage:
+    pages, totaux, suivant = paginer_sections(
+        app, "etat_resultats", (debut, fin),
+        {"revenus": construire_revenus, "depenses": construire_depenses},
+        curseur, limite,
+    )
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Callable
+
+from compteqc.mcp.cache import CacheResultats
+
+LIMITE_DEFAUT = 50
+LIMITE_MAX = 500
+
+
+class CurseurInvalide(ValueError):
+    """Curseur illisible, perime (ledger recharge) ou d'une autre requete."""
+
+
+def _empreinte_requete(nom: str, params: tuple) -> str:
+    return hashlib.sha1(repr((nom, params)).encode("utf-8")).hexdigest()[:16]
+
+
+def encoder_curseur(nom: str, params: tuple, generation: int, positions: list[int]) -> str:
+    """Encode un curseur opaque pour la page qui commence a `positions`."""
+    charge = {"g": generation, "r": _empreinte_requete(nom, params), "p": positions}
+    brut = json.dumps(charge, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(brut).decode("ascii").rstrip("=")
+
+
+def decoder_curseur(
+    curseur: str, nom: str, params: tuple, generation: int, nb_sections: int
+) -> list[int]:
+    """Retourne les positions encodees dans `curseur`.
+
+    Raises:
+        CurseurInvalide: Curseur illisible, d'une autre requete, ou emis
+            avant le dernier rechargement du ledger.
+    """
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4))
+        charge = json.loads(brut)
+        positions = [int(p) for p in charge["p"]]
+        empreinte, gen = charge["r"], charge["g"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise CurseurInvalide("Curseur invalide") from None
+    if empreinte != _empreinte_requete(nom, params) or len(positions) != nb_sections:
+        raise CurseurInvalide("Curseur d'une autre requete (filtres ou tri differents)")
+    if gen != generation:
+        raise CurseurInvalide(
+            "Curseur perime: le ledger a ete recharge, recommencer sans curseur"
+        )
+    if any(p < 0 for p in positions):
+        raise CurseurInvalide("Curseur invalide")
+    return positions
+
+
+def valider_limite(limite: int) -> int:
+    """Borne la taille de page a [1, LIMITE_MAX]."""
+    return max(1, min(int(limite), LIMITE_MAX))
+
+
+def index_liste(app, nom: str, params: tuple, construire: Callable[[], list]) -> list:
+    """Retourne la liste filtree et triee d'un outil, construite une fois par generation.
+
+    Args:
+        app: AppContext (son cache et sa generation).
+        nom: Nom de l'index (outil et section).
+        params: Filtres et tri qui determinent le contenu de l'index.
+        construire: Construit la liste complete (appelee sur absence du cache).
+    """
+    cache = getattr(app, "cache", None)
+    if not isinstance(cache, CacheResultats):
+        return construire()
+    generation = app.generation
+    cle = ("index", nom, params, generation)
+    trouve, index = cache.lire(f"{nom}:index", cle)
+    if trouve:
+        return index
+    index = construire()
+    if app.generation == generation:
+        cache.ecrire(cle, index)
+    return index
+
+
+def paginer_sections(
+    app,
+    nom: str,
+    params: tuple,
+    sections: dict[str, Callable[[], list]],
+    curseur: str | None,
+    limite: int,
+) -> tuple[dict[str, list], dict[str, int], str | None]:
+    """Decoupe une page dans chaque section d'une reponse.
+
+    Chaque section avance independamment de `limite` elements; le curseur
+    suivant est None quand toutes les sections sont epuisees.
+
+    Args:
+        app: AppContext.
+        nom: Nom de l'outil.
+        params: Filtres et tri de la requete (entrent dans l'empreinte).
+        sections: Nom de section -> constructeur de sa liste complete.
+        curseur: Curseur recu du client, ou None pour la premiere page.
+        limite: Nombre maximal d'elements par section.
+
+    Returns:
+        (elements de la page par section, total par section, curseur suivant).
+
+    Raises:
+        CurseurInvalide: Si le curseur ne correspond pas a cette requete.
+    """
+    limite = valider_limite(limite)
+    generation = app.generation
+    if curseur:
+        positions = decoder_curseur(curseur, nom, params, generation, len(sections))
+    else:
+        positions = [0] * len(sections)
+
+    pages: dict[str, list] = {}
+    totaux: dict[str, int] = {}
+    suivantes: list[int] = []
+    for (section, construire), debut in zip(sections.items(), positions):
+        index = index_liste(app, f"{nom}.{section}", params, construire)
+        pages[section] = index[debut:debut + limite]
+        totaux[section] = len(index)
+        suivantes.append(min(debut + limite, len(index)))
+
+    reste = any(p < totaux[s] for p, s in zip(suivantes, sections))
+    suivant = encoder_curseur(nom, params, generation, suivantes) if reste else None
+    return pages, totaux, suivant
+
+
+def paginer(
+    app,
+    nom: str,
+    params: tuple,
+    construire: Callable[[], list],
+    curseur: str | None,
+    limite: int,
+) -> tuple[list, int, str | None]:
+    """Comme `paginer_sections`, pour une reponse a une seule liste.
+
+    Returns:
+        (elements de la page, total, curseur suivant).
+    """
+    pages, totaux, suivant = paginer_sections(
+        app, nom, params, {"elements": construire}, curseur, limite
+    )
+    return pages["elements"], totaux["elements"], suivant
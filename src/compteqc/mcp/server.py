@@ -2,61 +2,406 @@
 
 Usage:
     uv run python -m compteqc.mcp.server          # stdio (Claude Desktop / Code)
+    uv run python -m compteqc.mcp.server --http   # HTTP multi-clients (127.0.0.1:8765/mcp)
+
+En mode HTTP (streamable-http), un seul processus sert plusieurs clients:
+toutes les sessions partagent le meme AppContext (ledger charge une fois,
+cache des outils, surveillance des fichiers) et la meme file d'ecriture.
+Le serveur n'ecoute que sur 127.0.0.1.
+
+Le mode d'une session HTTP (lecture seule ou ecriture) est fixe par le
+serveur a son ouverture, d'apres les en-tetes de la requete `initialize`:
+- avec `--lecture-seule-par-defaut` (ou COMPTEQC_LECTURE_SEULE_PAR_DEFAUT),
+  toute session est en lecture seule, sauf si elle presente l'en-tete
+  `X-CompteQC-Jeton` egal a COMPTEQC_JETON_ECRITURE;
+- un client peut toujours demander une session en lecture seule avec
+  l'en-tete `X-CompteQC-Lecture-Seule: true`.
+Une session passee en lecture seule le reste jusqu'a sa fermeture.
 
 Variables d'environnement:
     COMPTEQC_LEDGER   -- chemin vers main.beancount (default: ledger/main.beancount)
     COMPTEQC_READONLY -- mode lecture seule (default: false)
+    COMPTEQC_LECTURE_SEULE_PAR_DEFAUT -- sessions HTTP en lecture seule sauf
+                         jeton d'ecriture (default: false)
+    COMPTEQC_JETON_ECRITURE -- jeton qui ouvre une session HTTP en ecriture
+    COMPTEQC_SURVEILLANCE -- recharger le ledger quand ses fichiers changent
+                         (default: true)
+    COMPTEQC_MIROIR   -- base SQLite du miroir du ledger
+                         (default: data/cache/miroir.sqlite a cote du ledger)
+    COMPTEQC_TRAVAILLEURS -- threads du pool des outils de lecture
+                         (default: min(4, nombre de coeurs))
+    COMPTEQC_MCP_PORT -- port du mode HTTP (default: 8765)
 """
 
 from __future__ import annotations
 
+import argparse
+import hmac
+import logging
 import os
+import threading
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from pathlib import Path
 
-from beancount import loader
 from mcp.server.fastmcp import FastMCP
+from mcp.server.streamable_http import MCP_SESSION_ID_HEADER
+
+from compteqc.ledger.chargement import ChargeurLedger, SurveillantLedger
+from compteqc.ledger.journal import recuperer_journaux
+from compteqc.ledger.miroir import miroir_ledger
+from compteqc.ledger.verrou import VerrouLecture, version_ledger
+from compteqc.mcp.cache import CacheResultats
+from compteqc.mcp.execution import arreter_executeurs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InstantaneLedger:
+    """Etat coherent du ledger a un instant (entrees et version du meme chargement)."""
+
+    entries: list
+    errors: list
+    options: dict
+    version: int
 
 
 @dataclass
 class AppContext:
-    """Contexte applicatif injecte dans chaque outil MCP via le lifespan."""
+    """Contexte applicatif injecte dans chaque outil MCP via le lifespan.
+
+    Les listes d'entrees ne sont jamais modifiees en place: un rechargement
+    construit un nouveau ledger puis le substitue d'un coup (`remplacer`).
+    Un outil qui lit plusieurs attributs utilise `instantane()`.
+
+    `generation` compte les substitutions (y compris pour des modifications
+    externes qui n'incrementent pas `version`); elle sert de cle au cache
+    des outils de consultation.
+    """
 
     ledger_path: str
     entries: list
     errors: list
     options: dict
     read_only: bool
+    chemin_miroir: str | None = None
+    version: int = 0
+    chargeur: ChargeurLedger | None = None
+    generation: int = 0
+    cache: CacheResultats = field(default_factory=CacheResultats, repr=False)
+    _verrou: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _rechargement: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    def instantane(self) -> InstantaneLedger:
+        """Retourne les entrees, erreurs, options et version d'un meme chargement."""
+        with self._verrou:
+            return InstantaneLedger(self.entries, self.errors, self.options, self.version)
+
+    def remplacer(self, entries: list, errors: list, options: dict, version: int) -> None:
+        """Substitue atomiquement un ledger charge et invalide le cache des outils."""
+        with self._verrou:
+            self.entries, self.errors, self.options, self.version = (
+                entries, errors, options, version
+            )
+            self.generation += 1
+        self.cache.vider()
 
     def reload(self) -> None:
-        """Recharge le ledger depuis le fichier (apres une mutation)."""
-        self.entries, self.errors, self.options = loader.load_file(self.ledger_path)
+        """Recharge le ledger (seuls les fichiers modifies sont re-parses)."""
+        if self.chargeur is None:
+            self.chargeur = ChargeurLedger(self.ledger_path)
+        # Un seul rechargement a la fois: un chargement plus ancien ne doit
+        # pas remplacer un plus recent. Le verrou de lecture attend la fin
+        # d'une ecriture multi-fichiers en cours (pas d'etat intermediaire).
+        ledger_dir = Path(self.ledger_path).parent
+        with self._rechargement:
+            with VerrouLecture(ledger_dir):
+                version = version_ledger(ledger_dir)
+                entries, errors, options = self.chargeur.charger()
+            self.remplacer(entries, errors, options, version)
+            self.synchroniser_miroir()
 
+    def rafraichir(self) -> bool:
+        """Recharge le ledger seulement si un fichier inclus ou la version a change.
+
+        Returns:
+            True si le ledger a ete recharge.
+        """
+        if version_ledger(Path(self.ledger_path).parent) == self.version and not (
+            self.chargeur is not None and self.chargeur.modifie()
+        ):
+            return False
+        self.reload()
+        return True
+
+    def synchroniser_miroir(self) -> None:
+        """Met a jour le miroir SQLite persistant (fichiers modifies seulement)."""
+        if self.chemin_miroir is not None:
+            miroir_ledger(self.entries, chemin_db=self.chemin_miroir)
+
+
+EN_TETE_LECTURE_SEULE = "x-compteqc-lecture-seule"
+EN_TETE_JETON = "x-compteqc-jeton"
+PORT_DEFAUT = 8765
+_VRAI = ("1", "true", "oui")
+
+# Contexte partage par toutes les sessions du processus
+_partage_verrou = threading.Lock()
+_partage: AppContext | None = None
+_surveillant: SurveillantLedger | None = None
+_nb_sessions = 0
+_garder_chaud = False
+
+
+@dataclass(frozen=True)
+class PolitiqueSessions:
+    """Politique d'acces des sessions HTTP, appliquee par le serveur.
+
+    Attributes:
+        lecture_seule_par_defaut: Sessions en lecture seule sauf jeton valide.
+        jeton: Jeton d'ecriture attendu dans `X-CompteQC-Jeton` (aucun si None).
+    """
+
+    lecture_seule_par_defaut: bool = False
+    jeton: str | None = None
+
+    @classmethod
+    def depuis_env(cls) -> PolitiqueSessions:
+        """Politique lue dans COMPTEQC_LECTURE_SEULE_PAR_DEFAUT et COMPTEQC_JETON_ECRITURE."""
+        return cls(
+            lecture_seule_par_defaut=os.environ.get(
+                "COMPTEQC_LECTURE_SEULE_PAR_DEFAUT", "false"
+            ).lower() in _VRAI,
+            jeton=os.environ.get("COMPTEQC_JETON_ECRITURE") or None,
+        )
+
+    def lecture_seule(self, en_tetes) -> bool:
+        """Mode d'une session ouverte avec ces en-tetes HTTP."""
+        if str(en_tetes.get(EN_TETE_LECTURE_SEULE, "")).lower() in _VRAI:
+            return True
+        if self.jeton is not None and hmac.compare_digest(
+            str(en_tetes.get(EN_TETE_JETON, "")).encode(), self.jeton.encode()
+        ):
+            return False
+        return self.lecture_seule_par_defaut
+
+
+_politique = PolitiqueSessions.depuis_env()
+# Mode des sessions HTTP par identifiant (mcp-session-id), fixe a l'ouverture
+_modes_verrou = threading.Lock()
+_modes_sessions: dict[str, bool] = {}
+
+
+def configurer_politique(politique: PolitiqueSessions) -> None:
+    """Remplace la politique d'acces des nouvelles sessions HTTP."""
+    global _politique
+    _politique = politique
+
+
+def enregistrer_session(session_id: str, lecture_seule: bool) -> None:
+    """Fixe le mode d'une session; une session en lecture seule le reste."""
+    with _modes_verrou:
+        _modes_sessions[session_id] = _modes_sessions.get(session_id, False) or lecture_seule
+
+
+class ModeSessionsHttp:
+    """Middleware ASGI: enregistre le mode de chaque session a son ouverture.
+
+    La requete `initialize` n'a pas encore d'identifiant de session: le mode
+    est enregistre sous l'identifiant que le transport renvoie dans la
+    reponse. Les requetes suivantes ne peuvent que restreindre la session.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        from starlette.datastructures import Headers
+
+        en_tetes = Headers(scope=scope)
+        mode = _politique.lecture_seule(en_tetes)
+        session_id = en_tetes.get(MCP_SESSION_ID_HEADER)
+        if session_id is not None:
+            enregistrer_session(session_id, mode)
+            await self.app(scope, receive, send)
+            return
+
+        async def envoyer(message) -> None:
+            if message["type"] == "http.response.start":
+                nouvelle = Headers(raw=message.get("headers", [])).get(MCP_SESSION_ID_HEADER)
+                if nouvelle is not None:
+                    enregistrer_session(nouvelle, mode)
+            await send(message)
+
+        await self.app(scope, receive, envoyer)
+
+
+def _ouvrir_contexte() -> AppContext:
+    """Charge le ledger et demarre la surveillance des fichiers (une fois par processus)."""
+    global _partage, _surveillant
+    if _partage is not None:
+        return _partage
 
-@asynccontextmanager
-async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
-    """Charge le ledger au demarrage du serveur et le rend disponible aux outils."""
     ledger_path = os.environ.get("COMPTEQC_LEDGER", "ledger/main.beancount")
     read_only = os.environ.get("COMPTEQC_READONLY", "false").lower() == "true"
-    entries, errors, options = loader.load_file(ledger_path)
-    yield AppContext(
+    surveiller = os.environ.get("COMPTEQC_SURVEILLANCE", "true").lower() == "true"
+    chemin_miroir = os.environ.get(
+        "COMPTEQC_MIROIR",
+        str(Path(ledger_path).resolve().parent.parent / "data" / "cache" / "miroir.sqlite"),
+    )
+    if not read_only:
+        # Terminer les ecritures interrompues avant de charger le ledger
+        recuperer_journaux(Path(ledger_path).parent)
+    app = AppContext(
         ledger_path=ledger_path,
-        entries=entries,
-        errors=errors,
-        options=options,
+        entries=[],
+        errors=[],
+        options={},
         read_only=read_only,
+        chemin_miroir=chemin_miroir,
+        chargeur=ChargeurLedger(ledger_path),
     )
+    app.reload()
+
+    if surveiller:
+        _surveillant = SurveillantLedger(app.chargeur, rappel=app.reload)
+        _surveillant.demarrer()
+    _partage = app
+    return app
+
+
+def _fermer_contexte() -> None:
+    """Arrete la surveillance et les pools; le prochain client rechargera le ledger."""
+    global _partage, _surveillant
+    if _surveillant is not None:
+        _surveillant.arreter()
+        _surveillant = None
+    _partage = None
+    arreter_executeurs()
+
+
+@asynccontextmanager
+async def app_lifespan(server: FastMCP) -> AsyncIterator[AppContext]:
+    """Rend le ledger disponible aux outils d'une session.
+
+    Le premier client charge le ledger; les sessions suivantes (mode HTTP)
+    reprennent le meme AppContext deja chaud. Un thread surveille les
+    fichiers inclus et recharge le ledger en arriere-plan quand ils changent
+    (CLI, Fava, editeur): les outils lisent toujours le dernier ledger
+    complet sans attendre un re-parsing.
+    """
+    global _nb_sessions
+    with _partage_verrou:
+        app = _ouvrir_contexte()
+        _nb_sessions += 1
+    try:
+        yield app
+    finally:
+        with _partage_verrou:
+            _nb_sessions -= 1
+            # En HTTP, le contexte reste chaud entre les clients
+            if _nb_sessions == 0 and not _garder_chaud:
+                _fermer_contexte()
+
+
+def sessions_actives() -> int:
+    """Nombre de sessions clientes ouvertes sur le contexte partage."""
+    return _nb_sessions
+
+
+def lecture_seule(ctx) -> bool:
+    """Vrai si les mutations sont interdites pour la session de cette requete.
+
+    Le serveur entier peut etre en lecture seule (COMPTEQC_READONLY). En
+    mode HTTP, le mode de la session a ete fixe a son ouverture par
+    `ModeSessionsHttp`; une session inconnue du registre (ex: transport
+    sans etat) recoit la politique appliquee aux en-tetes de la requete.
+    """
+    contexte = ctx.request_context
+    if contexte.lifespan_context.read_only:
+        return True
+    requete = getattr(contexte, "request", None)
+    en_tetes = getattr(requete, "headers", None)
+    if en_tetes is None:
+        return False  # stdio: client local unique
+    session_id = en_tetes.get(MCP_SESSION_ID_HEADER)
+    with _modes_verrou:
+        mode = _modes_sessions.get(session_id) if session_id is not None else None
+    if mode is None:
+        return _politique.lecture_seule(en_tetes)
+    return mode
 
 
 mcp = FastMCP("CompteQC", lifespan=app_lifespan)
 
 # Importer les modules d'outils (ils s'enregistrent via @mcp.tool())
-import compteqc.mcp.tools.ledger  # noqa: E402, F401
-import compteqc.mcp.tools.quebec  # noqa: E402, F401
-import compteqc.mcp.tools.categorisation  # noqa: E402, F401
 import compteqc.mcp.tools.approbation  # noqa: E402, F401
+import compteqc.mcp.tools.categorisation  # noqa: E402, F401
+import compteqc.mcp.tools.diagnostics  # noqa: E402, F401
+import compteqc.mcp.tools.ledger  # noqa: E402, F401
 import compteqc.mcp.tools.paie  # noqa: E402, F401
+import compteqc.mcp.tools.quebec  # noqa: E402, F401
+import compteqc.mcp.tools.requete  # noqa: E402, F401
+
+
+def _servir_http() -> None:
+    """Sert l'application streamable-http derriere `ModeSessionsHttp`."""
+    import anyio
+    import uvicorn
+
+    config = uvicorn.Config(
+        ModeSessionsHttp(mcp.streamable_http_app()),
+        host=mcp.settings.host,
+        port=mcp.settings.port,
+        log_level=mcp.settings.log_level.lower(),
+    )
+    anyio.run(uvicorn.Server(config).serve)
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Lance le serveur en stdio (defaut) ou en HTTP multi-clients sur 127.0.0.1."""
+    global _garder_chaud
+    parser = argparse.ArgumentParser(description="Serveur MCP CompteQC")
+    parser.add_argument(
+        "--http", action="store_true", help="Transport streamable-http multi-clients"
+    )
+    parser.add_argument(
+        "--port", type=int, default=int(os.environ.get("COMPTEQC_MCP_PORT", PORT_DEFAUT))
+    )
+    parser.add_argument(
+        "--lecture-seule-par-defaut",
+        action="store_true",
+        help="Sessions HTTP en lecture seule sauf jeton COMPTEQC_JETON_ECRITURE",
+    )
+    args = parser.parse_args(argv)
+
+    if not args.http:
+        mcp.run(transport="stdio")
+        return
+
+    politique = PolitiqueSessions.depuis_env()
+    if args.lecture_seule_par_defaut:
+        politique = PolitiqueSessions(lecture_seule_par_defaut=True, jeton=politique.jeton)
+    if politique.lecture_seule_par_defaut and politique.jeton is None:
+        logger.warning("Aucun COMPTEQC_JETON_ECRITURE: toutes les sessions sont en lecture seule")
+    configurer_politique(politique)
+
+    mcp.settings.host = "127.0.0.1"
+    mcp.settings.port = args.port
+    _garder_chaud = True
+    try:
+        _servir_http()
+    finally:
+        with _partage_verrou:
+            _fermer_contexte()
+
 
 if __name__ == "__main__":
-    mcp.run(transport="stdio")
+    main()
@@ -6,34 +6,37 @@ de dupliquer la logique entre les outils MCP et les extensions Fava.
 
 from __future__ import annotations
 
+import datetime
 from decimal import Decimal
 
 from beancount import loader
 from beancount.core import data
 
+from compteqc.ledger.colonnes import table_postings
+from compteqc.ledger.miroir import miroir_ledger
+
 
 def charger_ledger(chemin: str) -> tuple[list, list, dict]:
     """Charge un fichier Beancount et retourne (entries, errors, options)."""
     return loader.load_file(chemin)
 
 
-def calculer_soldes(entries: list, filtre: str | None = None) -> dict[str, Decimal]:
+def calculer_soldes(
+    entries: list,
+    filtre: str | None = None,
+    date: datetime.date | None = None,
+) -> dict[str, Decimal]:
     """Calcule les soldes de chaque compte a partir des transactions.
 
     Args:
         entries: Liste d'entrees Beancount.
         filtre: Sous-chaine optionnelle pour filtrer les comptes.
+        date: Date du solde (inclusive). Tout l'historique si None.
 
     Returns:
         Dictionnaire {nom_compte: solde_CAD}.
     """
-    soldes: dict[str, Decimal] = {}
-    for entry in entries:
-        if isinstance(entry, data.Transaction):
-            for posting in entry.postings:
-                if posting.units:
-                    acct = posting.account
-                    soldes[acct] = soldes.get(acct, Decimal("0")) + posting.units.number
+    soldes = table_postings(entries).index_soldes().soldes_au(date)
 
     if filtre:
         filtre_upper = filtre.upper()
@@ -42,6 +45,100 @@ def calculer_soldes(entries: list, filtre: str | None = None) -> dict[str, Decim
     return soldes
 
 
+def calculer_variations(
+    entries: list,
+    debut: datetime.date | None = None,
+    fin: datetime.date | None = None,
+    prefixe: str | tuple[str, ...] | None = None,
+) -> dict[str, Decimal]:
+    """Calcule la variation de solde de chaque compte sur une periode.
+
+    Args:
+        entries: Liste d'entrees Beancount.
+        debut: Date de debut inclusive (None = depuis le debut).
+        fin: Date de fin inclusive (None = jusqu'a la fin).
+        prefixe: Prefixe(s) de compte (ex: ("Revenus", "Depenses")).
+
+    Returns:
+        Dictionnaire {nom_compte: variation_CAD} des comptes mouvementes.
+    """
+    return table_postings(entries).index_soldes().variations(debut, fin, prefixe)
+
+
+def postings_compte(
+    entries: list,
+    compte: str | None = None,
+    prefixe: str | None = None,
+    debut: datetime.date | None = None,
+    fin: datetime.date | None = None,
+) -> list[dict]:
+    """Liste les postings d'un compte (ou d'un prefixe) sur une periode.
+
+    Passe par le miroir SQLite indexe sur (compte, date): le cout depend du
+    nombre de postings retournes, pas de la taille du ledger.
+
+    Args:
+        entries: Liste d'entrees Beancount.
+        compte: Nom de compte exact (ex: "Passifs:Pret-Actionnaire").
+        prefixe: Prefixe de compte (ex: "Depenses:Repas").
+        debut: Date minimale (inclusive).
+        fin: Date maximale (inclusive).
+
+    Returns:
+        Liste de dicts avec date, compte, montant, payee, narration.
+    """
+    return [
+        {
+            "date": str(ligne.date),
+            "compte": ligne.compte,
+            "montant": ligne.montant,
+            "payee": ligne.payee,
+            "narration": ligne.narration,
+        }
+        for ligne in miroir_ledger(entries).postings(
+            compte=compte, prefixe=prefixe, debut=debut, fin=fin
+        )
+    ]
+
+
+def est_pending(entry) -> bool:
+    """Retourne True si l'entree est une transaction #pending."""
+    return isinstance(entry, data.Transaction) and bool(entry.tags) and "pending" in entry.tags
+
+
+def resume_pending(entry: data.Transaction) -> dict:
+    """Resume une transaction #pending (date, payee, metadonnees AI, montant).
+
+    Args:
+        entry: Transaction portant le tag pending.
+
+    Returns:
+        Dict avec date, payee, narration, confiance, source, compte_propose, montant.
+    """
+    # Montant = somme des postings positifs (debit side)
+    montant = Decimal("0")
+    for p in entry.postings:
+        if p.units and p.units.number > 0:
+            montant += p.units.number
+
+    # Meta keys: pending.py uses 'confiance'/'source_ia'/'compte_propose',
+    # while some paths use 'confidence'/'ai-source'. Support both.
+    meta = entry.meta or {}
+    confiance = meta.get("confiance", meta.get("confidence", "unknown"))
+    source = meta.get("source_ia", meta.get("ai-source", "unknown"))
+    compte_propose = meta.get("compte_propose", "")
+
+    return {
+        "date": str(entry.date),
+        "payee": entry.payee or "",
+        "narration": entry.narration or "",
+        "confiance": confiance,
+        "source": source,
+        "compte_propose": compte_propose,
+        "montant": montant,
+    }
+
+
 def lister_pending(entries: list) -> list[dict]:
     """Liste toutes les transactions #pending avec leurs metadonnees AI.
 
@@ -51,32 +148,7 @@ def lister_pending(entries: list) -> list[dict]:
     Returns:
         Liste de dicts avec date, payee, narration, confiance, source, montant.
     """
-    pending = []
-    for entry in entries:
-        if isinstance(entry, data.Transaction) and entry.tags and "pending" in entry.tags:
-            # Montant = somme des postings positifs (debit side)
-            montant = Decimal("0")
-            for p in entry.postings:
-                if p.units and p.units.number > 0:
-                    montant += p.units.number
-
-            # Meta keys: pending.py uses 'confiance'/'source_ia'/'compte_propose',
-            # while some paths use 'confidence'/'ai-source'. Support both.
-            meta = entry.meta or {}
-            confiance = meta.get("confiance", meta.get("confidence", "unknown"))
-            source = meta.get("source_ia", meta.get("ai-source", "unknown"))
-            compte_propose = meta.get("compte_propose", "")
-
-            pending.append({
-                "date": str(entry.date),
-                "payee": entry.payee or "",
-                "narration": entry.narration or "",
-                "confiance": confiance,
-                "source": source,
-                "compte_propose": compte_propose,
-                "montant": montant,
-            })
-    return pending
+    return [resume_pending(entry) for entry in entries if est_pending(entry)]
 
 
 def formater_montant(montant: Decimal) -> str:
@@ -6,13 +6,16 @@ Expose lister_pending, approuver_lot (avec garde-fou $2,000) et rejeter
 
 from __future__ import annotations
 
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 from mcp.server.fastmcp import Context
 from mcp.server.session import ServerSession
 
-from compteqc.mcp.server import AppContext, mcp
+from compteqc.ledger.verrou import ConflitVersion, VerrouEcriture
+from compteqc.mcp.execution import hors_boucle, progression
+from compteqc.mcp.pagination import LIMITE_DEFAUT, CurseurInvalide, paginer
+from compteqc.mcp.server import AppContext, lecture_seule, mcp
 from compteqc.mcp.services import formater_montant, lister_pending
 
 SEUIL_CONFIRMATION_MONTANT = Decimal("2000")
@@ -36,38 +39,123 @@ def _construire_id(entry: dict) -> str:
     return f"{entry['date']}|{entry['payee']}|{narration[:20]}"
 
 
+def _confiance(entry: dict) -> float | None:
+    """Confiance numerique d'une transaction pending (None si inconnue)."""
+    try:
+        return float(entry["confiance"])
+    except (TypeError, ValueError):
+        return None
+
+
+TRIS_PENDING = ("date", "montant", "confiance")
+
+
 @mcp.tool()
+@hors_boucle
 def lister_pending_tool(
+    recherche: str | None = None,
+    source: str | None = None,
+    confiance_max: float | None = None,
+    montant_min: str | None = None,
+    date_debut: str | None = None,
+    date_fin: str | None = None,
+    tri: str = "date",
+    decroissant: bool = False,
+    limite: int = LIMITE_DEFAUT,
+    curseur: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
     """Lister les transactions en attente de revision (#pending).
 
-    Retourne toutes les transactions marquees #pending avec leur confiance,
-    source IA, et identifiant composite pour approbation/rejet.
+    Retourne les transactions marquees #pending avec leur confiance,
+    source IA, et identifiant composite pour approbation/rejet. Resultats
+    filtres et pagines: passer `curseur_suivant` pour la page suivante.
+
+    Args:
+        recherche: Sous-chaine du beneficiaire ou de la description.
+        source: Source de la proposition (ex: "regles", "ml", "llm").
+        confiance_max: Seulement les confiances inferieures ou egales.
+        montant_min: Montant minimal (ex: "2000").
+        date_debut: Date minimale inclusive (format AAAA-MM-JJ).
+        date_fin: Date maximale inclusive (format AAAA-MM-JJ).
+        tri: "date", "montant" ou "confiance".
+        decroissant: Inverser l'ordre du tri.
+        limite: Nombre de transactions par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
     """
+    if tri not in TRIS_PENDING:
+        return {"erreur": f"Tri invalide: {tri} (valeurs: {', '.join(TRIS_PENDING)})"}
     app = ctx.request_context.lifespan_context
-    pending = lister_pending(app.entries)
-
-    transactions = []
-    for entry in pending:
-        transactions.append({
-            "id": _construire_id(entry),
-            "date": entry["date"],
-            "payee": entry["payee"],
-            "narration": entry["narration"],
-            "montant": formater_montant(entry["montant"]),
-            "confiance": entry["confiance"],
-            "source": entry["source"],
-            "compte_propose": entry.get("compte_propose", ""),
-        })
+    try:
+        minimum = Decimal(montant_min) if montant_min else None
+    except InvalidOperation:
+        return {"erreur": f"Montant invalide: {montant_min}"}
+    recherche_upper = recherche.upper() if recherche else None
+
+    def retenue(entry: dict) -> bool:
+        if recherche_upper and recherche_upper not in (
+            f"{entry['payee']} {entry['narration']}".upper()
+        ):
+            return False
+        if source and entry["source"] != source:
+            return False
+        if confiance_max is not None:
+            confiance = _confiance(entry)
+            if confiance is None or confiance > confiance_max:
+                return False
+        if minimum is not None and entry["montant"] < minimum:
+            return False
+        if date_debut and entry["date"] < date_debut:
+            return False
+        if date_fin and entry["date"] > date_fin:
+            return False
+        return True
+
+    def construire() -> list[dict]:
+        pending = [e for e in lister_pending(app.entries) if retenue(e)]
+        if tri == "montant":
+            pending.sort(key=lambda e: e["montant"], reverse=decroissant)
+        elif tri == "confiance":
+            # Confiance inconnue en dernier
+            pending.sort(
+                key=lambda e: (_confiance(e) is None, _confiance(e) or 0.0),
+                reverse=decroissant,
+            )
+        elif decroissant:
+            pending.sort(key=lambda e: e["date"], reverse=True)
+        return [
+            {
+                "id": _construire_id(entry),
+                "date": entry["date"],
+                "payee": entry["payee"],
+                "narration": entry["narration"],
+                "montant": formater_montant(entry["montant"]),
+                "confiance": entry["confiance"],
+                "source": entry["source"],
+                "compte_propose": entry.get("compte_propose", ""),
+            }
+            for entry in pending
+        ]
+
+    params = (
+        recherche, source, confiance_max, montant_min, date_debut, date_fin, tri, decroissant
+    )
+    try:
+        transactions, total, suivant = paginer(
+            app, "lister_pending", params, construire, curseur, limite
+        )
+    except CurseurInvalide as e:
+        return {"erreur": str(e)}
 
     return {
-        "nb_pending": len(transactions),
+        "nb_pending": total,
         "transactions": transactions,
+        "curseur_suivant": suivant,
     }
 
 
 @mcp.tool()
+@hors_boucle(ecriture=True, etapes=4)
 def approuver_lot(
     ids: list[str],
     confirmer_gros_montants: bool = False,
@@ -77,6 +165,8 @@ def approuver_lot(
 
     Les transactions de plus de 2 000 $ necessitent une confirmation explicite
     via confirmer_gros_montants=True. Apres approbation, le ledger est recharge.
+    Progression notifiee par etape (lecture, ecriture, validation,
+    confirmation); une annulation avant la confirmation n'ecrit rien.
 
     Args:
         ids: Liste d'identifiants composites (format: "date|payee|narration[:20]").
@@ -84,7 +174,7 @@ def approuver_lot(
     """
     app = ctx.request_context.lifespan_context
 
-    if app.read_only:
+    if lecture_seule(ctx):
         return {"status": "erreur", "message": MSG_LECTURE_SEULE}
 
     from compteqc.mcp.services import trouver_pending_par_id
@@ -92,8 +182,15 @@ def approuver_lot(
     chemin_p = _chemin_pending(app)
     chemin_m = _chemin_main(app)
 
+    suivi = progression()
+    suivi.etape("lecture")
+
+    # Les indices sont resolus sur la version chargee (verifiee a l'ecriture)
+    app.rafraichir()
+    etat = app.instantane()
+
     # Resoudre les IDs en indices
-    pending_list = lister_pending(app.entries)
+    pending_list = lister_pending(etat.entries)
     indices = []
     ids_introuvables = []
     gros_montants = []
@@ -130,7 +227,13 @@ def approuver_lot(
     # Approuver
     from compteqc.categorisation.pending import approuver_transactions
 
-    nb = approuver_transactions(chemin_p, chemin_m, indices)
+    try:
+        nb = approuver_transactions(
+            chemin_p, chemin_m, indices, version_attendue=etat.version, etape=suivi.etape
+        )
+    except ConflitVersion as e:
+        app.reload()
+        return {"status": "erreur", "message": str(e)}
     app.reload()
 
     return {
@@ -141,6 +244,7 @@ def approuver_lot(
 
 
 @mcp.tool()
+@hors_boucle(ecriture=True, etapes=2)
 def rejeter(
     id: str,
     compte_corrige: str | None = None,
@@ -159,14 +263,18 @@ def rejeter(
     """
     app = ctx.request_context.lifespan_context
 
-    if app.read_only:
+    if lecture_seule(ctx):
         return {"status": "erreur", "message": MSG_LECTURE_SEULE}
 
     from compteqc.mcp.services import trouver_pending_par_id
 
     chemin_p = _chemin_pending(app)
+    suivi = progression()
+    suivi.etape("lecture")
 
-    pending_list = lister_pending(app.entries)
+    app.rafraichir()
+    etat = app.instantane()
+    pending_list = lister_pending(etat.entries)
     idx = trouver_pending_par_id(pending_list, id)
 
     if idx is None:
@@ -175,13 +283,20 @@ def rejeter(
             "message": f"Transaction introuvable: {id}",
         }
 
-    # Si correction de compte, mettre a jour la transaction pending avant rejet
-    if compte_corrige:
-        _corriger_pending(chemin_p, idx, compte_corrige)
-
     from compteqc.categorisation.pending import rejeter_transactions
 
-    nb = rejeter_transactions(chemin_p, [idx])
+    # Correction et rejet sous un meme verrou, sur la version chargee
+    try:
+        with VerrouEcriture(chemin_p.parent, version_attendue=etat.version):
+            suivi.etape("ecriture")
+            # Si correction de compte, mettre a jour la transaction pending avant rejet
+            if compte_corrige:
+                _corriger_pending(chemin_p, idx, compte_corrige)
+
+            nb = rejeter_transactions(chemin_p, [idx])
+    except ConflitVersion as e:
+        app.reload()
+        return {"status": "erreur", "message": str(e)}
     app.reload()
 
     msg = f"Transaction rejetee."
@@ -209,49 +324,51 @@ def _corriger_pending(chemin_pending: Path, idx: int, nouveau_compte: str) -> No
 
     from compteqc.categorisation.pending import _ENTETE_PENDING, lire_pending
 
-    pending = lire_pending(chemin_pending)
-    if idx >= len(pending):
-        return
-
-    txn = pending[idx]
-
-    # Mettre a jour les metadata
-    meta = copy.copy(txn.meta)
-    meta["source_ia"] = "human"
-    meta["confiance"] = "1.0"
-    meta["compte_propose"] = nouveau_compte
-
-    # Remplacer le compte dans les postings de depenses
-    nouveaux_postings = []
-    for posting in txn.postings:
-        if posting.account.startswith("Depenses:"):
-            nouveau = data.Posting(
-                account=nouveau_compte,
-                units=posting.units,
-                cost=posting.cost,
-                price=posting.price,
-                flag=posting.flag,
-                meta=posting.meta,
-            )
-            nouveaux_postings.append(nouveau)
-        else:
-            nouveaux_postings.append(posting)
-
-    txn_corrigee = data.Transaction(
-        meta=meta,
-        date=txn.date,
-        flag=txn.flag,
-        payee=txn.payee,
-        narration=txn.narration,
-        tags=txn.tags,
-        links=txn.links,
-        postings=nouveaux_postings,
-    )
-
-    pending[idx] = txn_corrigee
-
-    # Reecrire le fichier
-    contenu = _ENTETE_PENDING
-    if pending:
-        contenu += "\n" + "\n".join(printer.format_entry(t) for t in pending)
-    chemin_pending.write_text(contenu, encoding="utf-8")
+    with VerrouEcriture(chemin_pending.parent) as verrou:
+        pending = lire_pending(chemin_pending)
+        if idx >= len(pending):
+            return
+
+        txn = pending[idx]
+
+        # Mettre a jour les metadata
+        meta = copy.copy(txn.meta)
+        meta["source_ia"] = "human"
+        meta["confiance"] = "1.0"
+        meta["compte_propose"] = nouveau_compte
+
+        # Remplacer le compte dans les postings de depenses
+        nouveaux_postings = []
+        for posting in txn.postings:
+            if posting.account.startswith("Depenses:"):
+                nouveau = data.Posting(
+                    account=nouveau_compte,
+                    units=posting.units,
+                    cost=posting.cost,
+                    price=posting.price,
+                    flag=posting.flag,
+                    meta=posting.meta,
+                )
+                nouveaux_postings.append(nouveau)
+            else:
+                nouveaux_postings.append(posting)
+
+        txn_corrigee = data.Transaction(
+            meta=meta,
+            date=txn.date,
+            flag=txn.flag,
+            payee=txn.payee,
+            narration=txn.narration,
+            tags=txn.tags,
+            links=txn.links,
+            postings=nouveaux_postings,
+        )
+
+        pending[idx] = txn_corrigee
+
+        # Reecrire le fichier
+        contenu = _ENTETE_PENDING
+        if pending:
+            contenu += "\n" + "\n".join(printer.format_entry(t) for t in pending)
+        chemin_pending.write_text(contenu, encoding="utf-8")
+        verrou.modifie()
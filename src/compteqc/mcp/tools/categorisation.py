@@ -13,6 +13,7 @@ from decimal import Decimal, InvalidOperation
 from mcp.server.fastmcp import Context
 from mcp.server.session import ServerSession
 
+from compteqc.mcp.execution import hors_boucle
 from compteqc.mcp.server import AppContext, mcp
 
 logger = logging.getLogger(__name__)
@@ -33,6 +34,7 @@ def _construire_raison(source: str, compte: str, confiance: float, regle: str |
 
 
 @mcp.tool()
+@hors_boucle
 def proposer_categorie(
     payee: str,
     narration: str,
@@ -0,0 +1,40 @@
+"""Outil MCP de diagnostic du serveur (cache des resultats, etat du ledger)."""
+
+from __future__ import annotations
+
+from mcp.server.fastmcp import Context
+from mcp.server.session import ServerSession
+
+from compteqc.mcp import execution
+from compteqc.mcp.execution import hors_boucle
+from compteqc.mcp.server import AppContext, lecture_seule, mcp, sessions_actives
+
+
+@mcp.tool()
+@hors_boucle
+def diagnostics(
+    ctx: Context[ServerSession, AppContext] = None,
+) -> dict:
+    """Afficher l'etat interne du serveur: ledger charge et cache des outils.
+
+    Montre la version et la generation du ledger en memoire, le nombre
+    d'entrees et d'erreurs, et les compteurs du cache des outils de
+    consultation (succes, echecs, evictions, invalidations, par outil),
+    ainsi que les mutations en attente dans la file d'ecriture et le nombre
+    de sessions clientes partageant le ledger (mode HTTP).
+    """
+    app = ctx.request_context.lifespan_context
+    etat = app.instantane()
+    return {
+        "ledger": {
+            "chemin": app.ledger_path,
+            "version": etat.version,
+            "generation": app.generation,
+            "nb_entrees": len(etat.entries),
+            "nb_erreurs": len(etat.errors),
+            "lecture_seule": lecture_seule(ctx),
+        },
+        "sessions": sessions_actives(),
+        "cache": app.cache.statistiques(),
+        "execution": execution.statistiques(),
+    }
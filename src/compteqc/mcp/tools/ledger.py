@@ -12,75 +12,130 @@ from decimal import Decimal
 from mcp.server.fastmcp import Context
 from mcp.server.session import ServerSession
 
+from compteqc.ledger.arbre import arbre_soldes
+from compteqc.mcp.cache import memoiser
+from compteqc.mcp.execution import hors_boucle
+from compteqc.mcp.pagination import LIMITE_DEFAUT, CurseurInvalide, paginer, paginer_sections
 from compteqc.mcp.server import AppContext, mcp
-from compteqc.mcp.services import calculer_soldes, formater_montant
+from compteqc.mcp.services import calculer_soldes, calculer_variations, formater_montant
 
-MAX_ITEMS = 50
+MAX_ITEMS = LIMITE_DEFAUT
+TRIS_SOLDES = ("compte", "solde")
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def soldes_comptes(
     filtre: str | None = None,
+    date: str | None = None,
+    tri: str = "compte",
+    decroissant: bool = False,
+    limite: int = MAX_ITEMS,
+    curseur: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
     """Afficher les soldes de tous les comptes du ledger.
 
     Filtre optionnel par sous-chaine sur le nom du compte
     (ex: "Depenses", "Actifs:Banque"). Les comptes a solde zero sont exclus.
-    Limite a 50 resultats; le champ tronque indique si la liste est incomplete.
+    Resultats pagines: passer `curseur_suivant` pour obtenir la page suivante
+    (le champ tronque indique qu'il reste des comptes).
 
     Args:
         filtre: Sous-chaine pour filtrer les comptes (insensible a la casse).
+        date: Soldes en fin de journee a cette date (format AAAA-MM-JJ).
+        tri: "compte" (ordre alphabetique) ou "solde".
+        decroissant: Inverser l'ordre du tri.
+        limite: Nombre de comptes par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
     """
+    if tri not in TRIS_SOLDES:
+        return {"erreur": f"Tri invalide: {tri} (valeurs: {', '.join(TRIS_SOLDES)})"}
     app = ctx.request_context.lifespan_context
-    soldes = calculer_soldes(app.entries, filtre=filtre)
-
-    comptes = [
-        {"compte": k, "solde": formater_montant(v)}
-        for k, v in sorted(soldes.items())
-        if v != Decimal("0")
-    ]
+    d_solde = datetime.date.fromisoformat(date) if date else None
+
+    def construire() -> list[dict]:
+        soldes = calculer_soldes(app.entries, filtre=filtre, date=d_solde)
+        non_nuls = [(k, v) for k, v in soldes.items() if v != Decimal("0")]
+        cle = (lambda kv: kv[0]) if tri == "compte" else (lambda kv: (kv[1], kv[0]))
+        non_nuls.sort(key=cle, reverse=decroissant)
+        return [{"compte": k, "solde": formater_montant(v)} for k, v in non_nuls]
+
+    params = (filtre, date, tri, decroissant)
+    try:
+        comptes, total, suivant = paginer(
+            app, "soldes_comptes", params, construire, curseur, limite
+        )
+    except CurseurInvalide as e:
+        return {"erreur": str(e)}
     return {
-        "nb_comptes": len(comptes),
-        "comptes": comptes[:MAX_ITEMS],
-        "tronque": len(comptes) > MAX_ITEMS,
+        "nb_comptes": total,
+        "comptes": comptes,
+        "tronque": suivant is not None,
+        "curseur_suivant": suivant,
     }
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def balance_verification(
+    filtre: str | None = None,
+    limite: int = MAX_ITEMS,
+    curseur: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
     """Afficher la balance de verification (trial balance).
 
     Montre les debits et credits par compte, groupes par categorie
     (Actifs, Passifs, Capital, Revenus, Depenses).
-    Verifie que total debits = total credits.
+    Verifie que total debits = total credits (sur tous les comptes, quel
+    que soit le filtre). Liste des comptes paginee par curseur.
+
+    Args:
+        filtre: Sous-chaine pour filtrer les comptes listes (insensible a la casse).
+        limite: Nombre de comptes par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
     """
     app = ctx.request_context.lifespan_context
     soldes = calculer_soldes(app.entries)
 
     categories = ["Actifs", "Passifs", "Capital", "Revenus", "Depenses"]
-    comptes = []
-    total_debits = Decimal("0")
-    total_credits = Decimal("0")
-
-    for categorie in categories:
-        comptes_cat = {
-            k: v for k, v in sorted(soldes.items())
-            if k.startswith(categorie) and v != Decimal("0")
-        }
-        for nom, montant in comptes_cat.items():
-            if montant > 0:
-                comptes.append({"compte": nom, "debit": formater_montant(montant), "credit": ""})
-                total_debits += montant
-            else:
-                comptes.append({"compte": nom, "debit": "", "credit": formater_montant(abs(montant))})
-                total_credits += abs(montant)
-
+    total_debits = sum((v for v in soldes.values() if v > 0), Decimal("0"))
+    total_credits = sum((-v for v in soldes.values() if v < 0), Decimal("0"))
+
+    def construire() -> list[dict]:
+        comptes = []
+        filtre_upper = filtre.upper() if filtre else None
+        for categorie in categories:
+            comptes_cat = {
+                k: v for k, v in sorted(soldes.items())
+                if k.startswith(categorie) and v != Decimal("0")
+                and (filtre_upper is None or filtre_upper in k.upper())
+            }
+            for nom, montant in comptes_cat.items():
+                if montant > 0:
+                    comptes.append(
+                        {"compte": nom, "debit": formater_montant(montant), "credit": ""}
+                    )
+                else:
+                    comptes.append(
+                        {"compte": nom, "debit": "", "credit": formater_montant(abs(montant))}
+                    )
+        return comptes
+
+    try:
+        comptes, total, suivant = paginer(
+            app, "balance_verification", (filtre,), construire, curseur, limite
+        )
+    except CurseurInvalide as e:
+        return {"erreur": str(e)}
     return {
-        "comptes": comptes[:MAX_ITEMS],
-        "tronque": len(comptes) > MAX_ITEMS,
+        "nb_comptes": total,
+        "comptes": comptes,
+        "tronque": suivant is not None,
+        "curseur_suivant": suivant,
         "total_debits": formater_montant(total_debits),
         "total_credits": formater_montant(total_credits),
         "equilibre": total_debits == total_credits,
@@ -88,131 +143,142 @@ def balance_verification(
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def etat_resultats(
     date_debut: str | None = None,
     date_fin: str | None = None,
+    limite: int = MAX_ITEMS,
+    curseur: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
     """Afficher l'etat des resultats (revenus et depenses) pour une periode.
 
     Sans filtres de dates, affiche toutes les transactions.
     Les revenus sont affiches en valeur absolue (positif = revenu gagne).
+    Les listes de revenus et de depenses sont paginees ensemble: chaque page
+    avance de `limite` comptes dans chacune; les totaux portent sur tout.
 
     Args:
         date_debut: Date de debut inclusive (format AAAA-MM-JJ).
         date_fin: Date de fin inclusive (format AAAA-MM-JJ).
+        limite: Nombre de comptes par liste et par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
     """
-    from beancount.core import data
-
     app = ctx.request_context.lifespan_context
     d_debut = datetime.date.fromisoformat(date_debut) if date_debut else None
     d_fin = datetime.date.fromisoformat(date_fin) if date_fin else None
 
-    revenus: dict[str, Decimal] = {}
-    depenses: dict[str, Decimal] = {}
-
-    for entry in app.entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if d_debut and entry.date < d_debut:
-            continue
-        if d_fin and entry.date > d_fin:
-            continue
-
-        for posting in entry.postings:
-            if posting.units is None:
-                continue
-            acct = posting.account
-            montant = posting.units.number
-            if acct.startswith("Revenus"):
-                revenus[acct] = revenus.get(acct, Decimal("0")) + montant
-            elif acct.startswith("Depenses"):
-                depenses[acct] = depenses.get(acct, Decimal("0")) + montant
-
-    # Revenus sont negatifs en beancount (credits) -> afficher en positif
-    liste_revenus = [
-        {"compte": k, "montant": formater_montant(-v)}
-        for k, v in sorted(revenus.items())
-    ]
-    total_revenus = sum(-v for v in revenus.values())
+    variations = calculer_variations(
+        app.entries, debut=d_debut, fin=d_fin, prefixe=("Revenus", "Depenses")
+    )
+    revenus = {k: v for k, v in variations.items() if k.startswith("Revenus")}
+    depenses = {k: v for k, v in variations.items() if k.startswith("Depenses")}
 
-    liste_depenses = [
-        {"compte": k, "montant": formater_montant(v)}
-        for k, v in sorted(depenses.items())
-    ]
+    total_revenus = sum(-v for v in revenus.values())
     total_depenses = sum(depenses.values())
-
     resultat_net = total_revenus - total_depenses
 
+    sections = {
+        # Revenus sont negatifs en beancount (credits) -> afficher en positif
+        "revenus": lambda: [
+            {"compte": k, "montant": formater_montant(-v)} for k, v in sorted(revenus.items())
+        ],
+        "depenses": lambda: [
+            {"compte": k, "montant": formater_montant(v)} for k, v in sorted(depenses.items())
+        ],
+    }
+    try:
+        pages, totaux, suivant = paginer_sections(
+            app, "etat_resultats", (date_debut, date_fin), sections, curseur, limite
+        )
+    except CurseurInvalide as e:
+        return {"erreur": str(e)}
+
     return {
-        "revenus": liste_revenus[:MAX_ITEMS],
-        "depenses": liste_depenses[:MAX_ITEMS],
+        "revenus": pages["revenus"],
+        "depenses": pages["depenses"],
+        "nb_revenus": totaux["revenus"],
+        "nb_depenses": totaux["depenses"],
         "total_revenus": formater_montant(total_revenus),
         "total_depenses": formater_montant(total_depenses),
         "resultat_net": formater_montant(resultat_net),
-        "tronque": len(liste_revenus) > MAX_ITEMS or len(liste_depenses) > MAX_ITEMS,
+        "tronque": suivant is not None,
+        "curseur_suivant": suivant,
     }
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def bilan(
+    date: str | None = None,
+    limite: int = MAX_ITEMS,
+    curseur: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
     """Afficher le bilan (actifs, passifs, capitaux propres).
 
     Verifie l'equation comptable: Actifs = Passifs + Capitaux propres.
-    Le resultat net est inclus dans les capitaux propres.
+    Le resultat net est inclus dans les capitaux propres. Les trois listes
+    sont paginees ensemble par curseur; les totaux portent sur tout.
+
+    Args:
+        date: Bilan en fin de journee a cette date (format AAAA-MM-JJ).
+        limite: Nombre de comptes par liste et par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
     """
     app = ctx.request_context.lifespan_context
-    soldes = calculer_soldes(app.entries)
-
-    actifs: dict[str, Decimal] = {}
-    passifs: dict[str, Decimal] = {}
-    capitaux: dict[str, Decimal] = {}
+    d_bilan = datetime.date.fromisoformat(date) if date else None
+    arbre = arbre_soldes(app.entries, date=d_bilan)
 
-    for acct, montant in soldes.items():
-        if montant == Decimal("0"):
-            continue
-        if acct.startswith("Actifs"):
-            actifs[acct] = montant
-        elif acct.startswith("Passifs"):
-            passifs[acct] = montant
-        elif acct.startswith("Capital"):
-            capitaux[acct] = montant
+    actifs = arbre.soldes("Actifs", non_nuls=True)
+    passifs = arbre.soldes("Passifs", non_nuls=True)
+    capitaux = arbre.soldes("Capital", non_nuls=True)
 
     # Resultat net = Revenus (inverses) - Depenses
-    resultat_net = Decimal("0")
-    for acct, montant in soldes.items():
-        if acct.startswith("Revenus"):
-            resultat_net -= montant  # credits sont negatifs -> -(-x) = +x
-        elif acct.startswith("Depenses"):
-            resultat_net -= montant  # debits sont positifs -> -(+x) = -x
+    resultat_net = -(arbre.sous_total("Revenus") + arbre.sous_total("Depenses"))
 
     total_actifs = sum(actifs.values())
     total_passifs = sum(abs(v) for v in passifs.values())
     total_capitaux = sum(abs(v) for v in capitaux.values()) + resultat_net
     total_passifs_capitaux = total_passifs + total_capitaux
 
-    return {
-        "actifs": [
-            {"compte": k, "montant": formater_montant(v)}
-            for k, v in sorted(actifs.items())
-        ][:MAX_ITEMS],
-        "passifs": [
-            {"compte": k, "montant": formater_montant(abs(v))}
-            for k, v in sorted(passifs.items())
-        ][:MAX_ITEMS],
-        "capitaux_propres": [
+    def construire_capitaux() -> list[dict]:
+        lignes = [
             {"compte": k, "montant": formater_montant(abs(v))}
             for k, v in sorted(capitaux.items())
-        ] + ([{"compte": "Resultat net de l'exercice", "montant": formater_montant(resultat_net)}] if resultat_net != 0 else []),
+        ]
+        if resultat_net != 0:
+            lignes.append({
+                "compte": "Resultat net de l'exercice",
+                "montant": formater_montant(resultat_net),
+            })
+        return lignes
+
+    sections = {
+        "actifs": lambda: [
+            {"compte": k, "montant": formater_montant(v)} for k, v in sorted(actifs.items())
+        ],
+        "passifs": lambda: [
+            {"compte": k, "montant": formater_montant(abs(v))}
+            for k, v in sorted(passifs.items())
+        ],
+        "capitaux_propres": construire_capitaux,
+    }
+    try:
+        pages, _, suivant = paginer_sections(app, "bilan", (date,), sections, curseur, limite)
+    except CurseurInvalide as e:
+        return {"erreur": str(e)}
+
+    return {
+        "actifs": pages["actifs"],
+        "passifs": pages["passifs"],
+        "capitaux_propres": pages["capitaux_propres"],
         "total_actifs": formater_montant(total_actifs),
         "total_passifs": formater_montant(total_passifs),
         "total_capitaux_propres": formater_montant(total_capitaux),
         "equilibre": total_actifs == total_passifs_capitaux,
-        "tronque": (
-            len(actifs) > MAX_ITEMS
-            or len(passifs) > MAX_ITEMS
-            or len(capitaux) > MAX_ITEMS
-        ),
+        "tronque": suivant is not None,
+        "curseur_suivant": suivant,
     }
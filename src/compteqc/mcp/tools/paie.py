@@ -16,7 +16,8 @@ from beancount.parser import printer
 from mcp.server.fastmcp import Context
 from mcp.server.session import ServerSession
 
-from compteqc.mcp.server import AppContext, mcp
+from compteqc.mcp.execution import hors_boucle, progression
+from compteqc.mcp.server import AppContext, lecture_seule, mcp
 from compteqc.mcp.services import formater_montant
 
 logger = logging.getLogger(__name__)
@@ -115,6 +116,7 @@ def _message_confirmation(raison: str, brut: Decimal, dernier_brut: Decimal | No
 
 
 @mcp.tool()
+@hors_boucle
 def calculer_paie_tool(
     salaire_brut: str,
     nb_periodes: int = 26,
@@ -160,6 +162,7 @@ def calculer_paie_tool(
 
 
 @mcp.tool()
+@hors_boucle(ecriture=True, etapes=3)
 def lancer_paie(
     salaire_brut: str,
     nb_periodes: int = 26,
@@ -171,6 +174,8 @@ def lancer_paie(
 
     Necessite confirmation si le montant differe de la derniere paie
     ou depasse 2 000 $. Le champ raison precise le motif de confirmation.
+    Progression notifiee par etape (calcul, ecriture, confirmation); une
+    annulation avant la confirmation n'ecrit rien.
 
     Args:
         salaire_brut: Salaire brut en CAD (ex: "4230.77").
@@ -180,7 +185,7 @@ def lancer_paie(
     """
     app = ctx.request_context.lifespan_context
 
-    if app.read_only:
+    if lecture_seule(ctx):
         return {"status": "erreur", "message": MSG_LECTURE_SEULE}
 
     try:
@@ -195,8 +200,12 @@ def lancer_paie(
         except (InvalidOperation, ValueError):
             return {"erreur": f"Offset invalide: {offset_pret}"}
 
+    # Le numero de periode est calcule sur la version chargee (verifiee a l'ecriture)
+    app.rafraichir()
+    etat = app.instantane()
+
     # Garde-fou unifie
-    dernier_brut = _trouver_dernier_brut(app.entries)
+    dernier_brut = _trouver_dernier_brut(etat.entries)
     raison = _determiner_raison_confirmation(brut, dernier_brut)
 
     if raison and not confirmer:
@@ -205,7 +214,7 @@ def lancer_paie(
         from beancount.core import data
 
         nb_paies = sum(
-            1 for e in app.entries
+            1 for e in etat.entries
             if isinstance(e, data.Transaction) and e.tags and "paie" in e.tags
         )
         try:
@@ -231,9 +240,14 @@ def lancer_paie(
     from compteqc.quebec.paie.moteur import calculer_paie as calc_paie
     from compteqc.quebec.paie.journal import generer_transaction_paie
     from compteqc.ledger.fichiers import ecrire_transactions, chemin_fichier_mensuel, ajouter_include
+    from compteqc.ledger.cloture import ExerciceCloture
+    from compteqc.ledger.journal import JournalEcritures
+    from compteqc.ledger.verrou import ConflitVersion
 
+    suivi = progression()
+    suivi.etape("calcul")
     nb_paies = sum(
-        1 for e in app.entries
+        1 for e in etat.entries
         if isinstance(e, data.Transaction) and e.tags and "paie" in e.tags
     )
     numero_periode = nb_paies + 1
@@ -248,16 +262,24 @@ def lancer_paie(
     date_paie = datetime.date.today()
     txn = generer_transaction_paie(date_paie, resultat, salary_offset=offset)
 
-    # Ecrire dans le fichier mensuel
+    # Ecrire dans le fichier mensuel et assurer l'include dans main.beancount,
+    # sauf si un autre ecrivain a modifie le ledger depuis le calcul
     ledger_dir = Path(app.ledger_path).parent
-    fichier_mensuel = chemin_fichier_mensuel(date_paie.year, date_paie.month, ledger_dir)
-    texte = printer.format_entry(txn)
-    ecrire_transactions(fichier_mensuel, texte)
-
-    # Assurer l'include dans main.beancount
     chemin_main = Path(app.ledger_path)
-    chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
-    ajouter_include(chemin_main, chemin_relatif)
+    texte = printer.format_entry(txn)
+    try:
+        with JournalEcritures(ledger_dir, "paie", version_attendue=etat.version) as journal:
+            suivi.etape("ecriture")
+            fichier_mensuel = chemin_fichier_mensuel(
+                date_paie.year, date_paie.month, ledger_dir, journal=journal
+            )
+            ecrire_transactions(fichier_mensuel, texte, journal=journal)
+            chemin_relatif = str(fichier_mensuel.relative_to(ledger_dir))
+            ajouter_include(chemin_main, chemin_relatif, journal=journal)
+            suivi.etape("confirmation")
+    except (ConflitVersion, ExerciceCloture) as e:
+        app.reload()
+        return {"status": "erreur", "message": str(e)}
 
     app.reload()
 
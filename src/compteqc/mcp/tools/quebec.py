@@ -6,15 +6,20 @@ Delegue aux modules existants de compteqc.quebec.* pour les calculs.
 from __future__ import annotations
 
 import datetime
+from pathlib import Path
 
 from mcp.server.fastmcp import Context
 from mcp.server.session import ServerSession
 
+from compteqc.mcp.cache import memoiser
+from compteqc.mcp.execution import hors_boucle
 from compteqc.mcp.server import AppContext, mcp
 from compteqc.mcp.services import formater_montant
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def sommaire_tps_tvq(
     periode: str | None = None,
     ctx: Context[ServerSession, AppContext] = None,
@@ -69,7 +74,14 @@ def _formater_sommaire(s) -> dict:
     }
 
 
+def _registre_actifs(app: AppContext) -> list[Path]:
+    """Registre d'actifs lu par etat_dpa (hors ledger, suivi par le cache)."""
+    return [Path(app.ledger_path).parent / "actifs.yaml"]
+
+
 @mcp.tool()
+@hors_boucle
+@memoiser(fichiers=_registre_actifs)
 def etat_dpa(
     annee: int | None = None,
     ctx: Context[ServerSession, AppContext] = None,
@@ -123,6 +135,8 @@ def etat_dpa(
 
 
 @mcp.tool()
+@hors_boucle
+@memoiser
 def etat_pret_actionnaire(
     ctx: Context[ServerSession, AppContext] = None,
 ) -> dict:
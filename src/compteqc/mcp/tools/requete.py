@@ -0,0 +1,79 @@
+"""Outil MCP de requete ad hoc (BQL) sur le ledger en memoire.
+
+Repond en un appel aux questions que les rapports fixes ne couvrent pas.
+Le resultat complet d'une requete est calcule une fois par chargement du
+ledger puis servi page par page (curseur).
+"""
+
+from __future__ import annotations
+
+from mcp.server.fastmcp import Context
+from mcp.server.session import ServerSession
+
+from compteqc.ledger.requete import (
+    DELAI_DEFAUT,
+    LIGNES_MAX,
+    DelaiRequeteDepasse,
+    RequeteInvalide,
+    moteur_requetes,
+    valeur_json,
+)
+from compteqc.mcp.execution import hors_boucle
+from compteqc.mcp.pagination import LIMITE_DEFAUT, CurseurInvalide, index_liste, paginer
+from compteqc.mcp.server import AppContext, mcp
+
+
+@mcp.tool()
+@hors_boucle
+def requete(
+    bql: str,
+    limite: int = LIMITE_DEFAUT,
+    curseur: str | None = None,
+    ctx: Context[ServerSession, AppContext] = None,
+) -> dict:
+    """Executer une requete BQL (beanquery) en lecture seule sur le ledger.
+
+    Tables: postings (defaut), transactions, balances, accounts, entries...
+    Exemples:
+      SELECT account, sum(position) WHERE account ~ '^Depenses' GROUP BY account
+      SELECT date, payee, position WHERE account = 'Depenses:Repas' AND year = 2026
+      BALANCES FROM year = 2026
+      JOURNAL 'Passifs:Pret-Actionnaire'
+
+    Au plus 10 000 lignes et 10 secondes par requete. Resultats pagines:
+    passer `curseur_suivant` pour la page suivante.
+
+    Args:
+        bql: Requete SELECT, BALANCES ou JOURNAL.
+        limite: Nombre de lignes par page (defaut 50, max 500).
+        curseur: Curseur retourne par la page precedente.
+    """
+    app = ctx.request_context.lifespan_context
+    texte = bql.strip()
+
+    def executer():
+        etat = app.instantane()
+        moteur = moteur_requetes(etat.entries, etat.errors, etat.options)
+        return moteur.executer(texte, lignes_max=LIGNES_MAX, delai=DELAI_DEFAUT)
+
+    try:
+        resultat = index_liste(app, "requete.resultat", (texte,), executer)
+        lignes, total, suivant = paginer(
+            app,
+            "requete",
+            (texte,),
+            lambda: [[valeur_json(v) for v in ligne] for ligne in resultat.lignes],
+            curseur,
+            limite,
+        )
+    except (RequeteInvalide, DelaiRequeteDepasse, CurseurInvalide) as e:
+        return {"erreur": str(e)}
+
+    return {
+        "colonnes": [{"nom": nom, "type": type_} for nom, type_ in resultat.colonnes],
+        "lignes": lignes,
+        "nb_lignes": total,
+        "lignes_max_atteint": resultat.tronque,
+        "curseur_suivant": suivant,
+        "duree_ms": round(resultat.duree * 1000, 1),
+    }
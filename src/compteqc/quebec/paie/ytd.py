@@ -4,10 +4,12 @@ Derive les totaux directement des transactions existantes (source unique de veri
 Utilise les sous-comptes de passifs pour un suivi par type de cotisation.
 """
 
+import datetime
 from decimal import Decimal
 
 from beancount import loader
-from beancount.core import data
+
+from compteqc.ledger.colonnes import table_postings
 
 # Mappage: cle de cumul -> compte Beancount correspondant
 # Les montants dans les comptes de passifs sont negatifs (credits),
@@ -62,30 +64,22 @@ def calculer_cumuls_depuis_transactions(
     """
     cumuls = _cumuls_vides()
 
-    # Index inverse: compte -> cle de cumul
-    compte_vers_cle = {compte: cle for cle, compte in TOUS_COMPTES.items()}
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.date.year != annee:
-            continue
-        if not entry.tags or "paie" not in entry.tags:
-            continue
-
-        for posting in entry.postings:
-            compte = posting.account
-
-            # Accumulation par sous-compte de passif
-            if compte in compte_vers_cle:
-                cle = compte_vers_cle[compte]
-                # Les passifs sont credites (negatifs) -- on veut le cumul positif
-                montant = abs(posting.units.number)
-                cumuls[cle] += montant
-
-            # Suivi des gains bruts (pour normes du travail)
-            if compte == "Depenses:Salaires:Brut":
-                cumuls["gains_bruts"] += posting.units.number
+    table = table_postings(entries)
+    periode = {
+        "debut": datetime.date(annee, 1, 1),
+        "fin": datetime.date(annee, 12, 31),
+        "tag": "paie",
+    }
+
+    # Les passifs sont credites (negatifs) -- on veut le cumul positif
+    absolus = table.soldes(**periode, prefixe="Passifs:", valeur_absolue=True)
+    for cle, compte in TOUS_COMPTES.items():
+        if compte in absolus:
+            cumuls[cle] += absolus[compte]
+
+    # Suivi des gains bruts (pour normes du travail)
+    bruts = table.soldes(**periode, prefixe="Depenses:Salaires:Brut")
+    cumuls["gains_bruts"] += bruts.get("Depenses:Salaires:Brut", Decimal("0"))
 
     return cumuls
 
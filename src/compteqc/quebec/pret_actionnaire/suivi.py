@@ -12,7 +12,8 @@ import datetime
 from dataclasses import dataclass, field
 from decimal import Decimal
 
-from beancount.core import data
+from compteqc.ledger.cloture import TAG_OUVERTURE
+from compteqc.ledger.miroir import miroir_ledger
 
 
 @dataclass
@@ -38,6 +39,30 @@ class EtatPret:
 COMPTE_PRET_ACTIONNAIRE = "Passifs:Pret-Actionnaire"
 
 
+def mouvement_pret(date: datetime.date, montant: Decimal, description: str) -> MouvementPret:
+    """Mouvement du pret: avance si le montant est positif, sinon remboursement."""
+    return MouvementPret(
+        date=date,
+        montant=montant,
+        description=description,
+        type="avance" if montant > 0 else "remboursement",
+    )
+
+
+def mouvement_depuis_posting(entry, posting) -> MouvementPret | None:
+    """Mouvement du pret porte par un posting d'une transaction.
+
+    Returns:
+        None si le posting n'est pas au compte du pret, n'a pas de montant,
+        ou reporte le solde d'un exercice cloture (tag #ouverture).
+    """
+    if posting.account != COMPTE_PRET_ACTIONNAIRE or posting.units is None:
+        return None
+    if entry.tags and TAG_OUVERTURE in entry.tags:
+        return None
+    return mouvement_pret(entry.date, posting.units.number, entry.narration or "")
+
+
 def calculer_etat_pret(
     mouvements: list[MouvementPret],
 ) -> EtatPret:
@@ -93,8 +118,10 @@ def obtenir_etat_pret(
 ) -> EtatPret:
     """Derive l'etat du pret actionnaire depuis les entrees Beancount.
 
-    Lit les transactions du grand-livre, filtre par annee fiscale et par compte
-    Passifs:Pret-Actionnaire, puis delegue a calculer_etat_pret.
+    Interroge le miroir SQLite du grand-livre (index compte/date) pour les
+    postings de Passifs:Pret-Actionnaire de l'annee fiscale, puis delegue a
+    calculer_etat_pret. Le report du solde par la cloture de l'exercice
+    precedent (tag #ouverture) n'est pas un mouvement de l'annee.
 
     Convention de signe Beancount:
     - Debit (positif) sur un compte de passif = augmentation du pret (avance)
@@ -108,28 +135,13 @@ def obtenir_etat_pret(
         EtatPret derive des postings filtres.
     """
     annee = fin_exercice.year
-    mouvements: list[MouvementPret] = []
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.date.year != annee:
-            continue
-
-        for posting in entry.postings:
-            if posting.account != COMPTE_PRET_ACTIONNAIRE:
-                continue
-
-            montant = posting.units.number
-            type_mouvement = "avance" if montant > 0 else "remboursement"
-
-            mouvements.append(
-                MouvementPret(
-                    date=entry.date,
-                    montant=montant,
-                    description=entry.narration or "",
-                    type=type_mouvement,
-                )
-            )
+    lignes = miroir_ledger(entries).postings(
+        compte=COMPTE_PRET_ACTIONNAIRE,
+        debut=datetime.date(annee, 1, 1),
+        fin=datetime.date(annee, 12, 31),
+        sans_tag=TAG_OUVERTURE,
+    )
+
+    mouvements = [mouvement_pret(ligne.date, ligne.montant, ligne.narration) for ligne in lignes]
 
     return calculer_etat_pret(mouvements)
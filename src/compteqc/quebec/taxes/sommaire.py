@@ -11,8 +11,12 @@ import datetime
 from dataclasses import dataclass
 from decimal import Decimal
 
+import numpy as np
 from beancount.core import data
 
+from compteqc.ledger.cloture import TAG_OUVERTURE
+from compteqc.ledger.colonnes import table_postings
+
 # Comptes de taxes dans le plan comptable
 COMPTE_TPS_PERCUE = "Passifs:TPS-Percue"
 COMPTE_TVQ_PERCUE = "Passifs:TVQ-Percue"
@@ -40,13 +44,6 @@ class SommairePeriode:
     nb_transactions: int  # Nombre de transactions dans la periode
 
 
-def _extraire_montant_posting(posting: data.Posting) -> Decimal:
-    """Extrait le montant d'un posting comme Decimal."""
-    if posting.units is None:
-        return Decimal("0")
-    return Decimal(str(posting.units.number))
-
-
 def generer_sommaire_periode(
     entries: list,
     debut: datetime.date,
@@ -71,37 +68,22 @@ def generer_sommaire_periode(
     Returns:
         SommairePeriode avec les totaux pour la periode.
     """
-    tps_percue = Decimal("0")
-    tvq_percue = Decimal("0")
-    tps_payee = Decimal("0")
-    tvq_payee = Decimal("0")
-    nb_transactions = 0
-
-    for entry in entries:
-        if not isinstance(entry, data.Transaction):
-            continue
-        if entry.date < debut or entry.date > fin:
-            continue
-
-        a_des_taxes = False
-        for posting in entry.postings:
-            montant = _extraire_montant_posting(posting)
-            if posting.account == COMPTE_TPS_PERCUE:
-                # Credit (negatif) -> valeur absolue pour le sommaire
-                tps_percue += abs(montant)
-                a_des_taxes = True
-            elif posting.account == COMPTE_TVQ_PERCUE:
-                tvq_percue += abs(montant)
-                a_des_taxes = True
-            elif posting.account == COMPTE_TPS_PAYEE:
-                tps_payee += montant
-                a_des_taxes = True
-            elif posting.account == COMPTE_TVQ_PAYEE:
-                tvq_payee += montant
-                a_des_taxes = True
-
-        if a_des_taxes:
-            nb_transactions += 1
+    table = table_postings(entries)
+    # Les soldes d'ouverture (cloture d'exercice) ne sont pas des taxes de la periode
+    periode = table.masque(debut=debut, fin=fin, sans_tag=TAG_OUVERTURE)
+
+    def _total(compte: str, valeur_absolue: bool = False) -> Decimal:
+        masque = periode & table.masque(comptes=[compte])
+        return table.total(masque, valeur_absolue=valeur_absolue)
+
+    # Credits (negatifs) -> valeur absolue pour le sommaire
+    tps_percue = _total(COMPTE_TPS_PERCUE, valeur_absolue=True)
+    tvq_percue = _total(COMPTE_TVQ_PERCUE, valeur_absolue=True)
+    tps_payee = _total(COMPTE_TPS_PAYEE)
+    tvq_payee = _total(COMPTE_TVQ_PAYEE)
+
+    postings_taxes = periode & table.masque(comptes=COMPTES_TAXES)
+    nb_transactions = int(np.unique(table.id_txn[postings_taxes]).size)
 
     tps_nette = tps_percue - tps_payee
     tvq_nette = tvq_percue - tvq_payee
@@ -0,0 +1,268 @@
+"""Agregats d'un exercice partages par les rapports, calcules en un parcours.
+
+Le package CPA construit sept rapports puis le checklist de fin d'exercice
+et l'export GIFI. Chacun parcourait les entrees de son cote (codes GIFI des
+Open, transactions de paie, mouvements du pret actionnaire, comptes non
+classes...) et recalculait les soldes: une dizaine de passes sur le ledger
+pour un seul package.
+
+Chaque rapport declare dans `besoins` les agregats qu'il lit. `Agregats`
+regroupe les besoins declares et, a la premiere lecture, alimente tous les
+collecteurs demandes en un seul parcours des entrees. Les agregats de
+soldes (soldes par compte, arbre des comptes, sommaires TPS/TVQ) sont
+derives de la table de postings en colonnes, construite une fois par
+liste d'entrees.
+
+Un rapport construit seul cree ses propres agregats; le resultat est le
+meme qu'avec des agregats partages.
+
+Usage:
+    agregats = Agregats(entries, 2025)
+    rapports = [Bilan(entries, 2025, agregats=agregats), SommairePaie(...)]
+    Bilan.besoins  # ("arbre", "gifi")
+    rapports[0].generate(sortie)  # un parcours pour tous les rapports
+"""
+
+from __future__ import annotations
+
+import datetime
+from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from decimal import Decimal
+
+from beancount.core import data
+
+from compteqc.ledger.arbre import ArbreComptes, arbre_soldes
+from compteqc.mcp.services import calculer_soldes
+from compteqc.quebec.pret_actionnaire.suivi import (
+    EtatPret,
+    MouvementPret,
+    calculer_etat_pret,
+    mouvement_depuis_posting,
+)
+from compteqc.quebec.taxes.sommaire import SommairePeriode, generer_sommaires_annuels
+
+COMPTE_SALAIRE_BRUT = "Depenses:Salaires:Brut"
+COMPTE_NON_CLASSE = "Depenses:Non-Classe"
+
+
+class _Collecteur(ABC):
+    """Agregat alimente pendant le parcours unique des entrees."""
+
+    def __init__(self, annee: int) -> None:
+        self.debut = datetime.date(annee, 1, 1)
+        self.fin = datetime.date(annee, 12, 31)
+
+    def ouverture(self, entry: data.Open) -> None:
+        pass
+
+    def transaction(self, entry: data.Transaction) -> None:
+        pass
+
+    @abstractmethod
+    def resultat(self):
+        """Agregat calcule, lu une fois le parcours termine."""
+
+
+class _Gifi(_Collecteur):
+    """Codes GIFI des directives Open (meme resultat que extract_gifi_map)."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(annee)
+        self.codes: dict[str, str] = {}
+
+    def ouverture(self, entry: data.Open) -> None:
+        code = entry.meta.get("gifi") if entry.meta else None
+        if code:
+            self.codes[entry.account] = str(code)
+
+    def resultat(self) -> dict[str, str]:
+        return self.codes
+
+
+class _TransactionsPaie(_Collecteur):
+    """Transactions de paie de l'exercice: tag 'paie' ou posting au brut."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(annee)
+        self.transactions: list[data.Transaction] = []
+
+    def transaction(self, entry: data.Transaction) -> None:
+        if not self.debut <= entry.date <= self.fin:
+            return
+        if (entry.tags and "paie" in entry.tags) or any(
+            p.account == COMPTE_SALAIRE_BRUT for p in entry.postings
+        ):
+            self.transactions.append(entry)
+
+    def resultat(self) -> list[data.Transaction]:
+        return self.transactions
+
+
+class _MouvementsPret(_Collecteur):
+    """Mouvements du pret actionnaire de l'exercice (hors soldes d'ouverture)."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(annee)
+        self.mouvements: list[MouvementPret] = []
+
+    def transaction(self, entry: data.Transaction) -> None:
+        if not self.debut <= entry.date <= self.fin:
+            return
+        for posting in entry.postings:
+            mouvement = mouvement_depuis_posting(entry, posting)
+            if mouvement is not None:
+                self.mouvements.append(mouvement)
+
+    def resultat(self) -> list[MouvementPret]:
+        return self.mouvements
+
+
+class _NonClassees(_Collecteur):
+    """Nombre de transactions de l'exercice avec un posting a Depenses:Non-Classe."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(annee)
+        self.nombre = 0
+
+    def transaction(self, entry: data.Transaction) -> None:
+        if self.debut <= entry.date <= self.fin and any(
+            p.account == COMPTE_NON_CLASSE for p in entry.postings
+        ):
+            self.nombre += 1
+
+    def resultat(self) -> int:
+        return self.nombre
+
+
+class _EnAttente(_Collecteur):
+    """Nombre de transactions en attente d'approbation (flag '!')."""
+
+    def __init__(self, annee: int) -> None:
+        super().__init__(annee)
+        self.nombre = 0
+
+    def transaction(self, entry: data.Transaction) -> None:
+        if entry.flag == "!":
+            self.nombre += 1
+
+    def resultat(self) -> int:
+        return self.nombre
+
+
+# Agregats alimentes par le parcours des entrees
+COLLECTEURS: dict[str, type[_Collecteur]] = {
+    "gifi": _Gifi,
+    "paie": _TransactionsPaie,
+    "pret": _MouvementsPret,
+    "non_classees": _NonClassees,
+    "en_attente": _EnAttente,
+}
+
+# Agregats derives de la table de postings (aucun parcours des entrees)
+DERIVES = frozenset({"soldes", "arbre", "taxes"})
+
+AGREGATS = frozenset(COLLECTEURS) | DERIVES
+
+
+class Agregats:
+    """Agregats d'un exercice, partages par les rapports qui les declarent.
+
+    Attributes:
+        parcours: Nombre de parcours des entrees effectues (diagnostic).
+    """
+
+    def __init__(self, entries: list, annee: int) -> None:
+        self.entries = entries
+        self.annee = annee
+        self.parcours = 0
+        self._demandes: set[str] = set()
+        self._resultats: dict[str, object] = {}
+        self._taxes: dict[str, list[SommairePeriode]] = {}
+
+    def declarer(self, noms: Iterable[str]) -> None:
+        """Ajoute des agregats a calculer au prochain parcours.
+
+        Raises:
+            ValueError: Si un nom ne correspond a aucun agregat.
+        """
+        noms = set(noms)
+        inconnus = noms - AGREGATS
+        if inconnus:
+            raise ValueError(f"Agregats inconnus: {', '.join(sorted(inconnus))}")
+        self._demandes |= noms
+
+    def _collecte(self, nom: str):
+        if nom not in self._resultats:
+            self.declarer((nom,))
+            self._parcourir()
+        return self._resultats[nom]
+
+    def _parcourir(self) -> None:
+        """Un seul parcours des entrees pour tous les collecteurs en attente."""
+        a_calculer = [
+            n for n in sorted(self._demandes & COLLECTEURS.keys()) if n not in self._resultats
+        ]
+        collecteurs = {n: COLLECTEURS[n](self.annee) for n in a_calculer}
+        ouvertures = [c.ouverture for c in collecteurs.values()]
+        transactions = [c.transaction for c in collecteurs.values()]
+        for entry in self.entries:
+            if isinstance(entry, data.Transaction):
+                for visiter in transactions:
+                    visiter(entry)
+            elif isinstance(entry, data.Open):
+                for visiter in ouvertures:
+                    visiter(entry)
+        for nom, collecteur in collecteurs.items():
+            self._resultats[nom] = collecteur.resultat()
+        self.parcours += 1
+
+    # ------------------------------------------------------------------
+    # Agregats du parcours
+    # ------------------------------------------------------------------
+
+    def gifi(self) -> dict[str, str]:
+        """Mappage compte -> code GIFI des directives Open."""
+        return self._collecte("gifi")
+
+    def transactions_paie(self) -> list[data.Transaction]:
+        """Transactions de paie de l'exercice, dans l'ordre du ledger."""
+        return self._collecte("paie")
+
+    def etat_pret(self) -> EtatPret:
+        """Etat du pret actionnaire a la fin de l'exercice."""
+        if "etat_pret" not in self._resultats:
+            self._resultats["etat_pret"] = calculer_etat_pret(self._collecte("pret"))
+        return self._resultats["etat_pret"]
+
+    def nb_non_classees(self) -> int:
+        """Transactions de l'exercice encore a Depenses:Non-Classe."""
+        return self._collecte("non_classees")
+
+    def nb_en_attente(self) -> int:
+        """Transactions en attente d'approbation (toutes annees)."""
+        return self._collecte("en_attente")
+
+    # ------------------------------------------------------------------
+    # Agregats derives de la table de postings
+    # ------------------------------------------------------------------
+
+    def soldes(self) -> dict[str, Decimal]:
+        """Soldes de chaque compte sur tout l'historique (comme calculer_soldes)."""
+        if "soldes" not in self._resultats:
+            self._resultats["soldes"] = calculer_soldes(self.entries)
+        return self._resultats["soldes"]
+
+    def arbre(self) -> ArbreComptes:
+        """Arbre des soldes par compte."""
+        if "arbre" not in self._resultats:
+            self._resultats["arbre"] = arbre_soldes(self.entries)
+        return self._resultats["arbre"]
+
+    def sommaires_taxes(self, frequence: str = "trimestriel") -> list[SommairePeriode]:
+        """Sommaires TPS/TVQ de l'exercice par periode de declaration."""
+        if frequence not in self._taxes:
+            self._taxes[frequence] = generer_sommaires_annuels(
+                self.entries, self.annee, frequence
+            )
+        return self._taxes[frequence]
@@ -4,9 +4,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
-from compteqc.mcp.services import calculer_soldes
 from compteqc.rapports.base import BaseReport
-from compteqc.rapports.gifi_export import extract_gifi_map
 
 
 class BalanceVerification(BaseReport):
@@ -18,11 +16,12 @@ class BalanceVerification(BaseReport):
 
     report_name = "balance_verification"
     template_name = "balance_verification.html"
+    besoins = ("soldes", "gifi")
 
     def extract_data(self) -> dict:
         """Extrait les soldes et les separe en debits/credits."""
-        soldes = calculer_soldes(self.entries)
-        gifi_map = extract_gifi_map(self.entries)
+        soldes = self.agregats.soldes()
+        gifi_map = self.agregats.gifi()
 
         categories = ["Actifs", "Passifs", "Capital", "Revenus", "Depenses"]
         lignes: list[dict] = []
@@ -2,18 +2,68 @@
 
 Fournit l'infrastructure Jinja2 + WeasyPrint pour produire des rapports
 en double format (CSV machine-readable et PDF professionnel).
+
+Les rapports lisent leurs donnees dans des `Agregats` partages: chaque
+sous-classe declare dans `besoins` les agregats qu'elle utilise, et les
+rapports d'un meme package sont alimentes par un seul parcours du ledger.
 """
 
 from __future__ import annotations
 
 import csv
 import datetime
+import functools
+import time
 from abc import ABC, abstractmethod
 from decimal import Decimal
 from pathlib import Path
 
 from jinja2 import Environment, PackageLoader
 
+from compteqc.rapports.agregats import Agregats
+
+CHEMIN_CSS = Path(__file__).parent / "templates" / "css" / "report.css"
+
+
+@functools.cache
+def _environnement() -> Environment:
+    """Environnement Jinja2 des gabarits de rapports (un par processus)."""
+    return Environment(
+        loader=PackageLoader("compteqc.rapports", "templates"),
+        autoescape=True,
+    )
+
+
+@functools.cache
+def _feuille_style():
+    """Feuille de style des rapports, compilee une fois par processus."""
+    from weasyprint import CSS
+
+    return CSS(filename=str(CHEMIN_CSS))
+
+
+def rendre_pdf(template_name: str, contexte: dict, output_path: Path) -> float:
+    """Rend un gabarit de rapport en PDF via WeasyPrint.
+
+    Fonction de module (et non methode) pour pouvoir etre executee dans un
+    processus de travail a partir d'un contexte de donnees picklable.
+
+    Args:
+        template_name: Gabarit Jinja2 du rapport.
+        contexte: Variables du gabarit (voir `BaseReport.contexte_pdf`).
+        output_path: Chemin du fichier PDF de sortie.
+
+    Returns:
+        Duree du rendu, en secondes.
+    """
+    from weasyprint import HTML
+
+    debut = time.perf_counter()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    html_str = _environnement().get_template(template_name).render(**contexte)
+    HTML(string=html_str).write_pdf(str(output_path), stylesheets=[_feuille_style()])
+    return time.perf_counter() - debut
+
 
 class BaseReport(ABC):
     """Classe de base abstraite pour les rapports financiers.
@@ -22,20 +72,28 @@ class BaseReport(ABC):
         - extract_data() -> dict : extraction des donnees du ledger
         - csv_headers() -> list[str] : en-tetes CSV
         - csv_rows() -> list[list] : lignes de donnees CSV
+
+    et declarer dans `besoins` les agregats lus dans `self.agregats`.
     """
 
     report_name: str = "rapport"
     template_name: str = "base_report.html"
-
-    def __init__(self, entries: list, annee: int, entreprise: str = "") -> None:
+    besoins: tuple[str, ...] = ()
+
+    def __init__(
+        self,
+        entries: list,
+        annee: int,
+        entreprise: str = "",
+        agregats: Agregats | None = None,
+    ) -> None:
         self.entries = entries
         self.annee = annee
         self.entreprise = entreprise
+        self.agregats = agregats if agregats is not None else Agregats(entries, annee)
+        self.agregats.declarer(self.besoins)
         self._data: dict | None = None
-        self._env = Environment(
-            loader=PackageLoader("compteqc.rapports", "templates"),
-            autoescape=True,
-        )
+        self._env = _environnement()
 
     @property
     def data(self) -> dict:
@@ -78,6 +136,24 @@ class BaseReport(ABC):
                 writer.writerow(row)
         return output_path
 
+    def contexte_pdf(self, date_generation: str | None = None) -> dict:
+        """Variables du gabarit PDF: donnees du rapport et en-tete.
+
+        Le contexte ne contient que des valeurs simples (Decimal, dates,
+        chaines, listes et dictionnaires): il peut etre envoye a un autre
+        processus pour le rendu.
+
+        Args:
+            date_generation: Date imprimee sur le rapport (defaut: aujourd'hui).
+        """
+        return {
+            "entreprise": self.entreprise,
+            "annee": self.annee,
+            "date_generation": date_generation or datetime.date.today().isoformat(),
+            "report_name": self.report_name,
+            **self.data,
+        }
+
     def to_pdf(self, output_path: Path) -> Path:
         """Genere le rapport en format PDF via WeasyPrint.
 
@@ -87,21 +163,7 @@ class BaseReport(ABC):
         Returns:
             Chemin du fichier PDF cree.
         """
-        from weasyprint import HTML
-
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        template = self._env.get_template(self.template_name)
-        css_path = Path(__file__).parent / "templates" / "css" / "report.css"
-
-        context = {
-            "entreprise": self.entreprise,
-            "annee": self.annee,
-            "date_generation": datetime.date.today().isoformat(),
-            "report_name": self.report_name,
-            **self.data,
-        }
-        html_str = template.render(**context)
-        HTML(string=html_str).write_pdf(str(output_path), stylesheets=[str(css_path)])
+        rendre_pdf(self.template_name, self.contexte_pdf(), output_path)
         return output_path
 
     def generate(self, output_dir: Path) -> dict[str, Path]:
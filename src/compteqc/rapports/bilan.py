@@ -4,9 +4,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
-from compteqc.mcp.services import calculer_soldes
 from compteqc.rapports.base import BaseReport
-from compteqc.rapports.gifi_export import extract_gifi_map
 
 
 class Bilan(BaseReport):
@@ -17,33 +15,19 @@ class Bilan(BaseReport):
 
     report_name = "bilan"
     template_name = "bilan.html"
+    besoins = ("arbre", "gifi")
 
     def extract_data(self) -> dict:
         """Extrait actifs, passifs, capitaux propres et resultat net."""
-        soldes = calculer_soldes(self.entries)
-        gifi_map = extract_gifi_map(self.entries)
-
-        actifs: dict[str, Decimal] = {}
-        passifs: dict[str, Decimal] = {}
-        capitaux: dict[str, Decimal] = {}
-
-        for acct, montant in soldes.items():
-            if montant == Decimal("0"):
-                continue
-            if acct.startswith("Actifs"):
-                actifs[acct] = montant
-            elif acct.startswith("Passifs"):
-                passifs[acct] = montant
-            elif acct.startswith("Capital"):
-                capitaux[acct] = montant
+        arbre = self.agregats.arbre()
+        gifi_map = self.agregats.gifi()
+
+        actifs = arbre.soldes("Actifs", non_nuls=True)
+        passifs = arbre.soldes("Passifs", non_nuls=True)
+        capitaux = arbre.soldes("Capital", non_nuls=True)
 
         # Resultat net = Revenus (inverses) - Depenses
-        resultat_net = Decimal("0")
-        for acct, montant in soldes.items():
-            if acct.startswith("Revenus"):
-                resultat_net -= montant  # credits negatifs -> -(-x) = +x
-            elif acct.startswith("Depenses"):
-                resultat_net -= montant  # debits positifs -> -(+x) = -x
+        resultat_net = -(arbre.sous_total("Revenus") + arbre.sous_total("Depenses"))
 
         total_actifs = self._q(sum(actifs.values(), Decimal("0")))
         # Passifs and capitaux are credit (negative) in beancount; negate to show positive.
@@ -0,0 +1,109 @@
+"""Magasin adresse par contenu des fichiers generes du package CPA.
+
+Regenerer le package apres avoir corrige une seule depense refaisait tous
+les CSV et PDF. Chaque rapport recoit une cle: l'empreinte SHA-256 de son
+contexte de donnees (celui envoye au gabarit PDF), des gabarits et de la
+feuille de style. Un rapport dont la cle est deja dans le magasin est copie
+au lieu d'etre rendu; seuls les rapports dont les donnees ont change sont
+reconstruits. Le ZIP est memorise de la meme facon, par l'empreinte de
+son contenu.
+
+Le contexte inclut la date de generation imprimee sur les rapports: un
+rapport mis en cache un autre jour est rendu a nouveau.
+
+Usage:
+    cache = CacheRapports(Path("data/cache/rapports"))
+    cle = cle_rapport(rapport, contexte)
+    trouve = cache.lire(cle, ".pdf")  # None si absent
+    cache.ecrire(cle, ".pdf", chemin_pdf)
+"""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+from compteqc.rapports.base import BaseReport
+
+# A incrementer quand le format des fichiers generes change sans que les
+# gabarits changent (ex: version de WeasyPrint, code des rapports).
+VERSION_CACHE = "1"
+
+REPERTOIRE_GABARITS = Path(__file__).parent / "templates"
+
+
+@functools.cache
+def _empreinte_gabarits() -> str:
+    """Empreinte des gabarits Jinja2 et de la feuille de style."""
+    h = hashlib.sha256()
+    for chemin in sorted(REPERTOIRE_GABARITS.rglob("*")):
+        if chemin.is_file():
+            h.update(chemin.relative_to(REPERTOIRE_GABARITS).as_posix().encode())
+            h.update(chemin.read_bytes())
+    return h.hexdigest()
+
+
+def cle_rapport(rapport: BaseReport, contexte: dict) -> str:
+    """Cle de contenu d'un rapport: contexte, gabarits et format.
+
+    Args:
+        rapport: Rapport dont on veut memoriser les fichiers.
+        contexte: Contexte fige du rapport (`BaseReport.contexte_pdf`).
+    """
+    h = hashlib.sha256()
+    h.update(VERSION_CACHE.encode())
+    h.update(f"{type(rapport).__module__}.{type(rapport).__qualname__}".encode())
+    h.update(rapport.template_name.encode())
+    h.update(_empreinte_gabarits().encode())
+    h.update(json.dumps(contexte, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def placer(source: Path, destination: Path) -> Path:
+    """Copie un fichier du magasin vers le package.
+
+    Une copie plutot qu'un lien physique: un fichier du package reecrit sur
+    place ne doit pas modifier l'entree du magasin.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(source, destination)
+    return destination
+
+
+class CacheRapports:
+    """Fichiers generes, ranges par cle de contenu (racine/ab/abcdef....pdf)."""
+
+    def __init__(self, racine: Path | str) -> None:
+        self.racine = Path(racine)
+
+    def chemin(self, cle: str, suffixe: str) -> Path:
+        """Emplacement du fichier `suffixe` de la cle (qu'il existe ou non)."""
+        return self.racine / cle[:2] / f"{cle}{suffixe}"
+
+    def lire(self, cle: str, suffixe: str) -> Path | None:
+        """Fichier en cache pour la cle, ou None s'il est absent."""
+        chemin = self.chemin(cle, suffixe)
+        return chemin if chemin.is_file() else None
+
+    def ecrire(self, cle: str, suffixe: str, source: Path) -> Path:
+        """Copie `source` dans le magasin (ecriture atomique).
+
+        Returns:
+            Chemin du fichier dans le magasin.
+        """
+        chemin = self.chemin(cle, suffixe)
+        chemin.parent.mkdir(parents=True, exist_ok=True)
+        fd, temporaire = tempfile.mkstemp(dir=chemin.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            shutil.copyfile(source, temporaire)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            Path(temporaire).unlink(missing_ok=True)
+            raise
+        return chemin
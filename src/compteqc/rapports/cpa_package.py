@@ -3,22 +3,38 @@
 Combine les rapports financiers (balance, resultats, bilan), les annexes
 (paie, DPA, taxes, pret actionnaire), la validation GIFI et le checklist
 de fin d'exercice dans un ZIP organise pour le CPA.
+
+Les rapports, le checklist et l'export GIFI partagent les memes `Agregats`:
+le ledger est parcouru une seule fois pour tout le package.
+
+Avec un repertoire de cache, les rapports dont les donnees n'ont pas change
+sont copies depuis le magasin adresse par contenu (`CacheRapports`) et le
+ZIP est assemble en lisant les fichiers directement dans le magasin. Un ZIP
+dont tout le contenu est inchange est lui-meme repris du cache.
 """
 
 from __future__ import annotations
 
+import hashlib
+import shutil
 import zipfile
 from pathlib import Path
 
 from rich.console import Console
 from rich.table import Table
 
-from compteqc.echeances.verification import Severite, verifier_fin_exercice
-from compteqc.mcp.services import calculer_soldes
+from compteqc.echeances.verification import (
+    BESOINS_VERIFICATION,
+    Severite,
+    verifier_fin_exercice,
+)
+from compteqc.rapports.agregats import Agregats
 from compteqc.rapports.balance_verification import BalanceVerification
 from compteqc.rapports.bilan import Bilan
+from compteqc.rapports.cache import CacheRapports, placer
 from compteqc.rapports.etat_resultats import EtatResultats
-from compteqc.rapports.gifi_export import aggregate_by_gifi, export_gifi_csv, extract_gifi_map
+from compteqc.rapports.gifi_export import export_gifi_csv
+from compteqc.rapports.rendu import RenduRapport, generer_rapports
 from compteqc.rapports.sommaire_dpa import SommaireDPA
 from compteqc.rapports.sommaire_paie import SommairePaie
 from compteqc.rapports.sommaire_pret import SommairePret
@@ -62,6 +78,69 @@ def afficher_checklist(resultats: list, console_out: Console | None = None) -> N
     c.print(table)
 
 
+def afficher_durees(rendus: list[RenduRapport], console_out: Console | None = None) -> None:
+    """Affiche la duree de generation de chaque rapport en Rich table."""
+    c = console_out or console
+    table = Table(title="Generation des rapports")
+    table.add_column("Rapport", style="bold")
+    table.add_column("Donnees + CSV", justify="right")
+    table.add_column("PDF", justify="right")
+    table.add_column("Statut")
+
+    for r in rendus:
+        statut = "[yellow]reconstruit[/yellow]" if r.reconstruit else "[green]cache[/green]"
+        table.add_row(r.nom, f"{r.duree_donnees:.2f} s", f"{r.duree_pdf:.2f} s", statut)
+
+    c.print(table)
+
+
+def _empreinte_fichier(chemin: Path) -> str:
+    h = hashlib.sha256()
+    with open(chemin, "rb") as f:
+        for bloc in iter(lambda: f.read(1 << 16), b""):
+            h.update(bloc)
+    return h.hexdigest()
+
+
+def _assembler_zip(
+    zip_path: Path,
+    sources: dict[str, tuple[Path, str]],
+    cache: CacheRapports | None,
+) -> bool:
+    """Ecrit le ZIP en lisant chaque fichier a sa source (magasin ou package).
+
+    Args:
+        zip_path: ZIP a creer.
+        sources: {nom dans l'archive: (fichier source, cle de contenu)}.
+        cache: Magasin ou chercher (et ranger) le ZIP complet.
+
+    Returns:
+        True si le ZIP a ete reconstruit, False s'il provient du cache.
+    """
+    h = hashlib.sha256()
+    for arcname in sorted(sources):
+        h.update(f"{arcname}\0{sources[arcname][1]}\0".encode())
+    cle = h.hexdigest()
+
+    if cache is not None:
+        trouve = cache.lire(cle, ".zip")
+        if trouve is not None:
+            placer(trouve, zip_path)
+            return False
+
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for arcname in sorted(sources):
+            source = sources[arcname][0]
+            info = zipfile.ZipInfo.from_file(source, arcname)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            with open(source, "rb") as entree, zf.open(info, "w") as sortie:
+                shutil.copyfileobj(entree, sortie)
+
+    if cache is not None:
+        cache.ecrire(cle, ".zip", zip_path)
+    return True
+
+
 def generer_package_cpa(
     entries: list,
     annee: int,
@@ -70,9 +149,14 @@ def generer_package_cpa(
     entreprise: str = "",
     chemin_actifs: str | Path = "data/actifs.yaml",
     console_out: Console | None = None,
+    jobs: int | None = None,
+    cache: str | Path | None = None,
 ) -> Path:
     """Genere le package CPA complet dans un ZIP.
 
+    Les besoins de tous les rapports et du checklist sont declares avant
+    le premier calcul: le ledger n'est parcouru qu'une fois.
+
     1. Execute le checklist de fin d'exercice
     2. Abort si erreur fatale (equation comptable)
     3. Genere tous les rapports dans des sous-repertoires
@@ -86,6 +170,10 @@ def generer_package_cpa(
         entreprise: Nom de l'entreprise pour les rapports.
         chemin_actifs: Chemin vers le registre d'actifs YAML.
         console_out: Console Rich pour l'affichage (optionnel).
+        jobs: Nombre de processus de rendu PDF (defaut: un par rapport, au
+            plus un par coeur; 1 pour un rendu sequentiel).
+        cache: Repertoire du magasin des fichiers generes (aucun cache si
+            None): les rapports inchanges sont copies au lieu d'etre rendus.
 
     Returns:
         Chemin du fichier ZIP cree.
@@ -94,9 +182,24 @@ def generer_package_cpa(
         CpaPackageError: Si l'equation comptable est desequilibree.
     """
     output_dir = Path(output_dir)
+    magasin = CacheRapports(cache) if cache is not None else None
+
+    agregats = Agregats(entries, annee)
+    rapports = [
+        BalanceVerification(entries, annee, entreprise, agregats=agregats),
+        EtatResultats(entries, annee, entreprise, agregats=agregats),
+        Bilan(entries, annee, entreprise, agregats=agregats),
+    ]
+    annexes = [
+        SommairePaie(entries, annee, entreprise, agregats=agregats),
+        SommaireDPA(entries, annee, entreprise, chemin_actifs, agregats=agregats),
+        SommaireTaxes(entries, annee, entreprise, agregats=agregats),
+        SommairePret(entries, annee, entreprise, agregats=agregats),
+    ]
+    agregats.declarer(BESOINS_VERIFICATION)
 
     # 1. Checklist
-    resultats = verifier_fin_exercice(entries, annee, fin_exercice)
+    resultats = verifier_fin_exercice(entries, annee, fin_exercice, agregats=agregats)
     afficher_checklist(resultats, console_out)
 
     # 2. Check fatals
@@ -111,38 +214,26 @@ def generer_package_cpa(
     annexes_dir = pkg_dir / "annexes"
     gifi_dir = pkg_dir / "gifi"
 
-    # Rapports principaux
-    BalanceVerification(entries, annee, entreprise).generate(rapports_dir)
-    EtatResultats(entries, annee, entreprise).generate(rapports_dir)
-    Bilan(entries, annee, entreprise).generate(rapports_dir)
-
-    # Annexes
-    SommairePaie(entries, annee, entreprise).generate(annexes_dir)
-    SommaireDPA(entries, annee, entreprise, chemin_actifs).generate(annexes_dir)
-    SommaireTaxes(entries, annee, entreprise).generate(annexes_dir)
-    SommairePret(entries, annee, entreprise).generate(annexes_dir)
+    # Rapports principaux et annexes (PDF rendus en parallele)
+    rendus = generer_rapports(
+        [(r, rapports_dir) for r in rapports] + [(a, annexes_dir) for a in annexes],
+        jobs=jobs,
+        cache=magasin,
+    )
+    afficher_durees(rendus, console_out)
 
     # GIFI export
-    soldes = calculer_soldes(entries)
-    gifi_map = extract_gifi_map(entries)
-    gifi_balances = aggregate_by_gifi(soldes, gifi_map)
-
-    # S100 = balance sheet items (Actifs, Passifs, Capital)
-    gifi_s100 = {
-        k: v for k, v in gifi_balances.items()
-        if any(
-            acct.startswith(("Actifs", "Passifs", "Capital"))
-            for acct, code in gifi_map.items() if code == k
-        )
-    }
-    # S125 = income statement items (Revenus, Depenses)
-    gifi_s125 = {
-        k: v for k, v in gifi_balances.items()
-        if any(
-            acct.startswith(("Revenus", "Depenses"))
-            for acct, code in gifi_map.items() if code == k
-        )
+    gifi_map = agregats.gifi()
+    gifi_balances = agregats.arbre().totaux_gifi(gifi_map)
+
+    # S100 = postes du bilan (Actifs, Passifs, Capital)
+    # S125 = postes de l'etat des resultats (Revenus, Depenses)
+    codes_s100 = {
+        c for acct, c in gifi_map.items() if acct.startswith(("Actifs", "Passifs", "Capital"))
     }
+    codes_s125 = {c for acct, c in gifi_map.items() if acct.startswith(("Revenus", "Depenses"))}
+    gifi_s100 = {k: v for k, v in gifi_balances.items() if k in codes_s100}
+    gifi_s125 = {k: v for k, v in gifi_balances.items() if k in codes_s125}
 
     gifi_dir.mkdir(parents=True, exist_ok=True)
     if gifi_s100:
@@ -150,12 +241,29 @@ def generer_package_cpa(
     if gifi_s125:
         export_gifi_csv(gifi_s125, gifi_dir / "gifi_s125.csv", schedule="S125")
 
-    # 4. ZIP
+    # 4. ZIP (fichiers des rapports lus dans le magasin quand il y en a un)
+    depuis_cache = {}
+    if magasin is not None:
+        for r in rendus:
+            for chemin, suffixe in ((r.csv, ".csv"), (r.pdf, ".pdf")):
+                depuis_cache[chemin] = (magasin.chemin(r.cle, suffixe), r.cle + suffixe)
+    sources = {}
+    for file_path in sorted(pkg_dir.rglob("*")):
+        if file_path.is_file():
+            arcname = file_path.relative_to(output_dir).as_posix()
+            sources[arcname] = depuis_cache.get(file_path) or (
+                file_path, _empreinte_fichier(file_path)
+            )
+
     zip_path = output_dir / f"cpa-package-{annee}.zip"
-    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-        for file_path in sorted(pkg_dir.rglob("*")):
-            if file_path.is_file():
-                arcname = file_path.relative_to(output_dir)
-                zf.write(file_path, arcname)
+    zip_reconstruit = _assembler_zip(zip_path, sources, magasin)
+
+    c = console_out or console
+    reconstruits = sum(r.reconstruit for r in rendus)
+    c.print(
+        f"{reconstruits} rapport(s) reconstruit(s), "
+        f"{len(rendus) - reconstruits} copie(s) depuis le cache; "
+        f"ZIP {'reconstruit' if zip_reconstruit else 'copie depuis le cache'}."
+    )
 
     return zip_path
@@ -4,10 +4,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
-from beancount.core import data
-
 from compteqc.rapports.base import BaseReport
-from compteqc.rapports.gifi_export import extract_gifi_map
 
 
 class EtatResultats(BaseReport):
@@ -19,25 +16,14 @@ class EtatResultats(BaseReport):
 
     report_name = "etat_resultats"
     template_name = "etat_resultats.html"
+    besoins = ("soldes", "gifi")
 
     def extract_data(self) -> dict:
         """Extrait revenus et depenses des transactions."""
-        gifi_map = extract_gifi_map(self.entries)
-        revenus: dict[str, Decimal] = {}
-        depenses: dict[str, Decimal] = {}
-
-        for entry in self.entries:
-            if not isinstance(entry, data.Transaction):
-                continue
-            for posting in entry.postings:
-                if posting.units is None:
-                    continue
-                acct = posting.account
-                montant = posting.units.number
-                if acct.startswith("Revenus"):
-                    revenus[acct] = revenus.get(acct, Decimal("0")) + montant
-                elif acct.startswith("Depenses"):
-                    depenses[acct] = depenses.get(acct, Decimal("0")) + montant
+        gifi_map = self.agregats.gifi()
+        soldes = self.agregats.soldes()
+        revenus = {k: v for k, v in soldes.items() if k.startswith("Revenus")}
+        depenses = {k: v for k, v in soldes.items() if k.startswith("Depenses")}
 
         # Revenus en positif (inverser le signe beancount)
         lignes_revenus = [
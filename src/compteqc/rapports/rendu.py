@@ -0,0 +1,147 @@
+"""Generation des rapports d'un package: CSV, puis PDF en parallele.
+
+La mise en page WeasyPrint est l'etape la plus lente du package CPA et les
+rapports etaient rendus l'un apres l'autre. `generer_rapports`:
+
+1. extrait les donnees de chaque rapport et ecrit son CSV dans le
+   processus courant (les agregats partages restent en memoire);
+2. fige le contexte de chaque PDF (donnees simples, picklables, avec une
+   meme date de generation pour tous les rapports);
+3. rend les PDF dans un pool de processus. Chaque processus compile la
+   feuille de style une seule fois et la reutilise pour ses rapports.
+
+Les fichiers sont nommes d'apres le rapport et les contextes sont figes
+avant l'envoi au pool: le resultat ne depend ni du nombre de travailleurs
+ni de l'ordre dans lequel les rendus se terminent.
+
+Avec un `CacheRapports`, un rapport dont le contexte n'a pas change depuis
+un rendu precedent est copie depuis le magasin au lieu d'etre rendu.
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+from compteqc.rapports.base import BaseReport, rendre_pdf
+from compteqc.rapports.cache import CacheRapports, cle_rapport, placer
+
+
+@dataclass(frozen=True)
+class RenduRapport:
+    """Fichiers produits pour un rapport et durees de chaque etape (secondes).
+
+    `reconstruit` est faux quand les fichiers proviennent du cache; `cle`
+    est la cle de contenu du rapport.
+    """
+
+    nom: str
+    csv: Path
+    pdf: Path
+    duree_donnees: float
+    duree_pdf: float
+    reconstruit: bool = True
+    cle: str = ""
+
+
+def nb_jobs_defaut(nb_rapports: int) -> int:
+    """Un processus par rapport, au plus un par coeur."""
+    return max(1, min(nb_rapports, os.cpu_count() or 1))
+
+
+def generer_rapports(
+    travaux: list[tuple[BaseReport, Path]],
+    jobs: int | None = None,
+    cache: CacheRapports | None = None,
+) -> list[RenduRapport]:
+    """Genere le CSV et le PDF de chaque rapport dans son repertoire.
+
+    Args:
+        travaux: Paires (rapport, repertoire de sortie), dans l'ordre voulu.
+        jobs: Nombre de processus de rendu PDF (defaut: un par rapport, au
+            plus un par coeur). Avec 1, les PDF sont rendus dans le
+            processus courant.
+        cache: Magasin des fichiers deja generes (aucun cache si None).
+
+    Returns:
+        Un RenduRapport par rapport, dans l'ordre de `travaux`.
+    """
+    date_generation = datetime.date.today().isoformat()
+
+    preparations = []
+    for rapport, output_dir in travaux:
+        debut = time.perf_counter()
+        contexte = rapport.contexte_pdf(date_generation)
+        prep = _Preparation(
+            rapport=rapport,
+            csv=output_dir / f"{rapport.report_name}.csv",
+            pdf=output_dir / f"{rapport.report_name}.pdf",
+            contexte=contexte,
+            cle=cle_rapport(rapport, contexte),
+        )
+        prep.reconstruit = cache is None or not _restaurer(cache, prep)
+        if prep.reconstruit:
+            rapport.to_csv(prep.csv)
+        prep.duree_donnees = time.perf_counter() - debut
+        preparations.append(prep)
+
+    a_rendre = [p for p in preparations if p.reconstruit]
+    jobs = nb_jobs_defaut(len(a_rendre)) if jobs is None else max(1, jobs)
+    if jobs == 1 or len(a_rendre) <= 1:
+        for p in a_rendre:
+            p.duree_pdf = rendre_pdf(p.rapport.template_name, p.contexte, p.pdf)
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(a_rendre))) as pool:
+            futurs = [
+                pool.submit(rendre_pdf, p.rapport.template_name, p.contexte, p.pdf)
+                for p in a_rendre
+            ]
+            for p, futur in zip(a_rendre, futurs):
+                p.duree_pdf = futur.result()
+
+    if cache is not None:
+        for p in a_rendre:
+            cache.ecrire(p.cle, ".csv", p.csv)
+            cache.ecrire(p.cle, ".pdf", p.pdf)
+
+    return [
+        RenduRapport(
+            nom=p.rapport.report_name,
+            csv=p.csv,
+            pdf=p.pdf,
+            duree_donnees=p.duree_donnees,
+            duree_pdf=p.duree_pdf,
+            reconstruit=p.reconstruit,
+            cle=p.cle,
+        )
+        for p in preparations
+    ]
+
+
+@dataclass
+class _Preparation:
+    """Rapport dont le contexte est fige, en attente de rendu ou restaure."""
+
+    rapport: BaseReport
+    csv: Path
+    pdf: Path
+    contexte: dict
+    cle: str
+    reconstruit: bool = True
+    duree_donnees: float = 0.0
+    duree_pdf: float = 0.0
+
+
+def _restaurer(cache: CacheRapports, prep: _Preparation) -> bool:
+    """Copie le CSV et le PDF du rapport depuis le cache s'ils y sont tous deux."""
+    csv_cache = cache.lire(prep.cle, ".csv")
+    pdf_cache = cache.lire(prep.cle, ".pdf")
+    if csv_cache is None or pdf_cache is None:
+        return False
+    placer(csv_cache, prep.csv)
+    placer(pdf_cache, prep.pdf)
+    return True
@@ -13,6 +13,7 @@ from pathlib import Path
 from compteqc.quebec.dpa.calcul import PoolDPA, construire_pools
 from compteqc.quebec.dpa.classes import CLASSES_DPA
 from compteqc.quebec.dpa.registre import RegistreActifs
+from compteqc.rapports.agregats import Agregats
 from compteqc.rapports.base import BaseReport
 
 
@@ -33,8 +34,9 @@ class SommaireDPA(BaseReport):
         entreprise: str = "",
         chemin_actifs: str | Path = "data/actifs.yaml",
         ucc_precedent: dict[int, Decimal] | None = None,
+        agregats: Agregats | None = None,
     ) -> None:
-        super().__init__(entries, annee, entreprise)
+        super().__init__(entries, annee, entreprise, agregats)
         self.chemin_actifs = Path(chemin_actifs)
         self.ucc_precedent = ucc_precedent or {}
 
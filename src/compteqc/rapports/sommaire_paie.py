@@ -11,10 +11,10 @@ from decimal import Decimal
 
 from beancount.core import data
 
+from compteqc.rapports.agregats import COMPTE_SALAIRE_BRUT
 from compteqc.rapports.base import BaseReport
 
 # Comptes de paie dans le plan comptable (Phase 2 decision: per-deduction sub-accounts)
-COMPTE_SALAIRE_BRUT = "Depenses:Salaires:Brut"
 COMPTES_RETENUES = {
     "qpp_base": "Passifs:Retenues:QPP-Base",
     "qpp_supp1": "Passifs:Retenues:QPP-Supp1",
@@ -51,6 +51,7 @@ class SommairePaie(BaseReport):
 
     report_name = "sommaire_paie"
     template_name = "sommaire_paie.html"
+    besoins = ("paie",)
 
     def extract_data(self) -> dict:
         """Extrait les donnees de paie du ledger par transaction."""
@@ -75,28 +76,7 @@ class SommairePaie(BaseReport):
             "total_cotisations": Decimal("0"),
         }
 
-        debut = datetime.date(self.annee, 1, 1)
-        fin = datetime.date(self.annee, 12, 31)
-
-        for entry in self.entries:
-            if not isinstance(entry, data.Transaction):
-                continue
-            if entry.date < debut or entry.date > fin:
-                continue
-
-            # Identifier les transactions de paie: tag "paie" ou posting au brut
-            est_paie = False
-            if entry.tags and "paie" in entry.tags:
-                est_paie = True
-            else:
-                for posting in entry.postings:
-                    if posting.account == COMPTE_SALAIRE_BRUT:
-                        est_paie = True
-                        break
-
-            if not est_paie:
-                continue
-
+        for entry in self.agregats.transactions_paie():
             # Extraire les montants par compte
             ligne: dict[str, Decimal | datetime.date] = {"date": entry.date}
             brut = Decimal("0")
@@ -10,7 +10,14 @@ from __future__ import annotations
 import datetime
 from decimal import Decimal
 
-from compteqc.quebec.pret_actionnaire.suivi import obtenir_etat_pret
+from compteqc.ledger.colonnes import table_postings
+from compteqc.quebec.pret_actionnaire.suivi import (
+    COMPTE_PRET_ACTIONNAIRE,
+    EtatPret,
+    calculer_etat_pret,
+    mouvement_depuis_posting,
+)
+from compteqc.rapports.agregats import Agregats
 from compteqc.rapports.base import BaseReport
 
 
@@ -23,6 +30,7 @@ class SommairePret(BaseReport):
 
     report_name = "sommaire_pret"
     template_name = "sommaire_pret.html"
+    besoins = ("pret",)
 
     def __init__(
         self,
@@ -30,13 +38,17 @@ class SommairePret(BaseReport):
         annee: int,
         entreprise: str = "",
         fin_exercice: datetime.date | None = None,
+        agregats: Agregats | None = None,
     ) -> None:
-        super().__init__(entries, annee, entreprise)
+        super().__init__(entries, annee, entreprise, agregats)
         self.fin_exercice = fin_exercice or datetime.date(annee, 12, 31)
 
     def extract_data(self) -> dict:
         """Extrait l'etat du pret actionnaire."""
-        etat = obtenir_etat_pret(self.entries, self.fin_exercice)
+        if self.fin_exercice == datetime.date(self.agregats.annee, 12, 31):
+            etat = self.agregats.etat_pret()
+        else:
+            etat = self._etat_exercice()
 
         mouvements: list[dict] = []
         solde_courant = Decimal("0")
@@ -93,6 +105,29 @@ class SommairePret(BaseReport):
             "a_solde_non_nul": etat.solde != Decimal("0"),
         }
 
+    def _etat_exercice(self) -> EtatPret:
+        """Etat du pret sur l'exercice qui se termine a `fin_exercice`.
+
+        Exercice decale (ex: 1er juillet au 30 juin): les transactions du
+        pret sont choisies dans la table de postings en colonnes, deja
+        construite pour les soldes du package.
+        """
+        fin = self.fin_exercice
+        try:
+            debut = fin.replace(year=fin.year - 1) + datetime.timedelta(days=1)
+        except ValueError:  # 29 fevrier
+            debut = datetime.date(fin.year - 1, 3, 1)
+        table = table_postings(self.entries)
+        masque = table.masque(debut=debut, fin=fin, comptes=(COMPTE_PRET_ACTIONNAIRE,))
+        mouvements = []
+        for id_txn in dict.fromkeys(table.id_txn[masque].tolist()):
+            entry = table.transactions[id_txn]
+            for posting in entry.postings:
+                mouvement = mouvement_depuis_posting(entry, posting)
+                if mouvement is not None:
+                    mouvements.append(mouvement)
+        return calculer_etat_pret(mouvements)
+
     def csv_headers(self) -> list[str]:
         return [
             "Date",
@@ -9,7 +9,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
-from compteqc.quebec.taxes.sommaire import generer_sommaires_annuels
+from compteqc.rapports.agregats import Agregats
 from compteqc.rapports.base import BaseReport
 
 
@@ -22,6 +22,7 @@ class SommaireTaxes(BaseReport):
 
     report_name = "sommaire_taxes"
     template_name = "sommaire_taxes.html"
+    besoins = ("taxes",)
 
     def __init__(
         self,
@@ -29,13 +30,14 @@ class SommaireTaxes(BaseReport):
         annee: int,
         entreprise: str = "",
         frequence: str = "trimestriel",
+        agregats: Agregats | None = None,
     ) -> None:
-        super().__init__(entries, annee, entreprise)
+        super().__init__(entries, annee, entreprise, agregats)
         self.frequence = frequence
 
     def extract_data(self) -> dict:
         """Extrait les sommaires TPS/TVQ par periode."""
-        sommaires = generer_sommaires_annuels(self.entries, self.annee, self.frequence)
+        sommaires = self.agregats.sommaires_taxes(self.frequence)
 
         periodes: list[dict] = []
         totaux = {
@@ -415,3 +415,108 @@ class TestRevue:
         # The fixture has one non-classified transaction
         assert "non-classee" in result.output.lower()
         assert "Transaction mystere" in result.output or "Achat inconnu" in result.output
+
+
+# =============================================================================
+# Tests surveillance (daemon d'import)
+# =============================================================================
+
+
+@pytest.fixture
+def ledger_neuf(tmp_path):
+    """Ledger minimal sans transactions (plan comptable seulement)."""
+    ledger_dir = tmp_path / "ledger"
+    ledger_dir.mkdir()
+    shutil.copy(PROJECT_ROOT / "ledger" / "comptes.beancount", ledger_dir / "comptes.beancount")
+    (ledger_dir / "main.beancount").write_text(
+        'option "operating_currency" "CAD"\n'
+        'option "name_assets" "Actifs"\n'
+        'option "name_liabilities" "Passifs"\n'
+        'option "name_equity" "Capital"\n'
+        'option "name_income" "Revenus"\n'
+        'option "name_expenses" "Depenses"\n'
+        'include "comptes.beancount"\n',
+        encoding="utf-8",
+    )
+    rules_dir = tmp_path / "rules"
+    rules_dir.mkdir()
+    (rules_dir / "categorisation.yaml").write_text("regles: []\n", encoding="utf-8")
+    return tmp_path
+
+
+class TestSurveillance:
+    def test_surveiller_help(self):
+        result = runner.invoke(app, ["importer", "surveiller", "--help"])
+        assert result.exit_code == 0
+        assert "--polling" in result.output
+
+    def test_traiter_fichier_garde_ledger_chaud(self, ledger_neuf, monkeypatch):
+        from compteqc.cli import importer as mod
+
+        chemin_main = ledger_neuf / "ledger" / "main.beancount"
+        contexte = mod._ContexteSurveillance(
+            chemin_main, ledger_neuf / "rules" / "categorisation.yaml"
+        )
+        contexte.preparer()
+        pipeline_initial = contexte.pipeline
+
+        chargements = []
+        monkeypatch.setattr(
+            mod.loader, "load_file", lambda *a, **k: chargements.append(a) or ([], [], {})
+        )
+
+        imports = ledger_neuf / "data" / "imports"
+        imports.mkdir(parents=True)
+        fichier = imports / "releve.csv"
+        shutil.copy(FIXTURES_DIR / "rbc_cheques_sample.csv", fichier)
+
+        nb = mod._traiter_fichier_surveille(
+            fichier, contexte, ledger_neuf / "data" / "processed"
+        )
+
+        assert nb == 8
+        assert not fichier.exists()
+        assert list((ledger_neuf / "data" / "processed").rglob("releve.csv"))
+        assert (ledger_neuf / "ledger" / "pending.beancount").exists()
+        # Ledger et pipeline gardes en memoire: aucun re-parse
+        assert chargements == []
+        assert contexte.pipeline is pipeline_initial
+        assert len(contexte.entries) > 8
+
+        # Le meme fichier redepose est dedoublonne depuis le ledger en memoire
+        shutil.copy(FIXTURES_DIR / "rbc_cheques_sample.csv", fichier)
+        assert mod._traiter_fichier_surveille(
+            fichier, contexte, ledger_neuf / "data" / "processed"
+        ) == 0
+        assert chargements == []
+
+
+class TestReviserAlias:
+    def test_alias_appris_sauvegarde(self, ledger_neuf):
+        from compteqc.ingestion.beneficiaires import (
+            NormaliseurBeneficiaires,
+            definir_normaliseur_defaut,
+        )
+
+        try:
+            result = runner.invoke(
+                app,
+                [
+                    "--ledger",
+                    str(ledger_neuf / "ledger" / "main.beancount"),
+                    "--regles",
+                    str(ledger_neuf / "rules" / "categorisation.yaml"),
+                    "reviser",
+                    "alias",
+                    "PMNT FACT ELECTR HYDRO-QUEBEC",
+                    "Hydro-Quebec",
+                ],
+            )
+            assert result.exit_code == 0, result.output
+            assert "Alias appris" in result.output
+
+            chemin_alias = ledger_neuf / "rules" / "beneficiaires.yaml"
+            normaliseur = NormaliseurBeneficiaires.charger(chemin_alias)
+            assert normaliseur.canonique("Pmnt Fact Électr Hydro-Quebec") == "Hydro-Quebec"
+        finally:
+            definir_normaliseur_defaut(None)
@@ -7,6 +7,7 @@ et les commandes CLI cqc cpa export / cqc cpa verifier.
 from __future__ import annotations
 
 import csv
+import datetime
 import os
 import zipfile
 from decimal import Decimal
@@ -20,10 +21,21 @@ from compteqc.echeances.verification import (
     VerificationResult,
     verifier_fin_exercice,
 )
+from compteqc.quebec.pret_actionnaire.suivi import obtenir_etat_pret
+from compteqc.rapports.agregats import Agregats
+from compteqc.rapports.balance_verification import BalanceVerification
+from compteqc.rapports.bilan import Bilan
+from compteqc.rapports.cache import CacheRapports, cle_rapport
 from compteqc.rapports.cpa_package import (
     CpaPackageError,
+    _assembler_zip,
     generer_package_cpa,
 )
+from compteqc.rapports.etat_resultats import EtatResultats
+from compteqc.rapports.rendu import generer_rapports
+from compteqc.rapports.sommaire_paie import SommairePaie
+from compteqc.rapports.sommaire_pret import SommairePret
+from compteqc.rapports.sommaire_taxes import SommaireTaxes
 
 
 # ---------------------------------------------------------------------------
@@ -248,6 +260,166 @@ class TestVerification:
         assert "1 transaction" in pending[0].message
 
 
+# ===========================================================================
+# Tests: Agregats partages
+# ===========================================================================
+
+PRET_ET_TAXES = """
+2025-01-01 open Passifs:Retenues:Impot-Federal CAD
+
+2025-03-01 * "Actionnaire" "Avance"
+  Passifs:Pret-Actionnaire  2000.00 CAD
+  Actifs:Banque:RBC  -2000.00 CAD
+
+2025-04-10 * "Client" "Facture taxable"
+  Actifs:Banque:RBC  1149.75 CAD
+  Revenus:Consultation  -1000.00 CAD
+  Passifs:TPS-Percue  -50.00 CAD
+  Passifs:TVQ-Percue  -99.75 CAD
+
+2025-05-31 * "Paie" "Salaire mai"
+  Depenses:Salaires:Brut  4000.00 CAD
+  Passifs:Retenues:Impot-Federal  -600.00 CAD
+  Actifs:Banque:RBC  -3400.00 CAD
+"""
+
+RAPPORTS_AGREGES = (
+    BalanceVerification,
+    EtatResultats,
+    Bilan,
+    SommairePaie,
+    SommaireTaxes,
+    SommairePret,
+)
+
+
+@pytest.fixture
+def complete_entries():
+    entries, errors, _ = parse_string(BEANCOUNT_BALANCED + PRET_ET_TAXES)
+    assert not errors, f"Parse errors: {errors}"
+    return entries
+
+
+class TestAgregats:
+    """Rapports et checklist alimentes par un seul parcours du ledger."""
+
+    def test_un_seul_parcours_pour_le_package(self, complete_entries):
+        agregats = Agregats(complete_entries, 2025)
+        rapports = [cls(complete_entries, 2025, agregats=agregats) for cls in RAPPORTS_AGREGES]
+        resultats = verifier_fin_exercice(complete_entries, 2025, agregats=agregats)
+        for rapport in rapports:
+            assert rapport.data
+        assert len(resultats) == 6
+        assert agregats.parcours == 1
+
+    def test_memes_donnees_que_les_rapports_seuls(self, complete_entries):
+        agregats = Agregats(complete_entries, 2025)
+        for cls in RAPPORTS_AGREGES:
+            partage = cls(complete_entries, 2025, agregats=agregats)
+            seul = cls(complete_entries, 2025)
+            assert partage.data == seul.data, cls.__name__
+
+    def test_paie_et_pret(self, complete_entries):
+        agregats = Agregats(complete_entries, 2025)
+        paie = SommairePaie(complete_entries, 2025, agregats=agregats).data
+        assert paie["nb_periodes"] == 2
+        assert paie["totaux"]["brut"] == Decimal("7000.00")
+        assert paie["totaux"]["impot_federal"] == Decimal("600.00")
+
+        attendu = obtenir_etat_pret(complete_entries, datetime.date(2025, 12, 31))
+        etat = agregats.etat_pret()
+        assert etat.solde == attendu.solde == Decimal("2000.00")
+        assert etat.avances_ouvertes == attendu.avances_ouvertes
+
+    def test_pret_exercice_decale(self, complete_entries):
+        """Fin d'exercice au 28 fevrier: l'avance de mars 2025 est dans l'exercice."""
+        data = SommairePret(
+            complete_entries, 2026, fin_exercice=datetime.date(2026, 2, 28)
+        ).data
+        assert [m["date"] for m in data["mouvements"]] == [datetime.date(2025, 3, 1)]
+        assert data["solde_fin"] == Decimal("2000.00")
+        assert data["avances_s152"][0]["date_inclusion"] == datetime.date(2027, 2, 28)
+
+    def test_checklist_identique(self, complete_entries):
+        partage = verifier_fin_exercice(
+            complete_entries, 2025, agregats=Agregats(complete_entries, 2025)
+        )
+        assert partage == verifier_fin_exercice(complete_entries, 2025)
+
+    def test_agregat_inconnu(self, complete_entries):
+        with pytest.raises(ValueError, match="inconnus"):
+            Agregats(complete_entries, 2025).declarer(["soldes", "inexistant"])
+
+
+# ===========================================================================
+# Tests: Cache adresse par contenu
+# ===========================================================================
+
+
+class TestCacheRapports:
+    """Rapports inchanges copies depuis le magasin au lieu d'etre rendus."""
+
+    def test_cle_stable_et_sensible_aux_donnees(self, balanced_entries, complete_entries):
+        bilan = Bilan(balanced_entries, 2025)
+        cle = cle_rapport(bilan, bilan.contexte_pdf("2026-01-15"))
+        assert cle == cle_rapport(bilan, Bilan(balanced_entries, 2025).contexte_pdf("2026-01-15"))
+        assert cle != cle_rapport(bilan, bilan.contexte_pdf("2026-01-16"))
+        modifie = Bilan(complete_entries, 2025)
+        assert cle != cle_rapport(modifie, modifie.contexte_pdf("2026-01-15"))
+        # Meme contexte, autre rapport: autre cle
+        balance = BalanceVerification(balanced_entries, 2025)
+        assert cle != cle_rapport(balance, bilan.contexte_pdf("2026-01-15"))
+
+    def test_rapport_en_cache_non_rendu(self, balanced_entries, tmp_path):
+        cache = CacheRapports(tmp_path / "cache")
+        rapport = Bilan(balanced_entries, 2025)
+        cle = cle_rapport(rapport, rapport.contexte_pdf(datetime.date.today().isoformat()))
+        source = tmp_path / "source"
+        source.write_bytes(b"csv en cache")
+        cache.ecrire(cle, ".csv", source)
+        source.write_bytes(b"%PDF en cache")
+        cache.ecrire(cle, ".pdf", source)
+
+        (rendu,) = generer_rapports([(rapport, tmp_path / "sortie")], cache=cache)
+
+        assert rendu.reconstruit is False
+        assert rendu.cle == cle
+        assert rendu.duree_pdf == 0.0
+        assert rendu.csv.read_bytes() == b"csv en cache"
+        assert rendu.pdf.read_bytes() == b"%PDF en cache"
+
+    def test_zip_lu_dans_le_magasin_puis_reutilise(self, tmp_path):
+        cache = CacheRapports(tmp_path / "cache")
+        source = tmp_path / "bilan.pdf"
+        source.write_bytes(b"%PDF bilan")
+        magasin = cache.ecrire("ab" * 32, ".pdf", source)
+        sources = {"pkg/rapports/bilan.pdf": (magasin, "ab" * 32 + ".pdf")}
+
+        zip_path = tmp_path / "package.zip"
+        assert _assembler_zip(zip_path, sources, cache) is True
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.read("pkg/rapports/bilan.pdf") == b"%PDF bilan"
+            assert zf.getinfo("pkg/rapports/bilan.pdf").compress_type == zipfile.ZIP_DEFLATED
+
+        zip_path.unlink()
+        assert _assembler_zip(zip_path, sources, cache) is False
+        with zipfile.ZipFile(zip_path) as zf:
+            assert zf.read("pkg/rapports/bilan.pdf") == b"%PDF bilan"
+
+    def test_package_regenere_depuis_le_cache(
+        self, balanced_entries, tmp_path, weasyprint_available
+    ):
+        cache = tmp_path / "cache"
+        premier = generer_package_cpa(
+            entries=balanced_entries, annee=2025, output_dir=tmp_path / "a", cache=cache
+        )
+        second = generer_package_cpa(
+            entries=balanced_entries, annee=2025, output_dir=tmp_path / "b", cache=cache
+        )
+        # Rien n'a change: le second ZIP est la copie du premier
+        assert second.read_bytes() == premier.read_bytes()
+
+
 # ===========================================================================
 # Tests: CPA Package (ZIP)
 # ===========================================================================
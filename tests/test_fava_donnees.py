@@ -0,0 +1,217 @@
+"""Tests du service de donnees derivees partage par les extensions Fava.
+
+Charge un vrai FavaLedger (sans serveur) et verifie que les extensions
+calculent leur vue au premier affichage, a partir d'un seul calcul par
+version du ledger, avec les memes resultats que les calculs independants
+qu'elles faisaient auparavant.
+"""
+
+from __future__ import annotations
+
+import datetime
+from decimal import Decimal
+
+import pytest
+from fava.core import FavaLedger
+
+from compteqc.fava_ext.approbation import ApprobationExtension
+from compteqc.fava_ext.donnees import donnees_ledger, oublier_services
+from compteqc.fava_ext.dpa_qc import DpaQCExtension
+from compteqc.fava_ext.echeances import EcheancesExtension
+from compteqc.fava_ext.paie_qc import PaieQCExtension
+from compteqc.fava_ext.pret_actionnaire import PretActionnaireExtension
+from compteqc.fava_ext.taxes_qc import TaxesQCExtension
+from compteqc.mcp.services import lister_pending
+from compteqc.quebec.paie.ytd import calculer_cumuls_depuis_transactions
+from compteqc.quebec.pret_actionnaire.suivi import obtenir_etat_pret
+from compteqc.quebec.taxes.sommaire import generer_sommaires_annuels
+
+ANNEE = datetime.date.today().year
+
+LEDGER = f"""\
+option "name_assets" "Actifs"
+option "name_liabilities" "Passifs"
+option "name_equity" "Capital"
+option "name_income" "Revenus"
+option "name_expenses" "Depenses"
+option "operating_currency" "CAD"
+
+{ANNEE}-01-01 open Actifs:Banque:Desjardins CAD
+{ANNEE}-01-01 open Actifs:TPS-Payee CAD
+{ANNEE}-01-01 open Passifs:TPS-Percue CAD
+{ANNEE}-01-01 open Passifs:TVQ-Percue CAD
+{ANNEE}-01-01 open Passifs:Pret-Actionnaire CAD
+{ANNEE}-01-01 open Passifs:Retenues:Impot-Federal CAD
+{ANNEE}-01-01 open Depenses:Salaires:Brut CAD
+{ANNEE}-01-01 open Depenses:Fournitures CAD
+{ANNEE}-01-01 open Revenus:Consultation CAD
+
+{ANNEE}-01-15 * "Client ABC" "Facture 001"
+  Actifs:Banque:Desjardins  1149.75 CAD
+  Revenus:Consultation  -1000.00 CAD
+  Passifs:TPS-Percue  -50.00 CAD
+  Passifs:TVQ-Percue  -99.75 CAD
+
+{ANNEE}-01-31 * "Paie" "Salaire janvier" #paie
+  Depenses:Salaires:Brut  5000.00 CAD
+  Passifs:Retenues:Impot-Federal  -700.00 CAD
+  Actifs:Banque:Desjardins  -4300.00 CAD
+
+{ANNEE}-02-01 * "Actionnaire" "Avance a l'actionnaire"
+  Passifs:Pret-Actionnaire  2000.00 CAD
+  Actifs:Banque:Desjardins  -2000.00 CAD
+
+{ANNEE}-02-10 ! "Amazon" "Clavier" #pending
+  confiance: "0.97"
+  source_ia: "regle"
+  Depenses:Fournitures  150.00 CAD
+  Actifs:Banque:Desjardins  -150.00 CAD
+
+{ANNEE}-02-12 ! "Apple" "MacBook" #pending
+  confiance: "0.65"
+  source_ia: "llm"
+  Depenses:Fournitures  3500.00 CAD
+  Actifs:Banque:Desjardins  -3500.00 CAD
+"""
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    chemin = tmp_path / "main.beancount"
+    chemin.write_text(LEDGER, encoding="utf-8")
+    oublier_services()
+    yield FavaLedger(str(chemin))
+    oublier_services()
+
+
+def _charger(ledger, *classes):
+    extensions = [cls(ledger) for cls in classes]
+    for ext in extensions:
+        ext.after_load_file()
+    return extensions
+
+
+def _afficher(extensions):
+    for ext in extensions:
+        ext.assurer_a_jour()
+    return extensions
+
+
+EXTENSIONS = (
+    ApprobationExtension,
+    PaieQCExtension,
+    TaxesQCExtension,
+    DpaQCExtension,
+    PretActionnaireExtension,
+    EcheancesExtension,
+)
+
+
+class TestDonneesDerivees:
+    def test_chargement_ne_calcule_rien(self, ledger):
+        extensions = _charger(ledger, *EXTENSIONS)
+        donnees = donnees_ledger(ledger)
+        assert donnees.actualisations == 0
+        assert all(ext._perimee for ext in extensions)
+
+    def test_un_seul_parcours_pour_toutes_les_pages(self, ledger):
+        _afficher(_charger(ledger, *EXTENSIONS))
+        donnees = donnees_ledger(ledger)
+        assert donnees.actualisations == 1
+        assert donnees.parcours == 1
+
+    def test_calcul_au_premier_affichage(self, ledger):
+        paie, taxes = _charger(ledger, PaieQCExtension, TaxesQCExtension)
+        assert paie.totaux()["salaire_brut_ytd"] == Decimal("5000.00")
+        assert paie._perimee is False
+        assert taxes._perimee is True
+
+    def test_service_unique_par_ledger(self, ledger):
+        assert donnees_ledger(ledger) is donnees_ledger(ledger)
+
+    def test_rechargement_sans_modification_garde_les_calculs(self, ledger):
+        extensions = _afficher(_charger(ledger, *EXTENSIONS))
+        donnees = donnees_ledger(ledger)
+        paie_avant = donnees.cumuls_paie()
+
+        ledger.load_file()
+        for ext in extensions:
+            ext.after_load_file()
+        _afficher(extensions)
+
+        assert donnees.actualisations == 1
+        assert donnees.cumuls_paie() is paie_avant
+
+    def test_modification_du_ledger_recalcule(self, ledger, tmp_path):
+        (paie,) = _afficher(_charger(ledger, PaieQCExtension))
+        donnees = donnees_ledger(ledger)
+
+        chemin = tmp_path / "main.beancount"
+        chemin.write_text(
+            LEDGER + f"""
+{ANNEE}-02-28 * "Paie" "Salaire fevrier" #paie
+  Depenses:Salaires:Brut  5000.00 CAD
+  Actifs:Banque:Desjardins  -5000.00 CAD
+""",
+            encoding="utf-8",
+        )
+        ledger.load_file()
+        paie.after_load_file()
+
+        assert paie.totaux()["salaire_brut_ytd"] == Decimal("10000.00")
+        assert donnees.actualisations == 2
+
+    def test_prechauffage(self, ledger, monkeypatch):
+        monkeypatch.setenv("COMPTEQC_FAVA_PRECHAUFFAGE", "true")
+        extensions = _charger(ledger, *EXTENSIONS)
+        donnees = donnees_ledger(ledger)
+        donnees.attendre_prechauffage(10)
+
+        assert not any(ext._perimee for ext in extensions)
+        assert donnees.parcours == 1
+
+    def test_parts_identiques_aux_calculs_independants(self, ledger):
+        approbation, paie, taxes, _, pret, _ = _afficher(_charger(ledger, *EXTENSIONS))
+        entries = ledger.all_entries
+
+        assert paie._payroll_data == calculer_cumuls_depuis_transactions(entries, ANNEE)
+        assert taxes._sommaires == generer_sommaires_annuels(entries, ANNEE, "annuel")
+
+        attendu = obtenir_etat_pret(entries, datetime.date(ANNEE, 12, 31))
+        assert pret._etat.solde == attendu.solde == Decimal("2000.00")
+        assert pret._etat.avances_ouvertes == attendu.avances_ouvertes
+        assert [(m.date, m.montant) for m in pret._etat.mouvements] == [
+            (m.date, m.montant) for m in attendu.mouvements
+        ]
+
+        pending = lister_pending(entries)
+        assert [t["payee"] for t in approbation.pending_transactions()] == ["Amazon", "Apple"]
+        assert [t["gros_montant"] for t in approbation.pending_transactions()] == [False, True]
+        # La liste partagee n'est pas modifiee par l'enrichissement
+        assert "niveau" not in donnees_ledger(ledger).pending()[0]
+        assert donnees_ledger(ledger).pending() == pending
+
+    def test_frequences_taxes_distinctes(self, ledger):
+        donnees = donnees_ledger(ledger)
+        annuel = donnees.sommaires_taxes("annuel")
+        trimestriel = donnees.sommaires_taxes("trimestriel")
+        assert len(annuel) == 1
+        assert len(trimestriel) == 4
+        assert donnees.sommaires_taxes("annuel") is annuel
+
+    def test_registre_actifs_relu_seulement_si_modifie(self, ledger, tmp_path):
+        donnees = donnees_ledger(ledger)
+        registre = donnees.registre_actifs()
+        assert registre.actifs == []
+
+        ledger.load_file()
+        assert donnees.registre_actifs() is registre
+
+        (tmp_path / "actifs.yaml").write_text("actifs: []\n", encoding="utf-8")
+        assert donnees.registre_actifs() is not registre
+
+    def test_echeances_en_dictionnaires(self, ledger):
+        (echeances,) = _charger(ledger, EcheancesExtension)
+        assert echeances.echeances_disponible() is True
+        for alerte in echeances.alertes():
+            assert {"description", "date_limite", "jours_restants", "classe_css"} <= set(alerte)
@@ -237,3 +237,163 @@ def test_gros_montant_identified_in_pending(entries_avec_pending):
     assert len(gros) == 1
     assert gros[0]["payee"] == "Apple"
     assert gros[0]["montant"] == Decimal("3500.00")
+
+
+# ---------- Test filtres et pagination de la file ----------
+
+
+def test_lire_filtres_ignore_vides_et_niveau_inconnu():
+    """Seuls les filtres renseignes et valides sont retenus."""
+    from compteqc.fava_ext.approbation import lire_filtres
+
+    filtres = lire_filtres({"niveau": "inconnu", "source": " ml ", "compte": "", "page": "2"})
+    assert filtres == {"source": "ml"}
+
+
+def test_filtrer_pending_par_niveau_et_montant(entries_avec_pending):
+    """Les filtres retournent les indices dans la file complete."""
+    from compteqc.fava_ext.approbation import filtrer_pending
+
+    pending = lister_pending(entries_avec_pending)
+    assert filtrer_pending(pending, {}) == [0, 1, 2]
+    assert filtrer_pending(pending, {"niveau": "revision"}) == [2]
+    assert filtrer_pending(pending, {"source": "ml"}) == [1]
+    assert filtrer_pending(pending, {"compte": "fournitures"}) == [0, 2]
+    assert filtrer_pending(pending, {"montant_min": "100", "montant_max": "2000"}) == [0]
+
+
+def test_filtrer_pending_montant_invalide(entries_avec_pending):
+    """Une borne de montant illisible est signalee."""
+    from compteqc.fava_ext.approbation import filtrer_pending
+
+    with pytest.raises(ValueError, match="Montant invalide"):
+        filtrer_pending(lister_pending(entries_avec_pending), {"montant_min": "abc"})
+
+
+@pytest.fixture
+def app_fava(tmp_path):
+    """Application Fava sur un ledger dont pending.beancount contient 5 transactions."""
+    import shutil
+    from datetime import date
+    from pathlib import Path
+
+    from beancount.core import amount, data
+    from fava.application import create_app
+
+    from compteqc.categorisation.pending import ecrire_pending
+    from compteqc.categorisation.pipeline import ResultatPipeline
+    from compteqc.fava_ext.donnees import oublier_services
+
+    racine = Path(__file__).parent.parent
+    ledger_dir = tmp_path / "ledger"
+    ledger_dir.mkdir()
+    shutil.copy(racine / "ledger" / "comptes.beancount", ledger_dir / "comptes.beancount")
+    (ledger_dir / "main.beancount").write_text(
+        'option "title" "CompteQC - Test"\n'
+        'option "operating_currency" "CAD"\n'
+        'option "name_assets" "Actifs"\n'
+        'option "name_liabilities" "Passifs"\n'
+        'option "name_equity" "Capital"\n'
+        'option "name_income" "Revenus"\n'
+        'option "name_expenses" "Depenses"\n'
+        '\n'
+        '2025-01-01 custom "fava-extension" "compteqc.fava_ext.approbation"\n'
+        'include "comptes.beancount"\n'
+        'include "pending.beancount"\n',
+        encoding="utf-8",
+    )
+
+    def txn(payee: str, montant: str) -> data.Transaction:
+        return data.Transaction(
+            meta=data.new_metadata("<test>", 0), date=date(2026, 1, 15), flag="!",
+            payee=payee, narration="achat", tags=frozenset(), links=frozenset(),
+            postings=[
+                data.Posting("Actifs:Banque:RBC:Cheques",
+                             amount.Amount(-Decimal(montant), "CAD"), None, None, None, None),
+                data.Posting("Depenses:Non-Classe",
+                             amount.Amount(Decimal(montant), "CAD"), None, None, None, None),
+            ],
+        )
+
+    def resultat(compte: str, confiance: float, source: str) -> ResultatPipeline:
+        return ResultatPipeline(
+            compte=compte, confiance=confiance, source=source, regle=None,
+            est_capex=False, classe_dpa=None, revue_obligatoire=False, suggestions=None,
+        )
+
+    ecrire_pending(
+        ledger_dir / "pending.beancount",
+        [
+            txn("Tim Hortons", "5.50"),
+            txn("Bureau en Gros", "80.00"),
+            txn("Staples", "2500.00"),
+            txn("Resto", "45.00"),
+            txn("Dell", "60.00"),
+        ],
+        [
+            resultat("Depenses:Repas-Representation", 0.97, "regles"),
+            resultat("Depenses:Bureau:Fournitures", 0.97, "regles"),
+            resultat("Depenses:Bureau:Fournitures", 0.97, "regles"),
+            resultat("Depenses:Repas-Representation", 0.60, "llm"),
+            resultat("Depenses:Bureau:Fournitures", 0.85, "ml"),
+        ],
+    )
+
+    oublier_services()
+    app = create_app([ledger_dir / "main.beancount"], load=True)
+    app.config["TESTING"] = True
+    yield app, ledger_dir
+    oublier_services()
+
+
+def _url_extension(app, suffixe: str = "") -> str:
+    slug = app.config["LEDGERS"].first_slug()
+    return f"/{slug}/extension/ApprobationExtension/{suffixe}"
+
+
+def test_page_filtree_et_paginee(app_fava):
+    """La page n'affiche que la page demandee des transactions filtrees."""
+    app, _ = app_fava
+    client = app.test_client()
+
+    page = client.get(_url_extension(app) + "?taille=2&page=2").get_data(as_text=True)
+    assert "Page 2 / 3" in page
+    assert "<td>Staples</td>" in page and "<td>Resto</td>" in page
+    assert "<td>Tim Hortons</td>" not in page
+
+    filtree = client.get(_url_extension(app) + "?source=regles").get_data(as_text=True)
+    assert "3 retenue(s) par le filtre" in filtree
+    assert "<td>Resto</td>" not in filtree
+
+
+def test_approuver_tout_le_filtre(app_fava):
+    """L'action sur le filtre approuve toutes les transactions retenues en une ecriture."""
+    from compteqc.categorisation.pending import lire_pending
+
+    app, ledger_dir = app_fava
+    client = app.test_client()
+    url = _url_extension(app, "approuver_filtre")
+    formulaire = {"source": "regles", "montant_max": "1000"}
+
+    # Nombre annonce different: la file a change depuis l'affichage
+    refus = client.post(url, data={**formulaire, "nb_attendu": "3"})
+    assert "Selection modifiee" in refus.get_data(as_text=True)
+    assert len(lire_pending(ledger_dir / "pending.beancount")) == 5
+
+    reponse = client.post(url, data={**formulaire, "nb_attendu": "2"})
+    assert reponse.status_code == 302
+
+    restantes = [t.payee for t in lire_pending(ledger_dir / "pending.beancount")]
+    assert restantes == ["Staples", "Resto", "Dell"]
+
+
+def test_approuver_filtre_gros_montants_confirmation(app_fava):
+    """Le garde-fou des 2 000 $ s'applique aussi a l'action sur le filtre."""
+    from compteqc.categorisation.pending import lire_pending
+
+    app, ledger_dir = app_fava
+    reponse = app.test_client().post(
+        _url_extension(app, "approuver_filtre"), data={"source": "regles", "nb_attendu": "3"}
+    )
+    assert "Confirmation requise" in reponse.get_data(as_text=True)
+    assert len(lire_pending(ledger_dir / "pending.beancount")) == 5
@@ -140,6 +140,44 @@ class TestChargerHistorique:
         result = charger_historique(chemin)
         assert result == {}
 
+    def test_anciennes_cles_regroupees(self, tmp_path):
+        """Les cles d'avant la canonisation des vendeurs gardent leurs compteurs."""
+        chemin = tmp_path / "historique.json"
+        compte = "Depenses:Repas-Representation"
+        chemin.write_text(
+            json.dumps({
+                "TIM HORTONS #1234": {
+                    "comptes": {compte: 1},
+                    "notes": [{"note": "b", "timestamp": "2026-02-01T00:00:00+00:00"}],
+                    "dernier_timestamp": "2026-02-01T00:00:00+00:00",
+                },
+                "TIM HORTONS #5678": {
+                    "comptes": {compte: 1, "Depenses:Bureau": 2},
+                    "notes": [{"note": "a", "timestamp": "2026-01-01T00:00:00+00:00"}],
+                    "dernier_timestamp": "2026-01-01T00:00:00+00:00",
+                },
+            }),
+            encoding="utf-8",
+        )
+
+        historique = charger_historique(chemin)
+        assert list(historique) == ["TIM HORTONS"]
+        entree = historique["TIM HORTONS"]
+        assert entree["comptes"] == {compte: 2, "Depenses:Bureau": 2}
+        assert [n["note"] for n in entree["notes"]] == ["a", "b"]
+        assert entree["dernier_timestamp"] == "2026-02-01T00:00:00+00:00"
+
+    def test_correction_apres_migration_atteint_seuil(self, tmp_path):
+        """Une correction sur un ancien historique compte les corrections passees."""
+        chemin = tmp_path / "historique.json"
+        chemin.write_text(
+            json.dumps({"TIM HORTONS #1234": {"comptes": {"Depenses:Repas": 1}, "notes": []}}),
+            encoding="utf-8",
+        )
+        regle = enregistrer_correction(chemin, "Tim Hortons #9999", "Depenses:Repas")
+        assert regle is not None
+        assert list(charger_historique(chemin)) == ["TIM HORTONS"]
+
 
 class TestAjouterRegleAuto:
     """Tests pour ajouter_regle_auto."""
@@ -9,6 +9,11 @@ from pathlib import Path
 import pytest
 from beancount.core import data
 
+from compteqc.ingestion.beneficiaires import (
+    NormaliseurBeneficiaires,
+    cle_beneficiaire,
+    definir_normaliseur_defaut,
+)
 from compteqc.ingestion.normalisation import (
     archiver_fichier,
     detecter_encodage,
@@ -16,7 +21,19 @@ from compteqc.ingestion.normalisation import (
 )
 from compteqc.ingestion.rbc_carte import RBCCarteImporter
 from compteqc.ingestion.rbc_cheques import RBCChequesImporter
-from compteqc.ingestion.rbc_ofx import RBCOfxImporter
+from compteqc.ingestion.rbc_ofx import (
+    RBCOfxImporter,
+    charger_ofx,
+    importateurs_depuis_ofx,
+    vider_cache_ofx,
+)
+from compteqc.ingestion.registre import (
+    FORMATS_INTEGRES,
+    FormatImport,
+    RegistreImportateurs,
+    empreinte_entete,
+)
+from compteqc.ingestion.surveillance import SurveillantRepertoire
 
 FIXTURES = Path(__file__).parent / "fixtures"
 
@@ -43,6 +60,105 @@ class TestNettoyerBeneficiaire:
         assert nettoyer_beneficiaire("AWS AMAZON COM  SEATTLE WA") == "Aws Amazon Com Seattle Wa"
 
 
+# ---------------------------------------------------------------------------
+# Tests NormaliseurBeneficiaires
+# ---------------------------------------------------------------------------
+
+
+class TestNormaliseurBeneficiaires:
+    @pytest.fixture
+    def normaliseur(self):
+        return NormaliseurBeneficiaires(
+            alias={"Hydro-Quebec": ["HYDRO[- ]?QUEBEC"], "Tim Hortons": ["^TIM HORTONS"]},
+        )
+
+    def test_cle_retire_numero_magasin(self):
+        assert cle_beneficiaire("Tim Hortons #1234") == "TIM HORTONS"
+        assert cle_beneficiaire("SAQ23132 MARCHE ATWATER") == "SAQ MARCHE ATWATER"
+
+    def test_cle_retire_processeur_province_accents(self):
+        assert cle_beneficiaire("SQ *MOLLO CAFE MONTREAL QC") == "MOLLO CAFE MONTREAL"
+        assert cle_beneficiaire("Pmnt Fact Électr") == "PMNT FACT ELECTR"
+
+    def test_variantes_meme_marchand(self, normaliseur):
+        variantes = ["TIM HORTONS #1234", "TIM HORTONS 5678 MONTREAL QC", "SQ *TIM HORTONS"]
+        assert {normaliseur.canonique(v) for v in variantes} == {"Tim Hortons"}
+
+    def test_sans_alias_nettoyage(self, normaliseur):
+        assert normaliseur.canonique("MOLLO CAFE MONTREAL QC") == "Mollo Cafe Montreal"
+        assert normaliseur.canonique("ACME INC 42") == "Acme Inc 42"
+
+    def test_alias_appris_prioritaire(self, normaliseur):
+        normaliseur.apprendre("PMNT FACT ELECTR HYDRO-QUEBEC", "Hydro Electricite")
+        assert normaliseur.canonique("Pmnt Fact Électr Hydro-Quebec") == "Hydro Electricite"
+        assert normaliseur.canonique("HYDRO QUEBEC") == "Hydro-Quebec"
+
+    def test_lot_resout_chaque_libelle_une_fois(self, normaliseur):
+        bruts = ["IGA #1 MONTREAL"] * 50 + ["TIM HORTONS #9"] * 50
+        resultats = normaliseur.canonique_lot(bruts)
+        assert resultats[0] == "Iga Montreal"
+        assert resultats[-1] == "Tim Hortons"
+        assert normaliseur.stats_memo()["misses"] == 2
+
+    def test_regex_invalide_ignoree(self):
+        normaliseur = NormaliseurBeneficiaires(alias={"X": ["[invalide"]})
+        assert normaliseur.canonique("BELL CANADA") == "Bell Canada"
+
+    def test_charger_sauvegarder(self, tmp_path):
+        chemin = tmp_path / "beneficiaires.yaml"
+        chemin.write_text('alias:\n  Amazon: "^AMAZON|AMZN"\n', encoding="utf-8")
+        normaliseur = NormaliseurBeneficiaires.charger(chemin)
+        assert normaliseur.canonique("AMZN MKTP CA*AB12CD34") == "Amazon"
+
+        normaliseur.apprendre("RWCO 2499", "Rwco")
+        normaliseur.sauvegarder()
+        recharge = NormaliseurBeneficiaires.charger(chemin)
+        assert recharge.canonique("RWCO 2499") == "Rwco"
+        assert recharge.canonique("AMAZON.CA") == "Amazon"
+
+    def test_charger_fichier_absent(self, tmp_path):
+        normaliseur = NormaliseurBeneficiaires.charger(tmp_path / "absent.yaml")
+        assert normaliseur.canonique("CAFE XYZ") == "Cafe Xyz"
+
+    def test_charger_structure_invalide(self, tmp_path):
+        chemin = tmp_path / "beneficiaires.yaml"
+        chemin.write_text("alias: [a, b]\n", encoding="utf-8")
+        with pytest.raises(ValueError):
+            NormaliseurBeneficiaires.charger(chemin)
+
+    def test_dedup_variante_de_libelle(self, tmp_path):
+        """Une ligne deja importee sous un autre libelle du meme marchand est un doublon."""
+        definir_normaliseur_defaut(NormaliseurBeneficiaires())
+        try:
+            entete = (
+                "Type de compte,Numéro du compte,Date de l'opération,Numéro du chèque,"
+                "Description 1,Description 2,CAD,USD\n"
+            )
+            ancien = tmp_path / "ancien.csv"
+            ancien.write_text(
+                entete
+                + 'Chèques,00001,1/5/2026,,"IGA #8639 MONTREAL QC",,-25.00,\n'
+                + 'Chèques,00001,1/5/2026,,"CAFE XYZ",,-4.50,\n',
+                encoding="utf-8",
+            )
+            nouveau = tmp_path / "nouveau.csv"
+            nouveau.write_text(
+                entete
+                + 'Chèques,00001,1/5/2026,,"IGA #8639 MONTREAL",,-25.00,\n'
+                + 'Chèques,00001,1/5/2026,,"CAFE XYZ",,-4.50,\n'
+                + 'Chèques,00001,1/5/2026,,"CAFE XYZ",,-4.50,\n',
+                encoding="utf-8",
+            )
+            importer = RBCChequesImporter()
+            existants = importer.extract(str(ancien), [])
+            assert len(existants) == 2
+            # Le deuxieme cafe identique du meme jour est un achat distinct
+            txns = importer.extract(str(nouveau), existants)
+            assert [t.narration for t in txns] == ["CAFE XYZ"]
+        finally:
+            definir_normaliseur_defaut(None)
+
+
 # ---------------------------------------------------------------------------
 # Tests detecter_encodage
 # ---------------------------------------------------------------------------
@@ -93,6 +209,65 @@ class TestArchiverFichier:
         assert "chemin_original" in meta
 
 
+# ---------------------------------------------------------------------------
+# Tests SurveillantRepertoire
+# ---------------------------------------------------------------------------
+
+
+class TestSurveillantRepertoire:
+    @pytest.fixture
+    def surveillant(self, tmp_path):
+        with SurveillantRepertoire(
+            tmp_path / "imports", delai_stabilite=2.0, forcer_polling=True
+        ) as s:
+            yield s
+
+    def test_cree_repertoire(self, surveillant):
+        assert surveillant.repertoire.is_dir()
+        assert surveillant.mode == "polling"
+
+    def test_fichier_signale_apres_stabilite(self, surveillant):
+        f = surveillant.repertoire / "releve.csv"
+        f.write_text("a,b\n")
+        assert surveillant.balayer(maintenant=0.0) == []
+        assert surveillant.balayer(maintenant=1.0) == []
+        assert surveillant.balayer(maintenant=2.5) == [f]
+
+    def test_fichier_signale_une_seule_fois(self, surveillant):
+        f = surveillant.repertoire / "releve.ofx"
+        f.write_text("OFX")
+        surveillant.balayer(maintenant=0.0)
+        assert surveillant.balayer(maintenant=3.0) == [f]
+        assert surveillant.balayer(maintenant=10.0) == []
+
+    def test_ecriture_partielle_repousse_le_delai(self, surveillant):
+        f = surveillant.repertoire / "releve.csv"
+        f.write_text("a,b\n")
+        surveillant.balayer(maintenant=0.0)
+        f.write_text("a,b\nc,d\n")
+        assert surveillant.balayer(maintenant=2.5) == []
+        assert surveillant.balayer(maintenant=5.0) == [f]
+
+    def test_ignore_temporaires_et_extensions(self, surveillant):
+        (surveillant.repertoire / "releve.csv.crdownload").write_text("x")
+        (surveillant.repertoire / ".releve.csv").write_text("x")
+        (surveillant.repertoire / "notes.txt").write_text("x")
+        (surveillant.repertoire / "vide.csv").write_text("")
+        surveillant.balayer(maintenant=0.0)
+        assert surveillant.balayer(maintenant=10.0) == []
+
+    def test_inotify_reveille_attente(self, tmp_path):
+        import sys
+
+        if not sys.platform.startswith("linux"):
+            pytest.skip("inotify est specifique a Linux")
+        with SurveillantRepertoire(tmp_path / "imports", delai_stabilite=0.2) as s:
+            assert s.mode == "inotify"
+            f = s.repertoire / "releve.qfx"
+            f.write_text("OFX")
+            assert s.attendre(timeout=5.0) == [f]
+
+
 # ---------------------------------------------------------------------------
 # Tests RBCChequesImporter
 # ---------------------------------------------------------------------------
@@ -427,3 +602,212 @@ class TestRBCOfxImporter:
         imp = RBCOfxImporter(account="Actifs:Banque:RBC:Cheques", account_id="12345-6789012")
         with pytest.raises(ValueError, match="invalide"):
             imp.extract(str(f), [])
+
+
+# ---------------------------------------------------------------------------
+# Tests parsing OFX unique (cache + releves multiples)
+# ---------------------------------------------------------------------------
+
+
+class TestOfxParseUnique:
+    @pytest.fixture(autouse=True)
+    def cache_vide(self):
+        vider_cache_ofx()
+        yield
+        vider_cache_ofx()
+
+    @pytest.fixture
+    def compteur_parse(self, monkeypatch):
+        from compteqc.ingestion import rbc_ofx
+
+        appels = []
+        parse_original = rbc_ofx.OFXTree.parse
+
+        def parse_compte(self, source, *args, **kwargs):
+            appels.append(source)
+            return parse_original(self, source, *args, **kwargs)
+
+        monkeypatch.setattr(rbc_ofx.OFXTree, "parse", parse_compte)
+        return appels
+
+    def test_cache_meme_fichier(self, compteur_parse):
+        filepath = FIXTURES / "rbc_sample.ofx"
+        assert charger_ofx(filepath) is charger_ofx(str(filepath))
+        assert len(compteur_parse) == 1
+
+    def test_cache_invalide_si_fichier_modifie(self, tmp_path, compteur_parse):
+        import os
+
+        f = tmp_path / "releve.ofx"
+        f.write_bytes((FIXTURES / "rbc_sample.ofx").read_bytes())
+        charger_ofx(f)
+        stat = f.stat()
+        os.utime(f, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        charger_ofx(f)
+        assert len(compteur_parse) == 2
+
+    def test_fichier_invalide_raise(self, tmp_path):
+        f = tmp_path / "bad.ofx"
+        f.write_text("this is not valid OFX")
+        with pytest.raises(ValueError, match="invalide"):
+            charger_ofx(f)
+
+    def test_detection_puis_extraction_un_seul_parse(self, compteur_parse):
+        filepath = str(FIXTURES / "rbc_sample.ofx")
+        importateurs = importateurs_depuis_ofx(filepath)
+        assert len(importateurs) == 1
+        imp = importateurs[0]
+        assert imp.identify(filepath)
+        assert len(imp.extract(filepath, [])) == 6
+        assert len(compteur_parse) == 1
+
+    def test_multi_releves_fan_out(self, compteur_parse):
+        filepath = str(FIXTURES / "rbc_multi.ofx")
+        importateurs = importateurs_depuis_ofx(filepath)
+        comptes = [imp.account(filepath) for imp in importateurs]
+        assert comptes == ["Actifs:Banque:RBC:Cheques", "Passifs:CartesCredit:RBC"]
+
+        cheques = importateurs[0].extract(filepath, [])
+        carte = importateurs[1].extract(filepath, [])
+        assert len(cheques) == 6
+        assert len(carte) == 3
+        assert all(t.postings[0].account == "Passifs:CartesCredit:RBC" for t in carte)
+        assert len(compteur_parse) == 1
+
+
+# ---------------------------------------------------------------------------
+# Tests RegistreImportateurs
+# ---------------------------------------------------------------------------
+
+
+class TestRegistreImportateurs:
+    @pytest.fixture
+    def registre(self, monkeypatch):
+        from compteqc.ingestion import registre as mod
+
+        monkeypatch.setattr(mod, "entry_points", lambda group: [])
+        return RegistreImportateurs(FORMATS_INTEGRES)
+
+    def test_empreinte_ignore_colonnes_accentuees(self):
+        utf8 = empreinte_entete(["Type de compte", "Numéro du compte", "Description 1", "CAD"])
+        remplace = empreinte_entete(
+            ['"Type de compte"', "Num?ro du compte", "Description 1", "CAD"]
+        )
+        assert utf8 == remplace == {"type de compte", "description 1", "cad"}
+
+    def test_identifier_csv_rbc(self, registre):
+        formats = registre.identifier(FIXTURES / "rbc_cheques_sample.csv")
+        assert [f.nom for f in formats] == ["rbc-csv"]
+
+    def test_identifier_csv_latin1(self, registre, tmp_path):
+        f = tmp_path / "export.csv"
+        contenu = (FIXTURES / "rbc_carte_sample.csv").read_text(encoding="utf-8")
+        f.write_bytes(contenu.encode("latin-1"))
+        assert [fmt.nom for fmt in registre.identifier(f)] == ["rbc-csv"]
+
+    def test_identifier_ofx_par_marqueur(self, registre):
+        assert [f.nom for f in registre.identifier(FIXTURES / "rbc_multi.ofx")] == ["rbc-ofx"]
+
+    def test_colonne_supplementaire_repli(self, registre, tmp_path):
+        f = tmp_path / "export.csv"
+        lignes = (FIXTURES / "rbc_cheques_sample.csv").read_text(encoding="utf-8").splitlines()
+        f.write_text("\n".join([lignes[0] + ',"Solde"'] + lignes[1:]), encoding="utf-8")
+        assert [fmt.nom for fmt in registre.identifier(f)] == ["rbc-csv"]
+
+    @pytest.mark.parametrize(
+        "entete",
+        [
+            '"Type de compte","Numéro du compte","Date de l\'opération","Numéro du chèque",'
+            '"Description 1","Description 2","CAD$","USD$"',
+            '"Type de compte","Numéro du compte","Date de l\'opération","Numéro du chèque",'
+            '"Description 1","Description 2","CAD"',
+            '"Type de compte","Numéro du compte","Date de l\'opération","Numéro du chèque",'
+            '"Description 1","CAD$"',
+        ],
+        ids=["devises-dollar", "sans-usd", "sans-description-2"],
+    )
+    def test_identifier_variantes_entete_rbc(self, registre, tmp_path, entete):
+        f = tmp_path / "export.csv"
+        f.write_text(
+            entete + "\nChèques,00501-5004817,1/6/2026,,\"DEPOT DE PAIE\",522.67\n",
+            encoding="utf-8",
+        )
+        assert [fmt.nom for fmt in registre.identifier(f)] == ["rbc-csv"]
+        assert [type(i) for i in registre.detecter(f)] == [RBCChequesImporter]
+
+    def test_entete_rbc_sans_colonne_cad_refuse(self, registre, tmp_path):
+        f = tmp_path / "export.csv"
+        f.write_text('"Type de compte","Description 1","USD"\n', encoding="utf-8")
+        assert registre.identifier(f) == []
+
+    def test_format_inconnu(self, registre, tmp_path):
+        f = tmp_path / "autre.csv"
+        f.write_text("Date,Montant,Libelle\n2026-01-01,10.00,Test\n")
+        assert registre.identifier(f) == []
+        assert registre.detecter(f) == []
+
+    def test_detecter_csv_combine(self, registre, tmp_path):
+        f = tmp_path / "combine.csv"
+        cheques = (FIXTURES / "rbc_cheques_sample.csv").read_text(encoding="utf-8").splitlines()
+        carte = (FIXTURES / "rbc_carte_sample.csv").read_text(encoding="utf-8").splitlines()
+        f.write_text("\n".join(cheques + carte[1:]) + "\n", encoding="utf-8")
+        importateurs = registre.detecter(f)
+        assert [type(i) for i in importateurs] == [RBCChequesImporter, RBCCarteImporter]
+
+    def test_detecter_extension_non_correspondante(self, registre, tmp_path):
+        f = tmp_path / "releve.txt"
+        f.write_bytes((FIXTURES / "rbc_sample.ofx").read_bytes())
+        assert registre.detecter(f) == []
+
+    def test_fabrique_chargee_a_la_demande(self, registre, tmp_path):
+        registre.enregistrer(FormatImport(
+            nom="desjardins",
+            description="CSV Desjardins",
+            extensions=(".csv",),
+            fabrique="module_inexistant_desjardins:importateurs",
+            entete=frozenset({"folio", "montant"}),
+        ))
+        # Le module du plugin n'est pas importe pour un fichier RBC
+        importateurs = registre.detecter(FIXTURES / "rbc_cheques_sample.csv")
+        assert [type(i) for i in importateurs] == [RBCChequesImporter]
+
+        f = tmp_path / "desjardins.csv"
+        f.write_text("Folio,Montant\n1,10.00\n")
+        with pytest.raises(ModuleNotFoundError):
+            registre.detecter(f)
+
+    def test_plugin_entry_point(self, monkeypatch, tmp_path):
+        from compteqc.ingestion import registre as mod
+
+        fmt = FormatImport(
+            nom="carte-x",
+            description="CSV Carte X",
+            extensions=(".csv",),
+            fabrique="compteqc.ingestion.rbc_carte:importateurs_depuis_csv",
+            entete=frozenset({"date", "marchand", "montant"}),
+        )
+
+        class FauxEntryPoint:
+            name = "carte-x"
+
+            def load(self):
+                return fmt
+
+        monkeypatch.setattr(mod, "entry_points", lambda group: [FauxEntryPoint()])
+        registre = RegistreImportateurs(FORMATS_INTEGRES)
+        assert [f.nom for f in registre.formats] == ["rbc-ofx", "rbc-csv", "carte-x"]
+
+        f = tmp_path / "x.csv"
+        f.write_text("Date,Marchand,Montant\n")
+        assert registre.identifier(f) == [fmt]
+
+    def test_enregistrer_doublon_refuse(self, registre):
+        with pytest.raises(ValueError, match="deja"):
+            registre.enregistrer(FORMATS_INTEGRES[0])
+
+    def test_enregistrer_sans_empreinte_refuse(self, registre):
+        with pytest.raises(ValueError):
+            registre.enregistrer(FormatImport(
+                nom="vide", description="", extensions=(".csv",), fabrique="x:y",
+            ))
+
@@ -2,14 +2,47 @@
 
 from __future__ import annotations
 
+import datetime
 import subprocess
+import sys
+import threading
+from decimal import Decimal
 from pathlib import Path
 
 import pytest
+from beancount import loader
+from beancount.core import data
+from beancount.parser import printer
 
+from compteqc.ledger import git as module_git
+from compteqc.ledger.arbre import ArbreComptes, arbre_soldes
+from compteqc.ledger.chargement import ChargeurLedger, SurveillantLedger
+from compteqc.ledger.cloture import (
+    ExerciceCloture,
+    annees_cloturees,
+    annees_ouvertes,
+    charger_ledger,
+    cloturer_exercice,
+)
+from compteqc.ledger.colonnes import TablePostings, table_postings
 from compteqc.ledger.fichiers import ajouter_include, chemin_fichier_mensuel, ecrire_transactions
 from compteqc.ledger.git import auto_commit
+from compteqc.ledger.journal import JournalEcritures, recuperer_journaux
+from compteqc.ledger.miroir import MiroirLedger, miroir_ledger
+from compteqc.ledger.requete import (
+    DelaiRequeteDepasse,
+    MoteurRequetes,
+    RequeteInvalide,
+    moteur_requetes,
+)
 from compteqc.ledger.validation import charger_comptes_existants, valider_ledger
+from compteqc.ledger.verrou import (
+    FICHIER_VERROU,
+    ConflitVersion,
+    VerrouEcriture,
+    VerrouOccupe,
+    version_ledger,
+)
 
 # Chemin vers le ledger du projet
 LEDGER_DIR = Path(__file__).parent.parent / "ledger"
@@ -201,3 +234,884 @@ class TestAutoCommit:
 
         with pytest.raises(ValueError, match="Ledger invalide"):
             auto_commit(repo, "test: ledger invalide")
+
+    def _git(self, repo: Path, *args: str) -> str:
+        return subprocess.run(
+            ["git", *args], cwd=str(repo), capture_output=True, text=True
+        ).stdout
+
+    def test_backend_dulwich_ajouts_et_suppressions(self, tmp_path: Path, monkeypatch):
+        """Le backend en processus stage ajouts/suppressions et ignore .gitignore."""
+        monkeypatch.setenv("COMPTEQC_GIT_BACKEND", "dulwich")
+        repo = self._setup_git_repo(tmp_path)
+        traites = repo / "data" / "processed"
+        traites.mkdir(parents=True)
+        (traites / "releve.csv").write_text("a,b\n")
+        (traites / "ignore.tmp").write_text("x")
+        (repo / ".gitignore").write_text("*.tmp\n")
+
+        assert auto_commit(repo, "test: ajout releve") is True
+        assert "test: ajout releve" in self._git(repo, "log", "--oneline", "-1")
+        assert self._git(repo, "ls-files", "data/processed").split() == [
+            "data/processed/releve.csv"
+        ]
+        # L'index ecrit est lisible par git: rien de stage en attente
+        assert self._git(repo, "status", "--porcelain", "data", "ledger") == ""
+
+        (traites / "releve.csv").unlink()
+        assert auto_commit(repo, "test: suppression") is True
+        assert self._git(repo, "ls-files", "data/processed") == ""
+        assert auto_commit(repo, "test: rien") is False
+
+    def test_repli_subprocess_si_backend_echoue(self, tmp_path: Path, monkeypatch):
+        """Une erreur du backend en processus bascule sur les sous-processus git."""
+        def echec(*args):
+            raise OSError("index verrouille")
+
+        monkeypatch.delenv("COMPTEQC_GIT_BACKEND", raising=False)
+        monkeypatch.setattr(module_git, "_commit_dulwich", echec)
+        repo = self._setup_git_repo(tmp_path)
+        (repo / "ledger" / "notes.txt").write_text("note\n")
+
+        assert auto_commit(repo, "test: repli") is True
+        assert "test: repli" in self._git(repo, "log", "--oneline", "-1")
+
+
+class TestJournalEcritures:
+    """Tests pour le journal d'ecriture anticipee."""
+
+    @pytest.fixture
+    def ledger_dir(self, tmp_path: Path) -> Path:
+        (tmp_path / "main.beancount").write_text('option "title" "Test"\n', encoding="utf-8")
+        (tmp_path / "pending.beancount").write_text(
+            "; en-tete\n" + "".join(f"; ligne {i}\n" for i in range(1000)), encoding="utf-8"
+        )
+        return tmp_path
+
+    def _etat(self, ledger_dir: Path) -> dict[str, str]:
+        return {
+            p.name: p.read_text(encoding="utf-8")
+            for p in sorted(ledger_dir.rglob("*.beancount"))
+        }
+
+    def test_annuler_restaure_fichiers(self, ledger_dir):
+        avant = self._etat(ledger_dir)
+        with JournalEcritures(ledger_dir, "test") as journal:
+            journal.ajouter(ledger_dir / "main.beancount", 'include "2026/01.beancount"\n')
+            journal.ajouter(ledger_dir / "2026" / "01.beancount", "; janvier\n")
+            contenu = (ledger_dir / "pending.beancount").read_text(encoding="utf-8")
+            journal.reecrire(ledger_dir / "pending.beancount", contenu.replace("ligne 500", "é"))
+            journal.annuler()
+        assert self._etat(ledger_dir) == avant
+        assert not list((ledger_dir / ".journal").glob("*.wal"))
+
+    def test_exception_annule_et_sortie_normale_confirme(self, ledger_dir):
+        main = ledger_dir / "main.beancount"
+        with pytest.raises(RuntimeError):
+            with JournalEcritures(ledger_dir) as journal:
+                journal.ajouter(main, "; ajout\n")
+                raise RuntimeError("boom")
+        assert "; ajout" not in main.read_text(encoding="utf-8")
+
+        with JournalEcritures(ledger_dir) as journal:
+            journal.ajouter(main, "; ajout\n")
+        assert main.read_text(encoding="utf-8").endswith("; ajout\n")
+
+    def test_delta_compact(self, ledger_dir):
+        pending = ledger_dir / "pending.beancount"
+        journal = JournalEcritures(ledger_dir)
+        journal.reecrire(pending, pending.read_text(encoding="utf-8").replace("ligne 10\n", ""))
+        assert journal.chemin.stat().st_size < 300
+        journal.annuler()
+
+    def test_recuperation_annule_operation_incomplete(self, ledger_dir):
+        avant = self._etat(ledger_dir)
+        journal = JournalEcritures(ledger_dir)
+        journal.ajouter(ledger_dir / "main.beancount", "; ajout\n")
+        journal.reecrire(ledger_dir / "pending.beancount", "; vide\n")
+        # Arret brutal: ni fin ni annulation, derniere ligne tronquee
+        journal._fichier.write('{"op": "ajout", "fich')
+        journal._fichier.close()
+
+        assert recuperer_journaux(ledger_dir) == 1
+        assert self._etat(ledger_dir) == avant
+        assert recuperer_journaux(ledger_dir) == 0
+
+    def test_recuperation_rejoue_operation_terminee(self, ledger_dir):
+        main = ledger_dir / "main.beancount"
+        journal = JournalEcritures(ledger_dir)
+        journal.ajouter(main, "; ajout\n")
+        journal._fichier.write('{"op": "fin"}\n')
+        journal._fichier.close()
+        # Ecriture perdue apres le marqueur de fin: le rejeu la refait
+        main.write_text('option "title" "Test"\n', encoding="utf-8")
+
+        assert recuperer_journaux(ledger_dir) == 1
+        assert main.read_text(encoding="utf-8") == 'option "title" "Test"\n; ajout\n'
+
+    @pytest.mark.parametrize("applique", [True, False])
+    @pytest.mark.parametrize(
+        "avant, apres",
+        [
+            ("A\nB\nC\n", "A\nC\n"),  # suppression pure
+            ("A\nC\n", "A\ninclude \"2026/01.beancount\"\nC\n"),  # insertion pure
+        ],
+        ids=["suppression", "insertion"],
+    )
+    @pytest.mark.parametrize("termine", [True, False], ids=["rejeu", "annulation"])
+    def test_recuperation_segment_vide_idempotente(
+        self, tmp_path, avant, apres, applique, termine
+    ):
+        fichier = tmp_path / "main.beancount"
+        fichier.write_text(avant, encoding="utf-8")
+        journal = JournalEcritures(tmp_path)
+        journal.reecrire(fichier, apres)
+        if termine:
+            journal._fichier.write('{"op": "fin"}\n')
+        journal._fichier.close()
+        if not applique:
+            # Arret entre l'ecriture du journal et celle du fichier
+            fichier.write_text(avant, encoding="utf-8")
+
+        assert recuperer_journaux(tmp_path) == 1
+        assert fichier.read_text(encoding="utf-8") == (apres if termine else avant)
+
+
+class TestVerrouEcriture:
+    """Tests pour le verrou d'ecriture et le compteur de version."""
+
+    def test_version_incrementee_si_modifie(self, tmp_path):
+        assert version_ledger(tmp_path) == 0
+        with VerrouEcriture(tmp_path):
+            pass
+        assert version_ledger(tmp_path) == 0
+
+        with VerrouEcriture(tmp_path) as verrou:
+            verrou.modifie()
+        assert version_ledger(tmp_path) == 1
+
+    def test_journal_confirme_incremente_annule_non(self, tmp_path):
+        main = tmp_path / "main.beancount"
+        main.write_text("", encoding="utf-8")
+        with JournalEcritures(tmp_path) as journal:
+            journal.ajouter(main, "; ajout\n")
+            journal.annuler()
+        assert version_ledger(tmp_path) == 0
+
+        with JournalEcritures(tmp_path) as journal:
+            journal.ajouter(main, "; ajout\n")
+        assert version_ledger(tmp_path) == 1
+
+    def test_conflit_version(self, tmp_path):
+        with VerrouEcriture(tmp_path) as verrou:
+            verrou.modifie()
+        with pytest.raises(ConflitVersion):
+            with JournalEcritures(tmp_path, version_attendue=0):
+                pass
+        with VerrouEcriture(tmp_path, version_attendue=1) as verrou:
+            assert verrou.version == 1
+
+    def test_reentrant_une_seule_increment(self, tmp_path):
+        with VerrouEcriture(tmp_path) as externe:
+            with VerrouEcriture(tmp_path) as interne:
+                interne.modifie()
+            assert version_ledger(tmp_path) == 0
+            externe.modifie()
+        assert version_ledger(tmp_path) == 1
+
+    def test_exclusion_inter_processus(self, tmp_path):
+        script = (
+            "import fcntl, os, sys, time\n"
+            "fd = os.open(sys.argv[1], os.O_RDWR | os.O_CREAT)\n"
+            "fcntl.flock(fd, fcntl.LOCK_EX)\n"
+            "print('pret', flush=True)\n"
+            "time.sleep(30)\n"
+        )
+        proc = subprocess.Popen(
+            [sys.executable, "-c", script, str(tmp_path / FICHIER_VERROU)],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert proc.stdout.readline().strip() == "pret"
+            with pytest.raises(VerrouOccupe):
+                with VerrouEcriture(tmp_path, delai=0.2):
+                    pass
+        finally:
+            proc.kill()
+            proc.wait()
+        with VerrouEcriture(tmp_path, delai=5):
+            pass
+
+
+class TestChargeurLedger:
+    """Tests pour le chargement incremental et la surveillance du ledger."""
+
+    @pytest.fixture
+    def ledger_dir(self, tmp_path: Path) -> Path:
+        (tmp_path / "2026").mkdir()
+        (tmp_path / "main.beancount").write_text(
+            'option "name_assets" "Actifs"\n'
+            'option "name_equity" "Capital"\n'
+            'option "name_expenses" "Depenses"\n'
+            'include "2026/*.beancount"\n'
+            "2026-01-01 open Actifs:Banque\n"
+            "2026-01-01 open Capital:Apport\n"
+            "2026-01-01 open Depenses:Bureau\n",
+            encoding="utf-8",
+        )
+        for mois in (1, 2):
+            (tmp_path / "2026" / f"{mois:02d}.beancount").write_text(
+                'option "name_assets" "Actifs"\n'
+                'option "name_equity" "Capital"\n'
+                'option "name_expenses" "Depenses"\n'
+                f'2026-{mois:02d}-05 * "Apport"\n  Actifs:Banque  100 CAD\n  Capital:Apport\n'
+                f'2026-{mois:02d}-10 * "Papeterie"\n  Depenses:Bureau  12.50 CAD\n'
+                "  Actifs:Banque\n",
+                encoding="utf-8",
+            )
+        return tmp_path
+
+    def _texte(self, entries: list) -> list[str]:
+        return [printer.format_entry(e) for e in entries]
+
+    def test_equivalent_a_load_file(self, ledger_dir):
+        attendu, erreurs, options = loader.load_file(str(ledger_dir / "main.beancount"))
+        chargeur = ChargeurLedger(ledger_dir / "main.beancount")
+        for _ in range(2):
+            entries, erreurs_c, options_c = chargeur.charger()
+            assert self._texte(entries) == self._texte(attendu)
+            assert len(erreurs_c) == len(erreurs) == 0
+            assert options_c["include"] == options["include"]
+        assert chargeur.nb_parses == 3
+
+    def test_seul_le_fichier_modifie_est_reparse(self, ledger_dir):
+        chargeur = ChargeurLedger(ledger_dir / "main.beancount")
+        chargeur.charger()
+        assert not chargeur.modifie()
+
+        with open(ledger_dir / "2026" / "02.beancount", "a", encoding="utf-8") as f:
+            f.write('2026-02-20 * "Encre"\n  Depenses:Bureau  30 CAD\n  Actifs:Banque\n')
+        assert chargeur.modifie()
+        entries, erreurs, _ = chargeur.charger()
+
+        assert chargeur.nb_parses == 4
+        assert not erreurs
+        assert len([e for e in entries if isinstance(e, data.Transaction)]) == 5
+
+    def test_surveillant_recharge_apres_modification(self, ledger_dir):
+        chargeur = ChargeurLedger(ledger_dir / "main.beancount")
+        chargeur.charger()
+        recharge = threading.Event()
+
+        def rappel():
+            chargeur.charger()
+            recharge.set()
+
+        surveillant = SurveillantLedger(chargeur, rappel, intervalle=0.05)
+        surveillant.demarrer()
+        try:
+            with open(ledger_dir / "2026" / "01.beancount", "a", encoding="utf-8") as f:
+                f.write("; modification externe\n")
+            assert recharge.wait(5)
+        finally:
+            surveillant.arreter()
+        assert not chargeur.modifie()
+
+
+def _txn(date: str, postings: list[tuple[str, str]], tags: frozenset = frozenset()):
+    return data.Transaction(
+        meta={}, date=datetime.date.fromisoformat(date), flag="*",
+        payee=None, narration="test", tags=tags, links=frozenset(),
+        postings=[
+            data.Posting(compte, data.Amount(Decimal(m), "CAD"), None, None, None, None)
+            for compte, m in postings
+        ],
+    )
+
+
+class TestTablePostings:
+    """Tests pour la table de postings en colonnes."""
+
+    @pytest.fixture
+    def entries(self):
+        return [
+            _txn("2026-01-15", [("Actifs:Banque", "-100.00"), ("Depenses:Repas", "100.00")]),
+            _txn("2026-02-10", [("Actifs:Banque", "250.50"), ("Revenus:Consultation", "-250.50")],
+                 tags=frozenset({"facture"})),
+            _txn("2026-03-01", [("Actifs:Banque", "-0.125"), ("Depenses:Frais", "0.125")]),
+        ]
+
+    def test_soldes_exacts(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        assert table.echelle == 3
+        soldes = table.soldes()
+        assert soldes["Actifs:Banque"] == Decimal("150.375")
+        assert soldes["Depenses:Frais"] == Decimal("0.125")
+
+    def test_plage_de_dates_et_prefixe(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        soldes = table.soldes(
+            debut=datetime.date(2026, 2, 1), fin=datetime.date(2026, 3, 31), prefixe="Depenses"
+        )
+        assert soldes == {"Depenses:Frais": Decimal("0.125")}
+
+    def test_filtre_tag_et_valeur_absolue(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        assert table.soldes(tag="facture", valeur_absolue=True) == {
+            "Actifs:Banque": Decimal("250.50"),
+            "Revenus:Consultation": Decimal("250.50"),
+        }
+        assert table.soldes(tag="inexistant") == {}
+        sans_facture = table.masque(sans_tag="facture")
+        assert table.total(sans_facture & table.masque(prefixe="Revenus")) == Decimal("0")
+
+    def test_mois_et_par_transaction(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        assert list(table.mois()) == [1, 1, 2, 2, 3, 3]
+        revenus = table.masque(prefixe="Revenus")
+        assert list(table.par_transaction(revenus)) == [False, False, True, True, False, False]
+
+    def test_cache_ajout_incremental(self, entries):
+        table = table_postings(entries)
+        entries.append(_txn("2026-04-01", [("Actifs:Banque", "10"), ("Revenus:Autres", "-10")]))
+        assert table_postings(entries) is table
+        assert len(table.transactions) == 4
+        assert table.soldes()["Actifs:Banque"] == Decimal("160.375")
+
+    def test_cache_reconstruit_si_liste_differente(self, entries):
+        table = table_postings(entries)
+        assert table_postings(list(entries)) is not table
+
+    def test_cache_ajout_concurrent(self, entries):
+        """Plusieurs threads voient la liste grandir: chaque posting compte une fois."""
+        table = table_postings(entries)
+        entries.append(_txn("2026-04-01", [("Actifs:Banque", "10"), ("Revenus:Autres", "-10")]))
+        barriere = threading.Barrier(8)
+
+        def lire():
+            barriere.wait()
+            table_postings(entries)
+            for _ in range(20):
+                table_postings(list(entries))  # evictions concurrentes
+
+        threads = [threading.Thread(target=lire) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(table.transactions) == 4
+        assert table.soldes()["Actifs:Banque"] == Decimal("160.375")
+
+    def test_trop_de_decimales_refuse(self):
+        table = TablePostings()
+        with pytest.raises(ValueError, match="decimales"):
+            table.ajouter([_txn("2026-01-01", [("A", "0.0000000001"), ("B", "-0.0000000001")])])
+        assert len(table) == 0
+        assert table.transactions == []
+
+
+class TestIndexSoldes:
+    """Tests pour l'index des soldes cumules a date."""
+
+    @pytest.fixture
+    def entries(self):
+        return [
+            _txn("2026-01-15", [("Actifs:Banque", "-100.00"), ("Depenses:Repas", "100.00")]),
+            _txn("2026-01-15", [("Actifs:Banque", "40.00"), ("Revenus:Consultation", "-40.00")]),
+            _txn("2026-02-10", [("Actifs:Banque", "250.50"), ("Revenus:Consultation", "-250.50")]),
+            _txn("2026-03-01", [("Actifs:Banque", "-20.00"), ("Depenses:Repas", "20.00")]),
+        ]
+
+    def test_solde_a_date(self, entries):
+        index = TablePostings.depuis_entries(entries).index_soldes()
+        assert index.solde("Actifs:Banque", datetime.date(2026, 1, 14)) == Decimal("0")
+        assert index.solde("Actifs:Banque", datetime.date(2026, 1, 15)) == Decimal("-60.00")
+        assert index.solde("Actifs:Banque", datetime.date(2026, 2, 28)) == Decimal("190.50")
+        assert index.solde("Actifs:Banque") == Decimal("170.50")
+        assert index.solde("Inexistant") == Decimal("0")
+
+    def test_soldes_au_concorde_avec_table(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        index = table.index_soldes()
+        for jour in ("2026-01-01", "2026-01-15", "2026-02-10", "2026-12-31"):
+            date = datetime.date.fromisoformat(jour)
+            assert index.soldes_au(date) == table.soldes(fin=date)
+        assert index.soldes_au(prefixe="Depenses") == {"Depenses:Repas": Decimal("120.00")}
+
+    def test_variations_periode(self, entries):
+        table = TablePostings.depuis_entries(entries)
+        index = table.index_soldes()
+        debut, fin = datetime.date(2026, 2, 1), datetime.date(2026, 3, 1)
+        assert index.variations(debut, fin) == table.soldes(debut=debut, fin=fin)
+        assert index.variations(debut, datetime.date(2026, 2, 28), prefixe="Depenses") == {}
+
+    def test_rafraichit_comptes_touches(self, entries):
+        table = table_postings(entries)
+        index = table.index_soldes()
+        dates_repas = index._dates[table._index_comptes["Depenses:Repas"]]
+        entries.append(
+            _txn("2026-04-01", [("Actifs:Banque", "5.005"), ("Revenus:Autres", "-5.005")])
+        )
+        assert table_postings(entries).index_soldes() is index
+        # Compte non touche: tableaux conserves tels quels
+        assert index._dates[table._index_comptes["Depenses:Repas"]] is dates_repas
+        assert index.solde("Actifs:Banque") == Decimal("175.505")
+        assert index.solde("Depenses:Repas", datetime.date(2026, 12, 31)) == Decimal("120.00")
+
+
+class TestArbreComptes:
+    """Tests pour l'arbre des comptes avec sous-totaux."""
+
+    @pytest.fixture
+    def arbre(self):
+        return ArbreComptes.depuis_soldes({
+            "Actifs:Banque:RBC": Decimal("1000.00"),
+            "Actifs:Banque:Desjardins": Decimal("250.00"),
+            "Actifs:Caisse": Decimal("0"),
+            "Depenses:Bureau:Logiciels": Decimal("120.00"),
+            "Depenses:Bureau": Decimal("30.00"),
+            "Revenus:Consultation": Decimal("-1400.00"),
+        })
+
+    def test_sous_totaux_par_noeud(self, arbre):
+        assert arbre.sous_total("Actifs") == Decimal("1250.00")
+        assert arbre.sous_total("Actifs:Banque") == Decimal("1250.00")
+        assert arbre.sous_total("Depenses:Bureau") == Decimal("150.00")
+        assert arbre.sous_total() == Decimal("0")
+        assert arbre.sous_total("Passifs") == Decimal("0")
+
+    def test_soldes_sous_arbre(self, arbre):
+        assert arbre.soldes("Actifs", non_nuls=True) == {
+            "Actifs:Banque:Desjardins": Decimal("250.00"),
+            "Actifs:Banque:RBC": Decimal("1000.00"),
+        }
+        assert "Actifs:Caisse" in arbre.soldes("Actifs")
+        # Les noeuds intermediaires sans posting propre ne sont pas des comptes
+        assert "Actifs:Banque" not in arbre.soldes("Actifs")
+        assert arbre.soldes("Depenses:Bureau") == {
+            "Depenses:Bureau": Decimal("30.00"),
+            "Depenses:Bureau:Logiciels": Decimal("120.00"),
+        }
+
+    def test_sous_totaux_profondeur(self, arbre):
+        assert arbre.sous_totaux("Depenses", profondeur=2) == {
+            "Depenses": Decimal("150.00"),
+            "Depenses:Bureau": Decimal("150.00"),
+        }
+
+    def test_totaux_gifi(self, arbre):
+        gifi_map = {
+            "Actifs:Banque:RBC": "1001",
+            "Actifs:Banque:Desjardins": "1001",
+            "Revenus:Consultation": "8000",
+        }
+        assert arbre.totaux_gifi(gifi_map) == {
+            "1001": Decimal("1250.00"),
+            "8000": Decimal("-1400.00"),
+        }
+        assert arbre.totaux_gifi(gifi_map, "Actifs") == {"1001": Decimal("1250.00")}
+
+    def test_arbre_en_cache_mis_a_jour(self):
+        entries = [_txn("2026-01-15", [("Actifs:Banque", "-100.00"), ("Depenses:Repas", "100.00")])]
+        arbre = arbre_soldes(entries)
+        entries.append(
+            _txn("2026-02-01", [("Actifs:Banque", "40.00"), ("Revenus:Autres", "-40.00")])
+        )
+        assert arbre_soldes(entries) is arbre
+        assert arbre.sous_total("Actifs") == Decimal("-60.00")
+        assert arbre.sous_total("Depenses") == Decimal("100.00")
+        au_15 = arbre_soldes(entries, date=datetime.date(2026, 1, 15))
+        assert au_15.sous_total("Revenus") == Decimal("0")
+
+
+_OPTIONS_CLOTURE = """option "name_assets" "Actifs"
+option "name_liabilities" "Passifs"
+option "name_equity" "Capital"
+option "name_income" "Revenus"
+option "name_expenses" "Depenses"
+"""
+
+
+class TestCloture:
+    """Tests pour la cloture d'exercice et les soldes d'ouverture."""
+
+    @pytest.fixture
+    def ledger(self, tmp_path: Path) -> Path:
+        ledger_dir = tmp_path / "ledger"
+        ledger_dir.mkdir()
+        main = ledger_dir / "main.beancount"
+        main.write_text(
+            'option "operating_currency" "CAD"\n' + _OPTIONS_CLOTURE
+            + "2025-01-01 open Actifs:Banque CAD\n"
+            "2025-01-01 open Passifs:TPS-Percue CAD\n"
+            "2025-01-01 open Capital:Benefices-Non-Repartis CAD\n"
+            "2025-01-01 open Revenus:Consultation CAD\n"
+            "2025-01-01 open Depenses:Repas CAD\n"
+            'include "2025/11.beancount"\n'
+            'include "2025/12.beancount"\n'
+            'include "2026/01.beancount"\n',
+            encoding="utf-8",
+        )
+        mois = {
+            "2025/11": [("2025-11-10", "Revenus:Consultation", "-1000.00", "Actifs:Banque")],
+            "2025/12": [
+                ("2025-12-05", "Depenses:Repas", "40.00", "Actifs:Banque"),
+                ("2025-12-20", "Passifs:TPS-Percue", "-50.00", "Actifs:Banque"),
+            ],
+            "2026/01": [("2026-01-15", "Revenus:Consultation", "-200.00", "Actifs:Banque")],
+        }
+        for nom, txns in mois.items():
+            fichier = ledger_dir / f"{nom}.beancount"
+            fichier.parent.mkdir(exist_ok=True)
+            texte = _OPTIONS_CLOTURE
+            for date, compte, montant, contrepartie in txns:
+                texte += (
+                    f'\n{date} * "Test"\n  {compte}  {montant} CAD\n  {contrepartie}\n'
+                )
+            fichier.write_text(texte, encoding="utf-8")
+        return main
+
+    def _soldes_bilan(self, entries) -> dict[str, Decimal]:
+        return {
+            c: s for c, s in table_postings(entries).soldes().items()
+            if c.startswith(("Actifs", "Passifs")) and s != 0
+        }
+
+    def test_cloture_reporte_soldes(self, ledger):
+        avant, _, _ = charger_ledger(ledger)
+        resultat = cloturer_exercice(ledger, 2025)
+
+        assert resultat.nb_fichiers == 2
+        assert resultat.resultat_cumule == Decimal("-960.00")
+        assert annees_ouvertes(ledger) == [2026]
+        assert annees_cloturees(ledger) == [2025]
+        assert 'include "clotures/ouverture-2026.beancount"' in ledger.read_text()
+
+        courant, erreurs, _ = charger_ledger(ledger)
+        assert not erreurs
+        assert self._soldes_bilan(courant) == self._soldes_bilan(avant)
+        soldes = table_postings(courant).soldes()
+        assert soldes["Capital:Benefices-Non-Repartis"] == Decimal("-960.00")
+        # L'etat des resultats courant ne contient plus que 2026
+        assert soldes["Revenus:Consultation"] == Decimal("-200.00")
+
+    def test_historique_complet_avec_archives(self, ledger):
+        avant, _, _ = charger_ledger(ledger)
+        cloturer_exercice(ledger, 2025)
+
+        historique, erreurs, _ = charger_ledger(ledger, archives=True)
+        assert not erreurs
+        assert table_postings(historique).soldes() == table_postings(avant).soldes()
+
+    def test_cloture_dans_l_ordre(self, ledger):
+        with pytest.raises(ValueError, match="anterieures: 2025"):
+            cloturer_exercice(ledger, 2026)
+        with pytest.raises(ValueError, match="Aucun fichier mensuel de 2024"):
+            cloturer_exercice(ledger, 2024)
+
+    def test_cloture_successive(self, ledger):
+        cloturer_exercice(ledger, 2025)
+        cloturer_exercice(ledger, 2026)
+
+        contenu = ledger.read_text()
+        assert "ouverture-2026" not in contenu
+        assert 'include "clotures/ouverture-2027.beancount"' in contenu
+        courant, erreurs, _ = charger_ledger(ledger)
+        assert not erreurs
+        soldes = table_postings(courant).soldes()
+        assert soldes["Actifs:Banque"] == Decimal("1210.00")
+        assert soldes["Capital:Benefices-Non-Repartis"] == Decimal("-1160.00")
+
+    def test_ecriture_exercice_cloture_refusee(self, ledger):
+        cloturer_exercice(ledger, 2025)
+        contenu = ledger.read_text()
+
+        with pytest.raises(ExerciceCloture, match="2025 est cloture"):
+            chemin_fichier_mensuel(2025, 12, ledger.parent)
+        with pytest.raises(ExerciceCloture):
+            ajouter_include(ledger, "2025/12.beancount")
+        assert ledger.read_text() == contenu
+        # L'exercice courant reste ouvert
+        assert chemin_fichier_mensuel(2026, 2, ledger.parent).exists()
+
+    def test_approbation_exercice_cloture_reste_en_attente(self, ledger):
+        from compteqc.categorisation.pending import approuver_transactions, lire_pending
+
+        cloturer_exercice(ledger, 2025)
+        pending = ledger.parent / "pending.beancount"
+        pending.write_text(
+            _OPTIONS_CLOTURE
+            + '\n2025-12-30 ! "Retard" #pending\n  Depenses:Repas  10.00 CAD\n'
+            "  Actifs:Banque\n",
+            encoding="utf-8",
+        )
+        contenu = ledger.read_text()
+
+        assert approuver_transactions(pending, ledger, [0]) == 0
+        assert len(lire_pending(pending)) == 1
+        assert ledger.read_text() == contenu
+
+    def test_report_pret_actionnaire_pas_un_mouvement(self, ledger):
+        from compteqc.quebec.pret_actionnaire.suivi import obtenir_etat_pret
+        from compteqc.rapports.agregats import Agregats
+
+        ledger.write_text(
+            ledger.read_text() + "2025-01-01 open Passifs:Pret-Actionnaire CAD\n",
+            encoding="utf-8",
+        )
+        decembre = ledger.parent / "2025" / "12.beancount"
+        decembre.write_text(
+            decembre.read_text()
+            + '\n2025-12-10 * "Avance"\n  Passifs:Pret-Actionnaire  300.00 CAD\n'
+            "  Actifs:Banque\n",
+            encoding="utf-8",
+        )
+        cloturer_exercice(ledger, 2025)
+
+        courant, erreurs, _ = charger_ledger(ledger)
+        assert not erreurs
+        assert table_postings(courant).soldes()["Passifs:Pret-Actionnaire"] == Decimal("300.00")
+        fin = datetime.date(2026, 12, 31)
+        assert obtenir_etat_pret(courant, fin).mouvements == []
+        assert Agregats(courant, 2026).etat_pret().mouvements == []
+
+    def test_cpa_exercice_cloture_charge_historique(self, ledger):
+        from typer.testing import CliRunner
+
+        from compteqc.cli.app import app
+
+        cloturer_exercice(ledger, 2025)
+        result = CliRunner().invoke(
+            app, ["cpa", "verifier", "--annee", "2025", "--ledger", str(ledger)]
+        )
+        assert result.exit_code == 0, result.output
+        assert "chargement de l'historique" in result.output
+
+
+_ENTETE_MIROIR = """option "operating_currency" "CAD"
+option "name_assets" "Actifs"
+option "name_liabilities" "Passifs"
+option "name_equity" "Capital"
+option "name_income" "Revenus"
+option "name_expenses" "Depenses"
+2026-01-01 open Actifs:Banque
+2026-01-01 open Passifs:Pret-Actionnaire
+2026-01-01 open Depenses:Repas
+include "2026/*.beancount"
+"""
+
+
+class TestMiroirLedger:
+    """Tests pour le miroir SQLite du ledger."""
+
+    @pytest.fixture
+    def ledger(self, tmp_path):
+        (tmp_path / "2026").mkdir()
+        (tmp_path / "main.beancount").write_text(_ENTETE_MIROIR, encoding="utf-8")
+        (tmp_path / "2026" / "01.beancount").write_text(
+            '2026-01-05 * "Resto" "Diner client" #client\n'
+            '  fitid: "A1"\n'
+            "  Depenses:Repas  45.50 CAD\n"
+            "  Actifs:Banque\n"
+            '2026-01-20 * "Actionnaire" "Avance"\n'
+            "  Passifs:Pret-Actionnaire  500.00 CAD\n"
+            "  Actifs:Banque\n",
+            encoding="utf-8",
+        )
+        (tmp_path / "2026" / "02.beancount").write_text(
+            '2026-02-03 * "Actionnaire" "Remboursement"\n'
+            "  Passifs:Pret-Actionnaire  -200.00 CAD\n"
+            "  Actifs:Banque\n"
+            '2026-02-04 document Actifs:Banque "releve.pdf"\n',
+            encoding="utf-8",
+        )
+        return tmp_path / "main.beancount"
+
+    def _charger(self, chemin):
+        from beancount import loader
+
+        entries, _, _ = loader.load_file(str(chemin))
+        return entries
+
+    def test_postings_par_compte_et_periode(self, ledger):
+        miroir = MiroirLedger()
+        miroir.synchroniser(self._charger(ledger))
+        lignes = miroir.postings(
+            compte="Passifs:Pret-Actionnaire",
+            debut=datetime.date(2026, 1, 1), fin=datetime.date(2026, 1, 31),
+        )
+        assert [(ligne.date, ligne.montant, ligne.narration) for ligne in lignes] == [
+            (datetime.date(2026, 1, 20), Decimal("500.00"), "Avance"),
+        ]
+
+    def test_soldes_identiques_aux_entries(self, ledger):
+        from compteqc.mcp.services import calculer_soldes
+
+        entries = self._charger(ledger)
+        miroir = MiroirLedger()
+        miroir.synchroniser(entries)
+        assert miroir.soldes() == calculer_soldes(entries)
+        assert miroir.soldes(prefixe="Passifs") == {"Passifs:Pret-Actionnaire": Decimal("300.00")}
+
+    def test_recherche_utilise_index(self, ledger):
+        miroir = MiroirLedger()
+        plan = " ".join(miroir.plan_requete(
+            "SELECT * FROM postings p WHERE p.compte = ? AND p.date >= ?",
+            ("Passifs:Pret-Actionnaire", "2026-01-01"),
+        ))
+        assert "idx_postings_compte_date" in plan
+
+    def test_tags_beneficiaire_meta_documents(self, ledger):
+        miroir = MiroirLedger()
+        miroir.synchroniser(self._charger(ledger))
+        assert [t["narration"] for t in miroir.transactions(tag="client")] == ["Diner client"]
+        assert len(miroir.transactions(payee="Actionnaire")) == 2
+        assert [t["payee"] for t in miroir.transactions(meta=("fitid", "A1"))] == ["Resto"]
+        docs = miroir.documents(compte="Actifs:Banque")
+        assert len(docs) == 1 and docs[0]["chemin"].endswith("releve.pdf")
+
+    def test_synchronisation_incrementale(self, ledger, tmp_path):
+        import os
+
+        chemin_db = tmp_path / "cache" / "miroir.sqlite"
+        miroir = MiroirLedger(chemin_db)
+        stats = miroir.synchroniser(self._charger(ledger))
+        assert stats["modifies"] == 2
+
+        # Rien n'a change: aucun fichier re-ecrit, meme apres reouverture
+        miroir.fermer()
+        miroir = MiroirLedger(chemin_db)
+        assert miroir.synchroniser(self._charger(ledger)) == {
+            "modifies": 0, "inchanges": 2, "supprimes": 0,
+        }
+
+        fevrier = ledger.parent / "2026" / "02.beancount"
+        with open(fevrier, "a", encoding="utf-8") as f:
+            f.write('2026-02-10 * "Actionnaire" "Avance 2"\n'
+                    "  Passifs:Pret-Actionnaire  50.00 CAD\n  Actifs:Banque\n")
+        stat = fevrier.stat()
+        os.utime(fevrier, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        stats = miroir.synchroniser(self._charger(ledger))
+        assert stats == {"modifies": 1, "inchanges": 1, "supprimes": 0}
+        assert miroir.soldes(prefixe="Passifs") == {"Passifs:Pret-Actionnaire": Decimal("350.00")}
+
+        fevrier.unlink()
+        stats = miroir.synchroniser(self._charger(ledger))
+        assert stats["supprimes"] == 1
+        assert miroir.documents() == []
+
+    def test_fichier_modifie_apres_analyse(self, ledger):
+        """L'empreinte vient des entrees analysees, pas du fichier sur disque."""
+        miroir = MiroirLedger()
+        perimees = self._charger(ledger)
+
+        fevrier = ledger.parent / "2026" / "02.beancount"
+        with open(fevrier, "a", encoding="utf-8") as f:
+            f.write('2026-02-10 * "Actionnaire" "Avance 2"\n'
+                    "  Passifs:Pret-Actionnaire  50.00 CAD\n  Actifs:Banque\n")
+        miroir.synchroniser(perimees)
+        assert miroir.soldes(prefixe="Passifs") == {"Passifs:Pret-Actionnaire": Decimal("300.00")}
+
+        stats = miroir.synchroniser(self._charger(ledger))
+        assert stats == {"modifies": 1, "inchanges": 1, "supprimes": 0}
+        assert miroir.soldes(prefixe="Passifs") == {"Passifs:Pret-Actionnaire": Decimal("350.00")}
+
+    def test_cache_par_liste(self, ledger):
+        entries = self._charger(ledger)
+        miroir = miroir_ledger(entries)
+        assert miroir_ledger(entries) is miroir
+
+    def test_miroir_evince_reste_utilisable(self, ledger):
+        """Un miroir evince du cache n'est pas ferme sous son appelant."""
+        entries = self._charger(ledger)
+        miroir = miroir_ledger(entries)
+        erreurs = []
+
+        def evincer():
+            try:
+                for _ in range(3):
+                    miroir_ledger(list(entries))
+            except Exception as e:  # pragma: no cover - echec du test
+                erreurs.append(e)
+
+        threads = [threading.Thread(target=evincer) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not erreurs
+        assert miroir.soldes(prefixe="Passifs") == {"Passifs:Pret-Actionnaire": Decimal("300.00")}
+
+
+
+LEDGER_REQUETES = """\
+option "name_assets" "Actifs"
+option "name_expenses" "Depenses"
+2026-01-01 open Actifs:Banque
+2026-01-01 open Depenses:Repas
+2026-01-01 open Depenses:Logiciels
+2026-01-05 * "Resto" "Diner client"
+  Depenses:Repas  40.00 CAD
+  Actifs:Banque
+2026-02-05 * "Resto" "Lunch"
+  Depenses:Repas  25.00 CAD
+  Actifs:Banque
+2026-02-10 * "GitHub" "Abonnement"
+  Depenses:Logiciels  10.00 CAD
+  Actifs:Banque
+"""
+
+
+class TestMoteurRequetes:
+    @pytest.fixture
+    def moteur(self):
+        entries, errors, options = loader.load_string(LEDGER_REQUETES)
+        return MoteurRequetes(entries, errors, options)
+
+    def test_select_agrege(self, moteur):
+        resultat = moteur.executer(
+            "SELECT account, sum(number) AS total WHERE account ~ '^Depenses' "
+            "GROUP BY account ORDER BY account"
+        )
+        assert [nom for nom, _ in resultat.colonnes] == ["account", "total"]
+        assert resultat.lignes == [
+            ("Depenses:Logiciels", Decimal("10.00")),
+            ("Depenses:Repas", Decimal("65.00")),
+        ]
+        assert resultat.tronque is False
+
+    def test_compilation_memorisee(self, moteur):
+        requete = "SELECT date, payee WHERE account = 'Depenses:Repas'"
+        moteur.executer(requete)
+        moteur.executer("  " + requete + "\n")
+        assert moteur.compilations == 1
+
+    def test_limite_de_lignes(self, moteur):
+        resultat = moteur.executer("SELECT date, account", lignes_max=4)
+        assert len(resultat.lignes) == 4
+        assert resultat.tronque is True
+        # LIMIT explicite plus petit: pas de troncature
+        assert moteur.executer("SELECT date LIMIT 2", lignes_max=4).tronque is False
+
+    def test_requetes_refusees(self, moteur):
+        with pytest.raises(RequeteInvalide, match="Syntaxe"):
+            moteur.executer("SELEC date")
+        with pytest.raises(RequeteInvalide, match="permises"):
+            moteur.executer("CREATE TABLE t (a int)")
+        with pytest.raises(RequeteInvalide, match="compilable"):
+            moteur.executer("SELECT colonne_inconnue")
+
+    def test_delai(self, moteur, monkeypatch):
+        import compteqc.ledger.requete as module_requete
+
+        monkeypatch.setattr(module_requete, "_INTERVALLE_VERIFICATION", 1)
+        with pytest.raises(DelaiRequeteDepasse):
+            moteur.executer("SELECT date", delai=-1)
+
+    def test_moteur_par_chargement(self):
+        entries, errors, options = loader.load_string(LEDGER_REQUETES)
+        moteur = moteur_requetes(entries, errors, options)
+        assert moteur_requetes(entries, errors, options) is moteur
+        autres, _, _ = loader.load_string(LEDGER_REQUETES)
+        assert moteur_requetes(autres, errors, options) is not moteur
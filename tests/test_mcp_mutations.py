@@ -6,6 +6,7 @@ Les modules domaine sont deja testes dans les phases 2/3.
 
 from __future__ import annotations
 
+import asyncio
 from decimal import Decimal
 from unittest.mock import MagicMock, patch
 
@@ -111,7 +112,9 @@ class TestProposerCategorie:
         with ExitStack() as stack:
             for p in self._patch_pipeline(resultat):
                 stack.enter_context(p)
-            result = proposer_categorie(payee="Amazon", narration="Fournitures", montant="150.00", ctx=ctx)
+            result = asyncio.run(
+                proposer_categorie(payee="Amazon", narration="Fournitures", montant="150.00", ctx=ctx)
+            )
 
         assert "compte_propose" in result
         assert "confiance" in result
@@ -137,7 +140,9 @@ class TestProposerCategorie:
         with ExitStack() as stack:
             for p in self._patch_pipeline(resultat):
                 stack.enter_context(p)
-            result = proposer_categorie(payee="Bell", narration="Internet", montant="500.00", ctx=ctx)
+            result = asyncio.run(
+                proposer_categorie(payee="Bell", narration="Internet", montant="500.00", ctx=ctx)
+            )
 
         assert result["auto_approuve"] is True
 
@@ -157,7 +162,9 @@ class TestProposerCategorie:
         with ExitStack() as stack:
             for p in self._patch_pipeline(resultat):
                 stack.enter_context(p)
-            result = proposer_categorie(payee="Apple", narration="MacBook", montant="3000.00", ctx=ctx)
+            result = asyncio.run(
+                proposer_categorie(payee="Apple", narration="MacBook", montant="3000.00", ctx=ctx)
+            )
 
         assert result["auto_approuve"] is False
 
@@ -182,7 +189,7 @@ class TestApprouverLot:
 
         from compteqc.mcp.tools.approbation import approuver_lot
 
-        result = approuver_lot(ids=["2026-01-15|Amazon|Fournitures"], ctx=ctx)
+        result = asyncio.run(approuver_lot(ids=["2026-01-15|Amazon|Fournitures"], ctx=ctx))
         assert result["status"] == "erreur"
         assert "lecture seule" in result["message"].lower()
 
@@ -195,7 +202,7 @@ class TestApprouverLot:
 
         from compteqc.mcp.tools.approbation import approuver_lot
 
-        result = approuver_lot(ids=["2026-01-15|Apple|MacBook Pro"], ctx=ctx)
+        result = asyncio.run(approuver_lot(ids=["2026-01-15|Apple|MacBook Pro"], ctx=ctx))
         assert result["status"] == "confirmation_requise"
         assert len(result["transactions_gros_montants"]) == 1
 
@@ -211,11 +218,11 @@ class TestApprouverLot:
 
         from compteqc.mcp.tools.approbation import approuver_lot
 
-        result = approuver_lot(
+        result = asyncio.run(approuver_lot(
             ids=["2026-01-15|Apple|MacBook Pro"],
             confirmer_gros_montants=True,
             ctx=ctx,
-        )
+        ))
         assert result["status"] == "ok"
         assert result["nb_approuve"] == 1
         app.reload.assert_called_once()
@@ -227,7 +234,7 @@ class TestRejeter:
 
         from compteqc.mcp.tools.approbation import rejeter
 
-        result = rejeter(id="2026-01-15|Amazon|Fournitures", ctx=ctx)
+        result = asyncio.run(rejeter(id="2026-01-15|Amazon|Fournitures", ctx=ctx))
         assert result["status"] == "erreur"
         assert "lecture seule" in result["message"].lower()
 
@@ -244,11 +251,11 @@ class TestRejeter:
 
         from compteqc.mcp.tools.approbation import rejeter
 
-        result = rejeter(
+        result = asyncio.run(rejeter(
             id="2026-01-15|Amazon|Fournitures bureau",
             compte_corrige="Depenses:Bureau",
             ctx=ctx,
-        )
+        ))
         assert result["status"] == "ok"
         assert "Depenses:Bureau" in result["message"]
         mock_corriger.assert_called_once()
@@ -290,7 +297,7 @@ class TestCalculerPaieTool:
 
         from compteqc.mcp.tools.paie import calculer_paie_tool
 
-        result = calculer_paie_tool(salaire_brut="4230.77", ctx=ctx)
+        result = asyncio.run(calculer_paie_tool(salaire_brut="4230.77", ctx=ctx))
 
         assert "salaire_brut" in result
         assert "retenues_employe" in result
@@ -307,7 +314,7 @@ class TestLancerPaie:
 
         from compteqc.mcp.tools.paie import lancer_paie
 
-        result = lancer_paie(salaire_brut="4230.77", ctx=ctx)
+        result = asyncio.run(lancer_paie(salaire_brut="4230.77", ctx=ctx))
         assert result["status"] == "erreur"
         assert "lecture seule" in result["message"].lower()
 
@@ -332,7 +339,7 @@ class TestLancerPaie:
 
         from compteqc.mcp.tools.paie import lancer_paie
 
-        result = lancer_paie(salaire_brut="4230.77", ctx=ctx)
+        result = asyncio.run(lancer_paie(salaire_brut="4230.77", ctx=ctx))
         assert result["status"] == "confirmation_requise"
         assert result["raison"] == "gros_montant"
 
@@ -356,7 +363,7 @@ class TestLancerPaie:
 
         from compteqc.mcp.tools.paie import lancer_paie
 
-        result = lancer_paie(salaire_brut="1800.00", ctx=ctx)
+        result = asyncio.run(lancer_paie(salaire_brut="1800.00", ctx=ctx))
         assert result["status"] == "confirmation_requise"
         assert result["raison"] == "nouveau_montant"
 
@@ -380,6 +387,6 @@ class TestLancerPaie:
 
         from compteqc.mcp.tools.paie import lancer_paie
 
-        result = lancer_paie(salaire_brut="4230.77", ctx=ctx)
+        result = asyncio.run(lancer_paie(salaire_brut="4230.77", ctx=ctx))
         assert result["status"] == "confirmation_requise"
         assert result["raison"] == "nouveau_et_gros_montant"
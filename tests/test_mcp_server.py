@@ -6,13 +6,20 @@ des outils (truncation, read-only) sans tester le transport MCP.
 
 from __future__ import annotations
 
+import asyncio
+import datetime
 from decimal import Decimal
 
 import pytest
 from beancount.parser import parser as beancount_parser
 
 from compteqc.mcp.server import AppContext
-from compteqc.mcp.services import calculer_soldes, formater_montant, lister_pending
+from compteqc.mcp.services import (
+    calculer_soldes,
+    calculer_variations,
+    formater_montant,
+    lister_pending,
+)
 
 
 # ---------- Fixtures ----------
@@ -103,6 +110,25 @@ class TestCalculerSoldes:
         soldes = calculer_soldes(entries, filtre="depenses")
         assert "Depenses:Fournitures" in soldes
 
+    def test_soldes_a_date(self):
+        entries = _parse(LEDGER_SIMPLE)
+        soldes = calculer_soldes(entries, date=datetime.date(2026, 2, 1))
+        assert soldes["Actifs:Banque:Desjardins"] == Decimal("4850.00")
+        assert "Depenses:Repas" not in soldes
+
+    def test_variations_periode(self):
+        entries = _parse(LEDGER_SIMPLE)
+        variations = calculer_variations(
+            entries,
+            debut=datetime.date(2026, 2, 1),
+            fin=datetime.date(2026, 2, 28),
+            prefixe=("Revenus", "Depenses"),
+        )
+        assert variations == {
+            "Depenses:Fournitures": Decimal("150.00"),
+            "Depenses:Repas": Decimal("45.00"),
+        }
+
 
 class TestListerPending:
     def test_trouve_pending(self):
@@ -184,6 +210,36 @@ class TestAppContext:
         ctx.reload()
         assert len(ctx.entries) > 0  # Au moins l'open directive
 
+    def test_rafraichir_detecte_modification_externe(self, tmp_path):
+        """Une ecriture hors du serveur (CLI, Fava) est vue sans recharger a l'aveugle."""
+        main = tmp_path / "main.beancount"
+        mensuel = tmp_path / "01.beancount"
+        main.write_text(
+            'option "name_assets" "Actifs"\n'
+            'option "name_equity" "Capital"\n'
+            'include "01.beancount"\n'
+            "2026-01-01 open Actifs:Banque\n"
+            "2026-01-01 open Capital:Apport\n",
+            encoding="utf-8",
+        )
+        mensuel.write_text("", encoding="utf-8")
+        ctx = AppContext(
+            ledger_path=str(main), entries=[], errors=[], options={}, read_only=False
+        )
+        ctx.reload()
+        avant = ctx.instantane()
+        assert ctx.rafraichir() is False
+
+        mensuel.write_text(
+            '2026-01-05 * "Apport"\n  Actifs:Banque  100 CAD\n  Capital:Apport\n',
+            encoding="utf-8",
+        )
+        assert ctx.rafraichir() is True
+        apres = ctx.instantane()
+        assert len(apres.entries) == len(avant.entries) + 1
+        # Seul le fichier modifie a ete re-parse
+        assert ctx.chargeur.nb_parses == 3
+
 
 # ---------- Tests truncation ----------
 
@@ -234,3 +290,439 @@ class TestTruncation:
         assert result["tronque"] is True
         assert len(result["comptes"]) == 50
         assert result["nb_comptes"] == 55
+
+
+# ---------- Tests cache des outils ----------
+
+
+class TestCacheResultats:
+    def _ctx(self, entries: list):
+        from unittest.mock import MagicMock
+
+        app = AppContext(
+            ledger_path="fake.beancount", entries=entries, errors=[], options={}, read_only=True
+        )
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app
+        return ctx, app
+
+    def test_resultat_memorise_puis_invalide(self):
+        from compteqc.mcp.tools.ledger import bilan
+
+        ctx, app = self._ctx(_parse(LEDGER_SIMPLE))
+        premier = asyncio.run(bilan(ctx=ctx))
+        assert asyncio.run(bilan(ctx=ctx)) is premier
+        assert app.cache.statistiques()["par_outil"]["bilan"] == {"succes": 1, "echecs": 1}
+
+        # Un rechargement substitue le ledger et vide le cache
+        app.remplacer(_parse(LEDGER_PENDING), [], {}, version=0)
+        assert app.cache.statistiques()["taille"] == 0
+        assert asyncio.run(bilan(ctx=ctx)) is not premier
+
+    def test_arguments_dans_la_cle(self):
+        from compteqc.mcp.tools.ledger import soldes_comptes
+
+        ctx, app = self._ctx(_parse(LEDGER_SIMPLE))
+        tous = asyncio.run(soldes_comptes(ctx=ctx))
+        depenses = asyncio.run(soldes_comptes(filtre="Depenses", ctx=ctx))
+        assert tous["nb_comptes"] > depenses["nb_comptes"]
+        assert asyncio.run(soldes_comptes(filtre="Depenses", ctx=ctx)) is depenses
+
+    def test_eviction_lru(self):
+        from compteqc.mcp.cache import CacheResultats
+
+        cache = CacheResultats(taille_max=2)
+        for i in range(3):
+            cache.ecrire(("outil", i), i)
+        assert cache.lire("outil", ("outil", 0)) == (False, None)
+        assert cache.lire("outil", ("outil", 2)) == (True, 2)
+        assert cache.statistiques()["evictions"] == 1
+
+    def test_outil_diagnostics(self):
+        from compteqc.mcp.tools.diagnostics import diagnostics
+        from compteqc.mcp.tools.ledger import balance_verification
+
+        ctx, app = self._ctx(_parse(LEDGER_SIMPLE))
+        asyncio.run(balance_verification(ctx=ctx))
+        asyncio.run(balance_verification(ctx=ctx))
+        resultat = asyncio.run(diagnostics(ctx=ctx))
+        assert resultat["ledger"]["nb_entrees"] == len(app.entries)
+        assert resultat["cache"]["par_outil"]["balance_verification"] == {
+            "succes": 1, "echecs": 1,
+        }
+
+
+class TestExecution:
+    """Outils executes hors de la boucle asyncio (pool de lecture, ecrivain unique)."""
+
+    def test_lecture_repond_pendant_une_ecriture(self):
+        import threading
+
+        from compteqc.mcp.execution import hors_boucle
+
+        debut_ecriture = threading.Event()
+        fin_ecriture = threading.Event()
+
+        @hors_boucle(ecriture=True)
+        def ecrire() -> str:
+            debut_ecriture.set()
+            assert fin_ecriture.wait(5)
+            return "ecrit"
+
+        @hors_boucle
+        def lire() -> str:
+            return "lu"
+
+        async def scenario():
+            tache = asyncio.ensure_future(ecrire())
+            await asyncio.get_running_loop().run_in_executor(None, debut_ecriture.wait, 5)
+            # L'ecriture est bloquee dans son thread: la lecture doit repondre
+            assert await asyncio.wait_for(lire(), timeout=2) == "lu"
+            fin_ecriture.set()
+            return await tache
+
+        assert asyncio.run(scenario()) == "ecrit"
+
+    def test_ecritures_serialisees(self):
+        import threading
+        import time
+
+        from compteqc.mcp.execution import hors_boucle
+
+        verrou = threading.Lock()
+        en_cours = []
+        ordre = []
+
+        @hors_boucle(ecriture=True)
+        def ecrire(i: int) -> None:
+            with verrou:
+                en_cours.append(i)
+                simultanees = len(en_cours)
+            time.sleep(0.01)
+            with verrou:
+                en_cours.remove(i)
+                ordre.append((i, simultanees))
+
+        async def scenario():
+            await asyncio.gather(*(ecrire(i) for i in range(5)))
+
+        asyncio.run(scenario())
+        assert [i for i, _ in ordre] == list(range(5))
+        assert all(simultanees == 1 for _, simultanees in ordre)
+
+
+    def test_notifications_de_progression(self):
+        from unittest.mock import AsyncMock, MagicMock
+
+        from compteqc.mcp.execution import hors_boucle, progression
+
+        ctx = MagicMock()
+        ctx.report_progress = AsyncMock()
+
+        @hors_boucle(etapes=2)
+        def outil(ctx=None) -> str:
+            progression().etape("lecture")
+            progression().etape("calcul")
+            return "ok"
+
+        async def scenario():
+            resultat = await outil(ctx=ctx)
+            await asyncio.sleep(0.05)  # notifications envoyees depuis le thread
+            return resultat
+
+        assert asyncio.run(scenario()) == "ok"
+        assert [c.args for c in ctx.report_progress.await_args_list] == [
+            (1, 2, "lecture"), (2, 2, "calcul"),
+        ]
+
+    def test_annulation_entre_deux_etapes(self):
+        import threading
+
+        from compteqc.mcp.execution import OperationAnnulee, hors_boucle, progression
+
+        dans_etape = threading.Event()
+        reprendre = threading.Event()
+        arrete = threading.Event()
+        etapes = []
+
+        @hors_boucle(ecriture=True)
+        def outil() -> None:
+            progression().etape("ecriture")
+            etapes.append("ecriture")
+            dans_etape.set()
+            assert reprendre.wait(5)
+            try:
+                progression().etape("confirmation")
+                etapes.append("confirmation")
+            except OperationAnnulee:
+                arrete.set()
+                raise
+
+        async def scenario():
+            tache = asyncio.ensure_future(outil())
+            await asyncio.get_running_loop().run_in_executor(None, dans_etape.wait, 5)
+            tache.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tache
+            reprendre.set()
+
+        asyncio.run(scenario())
+        assert arrete.wait(5)
+        assert etapes == ["ecriture"]
+
+
+# ---------- Tests pagination des outils ----------
+
+
+def _ledger_55_comptes() -> str:
+    lignes = [
+        'option "name_assets" "Actifs"',
+        'option "name_expenses" "Depenses"',
+        "2026-01-01 open Actifs:Banque",
+    ]
+    for i in range(55):
+        lignes.append(f"2026-01-01 open Depenses:Cat{i:03d}")
+        lignes.append(
+            f'2026-01-{(i % 28) + 1:02d} * "Vendor{i}" "Purchase {i}"\n'
+            f"  Depenses:Cat{i:03d}  {10 + i:.2f} CAD\n"
+            f"  Actifs:Banque  -{10 + i:.2f} CAD"
+        )
+    return "\n".join(lignes)
+
+
+class TestPagination:
+    def _ctx(self, entries: list):
+        from unittest.mock import MagicMock
+
+        app = AppContext(
+            ledger_path="fake.beancount", entries=entries, errors=[], options={}, read_only=True
+        )
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app
+        return ctx, app
+
+    def test_parcours_complet_par_curseur(self):
+        from compteqc.mcp.tools.ledger import soldes_comptes
+
+        ctx, _ = self._ctx(_parse(_ledger_55_comptes()))
+        vus = []
+        curseur = None
+        while True:
+            page = asyncio.run(
+                soldes_comptes(filtre="Depenses", limite=20, curseur=curseur, ctx=ctx)
+            )
+            assert page["nb_comptes"] == 55
+            vus.extend(c["compte"] for c in page["comptes"])
+            curseur = page["curseur_suivant"]
+            if curseur is None:
+                assert page["tronque"] is False
+                break
+            assert page["tronque"] is True
+        assert vus == [f"Depenses:Cat{i:03d}" for i in range(55)]
+
+    def test_tri_par_solde_decroissant(self):
+        from compteqc.mcp.tools.ledger import soldes_comptes
+
+        ctx, _ = self._ctx(_parse(_ledger_55_comptes()))
+        page = asyncio.run(
+            soldes_comptes(filtre="Depenses", tri="solde", decroissant=True, limite=2, ctx=ctx)
+        )
+        assert [c["compte"] for c in page["comptes"]] == ["Depenses:Cat054", "Depenses:Cat053"]
+
+    def test_curseur_perime_ou_autre_requete(self):
+        from compteqc.mcp.tools.ledger import soldes_comptes
+
+        ctx, app = self._ctx(_parse(_ledger_55_comptes()))
+        curseur = asyncio.run(soldes_comptes(filtre="Depenses", limite=10, ctx=ctx))[
+            "curseur_suivant"
+        ]
+        autre = asyncio.run(soldes_comptes(filtre="Cat0", limite=10, curseur=curseur, ctx=ctx))
+        assert "autre requete" in autre["erreur"]
+
+        app.remplacer(app.entries, [], {}, version=0)
+        perime = asyncio.run(soldes_comptes(filtre="Depenses", limite=10, curseur=curseur, ctx=ctx))
+        assert "perime" in perime["erreur"]
+
+    def test_index_construit_une_fois(self):
+        from compteqc.mcp.tools.ledger import soldes_comptes
+
+        ctx, app = self._ctx(_parse(_ledger_55_comptes()))
+        page = asyncio.run(soldes_comptes(limite=10, ctx=ctx))
+        asyncio.run(soldes_comptes(limite=10, curseur=page["curseur_suivant"], ctx=ctx))
+        stats = app.cache.statistiques()["par_outil"]["soldes_comptes.elements:index"]
+        assert stats == {"succes": 1, "echecs": 1}
+
+    def test_sections_paginees_ensemble(self):
+        from compteqc.mcp.tools.ledger import etat_resultats
+
+        ctx, _ = self._ctx(_parse(LEDGER_SIMPLE))
+        page = asyncio.run(etat_resultats(limite=1, ctx=ctx))
+        assert len(page["revenus"]) == 1 and len(page["depenses"]) == 1
+        assert page["nb_depenses"] == 2
+        suite = asyncio.run(etat_resultats(limite=1, curseur=page["curseur_suivant"], ctx=ctx))
+        assert suite["revenus"] == []
+        assert [d["compte"] for d in suite["depenses"]] == ["Depenses:Repas"]
+        assert suite["curseur_suivant"] is None
+        assert suite["total_depenses"] == page["total_depenses"] == "195.00"
+
+    def test_filtres_pending(self):
+        from compteqc.mcp.tools.approbation import lister_pending_tool
+
+        ctx, _ = self._ctx(_parse(LEDGER_PENDING))
+        assert asyncio.run(lister_pending_tool(ctx=ctx))["nb_pending"] == 2
+        faibles = asyncio.run(lister_pending_tool(confiance_max=0.8, ctx=ctx))
+        assert [t["payee"] for t in faibles["transactions"]] == ["Inconnu"]
+        par_montant = asyncio.run(lister_pending_tool(tri="montant", ctx=ctx))
+        assert [t["payee"] for t in par_montant["transactions"]] == ["Netflix", "Inconnu"]
+        recherche = asyncio.run(lister_pending_tool(recherche="abonnement", ctx=ctx))
+        assert recherche["nb_pending"] == 1
+        assert asyncio.run(lister_pending_tool(montant_min="x", ctx=ctx))["erreur"]
+
+
+class TestOutilRequete:
+    def test_requete_paginee(self):
+        from unittest.mock import MagicMock
+
+        from beancount import loader
+
+        from compteqc.mcp.tools.requete import requete
+
+        entries, errors, options = loader.load_string(LEDGER_SIMPLE)
+        app = AppContext(
+            ledger_path="fake.beancount", entries=entries, errors=errors, options=options,
+            read_only=True,
+        )
+        ctx = MagicMock()
+        ctx.request_context.lifespan_context = app
+
+        bql = "SELECT date, account, position ORDER BY date, account"
+        page = asyncio.run(requete(bql=bql, limite=4, ctx=ctx))
+        assert [c["nom"] for c in page["colonnes"]] == ["date", "account", "position"]
+        assert page["nb_lignes"] == 6
+        assert page["lignes"][0] == ["2026-01-15", "Actifs:Banque:Desjardins", "5000.00 CAD"]
+        suite = asyncio.run(requete(bql=bql, limite=4, curseur=page["curseur_suivant"], ctx=ctx))
+        assert len(suite["lignes"]) == 2 and suite["curseur_suivant"] is None
+
+        assert "erreur" in asyncio.run(requete(bql="DROP TABLE postings", ctx=ctx))
+
+
+class TestContextePartage:
+    """Mode HTTP: un seul ledger chaud partage par toutes les sessions."""
+
+    @pytest.fixture
+    def ledger(self, tmp_path, monkeypatch):
+        main = tmp_path / "ledger" / "main.beancount"
+        main.parent.mkdir()
+        main.write_text(
+            'option "name_assets" "Actifs"\n2026-01-01 open Actifs:Banque\n', encoding="utf-8"
+        )
+        monkeypatch.setenv("COMPTEQC_LEDGER", str(main))
+        monkeypatch.setenv("COMPTEQC_SURVEILLANCE", "false")
+        monkeypatch.setenv("COMPTEQC_MIROIR", str(tmp_path / "miroir.sqlite"))
+        monkeypatch.delenv("COMPTEQC_READONLY", raising=False)
+        return main
+
+    def test_sessions_partagent_le_contexte(self, ledger):
+        from compteqc.mcp import server
+
+        async def scenario():
+            async with server.app_lifespan(server.mcp) as premier:
+                async with server.app_lifespan(server.mcp) as second:
+                    assert second is premier
+                    assert server.sessions_actives() == 2
+                    assert premier.chargeur.nb_parses == 1
+            assert server.sessions_actives() == 0
+
+        asyncio.run(scenario())
+        # Hors mode HTTP, le contexte est libere avec la derniere session
+        assert server._partage is None
+
+    def test_politique_sessions(self):
+        from compteqc.mcp.server import PolitiqueSessions
+
+        ouverte = PolitiqueSessions()
+        assert ouverte.lecture_seule({}) is False
+        assert ouverte.lecture_seule({"x-compteqc-lecture-seule": "true"}) is True
+
+        fermee = PolitiqueSessions(lecture_seule_par_defaut=True, jeton="s3cret")
+        assert fermee.lecture_seule({}) is True
+        assert fermee.lecture_seule({"x-compteqc-jeton": "mauvais"}) is True
+        assert fermee.lecture_seule({"x-compteqc-jeton": "s3cret"}) is False
+        # Le client peut toujours restreindre sa session
+        assert fermee.lecture_seule(
+            {"x-compteqc-jeton": "s3cret", "x-compteqc-lecture-seule": "oui"}
+        ) is True
+        # Sans jeton configure, aucune session n'obtient l'ecriture
+        assert PolitiqueSessions(lecture_seule_par_defaut=True).lecture_seule(
+            {"x-compteqc-jeton": ""}
+        ) is True
+
+    def test_politique_depuis_env(self, monkeypatch):
+        from compteqc.mcp.server import PolitiqueSessions
+
+        monkeypatch.setenv("COMPTEQC_LECTURE_SEULE_PAR_DEFAUT", "true")
+        monkeypatch.setenv("COMPTEQC_JETON_ECRITURE", "s3cret")
+        assert PolitiqueSessions.depuis_env() == PolitiqueSessions(True, "s3cret")
+
+    def test_mode_session_fixe_a_l_ouverture(self, monkeypatch):
+        from unittest.mock import MagicMock
+
+        from compteqc.mcp import server
+
+        politique = server.PolitiqueSessions(lecture_seule_par_defaut=True, jeton="s3cret")
+        monkeypatch.setattr(server, "_politique", politique)
+        monkeypatch.setattr(server, "_modes_sessions", {})
+        compteur = iter(range(100))
+
+        async def transport(scope, receive, send):
+            # Le transport attribue l'identifiant a l'ouverture de session
+            en_tetes = dict(scope["headers"])
+            session = en_tetes.get(b"mcp-session-id") or str(next(compteur)).encode()
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"mcp-session-id", session)]})
+            await send({"type": "http.response.body", "body": b""})
+
+        middleware = server.ModeSessionsHttp(transport)
+
+        async def requete(en_tetes: dict) -> str:
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http",
+                "headers": [(k.encode(), v.encode()) for k, v in en_tetes.items()],
+            }
+            await middleware(scope, None, send)
+            return dict(messages[0]["headers"])[b"mcp-session-id"].decode()
+
+        lecteur = asyncio.run(requete({}))
+        ecrivain = asyncio.run(requete({"x-compteqc-jeton": "s3cret"}))
+        assert server._modes_sessions == {lecteur: True, ecrivain: False}
+
+        # Les requetes suivantes ne peuvent que restreindre la session
+        asyncio.run(requete({"mcp-session-id": lecteur, "x-compteqc-jeton": "s3cret"}))
+        asyncio.run(requete({"mcp-session-id": ecrivain, "x-compteqc-lecture-seule": "true"}))
+        assert server._modes_sessions == {lecteur: True, ecrivain: True}
+
+        app = AppContext(
+            ledger_path="fake.beancount", entries=[], errors=[], options={}, read_only=False
+        )
+
+        def ctx(en_tetes: dict | None):
+            c = MagicMock()
+            c.request_context.lifespan_context = app
+            if en_tetes is None:
+                c.request_context.request = None
+            else:
+                c.request_context.request.headers = en_tetes
+            return c
+
+        # Le mode enregistre prime sur les en-tetes de la requete courante
+        assert server.lecture_seule(ctx({"mcp-session-id": lecteur, "x-compteqc-jeton": "s3cret"}))
+        # Session inconnue: politique appliquee aux en-tetes
+        assert server.lecture_seule(ctx({"x-compteqc-jeton": "s3cret"})) is False
+        assert server.lecture_seule(ctx({})) is True
+        # stdio: pas de requete HTTP
+        assert server.lecture_seule(ctx(None)) is False
@@ -17,6 +17,7 @@ from compteqc.categorisation.pending import (
     rejeter_transactions,
 )
 from compteqc.categorisation.pipeline import ResultatPipeline
+from compteqc.ledger.verrou import ConflitVersion, version_ledger
 
 PROJECT_ROOT = Path(__file__).parent.parent
 
@@ -278,6 +279,70 @@ class TestApprouverTransactions:
         assert len(pending) == 1
         assert pending[0].payee == "Shell"
 
+    def test_approuver_invalide_annule_ecritures(self, ledger_env):
+        """Un compte inconnu invalide le ledger: toutes les ecritures sont annulees."""
+        txn = _make_txn("Tim Hortons", "cafe", Decimal("5.50"))
+        ecrire_pending(ledger_env["pending"], [txn], [_make_resultat("Depenses:Inexistant", 0.9)])
+        main_avant = ledger_env["main"].read_text(encoding="utf-8")
+        pending_avant = ledger_env["pending"].read_text(encoding="utf-8")
+
+        nb = approuver_transactions(ledger_env["pending"], ledger_env["main"], [0])
+
+        assert nb == 0
+        assert ledger_env["main"].read_text(encoding="utf-8") == main_avant
+        assert ledger_env["pending"].read_text(encoding="utf-8") == pending_avant
+        assert not (ledger_env["ledger_dir"] / "2026" / "01.beancount").exists()
+        assert not list((ledger_env["ledger_dir"] / ".journal").glob("*.wal"))
+
+    def test_approuver_interrompu_avant_confirmation(self, ledger_env):
+        """Une exception levee par le rappel d'etape annule toutes les ecritures."""
+        txn = _make_txn("Tim Hortons", "cafe", Decimal("5.50"))
+        ecrire_pending(
+            ledger_env["pending"], [txn], [_make_resultat("Depenses:Repas-Representation", 0.9)]
+        )
+        main_avant = ledger_env["main"].read_text(encoding="utf-8")
+        pending_avant = ledger_env["pending"].read_text(encoding="utf-8")
+        etapes = []
+
+        class Arret(BaseException):
+            pass
+
+        def etape(nom: str) -> None:
+            etapes.append(nom)
+            if nom == "confirmation":
+                raise Arret
+
+        with pytest.raises(Arret):
+            approuver_transactions(ledger_env["pending"], ledger_env["main"], [0], etape=etape)
+
+        assert etapes == ["ecriture", "validation", "confirmation"]
+        assert ledger_env["main"].read_text(encoding="utf-8") == main_avant
+        assert ledger_env["pending"].read_text(encoding="utf-8") == pending_avant
+        assert not list((ledger_env["ledger_dir"] / ".journal").glob("*.wal"))
+
+    def test_approuver_version_perimee_refuse(self, ledger_env):
+        """Des indices calcules sur une version perimee ne sont pas appliques."""
+        txns = [
+            _make_txn("Tim Hortons", "cafe", Decimal("5.50")),
+            _make_txn("Shell", "essence", Decimal("65.00")),
+        ]
+        resultats = [
+            _make_resultat("Depenses:Repas-Representation", 0.88),
+            _make_resultat("Depenses:Deplacement:Transport", 0.85),
+        ]
+        ecrire_pending(ledger_env["pending"], txns, resultats)
+        version = version_ledger(ledger_env["ledger_dir"])
+
+        # Un autre ecrivain rejette la premiere: l'indice 1 n'existe plus
+        assert rejeter_transactions(ledger_env["pending"], [0], version_attendue=version) == 1
+        assert version_ledger(ledger_env["ledger_dir"]) == version + 1
+
+        with pytest.raises(ConflitVersion):
+            approuver_transactions(
+                ledger_env["pending"], ledger_env["main"], [1], version_attendue=version
+            )
+        assert len(lire_pending(ledger_env["pending"])) == 1
+
     def test_approuver_vide_retourne_zero(self, ledger_env):
         """Approuver depuis un pending vide retourne 0."""
         nb = approuver_transactions(
@@ -20,6 +20,7 @@ from compteqc.quebec.pret_actionnaire.detection import detecter_circularite
 from compteqc.quebec.pret_actionnaire.suivi import (
     MouvementPret,
     calculer_etat_pret,
+    mouvement_depuis_posting,
     obtenir_etat_pret,
 )
 
@@ -380,3 +381,27 @@ class TestObtenirEtatPret:
 
         assert len(etat.mouvements) == 1
         assert etat.mouvements[0].description == "Paiement facture personnelle"
+
+
+class TestMouvementDepuisPosting:
+    """Tests for the shared posting -> MouvementPret conversion."""
+
+    def test_avance_et_remboursement(self):
+        avance = _make_txn(datetime.date(2026, 3, 15), "Retrait", "Passifs:Pret-Actionnaire", "500")
+        rembourse = _make_txn(
+            datetime.date(2026, 4, 1), "Retour", "Passifs:Pret-Actionnaire", "-200"
+        )
+
+        assert mouvement_depuis_posting(avance, avance.postings[0]) == MouvementPret(
+            date=datetime.date(2026, 3, 15), montant=D("500"), description="Retrait", type="avance"
+        )
+        assert mouvement_depuis_posting(rembourse, rembourse.postings[0]).type == "remboursement"
+
+    def test_ignore_autres_comptes_et_ouverture(self):
+        autre = _make_txn(datetime.date(2026, 3, 15), "QPP", "Passifs:Retenues:QPP-Base", "-50")
+        ouverture = _make_txn(
+            datetime.date(2026, 1, 1), "Soldes d'ouverture", "Passifs:Pret-Actionnaire", "900"
+        )._replace(tags=frozenset({"ouverture"}))
+
+        assert mouvement_depuis_posting(autre, autre.postings[0]) is None
+        assert mouvement_depuis_posting(ouverture, ouverture.postings[0]) is None
@@ -8,6 +8,7 @@ from __future__ import annotations
 
 import csv
 import os
+import pickle
 from decimal import Decimal
 from pathlib import Path
 
@@ -24,6 +25,7 @@ from compteqc.rapports.gifi_export import (
     extract_gifi_map,
     validate_gifi,
 )
+from compteqc.rapports.rendu import generer_rapports, nb_jobs_defaut
 
 # ---------------------------------------------------------------------------
 # Fixture: entrees Beancount de test avec soldes connus et metadata GIFI
@@ -279,6 +281,38 @@ class TestGenerate:
         assert result["pdf"].exists()
 
 
+class TestRenduParallele:
+    """Tests pour le rendu PDF des rapports dans un pool de processus."""
+
+    def test_contexte_pdf_picklable(self, entries):
+        """Le contexte envoye aux processus de rendu est picklable et fige."""
+        rapport = Bilan(entries, annee=2025, entreprise="Test Inc.")
+        contexte = rapport.contexte_pdf("2026-01-15")
+        copie = pickle.loads(pickle.dumps(contexte))
+        assert copie == contexte
+        assert copie["date_generation"] == "2026-01-15"
+        assert copie["total_actifs"] == rapport.data["total_actifs"]
+
+    def test_nb_jobs_defaut(self):
+        assert nb_jobs_defaut(0) == 1
+        assert 1 <= nb_jobs_defaut(7) <= 7
+
+    def test_parallele_identique_au_sequentiel(self, entries, tmp_path, weasyprint_available):
+        """Memes fichiers, dans le meme ordre, quel que soit le nombre de processus."""
+        classes = (BalanceVerification, EtatResultats, Bilan)
+        sequentiel = generer_rapports(
+            [(cls(entries, 2025), tmp_path / "seq") for cls in classes], jobs=1
+        )
+        parallele = generer_rapports(
+            [(cls(entries, 2025), tmp_path / "par") for cls in classes], jobs=3
+        )
+        assert [r.nom for r in parallele] == [r.nom for r in sequentiel]
+        for seq, par in zip(sequentiel, parallele):
+            assert par.csv.read_bytes() == seq.csv.read_bytes()
+            assert par.pdf.exists() and par.pdf.stat().st_size > 0
+            assert par.duree_pdf > 0
+
+
 # ===========================================================================
 # Tests: GIFI
 # ===========================================================================